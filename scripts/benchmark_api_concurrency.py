@@ -0,0 +1,167 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/scripts\benchmark_api_concurrency.py
+# File Name: benchmark_api_concurrency
+# @ Author: mango-gh22
+# @ Date：2026/10/18 02:40
+"""
+desc API 并发负载基准测试：阻塞式处理函数 vs 异步查询层（有界线程池）
+用法:
+    python scripts/benchmark_api_concurrency.py                          # 默认 200 个请求，并发 1/8/32
+    python scripts/benchmark_api_concurrency.py --requests 500 --concurrency 16 64 --db-latency-ms 80
+
+数据库用本地替身（QueryEngine 接口，按 --db-latency-ms 阻塞模拟 MySQL 往返，返回合成行情），
+指标由真实的 EnhancedQueryEngine 计算；请求通过 httpx.ASGITransport 在同一事件循环内发送，
+因此处理函数阻塞事件循环时，按固定节奏（每 20ms）发出的 /health 探测会被推迟（队头阻塞），
+health p95 统计的是从计划发出时刻到收到响应的时间。
+"""
+
+import sys
+import os
+import time
+import asyncio
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+import httpx
+from fastapi import FastAPI, HTTPException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.async_query import AsyncQueryEngine
+from src.api.indicators_api import IndicatorRequest, app, get_query_engine, _build_calculate_response
+from src.query.enhanced_query_engine import EnhancedQueryEngine
+
+
+class StandInQueryEngine:
+    """MySQL 替身：query_daily_data 阻塞 latency 秒后返回合成日线数据（倒序，与真实查询一致）"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def query_daily_data(self, symbol, start_date=None, end_date=None):
+        time.sleep(self.latency)
+        dates = pd.bdate_range(start_date, end_date)
+        rng = np.random.default_rng(abs(hash(symbol)) % (2 ** 32))
+        close = 20 + np.cumsum(rng.normal(0, 0.3, len(dates)))
+        df = pd.DataFrame({
+            'trade_date': dates,
+            'symbol': symbol,
+            'open_price': close + rng.normal(0, 0.1, len(dates)),
+            'high_price': close + rng.random(len(dates)) * 0.5,
+            'low_price': close - rng.random(len(dates)) * 0.5,
+            'close_price': close,
+            'volume': rng.integers(10000, 1000000, len(dates)).astype(float),
+        })
+        return df.iloc[::-1].reset_index(drop=True)
+
+
+def blocking_app(engine: EnhancedQueryEngine) -> FastAPI:
+    """改造前的处理方式：async 处理函数内直接调用同步查询引擎"""
+    legacy = FastAPI()
+
+    @legacy.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @legacy.post("/indicators/calculate")
+    async def calculate(request: IndicatorRequest):
+        result_df = engine.query_with_indicators(request.symbol, request.indicators,
+                                                 request.start_date, request.end_date,
+                                                 use_cache=request.use_cache)
+        if result_df.empty:
+            raise HTTPException(status_code=404)
+        return _build_calculate_response(request, result_df)
+
+    return legacy
+
+
+async def run_load(target: FastAPI, requests: int, concurrency: int, symbols: int,
+                   start_date: str, end_date: str) -> dict:
+    """并发发送计算请求，同时每 20ms 探测一次 /health"""
+    transport = httpx.ASGITransport(app=target, raise_app_exceptions=False)
+    latencies, probes, statuses = [], [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=300) as client:
+        async def one(i: int):
+            body = {'symbol': f"sh{600000 + i % symbols}", 'indicators': ['moving_average', 'rsi', 'macd'],
+                    'start_date': start_date, 'end_date': end_date, 'use_cache': False}
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post('/indicators/calculate', json=body)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe():
+            scheduled = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get('/health')
+                probes.append(time.perf_counter() - scheduled)
+                scheduled = max(scheduled + 0.02, time.perf_counter())
+
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(one(i) for i in range(requests)))
+        finally:
+            elapsed = time.perf_counter() - start
+            done.set()
+            await prober
+
+    return {
+        'elapsed': elapsed,
+        'throughput': requests / elapsed,
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'health_p95': float(np.percentile(probes, 95)) if probes else float('nan'),
+        'statuses': statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API 并发负载基准测试')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--symbols', type=int, default=50, help='请求轮换的股票数')
+    parser.add_argument('--start-date', default='2024-01-01')
+    parser.add_argument('--end-date', default='2024-12-31')
+    parser.add_argument('--db-latency-ms', type=float, default=50, help='模拟的 MySQL 查询耗时')
+    parser.add_argument('--workers', type=int, default=5, help='异步查询层线程数')
+    parser.add_argument('--max-pending', type=int, default=64, help='异步查询层排队上限')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    engine = EnhancedQueryEngine(query_engine=StandInQueryEngine(args.db_latency_ms / 1000))
+    async_engine = AsyncQueryEngine(engine, max_workers=args.workers, max_pending=args.max_pending,
+                                    acquire_timeout=300)
+    app.dependency_overrides[get_query_engine] = lambda: async_engine
+    legacy = blocking_app(engine)
+
+    print("=" * 72)
+    print("API 并发负载基准测试")
+    print("=" * 72)
+    print(f"  {args.requests} 个请求, 模拟 MySQL 延迟 {args.db_latency_ms:.0f}ms, "
+          f"异步查询层: {args.workers} 线程 / 排队上限 {args.max_pending}")
+    print(f"\n  {'模式':<8} {'并发':>4} {'耗时(s)':>8} {'请求/秒':>8} {'p50(ms)':>8} {'p95(ms)':>8} "
+          f"{'health p95(ms)':>14}  状态码")
+    try:
+        for concurrency in args.concurrency:
+            for name, target in (('阻塞', legacy), ('异步', app)):
+                result = asyncio.run(run_load(target, args.requests, concurrency, args.symbols,
+                                                  args.start_date, args.end_date))
+                print(f"  {name:<8} {concurrency:>4} {result['elapsed']:>8.2f} {result['throughput']:>8.1f} "
+                      f"{result['p50'] * 1000:>8.0f} {result['p95'] * 1000:>8.0f} "
+                      f"{result['health_p95'] * 1000:>14.1f}  {result['statuses']}")
+    finally:
+        app.dependency_overrides.clear()
+        async_engine.shutdown()
+
+    print(f"\n异步查询层统计: {async_engine.get_statistics()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/scripts\benchmark_cci.py
+# File Name: benchmark_cci
+# @ Author: mango-gh22
+# @ Date：2026/10/17 17:50
+"""
+desc CCI 平均偏差基准测试：rolling().apply 原实现 vs 滑动窗口视图
+用法:
+    python scripts/benchmark_cci.py                      # 模拟日线 + 分钟线
+    python scripts/benchmark_cci.py --minute-symbol sh600519 --freq 1min   # 使用 stock_minute_data
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.indicators import kernels
+
+
+def legacy_mean_deviation(typical: pd.Series, period: int) -> pd.Series:
+    """原 CCI.calculate 的 rolling().apply 实现"""
+    return typical.rolling(window=period).apply(lambda x: np.mean(np.abs(x - np.mean(x))))
+
+
+def simulate_typical_price(rows: int, seed: int = 42) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    close = 50 + np.cumsum(rng.normal(0, 0.2, rows))
+    high = close + rng.random(rows) * 0.5
+    low = close - rng.random(rows) * 0.5
+    return pd.Series((high + low + close) / 3)
+
+
+def load_minute_typical_price(symbol: str, freq: str, limit: int) -> pd.Series:
+    """从 stock_minute_data 读取一只股票的分钟线典型价格"""
+    from src.database.db_connector import DatabaseConnector
+
+    db = DatabaseConnector()
+    rows = db.execute_query(
+        "SELECT high_price, low_price, close_price FROM stock_minute_data "
+        "WHERE normalized_code = %s AND freq = %s ORDER BY trade_time DESC LIMIT %s",
+        (symbol, freq, limit)
+    )
+    if not rows:
+        raise ValueError(f"stock_minute_data 中没有 {symbol} 的 {freq} 数据")
+
+    df = pd.DataFrame(rows, columns=['high_price', 'low_price', 'close_price']).iloc[::-1].astype(float)
+    return (df['high_price'] + df['low_price'] + df['close_price']) / 3
+
+
+def run_case(label: str, typical: pd.Series, period: int, legacy_limit: int) -> dict:
+    values = typical.to_numpy(dtype=np.float64)
+
+    start = time.perf_counter()
+    fast = kernels.rolling_mean_deviation(values, period)
+    fast_time = time.perf_counter() - start
+
+    # rolling().apply 太慢，超过上限时用子集测量后线性外推
+    legacy_rows = min(len(typical), legacy_limit)
+    start = time.perf_counter()
+    legacy = legacy_mean_deviation(typical.iloc[:legacy_rows], period).to_numpy()
+    legacy_time = (time.perf_counter() - start) * len(typical) / legacy_rows
+
+    max_diff = np.nanmax(np.abs(fast[:legacy_rows] - legacy))
+    assert np.allclose(fast[:legacy_rows], legacy, rtol=1e-10, equal_nan=True), "平均偏差结果不一致"
+
+    note = f" (由 {legacy_rows:,} 行外推)" if legacy_rows < len(typical) else ""
+    print(f"  {label}: {len(typical):,} bars, 周期 {period}")
+    print(f"    rolling().apply: {legacy_time * 1000:>10.1f}ms{note}")
+    print(f"    滑动窗口视图:    {fast_time * 1000:>10.2f}ms")
+    print(f"    加速比: {legacy_time / fast_time:.0f}x, 最大误差: {max_diff:.2e}")
+
+    return {'case': label, 'rows': len(typical), 'legacy_s': legacy_time,
+            'vectorized_s': fast_time, 'max_abs_diff': float(max_diff)}
+
+
+def run_benchmark(args):
+    print("📊 CCI 平均偏差基准测试")
+    print("-" * 50)
+
+    results = [run_case('日线(模拟)', simulate_typical_price(args.daily_years * 250), args.period,
+                        args.legacy_limit)]
+
+    if args.minute_symbol:
+        typical = load_minute_typical_price(args.minute_symbol, args.freq, args.minute_bars)
+        label = f'分钟线 {args.minute_symbol} {args.freq}'
+    else:
+        # A股每个交易日 240 根 1 分钟 K 线
+        typical = simulate_typical_price(args.minute_bars, seed=7)
+        label = '分钟线(模拟)'
+    results.append(run_case(label, typical, args.period, args.legacy_limit))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CCI 平均偏差基准测试')
+    parser.add_argument('--period', type=int, default=20, help='CCI 周期')
+    parser.add_argument('--daily-years', type=int, default=10, help='模拟日线年数')
+    parser.add_argument('--minute-bars', type=int, default=240 * 250, help='分钟线根数')
+    parser.add_argument('--minute-symbol', default=None, help='从 stock_minute_data 读取的股票代码')
+    parser.add_argument('--freq', default='1min', help='分钟线频率')
+    parser.add_argument('--legacy-limit', type=int, default=20_000, help='原实现实际测量行数上限')
+    args = parser.parse_args()
+
+    run_benchmark(args)
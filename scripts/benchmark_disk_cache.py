@@ -0,0 +1,134 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/scripts\benchmark_disk_cache.py
+# File Name: benchmark_disk_cache
+# @ Author: mango-gh22
+# @ Date：2026/10/17 20:50
+"""
+desc 磁盘缓存命中延迟基准测试：每次命中重写 index.json 的原实现 vs SQLite WAL 索引
+用法:
+    python scripts/benchmark_disk_cache.py                         # 1k / 10k / 100k 条目
+    python scripts/benchmark_disk_cache.py --entries 1000 50000 --hits 2000
+"""
+
+import sys
+import os
+import json
+import time
+import pickle
+import zlib
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.performance.cache_strategy import DiskCache, LRUCacheStrategy
+
+
+class LegacyJsonDiskCache:
+    """原 DiskCache 的命中路径：读文件、更新访问信息、重写整个 index.json"""
+
+    def __init__(self, cache_dir: Path, index: dict):
+        self.cache_dir = cache_dir
+        self.index_file = cache_dir / 'index.json'
+        self.index = index
+
+    def _save_index(self):
+        with open(self.index_file, 'w') as f:
+            json.dump(self.index, f)
+
+    def get(self, key: str, path: Path):
+        item_info = self.index[key]
+        with open(path, 'rb') as f:
+            value = pickle.loads(zlib.decompress(f.read()))
+        item_info['last_accessed'] = datetime.now().isoformat()
+        item_info['access_count'] = item_info.get('access_count', 0) + 1
+        self._save_index()
+        return value
+
+
+def make_index_entry(size: int) -> dict:
+    now = datetime.now().isoformat()
+    return {'created_at': now, 'last_accessed': now, 'size': size,
+            'ttl': None, 'metadata': {}, 'access_count': 0}
+
+
+def run_case(entries: int, hits: int, legacy_limit: int, hot_keys: int) -> dict:
+    work_dir = Path(tempfile.mkdtemp(prefix='disk_cache_bench_'))
+    value = {'close': np.random.default_rng(0).random(250).tolist()}
+    try:
+        cache = DiskCache(LRUCacheStrategy, 10240, str(work_dir / 'sqlite'))
+        hot = [f"hot:{i}" for i in range(hot_keys)]
+        for key in hot:
+            cache.set(key, value)
+
+        # 其余条目只写索引（命中测试不会读它们的文件）
+        now = time.time()
+        cache._conn.executemany(
+            "INSERT INTO disk_index VALUES (?, ?, ?, ?, ?, '{}', 0)",
+            ((f"cold:{i}", now, now, 1024, None) for i in range(entries - hot_keys))
+        )
+        cache._conn.commit()
+
+        start = time.perf_counter()
+        for i in range(hits):
+            assert cache.get(hot[i % hot_keys]) is not None
+        cache.flush()
+        sqlite_us = (time.perf_counter() - start) / hits * 1e6
+        cache.close()
+
+        # 原实现：索引放在内存字典里，每次命中重写全部 JSON；太慢时减少命中次数
+        legacy_dir = work_dir / 'json'
+        legacy_dir.mkdir()
+        index = {f"cold:{i}": make_index_entry(1024) for i in range(entries - hot_keys)}
+        index.update({key: make_index_entry(0) for key in hot})
+        legacy = LegacyJsonDiskCache(legacy_dir, index)
+        hot_path = legacy_dir / 'hot.cache'
+        hot_path.write_bytes(zlib.compress(pickle.dumps(value)))
+
+        legacy_hits = max(5, min(hits, legacy_limit // entries))
+        start = time.perf_counter()
+        for i in range(legacy_hits):
+            legacy.get(hot[i % hot_keys], hot_path)
+        legacy_us = (time.perf_counter() - start) / legacy_hits * 1e6
+        index_kb = legacy.index_file.stat().st_size / 1024
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"  {entries:>8,} 条目 (index.json {index_kb:,.0f}KB)")
+    print(f"    index.json 重写: {legacy_us:>10.1f}µs/次 ({legacy_hits:,} 次命中)")
+    print(f"    SQLite WAL 索引: {sqlite_us:>10.1f}µs/次 ({hits:,} 次命中)")
+    print(f"    加速比: {legacy_us / sqlite_us:.1f}x")
+    return {'entries': entries, 'legacy_us': legacy_us, 'sqlite_us': sqlite_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='磁盘缓存命中延迟 vs 条目数')
+    parser.add_argument('--entries', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--hits', type=int, default=5000, help='SQLite 索引的命中次数')
+    parser.add_argument('--legacy-limit', type=int, default=200000,
+                        help='原实现命中次数 = 该值 / 条目数（至少 5 次）')
+    parser.add_argument('--hot-keys', type=int, default=100, help='被反复命中的键数')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("磁盘缓存命中延迟基准测试")
+    print("=" * 60)
+
+    results = [run_case(n, args.hits, args.legacy_limit, min(args.hot_keys, n)) for n in args.entries]
+
+    print("\n汇总:")
+    print(f"  {'条目数':>10} {'index.json(µs)':>16} {'SQLite(µs)':>12}")
+    for r in results:
+        print(f"  {r['entries']:>10,} {r['legacy_us']:>16.1f} {r['sqlite_us']:>12.1f}")
+
+    flat = results[-1]['sqlite_us'] / results[0]['sqlite_us']
+    print(f"\nSQLite 索引命中延迟 {results[-1]['entries']:,} 条目 / {results[0]['entries']:,} 条目 = {flat:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/scripts\benchmark_indicator_kernels.py
+# File Name: benchmark_indicator_kernels
+# @ Author: mango-gh22
+# @ Date：2026/10/17 16:55
+"""
+desc OBV / Parabolic SAR 基准测试：原逐行实现 vs 数组/编译内核
+用法: python scripts/benchmark_indicator_kernels.py [--sizes 1000 10000 100000]
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.indicators import kernels
+
+
+def legacy_obv(price: pd.Series, volume: pd.Series) -> np.ndarray:
+    """原 OBV.calculate 的逐行实现"""
+    price_change = price.diff()
+    obv = np.zeros(len(price))
+    obv[0] = volume.iloc[0]
+    for i in range(1, len(price)):
+        if price_change.iloc[i] > 0:
+            obv[i] = obv[i - 1] + volume.iloc[i]
+        elif price_change.iloc[i] < 0:
+            obv[i] = obv[i - 1] - volume.iloc[i]
+        else:
+            obv[i] = obv[i - 1]
+    return obv
+
+
+def legacy_sar(high: pd.Series, low: pd.Series, close: pd.Series,
+               af: float = 0.02, af_max: float = 0.2) -> np.ndarray:
+    """原 ParabolicSAR._calculate_sar 的逐行实现（逐元素访问 Series）"""
+    n = len(close)
+    sar, trend = np.zeros(n), np.zeros(n)
+    acceleration, extreme_point = np.zeros(n), np.zeros(n)
+    sar[0] = low[0] if close[1] > close[0] else high[0]
+    trend[0] = 1 if close[1] > close[0] else -1
+    acceleration[0] = af
+    extreme_point[0] = high[0] if trend[0] == 1 else low[0]
+
+    for i in range(1, n):
+        sar[i] = sar[i - 1] + acceleration[i - 1] * (extreme_point[i - 1] - sar[i - 1])
+        if trend[i - 1] == 1:
+            if low[i] < sar[i]:
+                trend[i], sar[i] = -1, max(high[i - 1], high[i])
+                acceleration[i], extreme_point[i] = af, low[i]
+            else:
+                trend[i], acceleration[i], extreme_point[i] = 1, acceleration[i - 1], extreme_point[i - 1]
+                if high[i] > extreme_point[i - 1]:
+                    extreme_point[i] = high[i]
+                    acceleration[i] = min(acceleration[i - 1] + af, af_max)
+        else:
+            if high[i] > sar[i]:
+                trend[i], sar[i] = 1, min(low[i - 1], low[i])
+                acceleration[i], extreme_point[i] = af, high[i]
+            else:
+                trend[i], acceleration[i], extreme_point[i] = -1, acceleration[i - 1], extreme_point[i - 1]
+                if low[i] < extreme_point[i - 1]:
+                    extreme_point[i] = low[i]
+                    acceleration[i] = min(acceleration[i - 1] + af, af_max)
+    return sar
+
+
+def create_bars(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    close = np.round(50 + np.cumsum(rng.normal(0, 0.3, rows)), 2)
+    return pd.DataFrame({
+        'close_price': close,
+        'high_price': close + np.round(rng.random(rows), 2),
+        'low_price': close - np.round(rng.random(rows), 2),
+        'volume': rng.integers(1000, 100000, rows).astype(float),
+    })
+
+
+def timed(func, *args, repeat: int = 3, **kwargs):
+    """取多次运行的最短时间"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(sizes, legacy_limit: int):
+    print("📊 OBV / Parabolic SAR 内核基准测试")
+    print(f"  numba: {'已安装' if kernels.HAS_NUMBA else '未安装（使用纯 Python 内核）'}")
+    print("-" * 72)
+    print(f"  {'bars':>8} | {'OBV 原实现':>10} {'OBV 数组':>10} {'加速':>7} | "
+          f"{'SAR 原实现':>10} {'SAR Python':>10} {'SAR numba':>10}")
+
+    if kernels.HAS_NUMBA:
+        # 预热编译
+        warm = create_bars(10)
+        kernels.parabolic_sar(warm['high_price'], warm['low_price'], warm['close_price'], use_numba=True)
+
+    results = []
+    for rows in sizes:
+        df = create_bars(rows)
+        high, low, close, volume = (df[c] for c in ('high_price', 'low_price', 'close_price', 'volume'))
+
+        # 原实现太慢，超过上限时用子集测量后线性外推
+        legacy_rows = min(rows, legacy_limit)
+        scale = rows / legacy_rows
+        sub = df.iloc[:legacy_rows]
+
+        legacy_obv_time, legacy_obv_values = timed(legacy_obv, sub['close_price'], sub['volume'], repeat=1)
+        obv_time, obv_values = timed(kernels.obv, close.to_numpy(), volume.to_numpy())
+        assert np.array_equal(obv_values[:legacy_rows], legacy_obv_values), "OBV 结果不一致"
+        legacy_obv_time *= scale
+
+        legacy_sar_time, legacy_sar_values = timed(
+            legacy_sar, sub['high_price'], sub['low_price'], sub['close_price'], repeat=1)
+        py_time, sar_values = timed(kernels.parabolic_sar, high.to_numpy(), low.to_numpy(),
+                                    close.to_numpy(), use_numba=False)
+        assert np.allclose(sar_values[:legacy_rows], legacy_sar_values), "SAR 结果不一致"
+        legacy_sar_time *= scale
+
+        numba_time = None
+        if kernels.HAS_NUMBA:
+            numba_time, _ = timed(kernels.parabolic_sar, high.to_numpy(), low.to_numpy(),
+                                  close.to_numpy(), use_numba=True)
+
+        numba_text = f"{numba_time * 1000:>8.2f}ms" if numba_time is not None else f"{'-':>10}"
+        print(f"  {rows:>8,} | {legacy_obv_time * 1000:>8.1f}ms {obv_time * 1000:>8.2f}ms "
+              f"{legacy_obv_time / obv_time:>6.0f}x | {legacy_sar_time * 1000:>8.1f}ms "
+              f"{py_time * 1000:>8.2f}ms {numba_text}")
+
+        results.append({
+            'rows': rows,
+            'obv_legacy_s': legacy_obv_time,
+            'obv_vectorized_s': obv_time,
+            'sar_legacy_s': legacy_sar_time,
+            'sar_python_s': py_time,
+            'sar_numba_s': numba_time,
+        })
+
+    if any(r['rows'] > legacy_limit for r in results):
+        print(f"  注: 原实现超过 {legacy_limit:,} bars 的耗时由子集外推")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='OBV / Parabolic SAR 内核基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='序列长度（bars）')
+    parser.add_argument('--legacy-limit', type=int, default=20_000, help='原实现实际测量长度上限')
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.legacy_limit)
@@ -0,0 +1,118 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/scripts\benchmark_parallel_calculator.py
+# File Name: benchmark_parallel_calculator
+# @ Author: mango-gh22
+# @ Date：2026/10/17 23:59
+"""
+desc 并行计算器扩展性基准测试：全市场 SAR / CCI 串行 vs 进程池（共享内存传递数据），加速比 vs 核数
+用法:
+    python scripts/benchmark_parallel_calculator.py                          # 1..CPU 核数
+    python scripts/benchmark_parallel_calculator.py --symbols 500 --rows 2500 --workers 1 2 4 8
+    python scripts/benchmark_parallel_calculator.py --mode thread
+"""
+
+import sys
+import os
+import time
+import pickle
+import logging
+import argparse
+from multiprocessing import cpu_count
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.indicators.indicator_manager import IndicatorFactory
+from src.performance.parallel_calculator import ParallelCalculator, ParallelMode
+from src.performance.shared_frames import SharedFrame
+
+
+def simulate_universe(symbols: int, rows: int, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2014-01-02', periods=rows, freq='B', name='trade_date')
+    universe = {}
+    for i in range(symbols):
+        close = 20 + np.cumsum(rng.normal(0, 0.3, rows))
+        universe[f"sh{600000 + i}"] = pd.DataFrame({
+            'open_price': close + rng.normal(0, 0.1, rows),
+            'high_price': close + rng.random(rows) * 0.5,
+            'low_price': close - rng.random(rows) * 0.5,
+            'close_price': close,
+            'volume': rng.integers(10000, 1000000, rows).astype(float),
+        }, index=dates)
+    return universe
+
+
+def run_serial(universe: dict, indicators: list) -> float:
+    start = time.perf_counter()
+    for data in universe.values():
+        for name in indicators:
+            IndicatorFactory.create_indicator(name).calculate(data)
+    return time.perf_counter() - start
+
+
+def run_parallel(universe: dict, indicators: list, workers: int, mode: ParallelMode) -> float:
+    calculator = ParallelCalculator(max_workers=workers, mode=mode, cache_enabled=False)
+    try:
+        # 预热：进程池启动并导入指标模块
+        warm_data = next(iter(universe.values()))
+        warm = calculator.batch_submit([('warmup', name, warm_data, {}) for name in indicators])
+        calculator.wait_for_completion(warm, timeout=600)
+
+        start = time.perf_counter()
+        task_ids = calculator.batch_submit([
+            (symbol, name, data, {}) for symbol, data in universe.items() for name in indicators
+        ])
+        summary = calculator.wait_for_completion(task_ids, timeout=3600)
+        elapsed = time.perf_counter() - start
+        assert summary['failed'] == 0, f"{summary['failed']} 个任务失败"
+        return elapsed
+    finally:
+        calculator.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并行计算器加速比 vs 核数')
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=2500, help='每只股票的 bar 数')
+    parser.add_argument('--indicators', nargs='+', default=['parabolic_sar', 'cci'])
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='工作进程数列表，默认 1、2、4... 到 CPU 核数')
+    parser.add_argument('--mode', choices=['process', 'thread'], default='process')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    cores = cpu_count()
+    workers_list = args.workers or sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    mode = ParallelMode(args.mode)
+
+    print("=" * 60)
+    print("并行计算器扩展性基准测试")
+    print("=" * 60)
+    universe = simulate_universe(args.symbols, args.rows)
+    sample = next(iter(universe.values()))
+    shared = SharedFrame(sample)
+    spec_bytes = len(pickle.dumps(shared.spec))
+    shared.release()
+    print(f"  {args.symbols} 只股票 × {args.rows} bars, 指标: {args.indicators}, CPU 核数: {cores}")
+    print(f"  每个任务传递: pickle DataFrame {len(pickle.dumps(sample)) / 1024:.1f}KB"
+          f" -> 共享内存描述 {spec_bytes}B")
+
+    serial = run_serial(universe, args.indicators)
+    tasks = args.symbols * len(args.indicators)
+    print(f"\n  串行: {serial:.2f}s ({tasks / serial:.0f} 任务/秒)")
+
+    print(f"\n  {'工作数':>6} {'耗时(s)':>10} {'任务/秒':>10} {'加速比':>8} {'并行效率':>8}")
+    for workers in workers_list:
+        elapsed = run_parallel(universe, args.indicators, workers, mode)
+        speedup = serial / elapsed
+        print(f"  {workers:>6} {elapsed:>10.2f} {tasks / elapsed:>10.0f} {speedup:>8.2f} {speedup / workers:>8.0%}")
+
+    if max(workers_list) > cores:
+        print(f"\n注意: 工作数超过 CPU 核数 ({cores})，超出部分不会带来加速")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/scripts\benchmark_record_builder.py
+# File Name: benchmark_record_builder
+# @ Author: mango-gh22
+# @ Date：2026/10/17 10:05
+"""
+desc 记录构建基准测试：iterrows 原实现 vs 列式构建
+用法: python scripts/benchmark_record_builder.py [--rows 1000000]
+"""
+
+import sys
+import os
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.record_builder import build_records
+
+
+def legacy_prepare_records(df: pd.DataFrame, columns):
+    """原 DataStorage/AdaptiveDataStorage._prepare_records 的 iterrows 实现"""
+    records = []
+    for _, row in df.iterrows():
+        record = []
+        for col in columns:
+            val = row[col]
+            if pd.isna(val):
+                record.append(None)
+            elif isinstance(val, (np.integer, np.int64)):
+                record.append(int(val))
+            elif isinstance(val, (np.floating, np.float64)):
+                record.append(float(val))
+            elif isinstance(val, (datetime, pd.Timestamp)):
+                record.append(val.strftime('%Y-%m-%d %H:%M:%S'))
+            else:
+                record.append(val)
+        records.append(tuple(record))
+    return records
+
+
+def create_daily_frame(rows: int) -> pd.DataFrame:
+    """模拟预处理后的 stock_daily_data 数据"""
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    pe = rng.normal(20, 5, rows)
+    pe[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        'symbol': 'sh600519',
+        'trade_date': pd.date_range('2000-01-01', periods=rows, freq='D').strftime('%Y-%m-%d'),
+        'open_price': close + rng.normal(0, 0.5, rows),
+        'high_price': close + 1,
+        'low_price': close - 1,
+        'close_price': close,
+        'pre_close_price': np.roll(close, 1),
+        'volume': rng.integers(100000, 10000000, rows),
+        'amount': rng.random(rows) * 1e9,
+        'change_percent': rng.normal(0, 2, rows),
+        'turnover_rate_f': rng.random(rows) * 5,
+        'pe_ttm': pe,
+        'created_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+
+def run_benchmark(rows: int, legacy_limit: int):
+    print("📊 记录构建基准测试")
+    print("-" * 40)
+
+    df = create_daily_frame(rows)
+    columns = list(df.columns)
+
+    start = time.perf_counter()
+    records = build_records(df, columns)
+    columnar_time = time.perf_counter() - start
+
+    # iterrows 太慢，用子集测量后线性外推
+    legacy_rows = min(rows, legacy_limit)
+    legacy_df = df.iloc[:legacy_rows]
+    start = time.perf_counter()
+    legacy_records = legacy_prepare_records(legacy_df, columns)
+    legacy_time = (time.perf_counter() - start) * rows / legacy_rows
+
+    assert records[:legacy_rows] == legacy_records, "列式构建结果与原实现不一致"
+
+    per_million = 1_000_000 / rows
+    print(f"  数据规模: {rows:,} 行 x {len(columns)} 列")
+    note = f" (由 {legacy_rows:,} 行外推)" if legacy_rows < rows else ""
+    print(f"  iterrows:  {legacy_time * per_million:.2f}s / 百万行{note}")
+    print(f"  列式构建: {columnar_time * per_million:.2f}s / 百万行")
+    print(f"  加速比:   {legacy_time / columnar_time:.1f}x")
+
+    return {
+        'rows': rows,
+        'legacy_s_per_million': legacy_time * per_million,
+        'columnar_s_per_million': columnar_time * per_million,
+        'speedup': legacy_time / columnar_time,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='记录构建基准测试')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='测试行数')
+    parser.add_argument('--legacy-limit', type=int, default=50_000, help='iterrows 实际测量行数上限')
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.legacy_limit)
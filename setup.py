@@ -24,4 +24,12 @@ setup(
         "python-dotenv>=1.0.0",
         "pyyaml>=6.0",
     ],
+    extras_require={
+        # 可选：编译 Parabolic SAR 等逐 bar 递推内核
+        "fast": ["numba>=0.58"],
+        # 可选：指标缓存使用 Feather/Parquet 列式文件（未安装时回退为 pickle）
+        "cache": ["pyarrow>=12.0"],
+        # 可选：磁盘缓存的 lz4 / zstd 压缩（未安装时回退为 zlib）
+        "codecs": ["lz4>=4.0", "zstandard>=0.21"],
+    },
 )
\ No newline at end of file
@@ -22,6 +22,8 @@ import hashlib
 from src.indicators.indicator_manager import IndicatorManager
 from src.query.data_pipeline import DataPipeline, DataQualityReport
 from src.query.result_formatter import ResultFormatter
+from src.performance.cache_strategy import SharedCache
+from src.data.change_events import DataChangeEvent, get_data_change_bus, symbol_key
 
 logger = logging.getLogger(__name__)
 
@@ -76,7 +78,8 @@ class AsyncIndicatorCalculator:
     def __init__(self,
                  max_workers: int = 4,
                  cache_enabled: bool = True,
-                 timeout: int = 300):
+                 timeout: int = 300,
+                 shared_cache: Optional[SharedCache] = None):
         """
         初始化异步计算器
 
@@ -84,6 +87,7 @@ class AsyncIndicatorCalculator:
             max_workers: 最大工作线程数
             cache_enabled: 是否启用缓存
             timeout: 任务超时时间（秒）
+            shared_cache: 多进程共享缓存（多个 API 工作进程共用计算结果，None 表示只用进程内缓存）
         """
         self.max_workers = max_workers
         self.cache_enabled = cache_enabled
@@ -101,6 +105,7 @@ class AsyncIndicatorCalculator:
         # 缓存结果（短期）
         self.result_cache: Dict[str, Tuple[datetime, Dict]] = {}
         self.cache_ttl = timedelta(minutes=30)
+        self.shared_cache = shared_cache
 
         # 统计信息
         self.stats = {
@@ -109,9 +114,16 @@ class AsyncIndicatorCalculator:
             'failed_tasks': 0,
             'active_tasks': 0,
             'cache_hits': 0,
-            'cache_misses': 0
+            'cache_misses': 0,
+            'shared_cache_hits': 0,
+            'coalesced_tasks': 0,
+            'invalidated_results': 0
         }
 
+        # 数据入库后失效受影响股票的计算结果
+        self.change_bus = get_data_change_bus()
+        self.change_bus.subscribe(self._on_data_changed)
+
         logger.info(f"初始化异步计算器，最大线程数: {max_workers}, 缓存: {cache_enabled}")
 
     def _generate_task_id(self, symbol: str, indicators: List[str],
@@ -122,10 +134,16 @@ class AsyncIndicatorCalculator:
                     {start_date}_{end_date}_{json.dumps(parameters, sort_keys=True)}"
         return hashlib.md5(task_str.encode()).hexdigest()[:12]
 
-    def _get_cached_result(self, task_id: str) -> Optional[Dict]:
+    @staticmethod
+    def _shared_key(task_id: str, symbol: str, end_date: str) -> str:
+        """共享缓存键（带股票和结束日期，其他进程可据此失效）"""
+        return f"async_result:{symbol_key(symbol)}:{end_date}:{task_id}"
+
+    def _get_cached_result(self, task_id: str, symbol: str, end_date: str) -> Optional[Dict]:
         """获取缓存结果"""
         if not self.cache_enabled:
             return None
+        self.change_bus.poll()
 
         if task_id in self.result_cache:
             cached_time, result = self.result_cache[task_id]
@@ -134,6 +152,16 @@ class AsyncIndicatorCalculator:
                 logger.debug(f"缓存命中: {task_id}")
                 return result
 
+        # 其他进程算过的结果
+        if self.shared_cache is not None:
+            result = self.shared_cache.get(self._shared_key(task_id, symbol, end_date))
+            if result is not None:
+                self.result_cache[task_id] = (datetime.now(), result)
+                self.stats['cache_hits'] += 1
+                self.stats['shared_cache_hits'] += 1
+                logger.debug(f"共享缓存命中: {task_id}")
+                return result
+
         self.stats['cache_misses'] += 1
         return None
 
@@ -141,10 +169,35 @@ class AsyncIndicatorCalculator:
         """设置缓存结果"""
         if self.cache_enabled:
             self.result_cache[task_id] = (datetime.now(), result)
+            task = self.tasks.get(task_id)
+            if self.shared_cache is not None and task is not None:
+                self.shared_cache.set(self._shared_key(task_id, task.symbol, task.end_date),
+                                      result, ttl=self.cache_ttl)
 
             # 清理过期缓存
             self._cleanup_expired_cache()
 
+    def _on_data_changed(self, event: DataChangeEvent):
+        """数据变更事件：删除该股票结束日期 >= since_date 的计算结果"""
+        # 任务记录已清理的结果无法判断股票，一并删除
+        symbol = symbol_key(event.symbol)
+        stale = [task_id for task_id in list(self.result_cache)
+                 if (task := self.tasks.get(task_id)) is None
+                 or (symbol_key(task.symbol) == symbol and event.affects(task.end_date))]
+        for task_id in stale:
+            self.result_cache.pop(task_id, None)
+
+        if self.shared_cache is not None:
+            prefix = f"async_result:{symbol}:"
+            for key in self.shared_cache.get_keys():
+                if key.startswith(prefix) and event.affects(key[len(prefix):].rsplit(':', 1)[0] or None):
+                    self.shared_cache.delete(key)
+                    stale.append(key)
+
+        if stale:
+            self.stats['invalidated_results'] += len(stale)
+            logger.debug(f"数据变更失效计算结果: {symbol}, {len(stale)} 项")
+
     def _cleanup_expired_cache(self):
         """清理过期缓存"""
         current_time = datetime.now()
@@ -186,9 +239,17 @@ class AsyncIndicatorCalculator:
         # 生成任务ID
         task_id = self._generate_task_id(symbol, indicators, start_date, end_date, parameters)
 
+        # 相同任务正在计算时直接返回其任务ID，调用方通过 get_task_result(wait=True) 等待同一结果
+        running = self.tasks.get(task_id)
+        if running is not None and running.status in (CalculationStatus.PENDING,
+                                                      CalculationStatus.PROCESSING):
+            self.stats['coalesced_tasks'] += 1
+            logger.debug(f"合并到进行中的任务: {task_id}")
+            return task_id
+
         # 检查缓存
         if use_cache:
-            cached_result = self._get_cached_result(task_id)
+            cached_result = self._get_cached_result(task_id, symbol, end_date)
             if cached_result is not None:
                 # 创建已完成的任务
                 task = CalculationTask(
@@ -525,7 +586,8 @@ class AsyncIndicatorCalculator:
             'tasks': {
                 'total': self.stats['total_tasks'],
                 'by_status': status_counts,
-                'active': self.stats['active_tasks']
+                'active': self.stats['active_tasks'],
+                'coalesced': self.stats['coalesced_tasks']
             },
             'cache': {
                 'hits': self.stats['cache_hits'],
@@ -533,7 +595,9 @@ class AsyncIndicatorCalculator:
                 'hit_rate': (self.stats['cache_hits'] /
                              (self.stats['cache_hits'] + self.stats['cache_misses'])
                              if (self.stats['cache_hits'] + self.stats['cache_misses']) > 0 else 0),
-                'cached_results': len(self.result_cache)
+                'cached_results': len(self.result_cache),
+                'shared_hits': self.stats['shared_cache_hits'],
+                'invalidated': self.stats['invalidated_results']
             },
             'performance': {
                 'max_workers': self.max_workers,
@@ -0,0 +1,203 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/api\async_query.py
+# File Name: async_query
+# @ Author: mango-gh22
+# @ Date：2026/10/18 02:00
+"""
+desc 异步查询层 - 在有界线程池中执行阻塞的 MySQL 查询和指标计算，不阻塞事件循环
+"""
+# src/api/async_query.py
+"""
+异步查询层
+
+EnhancedQueryEngine / DatabaseConnector 基于同步的 mysql-connector，直接在 async 处理函数中
+调用会阻塞整个事件循环（一个慢查询卡住所有请求）。AsyncQueryEngine 提供同名的 async 方法，
+把调用放到有界线程池中执行：
+
+- max_workers：执行线程数，应不超过数据库连接池大小（连接池耗尽时连接器会退化为
+  带重试等待的新建连接）
+- max_pending：同时在执行和排队的调用上限（背压），已满时新调用最多等待 acquire_timeout 秒，
+  仍无空位则抛出 QueryOverloadedError（API 返回 503，客户端稍后重试）
+
+配置见 config/api_config.yaml 的 query_executor。
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryOverloadedError(RuntimeError):
+    """查询排队已满（等待 acquire_timeout 秒后仍无空位）"""
+
+
+class AsyncQueryEngine:
+    """EnhancedQueryEngine 的异步包装（有界线程池 + 背压）"""
+
+    def __init__(self, engine=None,
+                 max_workers: int = 5,
+                 max_pending: int = 32,
+                 acquire_timeout: float = 10.0):
+        """
+        初始化异步查询层
+
+        Args:
+            engine: EnhancedQueryEngine 实例，None 时首次调用前创建
+            max_workers: 执行线程数
+            max_pending: 同时在执行和排队的调用上限
+            acquire_timeout: 排队已满时等待空位的秒数
+        """
+        if max_workers <= 0 or max_pending < max_workers:
+            raise ValueError(f"线程数或排队上限无效: max_workers={max_workers}, max_pending={max_pending}")
+        self._engine = engine
+        self._engine_lock = threading.Lock()
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                              thread_name_prefix='async-query')
+        # asyncio.Semaphore 绑定事件循环，按当前循环延迟创建
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'total_wait_time': 0.0,
+            'total_run_time': 0.0
+        }
+
+        logger.info(f"初始化异步查询层，线程数: {max_workers}, 排队上限: {max_pending}")
+
+    @classmethod
+    def from_config(cls, engine=None) -> 'AsyncQueryEngine':
+        """按 config/api_config.yaml 的 query_executor 创建"""
+        try:
+            from src.config.config_loader import load_api_config
+            config = load_api_config().get('query_executor', {}) or {}
+        except Exception as e:
+            logger.warning(f"读取查询线程池配置失败，使用默认值: {e}")
+            config = {}
+        return cls(engine,
+                   max_workers=config.get('max_workers', 5),
+                   max_pending=config.get('max_pending', 32),
+                   acquire_timeout=config.get('acquire_timeout', 10.0))
+
+    @property
+    def engine(self):
+        """底层同步查询引擎"""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    from src.query.enhanced_query_engine import EnhancedQueryEngine
+                    self._engine = EnhancedQueryEngine()
+        return self._engine
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        在线程池中执行阻塞调用
+
+        Raises:
+            QueryOverloadedError: 排队已满且等待超时
+        """
+        slots = self._get_slots()
+        wait_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats['rejected'] += 1
+            raise QueryOverloadedError(f"查询排队已满（{self.max_pending}），请稍后重试")
+
+        self.stats['submitted'] += 1
+        self.stats['in_flight'] += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        self.stats['total_wait_time'] += time.perf_counter() - wait_start
+        run_start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+            self.stats['completed'] += 1
+            return result
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self.stats['in_flight'] -= 1
+            self.stats['total_run_time'] += time.perf_counter() - run_start
+            slots.release()
+
+    async def query_with_indicators(self, symbol: str,
+                                    indicators: List[str],
+                                    start_date: str,
+                                    end_date: str,
+                                    use_cache: bool = True,
+                                    data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """查询数据并计算技术指标（见 EnhancedQueryEngine.query_with_indicators）"""
+        return await self.run(self.engine.query_with_indicators,
+                              symbol, indicators, start_date, end_date, use_cache, data=data)
+
+    async def query_daily_data_many(self, symbols: List[str],
+                                    start_date: str,
+                                    end_date: str) -> Dict[str, pd.DataFrame]:
+        """一次查询多只股票的日线数据（见 EnhancedQueryEngine.query_daily_data_many）"""
+        return await self.run(self.engine.query_daily_data_many, symbols, start_date, end_date)
+
+    async def get_available_indicators(self) -> Dict[str, Dict]:
+        """获取所有可用指标信息"""
+        return await self.run(self.engine.get_available_indicators)
+
+    async def validate_indicator_calculation(self, symbol: str,
+                                             indicator_name: str,
+                                             start_date: str,
+                                             end_date: str) -> Dict:
+        """验证指标计算可行性"""
+        return await self.run(self.engine.validate_indicator_calculation,
+                              symbol, indicator_name, start_date, end_date)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """线程池统计：执行数、拒绝数、并发峰值、平均排队和执行耗时"""
+        stats = dict(self.stats)
+        started = stats['submitted']
+        finished = stats['completed'] + stats['failed']
+        stats['avg_wait_time'] = stats['total_wait_time'] / started if started else 0.0
+        stats['avg_run_time'] = stats['total_run_time'] / finished if finished else 0.0
+        stats['max_workers'] = self.max_workers
+        stats['max_pending'] = self.max_pending
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """关闭线程池"""
+        self.executor.shutdown(wait=wait)
+        logger.info("异步查询层已关闭")
+
+
+_async_query_engine: Optional[AsyncQueryEngine] = None
+_async_query_engine_lock = threading.Lock()
+
+
+def get_async_query_engine() -> AsyncQueryEngine:
+    """获取进程内共享的异步查询层（按配置创建）"""
+    global _async_query_engine
+    if _async_query_engine is None:
+        with _async_query_engine_lock:
+            if _async_query_engine is None:
+                _async_query_engine = AsyncQueryEngine.from_config()
+    return _async_query_engine
@@ -8,18 +8,24 @@ desc
 技术指标计算API
 提供RESTful API接口
 """
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, HTTPException, Query, Depends, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from functools import lru_cache
 import pandas as pd
 from datetime import datetime, timedelta
+import asyncio
+import json
 import logging
 import uvicorn
 
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))  # 添加项目根
-from src.query.enhanced_query_engine import EnhancedQueryEngine
+from src.api.async_query import AsyncQueryEngine, QueryOverloadedError, get_async_query_engine
+from src.api import streaming
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -34,9 +40,74 @@ app = FastAPI(
 
 
 # 依赖项：查询引擎
-def get_query_engine():
-    """获取查询引擎实例"""
-    return EnhancedQueryEngine()
+def get_query_engine() -> AsyncQueryEngine:
+    """获取查询引擎（进程内共享；阻塞的数据库查询和指标计算在有界线程池中执行）"""
+    return get_async_query_engine()
+
+
+def _overloaded(e: QueryOverloadedError) -> HTTPException:
+    """查询排队已满：返回 503，提示客户端稍后重试"""
+    logger.warning(str(e))
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+@lru_cache(maxsize=1)
+def get_batch_concurrency() -> int:
+    """批量接口同时计算的股票数（config/api_config.yaml 的 batch.max_concurrency）"""
+    try:
+        from src.config.config_loader import load_api_config
+        return int((load_api_config().get('batch', {}) or {}).get('max_concurrency', 8))
+    except Exception as e:
+        logger.warning(f"读取批量并发配置失败，使用默认值: {e}")
+        return 8
+
+
+@lru_cache(maxsize=1)
+def get_stream_chunk_bytes() -> int:
+    """流式响应每块的编码字节预算（config/api_config.yaml 的 streaming.chunk_bytes）"""
+    try:
+        from src.config.config_loader import load_api_config
+        return int((load_api_config().get('streaming', {}) or {}).get('chunk_bytes', 1048576))
+    except Exception as e:
+        logger.warning(f"读取流式响应配置失败，使用默认值: {e}")
+        return 1048576
+
+
+def _json_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """NaN 转为 None（指标预热期的 NaN 不是合法 JSON）"""
+    return df.astype(object).where(df.notna(), None)
+
+
+def _calculate_meta(request: 'IndicatorRequest', result_df: pd.DataFrame) -> Dict[str, Any]:
+    """指标计算响应的请求信息部分"""
+    return {
+        "symbol": request.symbol,
+        "indicators": request.indicators,
+        "date_range": f"{request.start_date} - {request.end_date}",
+        "data_count": len(result_df),
+        "columns": result_df.columns.tolist()
+    }
+
+
+def _calculate_statistics(result_df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """数值列的描述统计，没有数值列时为 None"""
+    numeric_cols = result_df.select_dtypes(include=['float64', 'int64']).columns
+    if len(numeric_cols) == 0:
+        return None
+    return _json_safe(result_df[numeric_cols].describe()).to_dict()
+
+
+def _build_calculate_response(request: 'IndicatorRequest', result_df: pd.DataFrame) -> Dict[str, Any]:
+    """组装指标计算响应（记录转换和统计较耗时，在线程池中执行）"""
+    response_data = _calculate_meta(request, result_df)
+    response_data["data"] = _json_safe(result_df).to_dict(orient="records")
+
+    # 添加统计信息
+    statistics = _calculate_statistics(result_df)
+    if statistics is not None:
+        response_data["statistics"] = statistics
+
+    return response_data
 
 
 # 数据模型
@@ -69,6 +140,43 @@ class ValidationRequest(BaseModel):
     end_date: str = Field(..., description="结束日期")
 
 
+def _calculate_symbol(engine, symbol: str, indicators: List[str], start_date: str, end_date: str,
+                      data: Optional[pd.DataFrame]) -> Dict[str, Any]:
+    """批量接口中单只股票的计算和结果组装（在线程池中执行）"""
+    result_df = engine.query_with_indicators(symbol, indicators, start_date, end_date, data=data)
+    if result_df.empty:
+        return {"error": "无数据"}
+    return {
+        "data_count": len(result_df),
+        "columns": result_df.columns.tolist(),
+        "data": _json_safe(result_df).to_dict(orient="records")
+    }
+
+
+async def _fan_out(engine: AsyncQueryEngine, frames: Dict[str, pd.DataFrame], symbols: List[str],
+                   indicators: List[str], start_date: str, end_date: str,
+                   concurrency: int) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """按预取的数据并发计算各股票指标（最多 concurrency 只同时计算），按完成顺序产出 (股票, 结果)"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def calculate(symbol: str) -> Tuple[str, Dict[str, Any]]:
+        async with semaphore:
+            try:
+                return symbol, await engine.run(_calculate_symbol, engine.engine, symbol, indicators,
+                                                start_date, end_date, frames.get(symbol))
+            except Exception as e:
+                return symbol, {"error": str(e)}
+
+    tasks = [asyncio.create_task(calculate(symbol)) for symbol in symbols]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # 客户端断开或出错时取消尚未开始的计算
+        for task in tasks:
+            task.cancel()
+
+
 # API端点
 @app.get("/")
 async def root():
@@ -94,7 +202,7 @@ async def health_check():
 
 @app.get("/indicators/available")
 async def get_available_indicators(
-        engine: EnhancedQueryEngine = Depends(get_query_engine)
+        engine: AsyncQueryEngine = Depends(get_query_engine)
 ):
     """
     获取所有可用指标
@@ -103,11 +211,13 @@ async def get_available_indicators(
         可用指标列表和信息
     """
     try:
-        indicators = engine.get_available_indicators()
+        indicators = await engine.get_available_indicators()
         return {
             "count": len(indicators),
             "indicators": indicators
         }
+    except QueryOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         logger.error(f"获取可用指标失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -116,22 +226,38 @@ async def get_available_indicators(
 @app.post("/indicators/calculate")
 async def calculate_indicators(
         request: IndicatorRequest,
-        engine: EnhancedQueryEngine = Depends(get_query_engine)
+        response_format: Optional[str] = Query(None, alias="format",
+                                               description="响应格式：json / ndjson / columns / arrow"),
+        accept: Optional[str] = Header(None),
+        engine: AsyncQueryEngine = Depends(get_query_engine),
+        chunk_bytes: int = Depends(get_stream_chunk_bytes)
 ):
     """
     计算技术指标
 
+    默认返回完整 JSON。format 参数或 Accept 请求头（application/x-ndjson、
+    application/vnd.apache.arrow.stream）选择流式格式时，按块（每块约 streaming.chunk_bytes
+    字节）边编码边发送，见 src/api/streaming.py。
+
     Args:
         request: 指标计算请求
+        response_format: 响应格式，优先于 Accept 请求头
 
     Returns:
         包含技术指标的数据
     """
     logger.info(f"计算指标请求: {request}")
 
+    try:
+        output = streaming.negotiate_format(response_format, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output == 'arrow' and not streaming.HAS_PYARROW:
+        raise HTTPException(status_code=406, detail="Arrow 格式需要安装 pyarrow")
+
     try:
         # 计算指标
-        result_df = engine.query_with_indicators(
+        result_df = await engine.query_with_indicators(
             symbol=request.symbol,
             indicators=request.indicators,
             start_date=request.start_date,
@@ -146,24 +272,24 @@ async def calculate_indicators(
             )
 
         # 准备返回数据
-        response_data = {
-            "symbol": request.symbol,
-            "indicators": request.indicators,
-            "date_range": f"{request.start_date} - {request.end_date}",
-            "data_count": len(result_df),
-            "columns": result_df.columns.tolist(),
-            "data": result_df.to_dict(orient="records")
-        }
-
-        # 添加统计信息
-        numeric_cols = result_df.select_dtypes(include=['float64', 'int64']).columns
-        if len(numeric_cols) > 0:
-            response_data["statistics"] = result_df[numeric_cols].describe().to_dict()
-
-        return response_data
+        if output == 'json':
+            return await engine.run(_build_calculate_response, request, result_df)
+
+        meta = _calculate_meta(request, result_df)
+        if output == 'arrow':
+            body = streaming.iter_arrow(result_df, meta, chunk_bytes)
+        else:
+            statistics = await engine.run(_calculate_statistics, result_df)
+            if output == 'ndjson':
+                body = streaming.iter_ndjson(result_df, meta, chunk_bytes, statistics)
+            else:
+                body = streaming.iter_columns(result_df, meta, statistics)
+        return StreamingResponse(body, media_type=streaming.MEDIA_TYPES[output])
 
     except HTTPException:
         raise
+    except QueryOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         logger.error(f"计算指标失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -172,7 +298,7 @@ async def calculate_indicators(
 @app.post("/indicators/validate")
 async def validate_indicator_calculation(
         request: ValidationRequest,
-        engine: EnhancedQueryEngine = Depends(get_query_engine)
+        engine: AsyncQueryEngine = Depends(get_query_engine)
 ):
     """
     验证指标计算可行性
@@ -184,7 +310,7 @@ async def validate_indicator_calculation(
         验证结果
     """
     try:
-        result = engine.validate_indicator_calculation(
+        result = await engine.validate_indicator_calculation(
             symbol=request.symbol,
             indicator_name=request.indicator,
             start_date=request.start_date,
@@ -193,6 +319,8 @@ async def validate_indicator_calculation(
 
         return result
 
+    except QueryOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         logger.error(f"验证指标计算失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -204,11 +332,17 @@ async def calculate_batch_indicators(
         indicators: List[str] = Query(..., description="指标名称列表"),
         start_date: str = Query(..., description="开始日期"),
         end_date: str = Query(..., description="结束日期"),
-        engine: EnhancedQueryEngine = Depends(get_query_engine)
+        accept: Optional[str] = Header(None),
+        engine: AsyncQueryEngine = Depends(get_query_engine),
+        concurrency: int = Depends(get_batch_concurrency)
 ):
     """
     批量计算技术指标
 
+    一次查询取回全部股票的日线数据，再并发计算各股票的指标（同时计算的股票数见
+    config/api_config.yaml 的 batch.max_concurrency）。请求头 Accept 为 application/x-ndjson 时
+    按完成顺序逐行返回每只股票的结果，最后一行为汇总。
+
     Args:
         symbols: 股票代码列表
         indicators: 指标列表
@@ -218,47 +352,40 @@ async def calculate_batch_indicators(
     Returns:
         批量计算结果
     """
-    logger.info(f"批量计算指标: {len(symbols)} 只股票，{len(indicators)} 个指标")
+    symbols = list(dict.fromkeys(symbols))
+    logger.info(f"批量计算指标: {len(symbols)} 只股票，{len(indicators)} 个指标，并发: {concurrency}")
 
     try:
-        results = {}
-        successful = 0
-        failed = 0
+        frames = await engine.query_daily_data_many(symbols, start_date, end_date)
+    except QueryOverloadedError as e:
+        raise _overloaded(e)
+    except Exception as e:
+        logger.error(f"批量计算失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        for symbol in symbols:
-            try:
-                result_df = engine.query_with_indicators(
-                    symbol=symbol,
-                    indicators=indicators,
-                    start_date=start_date,
-                    end_date=end_date
-                )
-
-                if not result_df.empty:
-                    results[symbol] = {
-                        "data_count": len(result_df),
-                        "columns": result_df.columns.tolist(),
-                        "data": result_df.to_dict(orient="records")
-                    }
-                    successful += 1
-                else:
-                    results[symbol] = {"error": "无数据"}
-                    failed += 1
+    results = _fan_out(engine, frames, symbols, indicators, start_date, end_date, concurrency)
 
-            except Exception as e:
-                results[symbol] = {"error": str(e)}
-                failed += 1
+    if accept and streaming.NDJSON_MEDIA_TYPE in accept:
+        async def stream():
+            successful = 0
+            async for symbol, result in results:
+                successful += 'error' not in result
+                yield json.dumps(jsonable_encoder({"symbol": symbol, **result}), ensure_ascii=False) + "\n"
+            summary = {"total_symbols": len(symbols), "successful": successful,
+                       "failed": len(symbols) - successful}
+            yield json.dumps({"summary": summary}, ensure_ascii=False) + "\n"
 
-        return {
-            "total_symbols": len(symbols),
-            "successful": successful,
-            "failed": failed,
-            "results": results
-        }
+        return StreamingResponse(stream(), media_type=streaming.NDJSON_MEDIA_TYPE)
 
-    except Exception as e:
-        logger.error(f"批量计算失败: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    collected = {symbol: result async for symbol, result in results}
+    successful = sum('error' not in result for result in collected.values())
+    return {
+        "total_symbols": len(symbols),
+        "successful": successful,
+        "failed": len(symbols) - successful,
+        # 按请求顺序返回
+        "results": {symbol: collected[symbol] for symbol in symbols}
+    }
 
 
 # 启动函数
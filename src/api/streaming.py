@@ -0,0 +1,162 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/api\streaming.py
+# File Name: streaming
+# @ Author: mango-gh22
+# @ Date：2026/10/18 03:40
+"""
+desc 流式响应编码 - 按固定字节预算分块输出指标结果（NDJSON / 列式 JSON / Arrow IPC）
+"""
+# src/api/streaming.py
+"""
+流式响应编码
+
+/indicators/calculate 默认把全部行转成字典列表再整体编码为 JSON，多年、多指标的结果会在
+内存中放大数倍，并且要等全部编码完才发出第一个字节。这里的编码器按块输出：
+
+- ndjson（application/x-ndjson）：首行 {"meta": {...}}，之后每行一条记录，末行 {"statistics": {...}}
+- columns（列式 JSON）：{"meta": {...}, "data": {列名: [值, ...]}, "statistics": {...}}，逐列输出
+- arrow（application/vnd.apache.arrow.stream）：Arrow IPC 流，请求信息写在 schema 元数据中，
+  需要 pyarrow
+
+每块的行数按 chunk_bytes 估算（见 config/api_config.yaml 的 streaming.chunk_bytes），编码缓冲
+不随结果行数增长。编码器都是同步生成器，StreamingResponse 在线程池中迭代，不阻塞事件循环。
+"""
+
+import io
+import json
+from typing import Any, Dict, Iterator, Optional
+import pandas as pd
+import logging
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# 响应格式 -> 媒体类型
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'ndjson': NDJSON_MEDIA_TYPE,
+    'columns': 'application/json',
+    'arrow': ARROW_MEDIA_TYPE,
+}
+
+# 估算每行字节数时采样的行数
+_SAMPLE_ROWS = 64
+
+
+def negotiate_format(response_format: Optional[str], accept: Optional[str]) -> str:
+    """
+    确定响应格式：format 参数优先，其次按 Accept 请求头，默认 json
+
+    Raises:
+        ValueError: format 参数不是支持的格式
+    """
+    if response_format:
+        response_format = response_format.lower()
+        if response_format not in MEDIA_TYPES:
+            raise ValueError(f"不支持的响应格式: {response_format}，可选: {', '.join(MEDIA_TYPES)}")
+        return response_format
+    if accept:
+        if ARROW_MEDIA_TYPE in accept:
+            return 'arrow'
+        if NDJSON_MEDIA_TYPE in accept:
+            return 'ndjson'
+    return 'json'
+
+
+def _json_default(value: Any) -> Any:
+    """json.dumps 无法直接编码的值：日期转 ISO 格式，numpy 标量转 Python 值"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, default=_json_default)
+
+
+def _json_values(series: pd.Series) -> list:
+    """列值转为可编码的列表（NaN 转为 None）"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _records_json(df: pd.DataFrame) -> str:
+    """DataFrame 转为 NDJSON 文本（NaN 输出为 null，日期为 ISO 格式，浮点数完整精度）"""
+    columns = [_json_values(df[column]) for column in df.columns]
+    names = [str(column) for column in df.columns]
+    return ''.join(_dumps(dict(zip(names, row))) + '\n' for row in zip(*columns))
+
+
+def rows_per_chunk(df: pd.DataFrame, chunk_bytes: int) -> int:
+    """按采样行的 NDJSON 编码长度估算每块行数"""
+    if df.empty:
+        return 1
+    sample = _records_json(df.head(_SAMPLE_ROWS))
+    row_bytes = max(len(sample.encode('utf-8')) / min(len(df), _SAMPLE_ROWS), 1.0)
+    return max(1, int(chunk_bytes // row_bytes))
+
+
+def iter_ndjson(df: pd.DataFrame, meta: Dict[str, Any], chunk_bytes: int,
+                statistics: Optional[Dict] = None) -> Iterator[str]:
+    """按块输出 NDJSON：meta 行、记录行、statistics 行"""
+    yield _dumps({"meta": meta}) + "\n"
+    rows = rows_per_chunk(df, chunk_bytes)
+    for start in range(0, len(df), rows):
+        yield _records_json(df.iloc[start:start + rows])
+    if statistics is not None:
+        yield _dumps({"statistics": statistics}) + "\n"
+
+
+def iter_columns(df: pd.DataFrame, meta: Dict[str, Any],
+                 statistics: Optional[Dict] = None) -> Iterator[str]:
+    """逐列输出列式 JSON（每次只编码一列）"""
+    yield '{"meta": ' + _dumps(meta) + ', "data": {'
+    for i, column in enumerate(df.columns):
+        yield (', ' if i else '') + _dumps(str(column)) + ': ' + _dumps(_json_values(df[column]))
+    yield '}'
+    if statistics is not None:
+        yield ', "statistics": ' + _dumps(statistics)
+    yield '}'
+
+
+def iter_arrow(df: pd.DataFrame, meta: Dict[str, Any], chunk_bytes: int) -> Iterator[bytes]:
+    """
+    按块输出 Arrow IPC 流（每块一个 RecordBatch）
+
+    Raises:
+        RuntimeError: 未安装 pyarrow
+    """
+    if not HAS_PYARROW:
+        raise RuntimeError("Arrow 格式需要安装 pyarrow")
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    schema = schema.with_metadata({**(schema.metadata or {}), b'meta': _dumps(meta).encode('utf-8')})
+    row_bytes = max(df.memory_usage(index=False, deep=True).sum() / max(len(df), 1), 1.0)
+    rows = max(1, int(chunk_bytes // row_bytes))
+
+    buffer = io.BytesIO()
+
+    def drain() -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    with pa.ipc.new_stream(buffer, schema) as writer:
+        yield drain()
+        for start in range(0, len(df), rows):
+            chunk = df.iloc[start:start + rows]
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield drain()
+    # 流结束标记
+    yield drain()
@@ -202,6 +202,12 @@ def load_query_config() -> Dict[str, Any]:
     return ConfigLoader.load_yaml_config(str(config_path))
 
 
+def load_api_config() -> Dict[str, Any]:
+    """加载 API 配置"""
+    config_path = Path(__file__).parent.parent.parent / 'config' / 'api_config.yaml'
+    return ConfigLoader.load_yaml_config(str(config_path))
+
+
 # 使用示例
 if __name__ == '__main__':
     # 测试各个配置加载函数
@@ -11,25 +11,42 @@ desc 适配现有表结构的存储类
 import logging
 
 from src.database.db_connector import DatabaseConnector
+from src.database.schema_registry import get_schema_registry
 from src.utils.logger import get_logger
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Tuple, Dict, List, Optional, Any
 from src.utils.code_converter import normalize_stock_code
+from src.data.record_builder import build_records
+from src.data.store_verifier import StoreVerifier
+from src.data.change_events import publish_data_changes
 
 logger = get_logger(__name__)
 
 class AdaptiveDataStorage:
     """自适应数据存储器 - 根据表结构动态适配"""
 
-    def __init__(self, config_path: str = 'config/database.yaml', table_name: str = 'stock_daily_data'):
+    # 浮点字段小数位数限制
+    RECORD_DECIMALS = {
+        'pct_change': 4, 'amplitude': 4, 'turnover_rate': 4, 'turnover_rate_f': 4,
+        'open': 3, 'close': 3, 'high': 3, 'low': 3, 'pre_close': 3,
+        'ma5': 3, 'ma10': 3, 'ma20': 3, 'ma30': 3, 'ma60': 3, 'ma120': 3, 'ma250': 3,
+        'amount': 3, 'volume_ratio': 3,
+    }
+
+    def __init__(self, config_path: str = 'config/database.yaml', table_name: str = 'stock_daily_data',
+                 verify_mode: str = 'sampled', verify_sample_every: int = 100):
         """
         自适应数据存储器初始化
 
         Args:
             config_path: 配置文件路径，如果为 None 则使用默认路径
             table_name: 目标表名
+            verify_mode: 写入后记录数校验模式 always/sampled/deferred/off，默认 sampled；
+                batch_store_daily_data 和 DataPipeline.batch_process_stocks 批次内的写入
+                延迟到批次结束统一核对
+            verify_sample_every: sampled 模式下每 N 次写入校验一次
         """
         self.logger = logging.getLogger(__name__)  # 👈 添加这行
 
@@ -39,7 +56,9 @@ class AdaptiveDataStorage:
             config_path = str(project_root / "config" / "database.yaml")
 
         self.db_connector = DatabaseConnector(config_path)
+        self.schema_registry = get_schema_registry(self.db_connector)
         self.table_name = table_name
+        self.verifier = StoreVerifier(verify_mode, verify_sample_every)
         self.table_columns = self._load_table_columns()
         self.column_mapping = self._create_column_mapping()
         logger.info(f"自适应数据存储器初始化完成: {table_name}, {len(self.table_columns)}列")
@@ -47,11 +66,7 @@ class AdaptiveDataStorage:
     def _load_table_columns(self) -> List[str]:
         """加载表中实际存在的列"""
         try:
-            with self.db_connector.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"DESCRIBE {self.table_name}")
-                    columns = cursor.fetchall()
-                    return [col[0] for col in columns]
+            return self.schema_registry.get_columns(self.table_name)
         except Exception as e:
             logger.error(f"加载表列失败: {e}")
             # 返回常见列作为后备
@@ -305,103 +320,49 @@ class AdaptiveDataStorage:
         try:
             with self.db_connector.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    # 先查询当前记录数
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM {} WHERE symbol = %s".format(self.table_name),
-                        (symbol,)
-                    )
-                    pre_count = cursor.fetchone()[0]
-
-                    # 执行插入
+                    # 执行插入（INSERT IGNORE 的 rowcount 即新增行数）
                     cursor.executemany(sql, records)
+                    actual_new = max(cursor.rowcount, 0)
                     conn.commit()
+                    if actual_new > 0:
+                        self._publish_changes(df)
+
+                    # 按校验策略核对记录数，批次内延迟到批次结束
+                    if self.verifier.should_verify_now():
+                        cursor.execute(
+                            "SELECT COUNT(*) FROM {} WHERE symbol = %s".format(self.table_name),
+                            (symbol,)
+                        )
+                        post_count = cursor.fetchone()[0]
+                        self.logger.info(f"🎯 插入完成: {symbol}, 新增{actual_new}条, 总计{post_count}条")
+                    else:
+                        self.verifier.record(self.table_name, df['symbol'].unique() if 'symbol' in df else symbol)
+                        self.logger.info(f"🎯 插入完成: {symbol}, 新增{actual_new}条")
 
-                    # 查询插入后记录数
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM {} WHERE symbol = %s".format(self.table_name),
-                        (symbol,)
-                    )
-                    post_count = cursor.fetchone()[0]
-
-                    actual_new = post_count - pre_count
-
-                    self.logger.info(f"🎯 插入完成: {symbol}, 新增{actual_new}条, 总计{post_count}条")
                     return actual_new
         except Exception as e:
             logger.error(f"插入失败: {e}")
             return 0
 
+    def _publish_changes(self, df: pd.DataFrame):
+        """发布日线数据变更事件，缓存层据此失效（失败只记录警告，不影响入库结果）"""
+        try:
+            publish_data_changes(df, 'daily', self.table_name)
+        except Exception as e:
+            logger.warning(f"发布数据变更事件失败: {e}")
+
     def _get_insertable_columns(self) -> List[str]:
         """获取可插入的列（排除自增主键）- v0.6.2 新增"""
         try:
-            with self.db_connector.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"DESCRIBE {self.table_name}")
-                    columns_info = cursor.fetchall()
-
-                    insertable = []
-                    for col_info in columns_info:
-                        col_name = col_info[0]
-                        # 检查是否为自增主键
-                        is_auto_increment = False
-                        is_primary_key = False
-
-                        if len(col_info) > 5:
-                            extra_info = str(col_info[5]).lower()
-                            is_auto_increment = 'auto_increment' in extra_info
-
-                        if len(col_info) > 3:
-                            key_info = str(col_info[3])
-                            is_primary_key = key_info == 'PRI'
-
-                        if not (is_auto_increment and is_primary_key):
-                            insertable.append(col_name)
-                        else:
-                            self.logger.debug(f"排除自增主键列: {col_name}")
-
-                    return insertable
+            return self.schema_registry.get_insertable_columns(self.table_name)
         except Exception as e:
             logger.error(f"获取可插入列失败: {e}")
             # 保底方案：排除已知的自增主键
             return [col for col in self.table_columns if col.lower() != 'id']
 
     def _prepare_records(self, df: pd.DataFrame, columns: List[str]) -> List[tuple]:
-        """准备插入记录"""
-        records = []
-
-        for _, row in df.iterrows():
-            record = []
-            for col in columns:
-                val = row[col]
-
-                # 处理特殊值
-                if pd.isna(val):
-                    record.append(None)
-                elif isinstance(val, (np.integer, np.int64)):
-                    record.append(int(val))
-                elif isinstance(val, (np.floating, np.float64)):
-                    # 限制小数位数
-                    if col in ['pct_change', 'amplitude', 'turnover_rate', 'turnover_rate_f']:
-                        record.append(round(float(val), 4))
-                    elif col in ['open', 'close', 'high', 'low', 'pre_close',
-                                 'ma5', 'ma10', 'ma20', 'ma30', 'ma60', 'ma120', 'ma250']:
-                        record.append(round(float(val), 3))
-                    elif col == 'amount':
-                        record.append(round(float(val), 3))
-                    elif col == 'volume_ratio':
-                        record.append(round(float(val), 3))
-                    else:
-                        record.append(float(val))
-                elif isinstance(val, datetime):
-                    record.append(val.strftime('%Y-%m-%d %H:%M:%S'))
-                elif isinstance(val, pd.Timestamp):
-                    record.append(val.strftime('%Y-%m-%d %H:%M:%S'))
-                else:
-                    record.append(val)
-
-            records.append(tuple(record))
-
-        return records
+        """准备插入记录（列式构建，按字段限制小数位数）"""
+        return build_records(df, columns, decimals=self.RECORD_DECIMALS)
 
     def save_daily_data(self, df: pd.DataFrame) -> bool:
         """
@@ -443,38 +404,48 @@ class AdaptiveDataStorage:
             'details': []
         }
 
-        for symbol, df in data_dict.items():
-            try:
-                affected_rows, report = self.store_daily_data(df)
+        # 批次内的写入只记录股票，结束时统一核对（sampled 模式按 deferred 处理）
+        with self.verifier.batch():
+            for symbol, df in data_dict.items():
+                try:
+                    affected_rows, report = self.store_daily_data(df)
+
+                    results['total_records'] += len(df)
+                    results['total_affected'] += affected_rows
 
-                results['total_records'] += len(df)
-                results['total_affected'] += affected_rows
+                    if report['status'] == 'success':
+                        results['success_count'] += 1
+                        logger.debug(f"✅ 成功: {symbol}, {affected_rows}行")
+                    else:
+                        results['error_count'] += 1
+                        logger.warning(f"⚠️ 失败: {symbol}, 原因: {report.get('reason', 'unknown')}")
+
+                    results['details'].append({
+                        'symbol': symbol,
+                        'records': len(df),
+                        'affected': affected_rows,
+                        'status': report['status']
+                    })
 
-                if report['status'] == 'success':
-                    results['success_count'] += 1
-                    logger.debug(f"✅ 成功: {symbol}, {affected_rows}行")
-                else:
+                except Exception as e:
                     results['error_count'] += 1
-                    logger.warning(f"⚠️ 失败: {symbol}, 原因: {report.get('reason', 'unknown')}")
-
-                results['details'].append({
-                    'symbol': symbol,
-                    'records': len(df),
-                    'affected': affected_rows,
-                    'status': report['status']
-                })
-
-            except Exception as e:
-                results['error_count'] += 1
-                logger.error(f"❌ 异常: {symbol}, 错误: {e}")
-                results['details'].append({
-                    'symbol': symbol,
-                    'status': 'error',
-                    'error': str(e)
-                })
+                    logger.error(f"❌ 异常: {symbol}, 错误: {e}")
+                    results['details'].append({
+                        'symbol': symbol,
+                        'status': 'error',
+                        'error': str(e)
+                    })
 
         results['success_rate'] = (results['success_count'] / total_symbols * 100) if total_symbols > 0 else 0
 
+        # 批次结束统一核对
+        try:
+            verified = self.verifier.reconcile(self.db_connector, self.table_name)
+            results['verified_counts'] = verified.get(self.table_name, {})
+        except Exception as e:
+            logger.warning(f"批次核对失败: {e}")
+            results['verified_counts'] = {}
+
         logger.info(
             f"批量存储完成: "
             f"成功{results['success_count']}/{total_symbols}, "
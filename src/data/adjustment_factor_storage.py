@@ -57,10 +57,7 @@ class AdjustmentFactorStorage(DataStorage):
                 'forward_factor', 'backward_factor', 'total_factor'
             }
 
-            with self.db_connector.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"DESCRIBE {self.factor_table}")
-                    actual_columns = {row[0] for row in cursor.fetchall()}
+            actual_columns = set(self.schema_registry.get_columns(self.factor_table))
 
             missing_columns = required_columns - actual_columns
             if missing_columns:
@@ -224,6 +221,10 @@ class AdjustmentFactorStorage(DataStorage):
                 records_affected=affected_rows,
                 status='success'
             )
+            # 复权因子变化会改变全部历史的复权价格，整只股票失效
+            if affected_rows > 0:
+                self._publish_changes(df_processed, 'adjustment_factor', self.factor_table,
+                                      whole_history=True)
 
             return affected_rows, {
                 'status': 'success',
@@ -0,0 +1,315 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/data\change_events.py
+# File Name: change_events
+# @ Author: mango-gh22
+# @ Date：2026/10/17 22:30
+"""
+desc 数据变更事件 - 入库后按股票发布“某日期之后的数据已变化”，缓存层据此失效
+"""
+
+# src/data/change_events.py
+"""
+数据变更事件
+
+DataStorage.store_daily_data、AdaptiveDataStorage.store_daily_data（DataPipeline 等的入库路径）、
+AdjustmentFactorStorage.store_adjustment_factors、FactorStorageManager.store_factor_data 提交成功后，按股票发布 DataChangeEvent：
+    symbol 的 since_date 及之后的数据已变化（since_date 为 None 表示整只股票，
+    如复权因子变化会改变历史复权价格）。
+
+缓存层（指标缓存、增量状态、数据管道缓存、异步计算结果缓存）订阅事件，只失效
+受影响股票中结束日期 >= since_date 的缓存项，因此 TTL 可以放宽。
+
+跨进程：事件同时追加到 SQLite 日志（WAL 模式），其他进程（API 工作进程等）在访问
+缓存前调用 poll()，按 POLL_INTERVAL 节流读取新事件并分发给本进程的订阅者。
+同一总线发布的事件在 publish() 时已直接分发，poll() 不会重复分发。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional
+import pandas as pd
+import logging
+
+from src.utils.code_converter import normalize_stock_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_PATH = 'data/cache/data_changes.sqlite'
+
+
+def symbol_key(symbol: str) -> str:
+    """
+    事件和缓存使用的股票键：统一为 sh600519 形式
+
+    缓存由调用方的原始写法（如 600519.SH）生成键，事件则来自入库数据，两边都经过此函数
+    才能互相匹配；无法识别的代码原样返回。
+    """
+    try:
+        return normalize_stock_code(symbol)
+    except (ValueError, TypeError):
+        return symbol
+
+
+@dataclass
+class DataChangeEvent:
+    """单只股票的数据变更"""
+    data_type: str                      # daily / adjustment_factor / factor
+    symbol: str
+    since_date: Optional[str] = None    # YYYY-MM-DD，None 表示全部日期
+    until_date: Optional[str] = None
+    table: Optional[str] = None
+    rows: int = 0
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def affects(self, end_date: Optional[str]) -> bool:
+        """结束日期为 end_date 的缓存是否受影响（end_date 为 None 视为受影响）"""
+        if self.since_date is None or end_date is None:
+            return True
+        return pd.Timestamp(end_date) >= pd.Timestamp(self.since_date)
+
+
+def events_from_frame(df: pd.DataFrame, data_type: str, table: Optional[str] = None,
+                      whole_history: bool = False) -> List[DataChangeEvent]:
+    """
+    由入库数据生成事件（每只股票一个）
+
+    Args:
+        df: 含 symbol、trade_date 列的数据
+        data_type: 数据类型
+        table: 目标表
+        whole_history: True 时 since_date 为 None（整只股票失效）
+    """
+    if df is None or df.empty or 'symbol' not in df.columns:
+        return []
+
+    if 'trade_date' in df.columns:
+        dates = pd.to_datetime(df['trade_date'], errors='coerce')
+    else:
+        dates = pd.Series(pd.NaT, index=df.index)
+
+    events = []
+    for symbol, symbol_dates in dates.groupby(df['symbol'].astype(str), sort=False):
+        since = symbol_dates.min()
+        until = symbol_dates.max()
+        events.append(DataChangeEvent(
+            data_type=data_type,
+            symbol=symbol_key(symbol),
+            since_date=None if whole_history or pd.isna(since) else since.strftime('%Y-%m-%d'),
+            until_date=None if pd.isna(until) else until.strftime('%Y-%m-%d'),
+            table=table,
+            rows=len(symbol_dates),
+        ))
+    return events
+
+
+class DataChangeBus:
+    """数据变更事件总线（进程内分发 + SQLite 日志跨进程传递）"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS data_change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            data_type TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            since_date TEXT,
+            until_date TEXT,
+            table_name TEXT,
+            rows INTEGER,
+            created_at TEXT NOT NULL
+        )
+    """
+
+    POLL_INTERVAL = 1.0     # 秒
+    RETENTION_DAYS = 7      # 日志保留天数
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_LOG_PATH):
+        """
+        Args:
+            log_path: SQLite 日志路径，None 表示只在进程内分发
+        """
+        self.log_path = Path(log_path) if log_path else None
+        self._lock = threading.RLock()
+        self._subscribers: List = []
+        self._conn = None
+        self._pid = None
+        self._origin = None
+        self._last_seen_id = 0
+        self._last_poll = 0.0
+        self.stats = {'published': 0, 'received': 0, 'dispatched': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # 日志
+    # ------------------------------------------------------------------
+
+    def _get_conn(self) -> Optional[sqlite3.Connection]:
+        """当前进程的日志连接（首次打开时跳过已有的历史事件）"""
+        if self.log_path is None:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.log_path), timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self.SCHEMA)
+            self._conn.commit()
+            self._pid = os.getpid()
+            self._origin = f"{self._pid}:{id(self)}"
+            self._last_seen_id = self._conn.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM data_change_log").fetchone()[0]
+        return self._conn
+
+    def _append(self, events: List[DataChangeEvent]):
+        conn = self._get_conn()
+        if conn is None:
+            return
+        conn.executemany(
+            "INSERT INTO data_change_log (origin, data_type, symbol, since_date, until_date, "
+            "table_name, rows, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(self._origin, e.data_type, e.symbol, e.since_date, e.until_date, e.table, e.rows, e.created_at)
+             for e in events]
+        )
+        expired_before = (datetime.now() - timedelta(days=self.RETENTION_DAYS)).isoformat()
+        conn.execute("DELETE FROM data_change_log WHERE created_at < ?", (expired_before,))
+        conn.commit()
+
+    # ------------------------------------------------------------------
+    # 订阅 / 发布
+    # ------------------------------------------------------------------
+
+    def subscribe(self, callback: Callable[[DataChangeEvent], None], replay: bool = False):
+        """
+        订阅事件
+
+        Python 绑定方法以弱引用保存，对象被回收后自动取消订阅。
+
+        Args:
+            callback: 回调函数，参数为 DataChangeEvent
+            replay: 是否先回放日志中保留的历史事件（按股票合并）。持久化缓存（磁盘缓存、
+                增量状态）应回放，以失效本进程启动前入库导致过期的缓存项；回调需按
+                event.created_at 只失效早于事件的缓存项，重复回放才不会误删新结果。
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__func__') else (lambda: callback)
+        with self._lock:
+            self._subscribers.append(ref)
+            try:
+                # 打开日志连接，之后发布的事件都能被 poll() 读到
+                self._get_conn()
+                history = self._history() if replay else []
+            except sqlite3.Error as e:
+                logger.warning(f"读取数据变更日志失败: {e}")
+                history = []
+
+        for event in history:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"回放数据变更事件失败 {event.symbol}: {e}")
+
+    def _history(self) -> List[DataChangeEvent]:
+        """日志中已有的事件，按股票合并：最早的 since_date（None 优先）、最晚的 created_at"""
+        conn = self._get_conn()
+        if conn is None:
+            return []
+        rows = conn.execute(
+            "SELECT symbol, MIN(COALESCE(since_date, '')), MAX(created_at) "
+            "FROM data_change_log WHERE id <= ? GROUP BY symbol", (self._last_seen_id,)
+        ).fetchall()
+        return [DataChangeEvent(data_type='replay', symbol=symbol, since_date=since or None,
+                                created_at=created_at)
+                for symbol, since, created_at in rows]
+
+    def unsubscribe(self, callback: Callable[[DataChangeEvent], None]):
+        with self._lock:
+            self._subscribers = [ref for ref in self._subscribers if ref() not in (None, callback)]
+
+    def _dispatch(self, events: List[DataChangeEvent]):
+        with self._lock:
+            callbacks = [ref() for ref in self._subscribers]
+            self._subscribers = [ref for ref, cb in zip(self._subscribers, callbacks) if cb is not None]
+        for event in events:
+            for callback in callbacks:
+                if callback is None:
+                    continue
+                try:
+                    callback(event)
+                    self.stats['dispatched'] += 1
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"处理数据变更事件失败 {event.symbol}: {e}")
+
+    def publish(self, events: List[DataChangeEvent]):
+        """发布事件：写入日志并分发给本进程的订阅者（失败只记录日志，不影响入库）"""
+        if not events:
+            return
+        with self._lock:
+            self.stats['published'] += len(events)
+            try:
+                self._append(events)
+            except sqlite3.Error as e:
+                self.stats['errors'] += 1
+                logger.warning(f"写入数据变更日志失败: {e}")
+        self._dispatch(events)
+        logger.debug(f"发布数据变更事件: {len(events)} 只股票")
+
+    def poll(self, force: bool = False) -> int:
+        """
+        读取其他进程发布的新事件并分发（按 POLL_INTERVAL 节流）
+
+        Returns:
+            本次分发的事件数
+        """
+        if self.log_path is None:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.POLL_INTERVAL:
+            return 0
+
+        with self._lock:
+            self._last_poll = now
+            try:
+                conn = self._get_conn()
+                rows = conn.execute(
+                    "SELECT id, origin, data_type, symbol, since_date, until_date, table_name, rows, created_at "
+                    "FROM data_change_log WHERE id > ? ORDER BY id", (self._last_seen_id,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                self.stats['errors'] += 1
+                logger.warning(f"读取数据变更日志失败: {e}")
+                return 0
+
+            if not rows:
+                return 0
+            self._last_seen_id = rows[-1][0]
+            events = [DataChangeEvent(data_type=r[2], symbol=r[3], since_date=r[4], until_date=r[5],
+                                      table=r[6], rows=r[7], created_at=r[8])
+                      for r in rows if r[1] != self._origin]
+            self.stats['received'] += len(events)
+
+        self._dispatch(events)
+        return len(events)
+
+
+_bus: Optional[DataChangeBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_data_change_bus() -> DataChangeBus:
+    """获取进程级数据变更事件总线"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = DataChangeBus()
+        return _bus
+
+
+def publish_data_changes(df: pd.DataFrame, data_type: str, table: Optional[str] = None,
+                         whole_history: bool = False) -> List[DataChangeEvent]:
+    """由入库数据生成事件并发布到进程级总线，返回发布的事件"""
+    events = events_from_frame(df, data_type, table, whole_history)
+    get_data_change_bus().publish(events)
+    return events
@@ -16,6 +16,7 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import json
+import contextlib
 import time
 
 # 导入现有模块
@@ -342,8 +343,10 @@ class DataPipeline:
                     'processing_time': 0
                 }
 
-        # 使用线程池处理
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+        # 使用线程池处理；批次内的写入只记录股票，结束时统一核对
+        verifier = getattr(self.storage, 'verifier', None)
+        verify_batch = verifier.batch() if verifier is not None else contextlib.nullcontext()
+        with verify_batch, concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
             future_to_symbol = {
                 executor.submit(process_single, symbol): symbol
                 for symbol in symbols
@@ -378,7 +381,16 @@ class DataPipeline:
                     batch_result['failed'] += 1
                     batch_result['processed'] += 1
 
-        # 完成批量处理
+        # 完成批量处理：统一核对本批次涉及的股票
+        if verifier is not None:
+            try:
+                verified = verifier.reconcile(self.storage.db_connector)
+                batch_result['verified_counts'] = {
+                    symbol: count for counts in verified.values() for symbol, count in counts.items()
+                }
+            except Exception as e:
+                logger.warning(f"批次核对失败: {e}")
+
         batch_result['end_time'] = datetime.now().isoformat()
         batch_result['processing_time'] = time.time() - batch_start_time
 
@@ -406,6 +418,8 @@ class DataPipeline:
                 'total_records': batch_result['total_records']
             },
 
+            'verified_counts': batch_result.get('verified_counts', {}),
+
             'performance': {
                 'symbols_per_second': round(batch_result['total_symbols'] / batch_result['processing_time'], 2) if
                 batch_result['processing_time'] > 0 else 0,
@@ -23,6 +23,10 @@ sys.path.append(os.path.dirname(project_root))
 
 from src.config.logging_config import setup_logging
 from src.database.db_connector import DatabaseConnector
+from src.database.schema_registry import get_schema_registry
+from src.data.record_builder import build_records
+from src.data.store_verifier import StoreVerifier
+from src.data.change_events import publish_data_changes
 from src.utils.code_converter import normalize_stock_code  # ✅ 强制添加此行
 
 logger = setup_logging()
@@ -31,12 +35,17 @@ logger = setup_logging()
 class DataStorage:
     """数据存储管理器 - 增强优化版"""
 
-    def __init__(self, config_path: str = 'config/database.yaml'):
+    def __init__(self, config_path: str = 'config/database.yaml',
+                 verify_mode: str = 'sampled', verify_sample_every: int = 100):
         """
         初始化数据存储器
 
         Args:
             config_path: 数据库配置文件路径
+            verify_mode: 写入后记录数校验模式 always/sampled/deferred/off，默认 sampled；
+                bulk_store_daily_data 批次内的写入延迟到批次结束统一核对。
+                deferred 模式下单次写入需自行调用 reconcile_verification
+            verify_sample_every: sampled 模式下每 N 次写入校验一次
         """
         # 关键修复：添加 logger
         import logging
@@ -45,10 +54,14 @@ class DataStorage:
         # 初始化数据库连接器
         self.db_connector = DatabaseConnector(config_path)
 
-        # 缓存初始化
-        self._table_columns_cache = {}  # 缓存表结构，避免重复查
+        # 表结构由进程级注册表缓存（TTL + DDL 后失效）；以下两项只保存查询失败时的默认字段
+        self.schema_registry = get_schema_registry(self.db_connector)
+        self._table_columns_cache = {}
         self._column_order_cache = {}
 
+        # 写入校验策略（批次内或 deferred 模式下由 reconcile_verification 统一核对）
+        self.verifier = StoreVerifier(verify_mode, verify_sample_every)
+
         # 设置映射关系
         self._setup_column_mappings()
 
@@ -128,13 +141,9 @@ class DataStorage:
             return self._table_columns_cache[table_name]
 
         try:
-            with self.db_connector.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
-                    cols = {row[0] for row in cursor.fetchall()}
-                    self._table_columns_cache[table_name] = cols
-                    logger.debug(f"缓存表 `{table_name}` 字段: {sorted(cols)}")
-                    return cols
+            cols = set(self.schema_registry.get_columns(table_name))
+            logger.debug(f"表 `{table_name}` 字段: {sorted(cols)}")
+            return cols
         except Exception as e:
             logger.error(f"无法获取表 `{table_name}` 结构: {e}")
             # 根据你提供的表结构，返回默认字段
@@ -367,17 +376,9 @@ class DataStorage:
             return self._column_order_cache[cache_key]
 
         try:
-            with self.db_connector.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
-                    columns = [row[0] for row in cursor.fetchall()]
-
-                    if not hasattr(self, '_column_order_cache'):
-                        self._column_order_cache = {}
-                    self._column_order_cache[cache_key] = columns
-
-                    logger.debug(f"获取表 {table_name} 字段顺序: {len(columns)} 个字段")
-                    return columns
+            columns = self.schema_registry.get_columns(table_name)
+            logger.debug(f"获取表 {table_name} 字段顺序: {len(columns)} 个字段")
+            return columns
 
         except Exception as e:
             logger.error(f"无法获取表 `{table_name}` 字段顺序: {e}")
@@ -438,53 +439,17 @@ class DataStorage:
 
         return insert_sql, update_sql, valid_columns
 
-    def _prepare_records(self, df: pd.DataFrame, valid_columns: List[str] = None) -> List[Tuple]:
-        """
-        准备插入记录 - 修复：使用指定的字段顺序
-        """
-        if valid_columns is None:
-            valid_columns = list(df.columns)
-
-        records = []
-
-        for _, row in df.iterrows():
-            record = []
-            for col in valid_columns:
-                value = row[col] if col in row.index else None
-
-                if pd.isna(value):
-                    record.append(None)
-                elif isinstance(value, (np.integer, np.int64)):
-                    record.append(int(value))
-                elif isinstance(value, (np.floating, np.float64)):
-                    record.append(float(value))
-                elif isinstance(value, (datetime, pd.Timestamp)):
-                    # 确保时间戳格式正确
-                    if isinstance(value, pd.Timestamp):
-                        record.append(value.strftime('%Y-%m-%d %H:%M:%S'))
-                    else:
-                        record.append(value.strftime('%Y-%m-%d %H:%M:%S'))
-                elif isinstance(value, str) and col in ['trade_date']:
-                    # 如果是日期字符串，确保格式正确
-                    try:
-                        pd_date = pd.to_datetime(value)
-                        record.append(pd_date.strftime('%Y-%m-%d'))
-                    except:
-                        record.append(value)
-                else:
-                    record.append(value)
-
-            records.append(tuple(record))
-
-        return records
-
-    def store_daily_data(self, data, table_name: str = None) -> Tuple[int, Dict]:
+    def store_daily_data(self, data, table_name: str = None,
+                         data_type: str = 'daily') -> Tuple[int, Dict]:
         """
         存储日线数据 - 增强版：支持多种输入类型并确保数据一致性
 
+        提交成功且有行变化时，按股票发布数据变更事件（见 src/data/change_events.py）。
+
         Args:
             data: 输入数据，可以是 pd.DataFrame、list of dicts 或 dict
             table_name: 目标表名，默认使用 stock_daily_data
+            data_type: 数据类型（日志和数据变更事件使用），如 'daily'、'factor'
 
         Returns:
             (影响行数, 详细信息字典)
@@ -540,27 +505,23 @@ class DataStorage:
             logger.info(f"✅ 预处理完成: {len(df_processed)} 条记录")
             logger.debug(f"预处理后列名: {list(df_processed.columns)}")
 
-            # 5. 检查字段一致性
-            with self.db_connector.get_connection() as conn:
-                with conn.cursor(dictionary=True) as cursor:
-                    # 获取表结构
-                    cursor.execute(f"DESCRIBE {table_name}")
-                    table_columns = [row['Field'] for row in cursor.fetchall()]
+            # 5. 检查字段一致性（表结构来自注册表缓存）
+            table_columns = self._get_table_column_order(table_name)
 
-                    # 获取数据列
-                    data_columns = list(df_processed.columns)
+            # 获取数据列
+            data_columns = list(df_processed.columns)
 
-                    # 找出匹配的列
-                    matching_columns = [col for col in data_columns if col in table_columns]
-                    missing_in_table = [col for col in data_columns if col not in table_columns]
-                    missing_in_data = [col for col in table_columns if
-                                       col not in data_columns and col not in ['id', 'created_time', 'updated_time']]
+            # 找出匹配的列
+            matching_columns = [col for col in data_columns if col in table_columns]
+            missing_in_table = [col for col in data_columns if col not in table_columns]
+            missing_in_data = [col for col in table_columns if
+                               col not in data_columns and col not in ['id', 'created_time', 'updated_time']]
 
-                    logger.info(f"字段匹配: {len(matching_columns)}/{len(data_columns)} 个字段可插入")
-                    if missing_in_table:
-                        logger.warning(f"数据中的字段在表中不存在: {missing_in_table}")
-                    if missing_in_data:
-                        logger.debug(f"表中的字段在数据中不存在: {missing_in_data}")
+            logger.info(f"字段匹配: {len(matching_columns)}/{len(data_columns)} 个字段可插入")
+            if missing_in_table:
+                logger.warning(f"数据中的字段在表中不存在: {missing_in_table}")
+            if missing_in_data:
+                logger.debug(f"表中的字段在数据中不存在: {missing_in_data}")
 
             # 6. 构建动态SQL - 只使用匹配的字段
             insert_sql, update_sql, valid_columns = self._build_dynamic_sql(df_processed, table_name)
@@ -581,6 +542,8 @@ class DataStorage:
             logger.debug(f"第一条记录示例: {records[0] if records else 'None'}")
 
             affected_rows = 0
+            verified_count = None
+            symbol = df_processed['symbol'].iloc[0] if 'symbol' in df_processed.columns else 'unknown'
             with self.db_connector.get_connection() as conn:
                 with conn.cursor() as cursor:
                     try:
@@ -593,11 +556,13 @@ class DataStorage:
 
                         logger.info(f"✅ 数据库提交成功，影响行数: {affected_rows}")
 
-                        # 验证实际插入的记录
-                        symbol = df_processed['symbol'].iloc[0] if 'symbol' in df_processed.columns else 'unknown'
-                        cursor.execute(f"SELECT COUNT(*) as count FROM {table_name} WHERE symbol = %s", (symbol,))
-                        actual_count = cursor.fetchone()[0]
-                        logger.info(f"✅ 验证成功: 表中有 {actual_count} 条 {symbol} 的记录")
+                        # 验证实际插入的记录（按校验策略执行或延迟到批次结束）
+                        if self.verifier.should_verify_now():
+                            cursor.execute(f"SELECT COUNT(*) as count FROM {table_name} WHERE symbol = %s", (symbol,))
+                            verified_count = cursor.fetchone()[0]
+                            logger.info(f"✅ 验证成功: 表中有 {verified_count} 条 {symbol} 的记录")
+                        else:
+                            self.verifier.record(table_name, df_processed['symbol'].unique())
 
                     except Exception as e:
                         # 出错时回滚
@@ -617,7 +582,6 @@ class DataStorage:
                         raise
 
             # 9. 返回成功结果
-            symbol = df_processed['symbol'].iloc[0] if 'symbol' in df_processed.columns else 'unknown'
             logger.info(
                 f"存储日线数据完成: {symbol}, "
                 f"表: {table_name}, "
@@ -625,15 +589,17 @@ class DataStorage:
                 f"影响: {affected_rows}行"
             )
 
-            # 10. 记录数据更新日志
+            # 10. 记录数据更新日志，通知缓存失效
             self._log_data_update(
-                data_type='daily',
+                data_type=data_type,
                 symbol=symbol,
                 table_name=table_name,
                 records_processed=len(records),
                 records_affected=affected_rows,
                 status='success'
             )
+            if affected_rows > 0:
+                self._publish_changes(df_processed, data_type, table_name)
 
             return affected_rows, {
                 'status': 'success',
@@ -646,6 +612,8 @@ class DataStorage:
                 'processed_shape': f"{len(df_processed)}x{len(df_processed.columns)}",
                 'matching_columns': len(matching_columns),
                 'total_columns': len(data_columns),
+                'verify_mode': self.verifier.effective_mode,
+                'verified_count': verified_count,
                 'timestamp': datetime.now().isoformat()
             }
 
@@ -658,7 +626,7 @@ class DataStorage:
                 symbol = df['symbol'].iloc[0] if not df.empty else 'unknown'
 
             self._log_data_update(
-                data_type='daily',
+                data_type=data_type,
                 symbol=symbol,
                 table_name=table_name or 'stock_daily_data',
                 records_processed=0,
@@ -686,10 +654,7 @@ class DataStorage:
         """
         try:
             # 获取表的实际字段
-            with self.db_connector.get_connection() as conn:
-                with conn.cursor(dictionary=True) as cursor:
-                    cursor.execute(f"DESCRIBE {table_name}")
-                    table_fields = [row['Field'] for row in cursor.fetchall()]
+            table_fields = self._get_table_column_order(table_name)
 
             # 找出数据中存在的表字段
             data_columns = list(df.columns)
@@ -725,19 +690,10 @@ class DataStorage:
 
     def _prepare_records(self, df: pd.DataFrame, valid_columns: list) -> list:
         """
-        准备要插入的记录
+        准备要插入的记录 - 列式构建（按列转换类型，避免 iterrows）
         """
         try:
-            # 确保所有字段都存在
-            for col in valid_columns:
-                if col not in df.columns:
-                    df[col] = None
-
-            # 转换DataFrame为记录列表
-            records = []
-            for _, row in df.iterrows():
-                record = tuple(row[col] if pd.notna(row[col]) else None for col in valid_columns)
-                records.append(record)
+            records = build_records(df, valid_columns)
 
             logger.debug(f"准备了 {len(records)} 条记录，每条 {len(valid_columns)} 个字段")
 
@@ -747,6 +703,260 @@ class DataStorage:
             logger.error(f"准备记录失败: {e}", exc_info=True)
             return []
 
+    # LOAD DATA LOCAL 被禁用时 MySQL 返回的错误码
+    LOCAL_INFILE_DISABLED_ERRORS = {1148, 2068, 3948}
+
+    def bulk_store_daily_data(self, frames, table_name: str = None,
+                              flush_rows: int = 200000) -> Tuple[int, Dict]:
+        """
+        批量导入日线数据 - 全市场初始化专用
+
+        多只股票的预处理结果先写入临时 TSV 文件，一次 LOAD DATA LOCAL INFILE
+        导入临时暂存表，再用一条 INSERT ... SELECT ... ON DUPLICATE KEY UPDATE
+        合并到目标表。服务器或客户端未开启 local_infile 时自动回退到
+        逐股票 store_daily_data。LOAD DATA 产生警告（非法或截断的值）时该批次不合并，
+        警告记录在详细信息的 errors 中。
+
+        Args:
+            frames: {股票代码: DataFrame} 字典，或 DataFrame 可迭代对象
+            table_name: 目标表名，默认使用 stock_daily_data
+            flush_rows: 累计行数达到该值时执行一次导入
+
+        Returns:
+            (影响行数, 详细信息字典)，详细信息包含 rows_per_sec
+        """
+        if table_name is None:
+            table_name = self.supported_tables.get('daily', 'stock_daily_data')
+
+        if isinstance(frames, dict):
+            frames = frames.values()
+        elif isinstance(frames, pd.DataFrame):
+            frames = [frames]
+
+        report = {
+            'status': 'success',
+            'mode': 'load_data',
+            'table': table_name,
+            'symbols': 0,
+            'records_processed': 0,
+            'records_affected': 0,
+            'loads': 0,
+            'errors': []
+        }
+
+        start_time = time.time()
+        pending = []
+        pending_rows = 0
+        bulk_enabled = self._local_infile_enabled()
+
+        if not bulk_enabled:
+            logger.warning("local_infile 未开启，批量导入回退为逐股票写入")
+            report['mode'] = 'fallback'
+
+        # 批次内的写入只记录股票，结束时统一核对（sampled 模式按 deferred 处理）
+        with self.verifier.batch():
+            for df in frames:
+                if df is None or df.empty:
+                    continue
+
+                if not bulk_enabled:
+                    affected, detail = self.store_daily_data(df, table_name)
+                    self._merge_bulk_report(report, detail, affected)
+                    continue
+
+                df_processed = self._preprocess_data(df, table_name)
+                if df_processed.empty:
+                    report['errors'].append({'reason': 'preprocess_failed'})
+                    continue
+
+                pending.append(df_processed)
+                pending_rows += len(df_processed)
+                report['symbols'] += df_processed['symbol'].nunique()
+                self.verifier.record(table_name, df_processed['symbol'].unique())
+
+                if pending_rows >= flush_rows:
+                    bulk_enabled = self._flush_bulk_load(pending, table_name, report)
+                    pending, pending_rows = [], 0
+
+            if pending:
+                self._flush_bulk_load(pending, table_name, report)
+
+        elapsed = time.time() - start_time
+        verified = self.reconcile_verification(table_name)
+        report['verified_counts'] = verified.get(table_name, {})
+        report['elapsed_seconds'] = round(elapsed, 3)
+        report['rows_per_sec'] = round(report['records_processed'] / elapsed, 1) if elapsed > 0 else 0.0
+        report['timestamp'] = datetime.now().isoformat()
+        if report['errors']:
+            report['status'] = 'partial' if report['records_processed'] else 'error'
+
+        logger.info(
+            f"批量导入完成: 模式={report['mode']}, 股票={report['symbols']}, "
+            f"记录={report['records_processed']}, 影响={report['records_affected']}, "
+            f"速度={report['rows_per_sec']:.0f} 行/秒"
+        )
+
+        return report['records_affected'], report
+
+    def _local_infile_enabled(self) -> bool:
+        """检查服务器是否允许 LOAD DATA LOCAL INFILE"""
+        try:
+            with self.db_connector.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SHOW GLOBAL VARIABLES LIKE 'local_infile'")
+                    row = cursor.fetchone()
+                    return bool(row) and str(row[1]).upper() in ('ON', '1')
+        except Exception as e:
+            logger.warning(f"检查 local_infile 失败: {e}")
+            return False
+
+    def _flush_bulk_load(self, frames: List[pd.DataFrame], table_name: str, report: Dict) -> bool:
+        """
+        将累计的数据一次性导入目标表
+
+        Returns:
+            是否继续使用 LOAD DATA（客户端拒绝时返回 False，后续走回退路径）
+        """
+        import tempfile
+        import mysql.connector
+
+        df_all = pd.concat(frames, ignore_index=True)
+        db_column_order = self._get_table_column_order(table_name)
+        columns = [col for col in db_column_order if col in df_all.columns]
+        if 'symbol' not in columns or 'trade_date' not in columns:
+            report['errors'].append({'reason': 'missing_key_columns'})
+            return True
+
+        column_list = ', '.join(f'`{col}`' for col in columns)
+        update_columns = [col for col in columns if col not in ('symbol', 'trade_date', 'id', 'created_time')]
+        update_set = ', '.join(f'`{col}` = s.`{col}`' for col in update_columns)
+        stage_table = f"_stage_{table_name}"
+
+        tmp = tempfile.NamedTemporaryFile(mode='w', suffix='.tsv', delete=False,
+                                          encoding='utf-8', newline='')
+        try:
+            df_all[columns].to_csv(tmp, sep='\t', header=False, index=False, na_rep='\\N',
+                                   date_format='%Y-%m-%d %H:%M:%S', lineterminator='\n')
+            tmp.close()
+            file_path = tmp.name.replace('\\', '/')
+
+            conn = self.db_connector.get_bulk_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS `{stage_table}`")
+                # 临时表不能分区，用 SELECT 复制字段类型而不复制分区/索引
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE `{stage_table}` AS "
+                    f"SELECT {column_list} FROM `{table_name}` WHERE 1 = 0"
+                )
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE `{stage_table}` "
+                    f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' "
+                    f"LINES TERMINATED BY '\\n' ({column_list})",
+                    (file_path,)
+                )
+                loaded = cursor.rowcount
+
+                # LOCAL 隐含 IGNORE：非法/截断的值只产生警告并按 NULL/0 导入，有警告时放弃整批
+                warnings = self._load_warnings(cursor)
+                if warnings:
+                    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS `{stage_table}`")
+                    conn.rollback()
+                    cursor.close()
+                    logger.error(f"LOAD DATA 产生 {len(warnings)} 条警告，本批次 {len(df_all)} 行未导入: {warnings[0]}")
+                    report['errors'].append({'reason': 'load_data_warnings', 'rows': len(df_all),
+                                             'warnings': warnings})
+                    return True
+
+                merge_sql = (
+                    f"INSERT INTO `{table_name}` ({column_list}) "
+                    f"SELECT {column_list} FROM `{stage_table}` s"
+                )
+                if update_set:
+                    merge_sql += f" ON DUPLICATE KEY UPDATE {update_set}"
+                cursor.execute(merge_sql)
+                affected = cursor.rowcount
+
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS `{stage_table}`")
+                conn.commit()
+                cursor.close()
+            except mysql.connector.Error as e:
+                conn.rollback()
+                if e.errno in self.LOCAL_INFILE_DISABLED_ERRORS:
+                    logger.warning(f"LOAD DATA LOCAL 被拒绝({e.errno})，本批次回退为逐股票写入")
+                    report['mode'] = 'fallback'
+                    for df in frames:
+                        affected_rows, detail = self.store_daily_data(df, table_name)
+                        self._merge_bulk_report(report, detail, affected_rows, count_symbol=False)
+                    return False
+                raise
+            finally:
+                conn.close()
+
+            report['loads'] += 1
+            report['records_processed'] += loaded
+            report['records_affected'] += affected
+            if affected > 0:
+                self._publish_changes(df_all, 'daily', table_name)
+            logger.info(f"✅ LOAD DATA 导入 {loaded} 行，合并影响 {affected} 行")
+            return True
+
+        except Exception as e:
+            logger.error(f"批量导入失败: {e}", exc_info=True)
+            report['errors'].append({'reason': str(e), 'rows': len(df_all)})
+            return True
+        finally:
+            if not tmp.closed:
+                tmp.close()
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+
+    @staticmethod
+    def _load_warnings(cursor, limit: int = 20) -> List[str]:
+        """上一条语句的警告（忽略 Note 级别），格式为 '级别 代码: 信息'"""
+        cursor.execute(f"SHOW WARNINGS LIMIT {int(limit)}")
+        return [f"{level} {code}: {message}" for level, code, message in cursor.fetchall()
+                if str(level) != 'Note']
+
+    def reconcile_verification(self, table_name: str = None) -> Dict[str, Dict[str, int]]:
+        """
+        批次结束时核对 deferred 模式下记录的股票
+
+        Args:
+            table_name: 只核对指定表，None 表示全部
+
+        Returns:
+            {表名: {股票代码: 表中记录数}}
+        """
+        try:
+            return self.verifier.reconcile(self.db_connector, table_name)
+        except Exception as e:
+            logger.warning(f"批次核对失败: {e}")
+            return {}
+
+    @staticmethod
+    def _merge_bulk_report(report: Dict, detail: Dict, affected: int, count_symbol: bool = True):
+        """合并回退路径的单股票存储结果到批量报告"""
+        if count_symbol:
+            report['symbols'] += 1
+        if detail.get('status') == 'success':
+            report['records_processed'] += detail.get('records_processed', 0)
+            report['records_affected'] += affected
+        elif detail.get('status') == 'error':
+            report['errors'].append({
+                'symbol': detail.get('symbol'),
+                'reason': detail.get('error') or detail.get('reason')
+            })
+
+    @staticmethod
+    def _publish_changes(df: pd.DataFrame, data_type: str, table_name: str,
+                         whole_history: bool = False):
+        """发布数据变更事件（失败只记录警告，不影响入库结果）"""
+        try:
+            publish_data_changes(df, data_type, table_name, whole_history)
+        except Exception as e:
+            logger.warning(f"发布数据变更事件失败: {e}")
+
     def _log_data_update(self, data_type: str, symbol: str, table_name: str,
                          records_processed: int, records_affected: int,
                          status: str, error_message: str = None):
@@ -108,7 +108,7 @@ class FactorStorageManager:
         df_processed = self._preprocess_factor_data(df.copy())
 
         # 复用通用存储器的核心逻辑
-        return self.data_storage.store_daily_data(df_processed)
+        return self.data_storage.store_daily_data(df_processed, data_type='factor')
 
     def _preprocess_factor_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
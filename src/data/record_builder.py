@@ -0,0 +1,129 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/data\record_builder.py
+# File Name: record_builder
+# @ Author: mango-gh22
+# @ Date：2026/10/17 9:12
+"""
+desc 列式记录构建器 - 为 executemany 生成参数元组
+"""
+
+# src/data/record_builder.py
+"""
+列式记录构建器
+
+原 _prepare_records 使用 df.iterrows() 逐行逐单元格判断类型，
+全量回填时是存储环节最主要的 CPU 开销。这里改为按列一次性转换：
+- 日期列整体 strftime
+- NaN/NaT → None
+- numpy 标量 → Python 原生类型（通过 ndarray.tolist()）
+最后用 zip(*columns) 拼出记录元组，不再有逐单元格分支。
+"""
+
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _object_to_native(value: Any) -> Any:
+    """object 列中的单个值转换（仅用于混合类型列）"""
+    if value is None:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def column_to_list(series: pd.Series, decimals: Optional[int] = None) -> List[Any]:
+    """
+    将一列转换为可直接传给数据库驱动的 Python 列表
+
+    Args:
+        series: 列数据
+        decimals: 浮点列保留的小数位数，None 表示不处理
+
+    Returns:
+        与 series 等长的列表，缺失值为 None
+    """
+    if len(series) == 0:
+        return []
+
+    dtype = series.dtype
+
+    # 1. 日期时间列：整体格式化
+    if ptypes.is_datetime64_any_dtype(dtype):
+        mask = series.isna().to_numpy()
+        values = series.dt.strftime(DATETIME_FORMAT).to_numpy(dtype=object)
+        if mask.any():
+            values[mask] = None
+        return values.tolist()
+
+    # 2. 布尔列
+    if ptypes.is_bool_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return series.to_numpy().tolist()
+
+    # 3. 数值列（numpy 原生 dtype，tolist 直接得到 int/float）
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        return series.to_numpy().tolist()
+
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        values = series.to_numpy(dtype=np.float64)
+        if decimals is not None:
+            values = np.round(values, decimals)
+        mask = np.isnan(values)
+        if not mask.any():
+            return values.tolist()
+        out = np.array(values.tolist(), dtype=object)
+        out[mask] = None
+        return out.tolist()
+
+    # 4. 扩展类型（Int64/Float64/string 等）：统一转 object 后替换缺失值
+    mask = series.isna().to_numpy()
+    values = series.to_numpy(dtype=object)
+    if mask.any():
+        values = values.copy()
+        values[mask] = None
+
+    if ptypes.is_numeric_dtype(dtype) and decimals is not None:
+        return [None if v is None else round(float(v), decimals) for v in values]
+
+    # 纯字符串列直接返回，混合 object 列才逐个转换
+    if isinstance(dtype, pd.StringDtype):
+        return values.tolist()
+
+    return [_object_to_native(v) for v in values]
+
+
+def build_records(df: pd.DataFrame,
+                  columns: List[str],
+                  decimals: Optional[Dict[str, int]] = None) -> List[Tuple]:
+    """
+    按指定字段顺序构建 executemany 记录
+
+    Args:
+        df: 已预处理的数据
+        columns: 插入字段顺序，df 中不存在的字段填 None
+        decimals: {字段名: 小数位数}，用于浮点字段取整
+
+    Returns:
+        记录元组列表
+    """
+    n_rows = len(df)
+    if n_rows == 0 or not columns:
+        return []
+
+    decimals = decimals or {}
+    column_lists = []
+    for col in columns:
+        if col in df.columns:
+            column_lists.append(column_to_list(df[col], decimals.get(col)))
+        else:
+            column_lists.append([None] * n_rows)
+
+    return list(zip(*column_lists))
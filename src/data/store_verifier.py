@@ -0,0 +1,152 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/data\store_verifier.py
+# File Name: store_verifier
+# @ Author: mango-gh22
+# @ Date：2026/10/17 13:02
+"""
+desc 存储校验策略 - 将写入后的 COUNT(*) 校验移出热路径
+"""
+
+# src/data/store_verifier.py
+"""
+存储校验策略
+
+原先每次 store_daily_data 提交后都执行一次
+SELECT COUNT(*) FROM t WHERE symbol = %s，分区表上每只股票多一次扫描。
+校验模式：
+- always:   每次写入后立即校验（原行为）
+- sampled:  每 N 次写入校验一次
+- deferred: 只记录涉及的股票，批次结束时一条 GROUP BY 查询统一核对
+- off:      不校验
+
+存储器默认 sampled。批量入口（bulk_store_daily_data、batch_store_daily_data、
+DataPipeline.batch_process_stocks）在 batch() 范围内写入，sampled 模式下改为 deferred，
+批次结束统一核对；单次写入没有核对时机，不记录待核对股票。
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+VERIFY_MODES = ('always', 'sampled', 'deferred', 'off')
+
+
+class StoreVerifier:
+    """存储校验器"""
+
+    def __init__(self, mode: str = 'sampled', sample_every: int = 100, chunk_size: int = 500):
+        """
+        Args:
+            mode: 校验模式，见 VERIFY_MODES
+            sample_every: sampled 模式下每 N 次写入校验一次
+            chunk_size: deferred 核对时每条 IN (...) 查询的股票数
+        """
+        if mode not in VERIFY_MODES:
+            raise ValueError(f"不支持的校验模式: {mode}，可选: {VERIFY_MODES}")
+
+        self.mode = mode
+        self.sample_every = max(1, int(sample_every))
+        self.chunk_size = chunk_size
+        self._counter = 0
+        self._batches = 0
+        self._touched: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def effective_mode(self) -> str:
+        """当前生效的模式：sampled 模式在批次范围内按 deferred 处理"""
+        if self.mode == 'sampled' and self._batches:
+            return 'deferred'
+        return self.mode
+
+    @contextmanager
+    def batch(self):
+        """
+        批量入口的写入范围，可嵌套、可跨线程共享
+
+        范围内 sampled 模式的写入只记录股票，由批量入口在结束时调用 reconcile 核对。
+        """
+        with self._lock:
+            self._batches += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batches -= 1
+
+    def should_verify_now(self) -> bool:
+        """本次写入后是否立即校验"""
+        mode = self.effective_mode
+        if mode == 'always':
+            return True
+        if mode != 'sampled':
+            return False
+
+        with self._lock:
+            self._counter += 1
+            return (self._counter - 1) % self.sample_every == 0
+
+    def record(self, table_name: str, symbols):
+        """记录写入涉及的股票（仅 deferred 模式或 sampled 模式的批次内生效）"""
+        if self.effective_mode != 'deferred':
+            return
+
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        with self._lock:
+            self._touched.setdefault(table_name, set()).update(s for s in symbols if s)
+
+    def pending_symbols(self, table_name: Optional[str] = None) -> List[str]:
+        """待核对的股票"""
+        with self._lock:
+            if table_name is not None:
+                return sorted(self._touched.get(table_name, ()))
+            return sorted(set().union(*self._touched.values())) if self._touched else []
+
+    def reconcile(self, db_connector, table_name: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        批次结束时统一核对记录数
+
+        Args:
+            db_connector: DatabaseConnector 实例
+            table_name: 只核对指定表，None 表示全部
+
+        Returns:
+            {表名: {股票代码: 记录数}}，未写入任何记录的股票计数为 0
+        """
+        with self._lock:
+            if table_name is not None:
+                pending = {table_name: self._touched.pop(table_name, set())}
+            else:
+                pending, self._touched = self._touched, {}
+
+        results: Dict[str, Dict[str, int]] = {}
+        for table, symbols in pending.items():
+            if not symbols:
+                continue
+            counts = self.count_symbols(db_connector, table, sorted(symbols))
+            results[table] = counts
+            logger.info(f"✅ 批次核对: {table} {len(counts)} 只股票，共 {sum(counts.values())} 条记录")
+
+        return results
+
+    def count_symbols(self, db_connector, table_name: str, symbols: List[str]) -> Dict[str, int]:
+        """按 IN (...) 分块查询多只股票的记录数"""
+        counts = {symbol: 0 for symbol in symbols}
+        with db_connector.get_connection() as conn:
+            with conn.cursor() as cursor:
+                for start in range(0, len(symbols), self.chunk_size):
+                    chunk = symbols[start:start + self.chunk_size]
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    cursor.execute(
+                        f"SELECT symbol, COUNT(*) FROM `{table_name}` "
+                        f"WHERE symbol IN ({placeholders}) GROUP BY symbol",
+                        tuple(chunk)
+                    )
+                    for symbol, count in cursor.fetchall():
+                        counts[symbol] = int(count)
+        return counts
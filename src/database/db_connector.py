@@ -19,6 +19,9 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# 执行后需要刷新表结构缓存的语句
+DDL_KEYWORDS = {'ALTER', 'CREATE', 'DROP', 'RENAME'}
+
 
 class DatabaseConnector:
     """数据库连接器类 - 增强版"""
@@ -282,6 +285,27 @@ class DatabaseConnector:
             # 重试机制
             return self._retry_get_connection(e, autocommit)
 
+    def get_bulk_connection(self):
+        """
+        获取允许 LOAD DATA LOCAL INFILE 的独立连接（不走连接池）
+
+        连接池中的连接未开启 allow_local_infile，批量导入需单独建立连接，
+        使用完毕由调用方关闭。
+
+        Returns:
+            mysql.connector.connection.MySQLConnection
+        """
+        return mysql.connector.connect(
+            host=self.config['host'],
+            port=self.config['port'],
+            user=self.config['user'],
+            password=self.config.get('password', ''),
+            database=self.config.get('database', ''),
+            charset=self.config.get('charset', 'utf8mb4'),
+            autocommit=False,
+            allow_local_infile=True,
+        )
+
     def _retry_get_connection(self, initial_error, autocommit):
         """重试获取连接"""
         max_attempts = 3
@@ -453,6 +477,13 @@ class DatabaseConnector:
                 affected_rows = cursor.rowcount
                 connection.commit()
                 logger.debug(f"查询执行成功，影响{affected_rows}行")
+                if query.lstrip().split(None, 1)[0].upper() in DDL_KEYWORDS:
+                    # 延迟导入：query_engine 以 database.db_connector 加载本模块（sys.path 只有 src/）
+                    try:
+                        from src.database.schema_registry import invalidate_schema
+                    except ImportError:
+                        from database.schema_registry import invalidate_schema
+                    invalidate_schema()
                 return affected_rows
 
         except Error as e:
@@ -0,0 +1,194 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/database\schema_registry.py
+# File Name: schema_registry
+# @ Author: mango-gh22
+# @ Date：2026/10/17 11:20
+"""
+desc 表结构注册表 - 进程级缓存 DESCRIBE 结果
+"""
+
+# src/database/schema_registry.py
+"""
+表结构注册表
+
+存储层每次 store_daily_data 都要 DESCRIBE 一次目标表，5000 只股票的导入
+就多出 5000+ 次往返。注册表在首次使用时用一条 INFORMATION_SCHEMA 查询
+加载当前库所有表的字段，之后按 TTL 过期单表刷新；执行 DDL 后调用
+invalidate() 显式失效。
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEMA_TTL = 600  # 秒
+
+_COLUMNS_SQL = """
+    SELECT TABLE_NAME AS table_name, COLUMN_NAME AS field, COLUMN_TYPE AS type,
+           COLUMN_KEY AS `key`, EXTRA AS extra, IS_NULLABLE AS nullable
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+
+class SchemaRegistry:
+    """表结构注册表（线程安全）"""
+
+    def __init__(self, db_connector, ttl: float = DEFAULT_SCHEMA_TTL):
+        """
+        Args:
+            db_connector: DatabaseConnector 实例
+            ttl: 表结构缓存有效期（秒）
+        """
+        self.db_connector = db_connector
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._tables: Dict[str, List[Dict[str, Any]]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._preloaded = False
+        self.stats = {'hits': 0, 'misses': 0, 'queries': 0, 'invalidations': 0}
+
+    def preload(self) -> int:
+        """一次查询加载当前库全部表结构，返回表数量"""
+        rows = self._query(_COLUMNS_SQL + " ORDER BY TABLE_NAME, ORDINAL_POSITION")
+
+        tables: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            tables.setdefault(row['table_name'], []).append(self._normalize_row(row))
+
+        now = time.time()
+        with self._lock:
+            self._tables = tables
+            self._loaded_at = {name: now for name in tables}
+            self._preloaded = True
+
+        logger.info(f"表结构注册表预加载完成: {len(tables)} 张表")
+        return len(tables)
+
+    def get_column_info(self, table_name: str) -> List[Dict[str, Any]]:
+        """
+        获取表字段信息（按定义顺序）
+
+        Returns:
+            [{'field', 'type', 'key', 'extra', 'nullable'}, ...]
+
+        Raises:
+            ValueError: 表不存在
+        """
+        with self._lock:
+            if not self._preloaded:
+                try:
+                    self.preload()
+                except Exception as e:
+                    logger.warning(f"表结构预加载失败，改为单表加载: {e}")
+                    self._preloaded = True
+
+            loaded_at = self._loaded_at.get(table_name)
+            if loaded_at is not None and time.time() - loaded_at < self.ttl:
+                self.stats['hits'] += 1
+                return self._tables[table_name]
+
+            self.stats['misses'] += 1
+
+        columns = self._load_table(table_name)
+        if not columns:
+            raise ValueError(f"表不存在或无字段: {table_name}")
+
+        with self._lock:
+            self._tables[table_name] = columns
+            self._loaded_at[table_name] = time.time()
+        return columns
+
+    def get_columns(self, table_name: str) -> List[str]:
+        """获取表字段名列表（按定义顺序）"""
+        return [col['field'] for col in self.get_column_info(table_name)]
+
+    def get_insertable_columns(self, table_name: str) -> List[str]:
+        """获取可插入字段（排除自增主键）"""
+        return [
+            col['field'] for col in self.get_column_info(table_name)
+            if not (col['key'] == 'PRI' and 'auto_increment' in col['extra'].lower())
+        ]
+
+    def invalidate(self, table_name: Optional[str] = None):
+        """
+        使缓存失效（DDL 之后调用）
+
+        Args:
+            table_name: 表名，None 表示全部失效并在下次访问时重新预加载
+        """
+        with self._lock:
+            self.stats['invalidations'] += 1
+            if table_name is None:
+                self._tables.clear()
+                self._loaded_at.clear()
+                self._preloaded = False
+            else:
+                self._tables.pop(table_name, None)
+                self._loaded_at.pop(table_name, None)
+        logger.debug(f"表结构缓存失效: {table_name or '全部'}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取注册表统计"""
+        with self._lock:
+            return {**self.stats, 'tables': len(self._tables), 'ttl': self.ttl}
+
+    def _load_table(self, table_name: str) -> List[Dict[str, Any]]:
+        rows = self._query(_COLUMNS_SQL + " AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION", (table_name,))
+        return [self._normalize_row(row) for row in rows]
+
+    def _query(self, sql: str, params: tuple = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.stats['queries'] += 1
+        with self.db_connector.get_connection() as conn:
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute(sql, params or ())
+                return cursor.fetchall()
+
+    @staticmethod
+    def _normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        def _text(value):
+            if isinstance(value, (bytes, bytearray)):
+                return value.decode('utf-8')
+            return value or ''
+
+        return {
+            'field': _text(row['field']),
+            'type': _text(row['type']),
+            'key': _text(row['key']),
+            'extra': _text(row['extra']),
+            'nullable': _text(row['nullable']) == 'YES',
+        }
+
+
+_registries: Dict[Tuple, SchemaRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_schema_registry(db_connector, ttl: float = DEFAULT_SCHEMA_TTL) -> SchemaRegistry:
+    """
+    获取进程级表结构注册表（按 host/port/database 共享）
+
+    Args:
+        db_connector: DatabaseConnector 实例
+        ttl: 首次创建时使用的 TTL
+    """
+    config = db_connector.config
+    key = (config.get('host'), config.get('port'), config.get('database'))
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = SchemaRegistry(db_connector, ttl)
+            _registries[key] = registry
+        return registry
+
+
+def invalidate_schema(table_name: Optional[str] = None):
+    """使所有注册表中的表结构缓存失效"""
+    with _registries_lock:
+        registries = list(_registries.values())
+    for registry in registries:
+        registry.invalidate(table_name)
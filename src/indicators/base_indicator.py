@@ -15,7 +15,9 @@ Desc: 基础指标类 - 增强版
 """
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
 import pandas as pd
 import logging
 
@@ -136,6 +138,96 @@ class BaseIndicator(ABC):
 
         return df_processed
 
+    # ------------------------------------------------------------------
+    # 增量计算协议
+    #
+    # 支持增量计算的指标从完整历史中提取最小状态（init_state），
+    # 之后只需新到达的 bar 即可推进（update），无需重算全部历史。
+    # 默认实现为"窗口回放"：状态保存最近 lookback 行输入，
+    # update 时在 尾部窗口 + 新数据 上调用 calculate 并只取新行，
+    # 适用于只依赖有限窗口的指标；递推类指标（EMA、OBV、SAR 等）覆盖 update。
+    # 状态必须可 JSON 序列化。
+    # ------------------------------------------------------------------
+
+    def get_incremental_lookback(self) -> Optional[int]:
+        """增量计算需要保留的历史行数，None 表示不支持增量计算（子类可以覆盖）"""
+        return None
+
+    @property
+    def supports_incremental(self) -> bool:
+        return self.get_incremental_lookback() is not None
+
+    def get_state_key(self) -> str:
+        """状态键：指标名 + 参数摘要（同一股票不同参数的状态互不影响）"""
+        params = json.dumps(self.parameters, sort_keys=True, default=str)
+        return f"{self.name}:{hashlib.md5(params.encode()).hexdigest()[:12]}"
+
+    def init_state(self, df: pd.DataFrame) -> Optional[Dict]:
+        """
+        从完整历史构建增量状态
+
+        Args:
+            df: 全部历史数据（时间升序）
+
+        Returns:
+            状态字典；不支持增量或历史不足 lookback 行时返回 None（调用方应全量计算）
+        """
+        lookback = self.get_incremental_lookback()
+        if lookback is None or len(df) < lookback:
+            return None
+
+        prepared = self.prepare_data(df)
+        state = {'bars': len(prepared), 'tail': self._tail_state(prepared, lookback)}
+        state.update(self._init_recursive_state(prepared))
+        return state
+
+    def update(self, state: Dict, new_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+        """
+        用新到达的 bar 推进指标
+
+        Args:
+            state: init_state/update 返回的状态
+            new_df: 新数据（时间升序，只包含上次状态之后的 bar）
+
+        Returns:
+            (新 bar 的指标结果, 新状态)
+        """
+        if not self.supports_incremental:
+            raise NotImplementedError(f"指标 {self.name} 不支持增量计算")
+        if new_df.empty:
+            return new_df.copy(), state
+
+        combined = self._combine_with_tail(state, new_df)
+        result = self.calculate(combined).iloc[-len(new_df):]
+        result.index = new_df.index
+        return result, self._advance_state(state, combined)
+
+    def _init_recursive_state(self, prepared: pd.DataFrame) -> Dict:
+        """递推类指标的额外状态（子类可以覆盖）"""
+        return {}
+
+    def _tail_state(self, df: pd.DataFrame, lookback: int) -> Dict[str, List]:
+        """最近 lookback 行的输入列（列表形式，便于 JSON 持久化）"""
+        columns = [col for col in self.get_required_columns() if col in df.columns]
+        tail = df[columns].tail(lookback)
+        return {col: tail[col].astype(float).tolist() for col in columns}
+
+    def _combine_with_tail(self, state: Dict, new_df: pd.DataFrame) -> pd.DataFrame:
+        """状态中的尾部窗口与新数据拼接"""
+        new_prepared = self.prepare_data(new_df)
+        tail = pd.DataFrame(state['tail'])
+        columns = list(tail.columns)
+        return pd.concat([tail, new_prepared[columns]], ignore_index=True)
+
+    def _advance_state(self, state: Dict, combined: pd.DataFrame, **recursive) -> Dict:
+        """推进后的新状态"""
+        new_rows = len(combined) - len(next(iter(state['tail'].values()), []))
+        new_state = dict(state)
+        new_state['bars'] = state['bars'] + new_rows
+        new_state['tail'] = self._tail_state(combined, self.get_incremental_lookback())
+        new_state.update(recursive)
+        return new_state
+
     def validate_parameters(self) -> bool:
         """验证参数有效性（子类可以覆盖）"""
         return True
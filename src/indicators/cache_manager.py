@@ -7,96 +7,194 @@
 desc 完善缓存管理系统
 File: src/indicators/cache_manager.py
 Desc: 指标缓存管理器 - 支持磁盘缓存、内存缓存和过期策略
+磁盘缓存为列式分区文件（Feather/Parquet）+ SQLite 索引，见 cache_store.py
+
+按日期范围缓存：
+    带日期（trade_date 列或 DatetimeIndex）的结果以 (股票, 指标, 参数) 为键保存为一个日期段，
+    请求的范围落在段内时直接切片返回；段的末尾可以用增量状态追加新 bar（见 get_segment/extend）。
+    不带日期的结果仍按完整的 (股票, 指标, 参数, 开始, 结束) 精确匹配。
 """
-import os
 import json
-import pickle
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import logging
 from pathlib import Path
 
+from src.data.change_events import symbol_key
+from .cache_store import ColumnarResultStore
+from .memory_tier import LRUMemoryTier
+
 logger = logging.getLogger(__name__)
 
+# 未指定开始/结束日期时的范围边界（ISO 日期字符串可直接比较）
+OPEN_START = '0000-01-01'
+OPEN_END = '9999-12-31'
+
+
+def normalize_date(value, default: str) -> str:
+    """日期统一为 YYYY-MM-DD 字符串"""
+    if value is None or value == '':
+        return default
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def trade_dates(data: pd.DataFrame) -> Optional[pd.Series]:
+    """结果中的交易日期（trade_date 列或 DatetimeIndex），没有日期时返回 None"""
+    if 'trade_date' in data.columns:
+        return pd.to_datetime(data['trade_date'])
+    if isinstance(data.index, pd.DatetimeIndex):
+        return pd.Series(data.index, index=data.index)
+    return None
+
+
+def slice_by_date(data: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+    """按日期范围切片（保持原有行顺序；非日期索引重新编号，与直接查询的结果一致）"""
+    dates = trade_dates(data)
+    mask = ((dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))).to_numpy()
+    sliced = data[mask]
+    if not isinstance(data.index, pd.DatetimeIndex):
+        sliced = sliced.reset_index(drop=True)
+    return sliced
+
 
 class IndicatorCacheManager:
     """指标缓存管理器"""
 
-    def __init__(self, cache_dir: str = "data/cache/indicators"):
+    def __init__(self, cache_dir: str = "data/cache/indicators", file_format: str = 'feather',
+                 memory_max_bytes: int = 256 * 1024 * 1024, memory_stripes: int = 16):
         """
         初始化缓存管理器
 
         Args:
             cache_dir: 缓存目录路径
+            file_format: 磁盘缓存格式，'feather'（内存映射读取）或 'parquet'
+            memory_max_bytes: 内存层字节上限
+            memory_stripes: 内存层分段锁数量
         """
         self.cache_dir = Path(cache_dir)
-        self.memory_cache: Dict[str, Any] = {}
-        self.cache_metadata: Dict[str, Dict] = {}
 
-        # 确保缓存目录存在
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # 内存层：按字节限额的分段锁 LRU，元数据为 {'start_date', 'end_date', 'state', 'symbol', 'created_at'}
+        self.memory_cache = LRUMemoryTier(max_bytes=memory_max_bytes, max_items=1000,
+                                          ttl=3600, stripes=memory_stripes)
+
+        # 磁盘缓存：列式分区文件 + SQLite 索引
+        self.store = ColumnarResultStore(cache_dir, file_format)
+
+        # 缓存配置：数据入库后由数据变更事件失效（见 invalidate），TTL 只作兜底
+        self.disk_ttl = 7 * 86400  # 磁盘缓存7天，与数据变更日志的保留天数一致
+
+    @property
+    def memory_ttl(self) -> float:
+        """内存缓存生存时间（秒，默认1小时）"""
+        return self.memory_cache.ttl
 
-        # 缓存配置
-        self.memory_ttl = 3600  # 内存缓存1小时
-        self.disk_ttl = 86400  # 磁盘缓存24小时
-        self.max_memory_items = 1000  # 最大内存缓存项数
+    @memory_ttl.setter
+    def memory_ttl(self, value: float):
+        self.memory_cache.ttl = value
 
-        # 加载缓存元数据
-        self._load_metadata()
+    @property
+    def max_memory_items(self) -> int:
+        """最大内存缓存项数"""
+        return self.memory_cache.max_items
+
+    @max_memory_items.setter
+    def max_memory_items(self, value: int):
+        self.memory_cache.max_items = value
 
     def _get_cache_key(self, symbol: str, indicator_name: str,
                        parameters: Dict, start_date: str, end_date: str) -> str:
-        """生成缓存键"""
-        cache_str = f"{symbol}_{indicator_name}_{json.dumps(parameters, sort_keys=True)}_\
+        """生成缓存键（精确范围，用于不带日期的结果；股票代码统一写法，与数据变更事件一致）"""
+        cache_str = f"{symbol_key(symbol)}_{indicator_name}_{json.dumps(parameters, sort_keys=True)}_\
                      {start_date}_{end_date}"
         return hashlib.md5(cache_str.encode()).hexdigest()
 
-    def _get_cache_path(self, cache_key: str) -> Path:
-        """获取缓存文件路径"""
-        return self.cache_dir / f"{cache_key}.pkl"
-
-    def _get_metadata_path(self) -> Path:
-        """获取元数据文件路径"""
-        return self.cache_dir / "metadata.json"
-
-    def _load_metadata(self):
-        """加载缓存元数据"""
-        metadata_path = self._get_metadata_path()
-        if metadata_path.exists():
-            try:
-                with open(metadata_path, 'r') as f:
-                    self.cache_metadata = json.load(f)
-            except Exception as e:
-                logger.warning(f"加载缓存元数据失败: {e}")
-                self.cache_metadata = {}
-
-    def _save_metadata(self):
-        """保存缓存元数据"""
-        try:
-            with open(self._get_metadata_path(), 'w') as f:
-                json.dump(self.cache_metadata, f, indent=2)
-        except Exception as e:
-            logger.error(f"保存缓存元数据失败: {e}")
+    def _get_segment_key(self, symbol: str, indicator_name: str, parameters: Dict) -> str:
+        """生成日期段缓存键（与日期范围无关）"""
+        cache_str = f"segment_{symbol_key(symbol)}_{indicator_name}_{json.dumps(parameters, sort_keys=True)}"
+        return hashlib.md5(cache_str.encode()).hexdigest()
 
-    def _is_cache_valid(self, cache_key: str, cache_type: str = 'disk') -> bool:
-        """检查缓存是否有效"""
-        if cache_key not in self.cache_metadata:
-            return False
+    def _is_expired(self, created_at: datetime, ttl: int) -> bool:
+        return datetime.now() - created_at > timedelta(seconds=ttl)
 
-        metadata = self.cache_metadata[cache_key]
-        created_at = datetime.fromisoformat(metadata['created_at'])
+    # ------------------------------------------------------------------
+    # 内存层 / 磁盘层
+    # ------------------------------------------------------------------
 
-        # 检查过期时间
-        ttl = self.memory_ttl if cache_type == 'memory' else self.disk_ttl
-        if datetime.now() - created_at > timedelta(seconds=ttl):
-            return False
+    def _lookup(self, cache_key: str, columns: Optional[List[str]] = None,
+                accept=None) -> Optional[Tuple[pd.DataFrame, Dict]]:
+        """
+        查找缓存项（先内存后磁盘）
+
+        Args:
+            cache_key: 缓存键
+            columns: 只读取的列（None 表示全部）
+            accept: 元数据判断函数，返回 False 时不读取数据
+
+        Returns:
+            (数据, 元数据) 或 None
+        """
+        hit = self.memory_cache.get(cache_key)
+        if hit is not None:
+            data, meta = hit
+            if accept is not None and not accept(meta):
+                return None
+            logger.debug(f"从内存缓存获取: {cache_key}")
+            return (data if columns is None else data[[c for c in columns if c in data.columns]]), meta
+
+        entry = self.store.get_entry(cache_key)
+        if entry is None:
+            return None
+        if self._is_expired(datetime.fromisoformat(entry['created_at']), self.disk_ttl):
+            self.store.delete(cache_key)
+            return None
+
+        meta = {'start_date': entry['start_date'], 'end_date': entry['end_date'], 'state': entry['state'],
+                'symbol': entry['symbol'], 'created_at': entry['created_at']}
+        if accept is not None and not accept(meta):
+            return None
+
+        data = self.store.read(cache_key, columns)
+        if data is None:
+            return None
+
+        # 完整读取的结果放入内存缓存
+        if columns is None:
+            self.memory_cache.put(cache_key, data, meta)
+        logger.debug(f"从磁盘缓存获取: {cache_key}")
+        return data, meta
+
+    def _get_disk_meta(self, cache_key: str) -> Optional[Dict]:
+        """磁盘索引中的覆盖范围（不读取数据）"""
+        entry = self.store.get_entry(cache_key)
+        if entry is None or self._is_expired(datetime.fromisoformat(entry['created_at']), self.disk_ttl):
+            return None
+        return {'start_date': entry['start_date'], 'end_date': entry['end_date']}
+
+    def _write(self, cache_key: str, symbol: str, indicator_name: str, parameters: Dict,
+               start_date: str, end_date: str, data: pd.DataFrame, state: Optional[Dict] = None):
+        symbol = symbol_key(symbol)
+
+        # 1. 设置内存缓存
+        self.memory_cache.put(cache_key, data, {'start_date': start_date, 'end_date': end_date, 'state': state,
+                                                'symbol': symbol, 'created_at': datetime.now().isoformat()})
+
+        # 2. 设置磁盘缓存（只写入一行索引）
+        try:
+            entry = self.store.write(cache_key, symbol, indicator_name, parameters,
+                                     start_date, end_date, data, state)
+            logger.debug(f"设置缓存: {cache_key}, 形状: {data.shape}, 格式: {entry['format']}")
+        except Exception as e:
+            logger.error(f"设置磁盘缓存失败: {e}")
 
-        return True
+    # ------------------------------------------------------------------
+    # 读写接口
+    # ------------------------------------------------------------------
 
     def get(self, symbol: str, indicator_name: str,
-            parameters: Dict, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+            parameters: Dict, start_date: str, end_date: str,
+            columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
         """
         获取缓存数据
 
@@ -106,36 +204,47 @@ class IndicatorCacheManager:
             parameters: 指标参数
             start_date: 开始日期
             end_date: 结束日期
+            columns: 只读取的列（None 表示全部）；磁盘缓存按列投影读取
 
         Returns:
-            缓存的数据或None
+            缓存的数据或None；已缓存的日期段覆盖请求范围时返回其中的切片
         """
-        cache_key = self._get_cache_key(symbol, indicator_name,
-                                        parameters, start_date, end_date)
-
-        # 1. 检查内存缓存
-        if cache_key in self.memory_cache and self._is_cache_valid(cache_key, 'memory'):
-            logger.debug(f"从内存缓存获取: {cache_key}")
-            return self.memory_cache[cache_key]
-
-        # 2. 检查磁盘缓存
-        cache_path = self._get_cache_path(cache_key)
-        if cache_path.exists() and self._is_cache_valid(cache_key, 'disk'):
-            try:
-                with open(cache_path, 'rb') as f:
-                    data = pickle.load(f)
-
-                # 放入内存缓存
-                self.memory_cache[cache_key] = data
-                logger.debug(f"从磁盘缓存获取: {cache_key}")
-                return data
-            except Exception as e:
-                logger.warning(f"读取磁盘缓存失败: {e}")
+        start, end = normalize_date(start_date, OPEN_START), normalize_date(end_date, OPEN_END)
+
+        # 1. 覆盖请求范围的日期段
+        segment_key = self._get_segment_key(symbol, indicator_name, parameters)
+        read_columns = None if columns is None else list(dict.fromkeys(columns + ['trade_date']))
+        found = self._lookup(segment_key, read_columns,
+                             accept=lambda meta: meta['start_date'] <= start and meta['end_date'] >= end)
+        if found is not None:
+            sliced = slice_by_date(found[0], start, end)
+            if columns is not None:
+                sliced = sliced[[c for c in columns if c in sliced.columns]]
+            return sliced
+
+        # 2. 精确范围匹配（不带日期的结果）
+        cache_key = self._get_cache_key(symbol, indicator_name, parameters, start_date, end_date)
+        found = self._lookup(cache_key, columns)
+        return None if found is None else found[0]
+
+    def get_segment(self, symbol: str, indicator_name: str, parameters: Dict) -> Optional[Dict]:
+        """
+        获取已缓存的日期段
 
-        return None
+        Returns:
+            {'data', 'start_date', 'end_date', 'state'} 或 None；
+            state 为段末尾的增量状态，可用 BaseIndicator.update 在段后追加新 bar
+        """
+        found = self._lookup(self._get_segment_key(symbol, indicator_name, parameters))
+        if found is None:
+            return None
+        data, meta = found
+        return {'data': data, 'start_date': meta['start_date'],
+                'end_date': meta['end_date'], 'state': meta['state']}
 
     def set(self, symbol: str, indicator_name: str, parameters: Dict,
-            start_date: str, end_date: str, data: pd.DataFrame):
+            start_date: str, end_date: str, data: pd.DataFrame,
+            state: Optional[Dict] = None):
         """
         设置缓存数据
 
@@ -143,46 +252,26 @@ class IndicatorCacheManager:
             symbol: 股票代码
             indicator_name: 指标名称
             parameters: 指标参数
-            start_date: 开始日期
-            end_date: 结束日期
+            start_date: 开始日期（数据覆盖范围）
+            end_date: 结束日期（数据覆盖范围）
             data: 要缓存的数据
+            state: 数据末尾的增量状态（可选）
         """
-        cache_key = self._get_cache_key(symbol, indicator_name,
-                                        parameters, start_date, end_date)
-
-        # 1. 设置内存缓存
-        self.memory_cache[cache_key] = data
+        if trade_dates(data) is None:
+            cache_key = self._get_cache_key(symbol, indicator_name, parameters, start_date, end_date)
+            self._write(cache_key, symbol, indicator_name, parameters, start_date, end_date, data, state)
+            return
 
-        # 管理内存缓存大小
-        if len(self.memory_cache) > self.max_memory_items:
-            # 移除最早的缓存项
-            keys = list(self.memory_cache.keys())
-            for key in keys[:100]:  # 一次移除100个
-                self.memory_cache.pop(key, None)
+        start, end = normalize_date(start_date, OPEN_START), normalize_date(end_date, OPEN_END)
+        segment_key = self._get_segment_key(symbol, indicator_name, parameters)
 
-        # 2. 设置磁盘缓存
-        try:
-            cache_path = self._get_cache_path(cache_key)
-            with open(cache_path, 'wb') as f:
-                pickle.dump(data, f)
-
-            # 更新元数据
-            self.cache_metadata[cache_key] = {
-                'symbol': symbol,
-                'indicator': indicator_name,
-                'parameters': parameters,
-                'start_date': start_date,
-                'end_date': end_date,
-                'created_at': datetime.now().isoformat(),
-                'data_shape': data.shape,
-                'data_columns': list(data.columns)
-            }
-
-            self._save_metadata()
-            logger.debug(f"设置缓存: {cache_key}, 形状: {data.shape}")
+        # 已有更大的日期段时不覆盖
+        meta = self._get_disk_meta(segment_key)
+        if meta is not None and meta['start_date'] <= start and meta['end_date'] >= end:
+            logger.debug(f"缓存段已覆盖 {start} - {end}: {segment_key}")
+            return
 
-        except Exception as e:
-            logger.error(f"设置磁盘缓存失败: {e}")
+        self._write(segment_key, symbol, indicator_name, parameters, start, end, data, state)
 
     def clear(self, cache_type: str = 'all'):
         """
@@ -196,19 +285,15 @@ class IndicatorCacheManager:
             logger.info("清理内存缓存")
 
         if cache_type in ['disk', 'all']:
-            # 删除所有缓存文件
-            for cache_file in self.cache_dir.glob("*.pkl"):
+            self.store.clear()
+
+            # 旧版 pickle 缓存文件和元数据
+            for legacy_file in list(self.cache_dir.glob("*.pkl")) + [self.cache_dir / "metadata.json"]:
                 try:
-                    cache_file.unlink()
+                    legacy_file.unlink(missing_ok=True)
                 except Exception as e:
-                    logger.error(f"删除缓存文件失败 {cache_file}: {e}")
+                    logger.error(f"删除缓存文件失败 {legacy_file}: {e}")
 
-            # 删除元数据
-            metadata_path = self._get_metadata_path()
-            if metadata_path.exists():
-                metadata_path.unlink()
-
-            self.cache_metadata.clear()
             logger.info("清理磁盘缓存")
 
     def get_cache_stats(self) -> Dict:
@@ -218,46 +303,72 @@ class IndicatorCacheManager:
         Returns:
             缓存统计字典
         """
-        memory_count = len(self.memory_cache)
-        disk_count = len(self.cache_metadata)
-
-        # 计算缓存命中率（简化版本）
-        total_hits = sum(meta.get('hits', 0) for meta in self.cache_metadata.values())
+        disk_stats = self.store.stats()
+        memory_stats = self.memory_cache.stats()
 
         return {
-            'memory_cache_items': memory_count,
-            'disk_cache_items': disk_count,
-            'total_hits': total_hits,
+            'memory_cache_items': memory_stats['items'],
+            'memory_bytes': memory_stats['bytes'],
+            'memory_max_bytes': memory_stats['max_bytes'],
+            'memory_hits': memory_stats['hits'],
+            'memory_misses': memory_stats['misses'],
+            'memory_evictions': memory_stats['evictions'],
+            'memory_expirations': memory_stats['expirations'],
+            'memory_hit_rate': memory_stats['hit_rate'],
+            'disk_cache_items': disk_stats['entries'],
+            'total_hits': disk_stats['total_hits'],
+            'disk_bytes': disk_stats['disk_bytes'],
+            'disk_formats': disk_stats['formats'],
             'cache_dir': str(self.cache_dir),
             'memory_ttl': self.memory_ttl,
             'disk_ttl': self.disk_ttl
         }
 
+    def invalidate(self, symbol: str, since_date: Optional[str] = None,
+                   changed_at: Optional[str] = None) -> int:
+        """
+        数据变更后失效缓存
+
+        只删除该股票中结束日期 >= since_date 的缓存项（since_date 之前的结果不受新数据影响）。
+
+        Args:
+            symbol: 股票代码
+            since_date: 变更的最早日期，None 表示全部日期（如复权因子变化）
+            changed_at: 变更时间（ISO 格式），只删除早于该时间创建的缓存项，None 表示不限
+
+        Returns:
+            删除的缓存项数（内存层与磁盘层分别计数）
+        """
+        symbol = symbol_key(symbol)
+        since = None if since_date is None else normalize_date(since_date, OPEN_START)
+
+        def stale(meta: Dict) -> bool:
+            if changed_at is not None and meta.get('created_at', '') >= changed_at:
+                return False
+            return since is None or normalize_date(meta.get('end_date'), OPEN_END) >= since
+
+        removed = self.memory_cache.pop_where(lambda key, meta: meta.get('symbol') == symbol and stale(meta))
+
+        for entry in self.store.entries_for_symbol(symbol):
+            if stale(entry):
+                self.store.delete(entry['cache_key'])
+                removed += 1
+
+        if removed:
+            logger.info(f"数据变更失效缓存: {symbol} {since or '全部'} 之后, {removed} 项")
+        return removed
+
     def cleanup_expired(self):
         """清理过期的缓存"""
-        expired_keys = []
-        current_time = datetime.now()
-
-        for cache_key, metadata in self.cache_metadata.items():
-            created_at = datetime.fromisoformat(metadata['created_at'])
-            if current_time - created_at > timedelta(seconds=self.disk_ttl):
-                expired_keys.append(cache_key)
+        expired_before = (datetime.now() - timedelta(seconds=self.disk_ttl)).isoformat()
+        expired_keys = self.store.keys_created_before(expired_before)
 
         for cache_key in expired_keys:
             # 从内存缓存移除
-            self.memory_cache.pop(cache_key, None)
-
-            # 从磁盘缓存移除
-            cache_path = self._get_cache_path(cache_key)
-            if cache_path.exists():
-                try:
-                    cache_path.unlink()
-                except Exception as e:
-                    logger.error(f"删除过期缓存文件失败 {cache_path}: {e}")
+            self.memory_cache.pop(cache_key)
 
-            # 从元数据移除
-            self.cache_metadata.pop(cache_key, None)
+            # 从磁盘缓存和索引移除
+            self.store.delete(cache_key)
 
         if expired_keys:
-            self._save_metadata()
-            logger.info(f"清理了 {len(expired_keys)} 个过期缓存项")
\ No newline at end of file
+            logger.info(f"清理了 {len(expired_keys)} 个过期缓存项")
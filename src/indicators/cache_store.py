@@ -0,0 +1,304 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/indicators\cache_store.py
+# File Name: cache_store
+# @ Author: mango-gh22
+# @ Date：2026/10/17 19:00
+"""
+desc 指标结果列式存储 - Feather/Parquet 分区文件 + SQLite 索引
+"""
+# src/indicators/cache_store.py
+"""
+指标结果列式存储
+
+目录布局:
+    <cache_dir>/<symbol>/<indicator>/<参数摘要>/<cache_key>.feather
+    <cache_dir>/index.sqlite
+
+- 默认格式为未压缩的 Feather (Arrow IPC)，读取时内存映射，按列投影只读取需要的列；
+  也可选 Parquet（体积更小，读取需要解码）。
+- 未安装 pyarrow 或数据无法转换为 Arrow 时回退为 pickle 文件（同样记录在索引中）。
+- 索引为 SQLite 表，每次写入只插入/更新一行，不再重写整个元数据文件。
+"""
+
+import os
+import json
+import pickle
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    pa = feather = pq = None
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+FILE_SUFFIXES = {'feather': '.feather', 'parquet': '.parquet', 'pickle': '.pkl'}
+
+
+def parameters_digest(parameters: Dict) -> str:
+    """参数摘要（分区目录名）"""
+    return hashlib.md5(json.dumps(parameters, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+class ColumnarResultStore:
+    """指标结果列式存储"""
+
+    INDEX_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache_index (
+            cache_key TEXT PRIMARY KEY,
+            symbol TEXT NOT NULL,
+            indicator TEXT NOT NULL,
+            params_digest TEXT NOT NULL,
+            parameters TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            path TEXT NOT NULL,
+            format TEXT NOT NULL,
+            rows INTEGER,
+            columns TEXT,
+            size_bytes INTEGER,
+            created_at TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            state TEXT
+        )
+    """
+
+    def __init__(self, cache_dir: str = "data/cache/indicators", file_format: str = 'feather'):
+        """
+        初始化列式存储
+
+        Args:
+            cache_dir: 缓存根目录
+            file_format: 'feather' 或 'parquet'，未安装 pyarrow 时自动使用 'pickle'
+        """
+        if file_format not in ('feather', 'parquet'):
+            raise ValueError(f"不支持的缓存格式: {file_format}")
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.file_format = file_format if HAS_PYARROW else 'pickle'
+        if not HAS_PYARROW:
+            logger.info("未安装 pyarrow，指标缓存使用 pickle 格式")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / "index.sqlite"), check_same_thread=False)
+        self._conn.execute(self.INDEX_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache_index)")}
+        if 'state' not in columns:
+            self._conn.execute("ALTER TABLE cache_index ADD COLUMN state TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_symbol ON cache_index (symbol, indicator)")
+        self._conn.commit()
+
+    def _partition_dir(self, symbol: str, indicator: str, digest: str) -> Path:
+        return self.cache_dir / symbol / indicator / digest
+
+    # ------------------------------------------------------------------
+    # 序列化
+    # ------------------------------------------------------------------
+
+    def _write_file(self, data: pd.DataFrame, partition: Path, cache_key: str) -> Tuple[Path, str]:
+        """
+        写入数据文件，返回 (路径, 实际格式)
+
+        先写临时文件再替换，读者不会看到写了一半的文件。
+        """
+        file_format = self.file_format
+        if file_format != 'pickle':
+            try:
+                table = pa.Table.from_pandas(data, preserve_index=True)
+                path = partition / f"{cache_key}{FILE_SUFFIXES[file_format]}"
+                tmp_path = path.with_name(path.name + '.tmp')
+                if file_format == 'feather':
+                    # 不压缩才能内存映射零拷贝读取
+                    feather.write_feather(table, str(tmp_path), compression='uncompressed')
+                else:
+                    pq.write_table(table, str(tmp_path))
+                os.replace(tmp_path, path)
+                return path, file_format
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                logger.debug(f"无法转换为 Arrow，回退为 pickle: {e}")
+
+        path = partition / f"{cache_key}{FILE_SUFFIXES['pickle']}"
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path, 'pickle'
+
+    @staticmethod
+    def _projection(schema, columns: List[str]) -> List[str]:
+        """投影列加上 pandas 索引列，以便还原索引"""
+        metadata = schema.pandas_metadata or {}
+        index_columns = [c for c in metadata.get('index_columns', []) if isinstance(c, str)]
+        return index_columns + [c for c in columns if c in schema.names and c not in index_columns]
+
+    def _read_file(self, path: Path, file_format: str, columns: Optional[List[str]]) -> pd.DataFrame:
+        if file_format == 'feather':
+            if columns is None:
+                table = feather.read_table(str(path), memory_map=True)
+            else:
+                with pa.memory_map(str(path)) as source:
+                    schema = pa.ipc.open_file(source).schema
+                table = feather.read_table(str(path), columns=self._projection(schema, columns), memory_map=True)
+            return table.to_pandas()
+
+        if file_format == 'parquet':
+            if columns is not None:
+                columns = self._projection(pq.read_schema(str(path)), columns)
+            return pq.read_table(str(path), columns=columns, memory_map=True).to_pandas()
+
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        if columns is not None:
+            data = data[[c for c in columns if c in data.columns]]
+        return data
+
+    # ------------------------------------------------------------------
+    # 读写接口
+    # ------------------------------------------------------------------
+
+    def get_entry(self, cache_key: str) -> Optional[Dict]:
+        """索引记录"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM cache_index WHERE cache_key = ?", (cache_key,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            names = [d[0] for d in cursor.description]
+        entry = dict(zip(names, row))
+        entry['state'] = json.loads(entry['state']) if entry.get('state') else None
+        return entry
+
+    def read(self, cache_key: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        读取缓存数据
+
+        Args:
+            cache_key: 缓存键
+            columns: 只读取的列（None 表示全部）
+
+        Returns:
+            DataFrame 或 None（不存在或文件损坏）
+        """
+        entry = self.get_entry(cache_key)
+        if entry is None:
+            return None
+
+        path = self.cache_dir / entry['path']
+        try:
+            data = self._read_file(path, entry['format'], columns)
+        except (OSError, ValueError, pickle.UnpicklingError) as e:
+            logger.warning(f"读取缓存文件失败 {path}: {e}")
+            self.delete(cache_key)
+            return None
+
+        with self._lock:
+            self._conn.execute("UPDATE cache_index SET hits = hits + 1 WHERE cache_key = ?", (cache_key,))
+            self._conn.commit()
+        return data
+
+    def write(self, cache_key: str, symbol: str, indicator: str, parameters: Dict,
+              start_date: str, end_date: str, data: pd.DataFrame,
+              state: Optional[Dict] = None) -> Dict:
+        """
+        写入缓存数据并更新索引，返回索引记录
+
+        state 为指标的增量状态（见 BaseIndicator.init_state），随索引一起保存，
+        用于在缓存段末尾追加新 bar。
+        """
+        digest = parameters_digest(parameters)
+        partition = self._partition_dir(symbol, indicator, digest)
+        partition.mkdir(parents=True, exist_ok=True)
+
+        path, file_format = self._write_file(data, partition, cache_key)
+
+        entry = {
+            'cache_key': cache_key,
+            'symbol': symbol,
+            'indicator': indicator,
+            'params_digest': digest,
+            'parameters': json.dumps(parameters, sort_keys=True, default=str),
+            'start_date': start_date,
+            'end_date': end_date,
+            'path': str(path.relative_to(self.cache_dir)),
+            'format': file_format,
+            'rows': len(data),
+            'columns': json.dumps([str(c) for c in data.columns]),
+            'size_bytes': path.stat().st_size,
+            'created_at': datetime.now().isoformat(),
+            'hits': 0,
+            'state': None if state is None else json.dumps(state),
+        }
+
+        with self._lock:
+            old = self._conn.execute("SELECT path FROM cache_index WHERE cache_key = ?", (cache_key,)).fetchone()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO cache_index ({', '.join(entry)}) VALUES ({', '.join('?' * len(entry))})",
+                tuple(entry.values())
+            )
+            self._conn.commit()
+
+        # 格式变化时删除旧文件
+        if old and old[0] != entry['path']:
+            (self.cache_dir / old[0]).unlink(missing_ok=True)
+        return entry
+
+    def delete(self, cache_key: str):
+        """删除一个缓存项"""
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM cache_index WHERE cache_key = ?", (cache_key,)).fetchone()
+            self._conn.execute("DELETE FROM cache_index WHERE cache_key = ?", (cache_key,))
+            self._conn.commit()
+        if row:
+            (self.cache_dir / row[0]).unlink(missing_ok=True)
+
+    def keys_created_before(self, created_before: str) -> List[str]:
+        """创建时间早于指定时间（ISO 格式）的缓存键"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache_key FROM cache_index WHERE created_at < ?", (created_before,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def entries_for_symbol(self, symbol: str) -> List[Dict]:
+        """股票的全部缓存项（cache_key、start_date、end_date、created_at），用于数据变更后失效"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache_key, start_date, end_date, created_at FROM cache_index WHERE symbol = ?",
+                (symbol,)
+            ).fetchall()
+        return [dict(zip(('cache_key', 'start_date', 'end_date', 'created_at'), row)) for row in rows]
+
+    def clear(self):
+        """删除全部缓存文件和索引"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM cache_index").fetchall()
+            self._conn.execute("DELETE FROM cache_index")
+            self._conn.commit()
+        for (path,) in rows:
+            (self.cache_dir / path).unlink(missing_ok=True)
+
+    def stats(self) -> Dict:
+        """索引统计"""
+        with self._lock:
+            count, hits, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(size_bytes), 0) FROM cache_index"
+            ).fetchone()
+            formats = dict(self._conn.execute(
+                "SELECT format, COUNT(*) FROM cache_index GROUP BY format").fetchall())
+        return {'entries': count, 'total_hits': hits, 'disk_bytes': size, 'formats': formats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -10,13 +10,15 @@ Desc: 技术指标管理器 - 重构版
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple, Type, Any
-import hashlib
-import json
-import pickle
 from datetime import datetime, timedelta
 import logging
 
 from src.indicators.base_indicator import BaseIndicator, IndicatorType
+from src.indicators.cache_manager import (
+    IndicatorCacheManager, normalize_date, slice_by_date, trade_dates, OPEN_START, OPEN_END
+)
+from src.indicators.state_store import IndicatorStateStore
+from src.data.change_events import DataChangeEvent, get_data_change_bus
 from src.query.query_engine import QueryEngine
 from src.processors.adjustor import StockAdjustor
 
@@ -80,94 +82,12 @@ class IndicatorFactory:
             raise
 
 
-class IndicatorCacheManager:
-    """指标缓存管理器"""
-
-    def __init__(self, cache_dir: str = "data/cache/indicators"):
-        self.cache_dir = cache_dir
-        self.memory_cache: Dict[str, pd.DataFrame] = {}
-        self.cache_metadata: Dict[str, Dict] = {}
-
-        # 确保缓存目录存在
-        from pathlib import Path
-        Path(cache_dir).mkdir(parents=True, exist_ok=True)
-
-        # 缓存配置
-        self.memory_ttl = 3600  # 内存缓存1小时
-
-    def _get_cache_key(self, symbol: str, indicator_name: str,
-                       parameters: Dict, start_date: str, end_date: str) -> str:
-        """生成缓存键"""
-        cache_str = f"{symbol}_{indicator_name}_{json.dumps(parameters, sort_keys=True)}_\
-                     {start_date}_{end_date}"
-        return hashlib.md5(cache_str.encode()).hexdigest()
-
-    def get(self, symbol: str, indicator_name: str,
-            parameters: Dict, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
-        """
-        获取缓存数据
-
-        Args:
-            symbol: 股票代码
-            indicator_name: 指标名称
-            parameters: 指标参数
-            start_date: 开始日期
-            end_date: 结束日期
-
-        Returns:
-            缓存的数据或None
-        """
-        cache_key = self._get_cache_key(symbol, indicator_name, parameters, start_date, end_date)
-
-        # 检查内存缓存
-        if cache_key in self.memory_cache:
-            logger.debug(f"从内存缓存获取: {cache_key}")
-            return self.memory_cache[cache_key]
-
-        return None
-
-    def set(self, symbol: str, indicator_name: str, parameters: Dict,
-            start_date: str, end_date: str, data: pd.DataFrame):
-        """
-        设置缓存数据
-
-        Args:
-            symbol: 股票代码
-            indicator_name: 指标名称
-            parameters: 指标参数
-            start_date: 开始日期
-            end_date: 结束日期
-            data: 要缓存的数据
-        """
-        cache_key = self._get_cache_key(symbol, indicator_name, parameters, start_date, end_date)
-
-        # 设置内存缓存
-        self.memory_cache[cache_key] = data
-
-        # 管理内存缓存大小
-        if len(self.memory_cache) > 1000:
-            # 移除最早的缓存项
-            keys = list(self.memory_cache.keys())
-            for key in keys[:100]:
-                self.memory_cache.pop(key, None)
-
-        logger.debug(f"设置缓存: {cache_key}, 形状: {data.shape}")
-
-    def clear(self, cache_type: str = 'all'):
-        """
-        清理缓存
-
-        Args:
-            cache_type: 缓存类型，'memory'、'disk' 或 'all'
-        """
-        if cache_type in ['memory', 'all']:
-            self.memory_cache.clear()
-            logger.info("清理内存缓存")
-
-
 class IndicatorManager:
     """技术指标管理器 - 重构版"""
 
+    # query_engine.query_daily_data 的默认返回条数上限
+    DAILY_QUERY_LIMIT = 100
+
     def __init__(self, config_path: str = 'config/database.yaml'):
         """
         初始化指标管理器
@@ -179,6 +99,11 @@ class IndicatorManager:
         self.query_engine = QueryEngine(config_path)
         self.adjustor = StockAdjustor(config_path)
         self.cache_manager = IndicatorCacheManager()
+        self.state_store = IndicatorStateStore()
+
+        # 数据入库后按股票失效缓存和增量状态（回放本进程启动前的变更）
+        self.change_bus = get_data_change_bus()
+        self.change_bus.subscribe(self._on_data_changed, replay=True)
 
         # 指标工厂
         self.indicator_factory = IndicatorFactory()
@@ -186,6 +111,11 @@ class IndicatorManager:
         # 可用指标信息（不存储实例，只存储信息）
         self._init_available_indicators()
 
+    def _on_data_changed(self, event: DataChangeEvent):
+        """数据变更事件：失效该股票 since_date 之后的缓存段和增量状态"""
+        self.cache_manager.invalidate(event.symbol, event.since_date, event.created_at)
+        self.state_store.invalidate(event.symbol, event.since_date, event.created_at)
+
     def _init_available_indicators(self):
         """初始化可用指标信息"""
         self.available_indicators = {
@@ -419,10 +349,14 @@ class IndicatorManager:
                              start_date: str,
                              end_date: str,
                              indicator_params: Optional[Dict[str, Dict]] = None,
-                             use_cache: bool = True) -> Dict[str, pd.DataFrame]:
+                             use_cache: bool = True,
+                             data: Optional[pd.DataFrame] = None) -> Dict[str, pd.DataFrame]:
         """
         为指定股票计算多个指标
 
+        缓存按 (股票, 指标, 参数) 保存日期段：请求范围在段内时直接切片返回，
+        请求结束日期超出段末尾时只为新 bar 推进指标（见 _extend_cached_segment）。
+
         Args:
             symbol: 股票代码
             indicator_names: 指标名称列表
@@ -430,11 +364,13 @@ class IndicatorManager:
             end_date: 结束日期
             indicator_params: 各指标参数，格式：{'indicator_name': {param1: value1, ...}}
             use_cache: 是否使用缓存
+            data: 调用方已查询的日线数据（query_daily_data 的结果），传入时不再查询数据库
 
         Returns:
-            计算结果字典 {指标名: DataFrame}
+            计算结果字典 {指标名: DataFrame}，行按交易日期升序
         """
         logger.info(f"计算指标: {symbol}, 指标: {indicator_names}, 日期: {start_date} - {end_date}")
+        self.change_bus.poll()
 
         # 确保indicator_params是字典类型
         if indicator_params is None or not isinstance(indicator_params, dict):
@@ -445,25 +381,62 @@ class IndicatorManager:
             logger.warning("indicator_params参数接收到布尔值，已重置为空字典")
             indicator_params = {}
 
+        # 先检查缓存，全部命中时不查询数据库
+        results = {}
+        pending = {}
+        for indicator_name in indicator_names:
+            if indicator_name not in self.available_indicators:
+                logger.warning(f"指标 {indicator_name} 不可用")
+                continue
+
+            # 安全获取指标参数
+            params = indicator_params.get(indicator_name, {})
+
+            # 确保params是字典
+            if not isinstance(params, dict):
+                logger.warning(f"指标 {indicator_name} 的参数不是字典类型，已重置为空字典")
+                params = {}
+
+            if use_cache:
+                cached_result = self.cache_manager.get(
+                    symbol, indicator_name, params, start_date, end_date
+                )
+                if cached_result is not None:
+                    results[indicator_name] = cached_result
+                    logger.debug(f"使用缓存结果: {indicator_name}")
+                    continue
+
+            pending[indicator_name] = params
+
+        if not pending:
+            return results
+
         # 获取原始数据
         try:
 
             # 在获取数据后立即预处理
-            df = self.query_engine.query_daily_data(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date
-            )
+            if data is not None:
+                df = data
+            else:
+                df = self.query_engine.query_daily_data(
+                    symbol=symbol,
+                    start_date=start_date,
+                    end_date=end_date
+                )
 
             if df.empty:
                 logger.warning(f"股票 {symbol} 在 {start_date} - {end_date} 期间无数据")
-                return {}
+                return results
 
             logger.info(f"获取到 {len(df)} 条数据")
 
             # 预处理数据：确保没有None值，转换Decimal为float
             df = self._preprocess_data_for_calculation(df)
 
+            # 查询结果按日期倒序返回，指标需要按时间顺序计算
+            if 'trade_date' in df.columns:
+                df = df.sort_values('trade_date').reset_index(drop=True)
+
             # 检查预处理后的数据
             logger.info(f"预处理后数据形状: {df.shape}")
             logger.info(f"预处理后数据类型:\n{df.dtypes}")
@@ -472,47 +445,35 @@ class IndicatorManager:
             logger.error(f"获取或预处理数据失败: {e}")
             import traceback
             logger.error(f"详细错误: {traceback.format_exc()}")
-            return {}
+            return results
 
-        # 计算结果
-        results = {}
-        for indicator_name in indicator_names:
-            if indicator_name not in self.available_indicators:
-                logger.warning(f"指标 {indicator_name} 不可用")
-                continue
+        # 查询被 LIMIT 截断时，缓存只覆盖实际返回的日期
+        coverage_start = start_date
+        if len(df) >= self.DAILY_QUERY_LIMIT and 'trade_date' in df.columns:
+            coverage_start = df['trade_date'].min()
 
+        # 计算结果
+        for indicator_name, params in pending.items():
             try:
-                # 安全获取指标参数
-                params = {}
-                if isinstance(indicator_params, dict):
-                    params = indicator_params.get(indicator_name, {})
-
-                # 确保params是字典
-                if not isinstance(params, dict):
-                    logger.warning(f"指标 {indicator_name} 的参数不是字典类型，已重置为空字典")
-                    params = {}
-
-                # 检查缓存
-                if use_cache:
-                    cached_result = self.cache_manager.get(
-                        symbol, indicator_name, params, start_date, end_date
-                    )
-                    if cached_result is not None:
-                        results[indicator_name] = cached_result
-                        logger.debug(f"使用缓存结果: {indicator_name}")
-                        continue
-
                 # 创建指标实例
                 indicator = self.create_indicator(indicator_name, **params)
 
-                # 计算指标（使用预处理后的数据副本）
-                result_df = indicator.calculate(df.copy())
-
-                # 缓存结果
+                result_df = None
                 if use_cache:
-                    self.cache_manager.set(
-                        symbol, indicator_name, params, start_date, end_date, result_df
-                    )
+                    result_df = self._extend_cached_segment(symbol, indicator, params, df,
+                                                            start_date, end_date)
+
+                if result_df is None:
+                    # 计算指标（使用预处理后的数据副本）
+                    result_df = indicator.calculate(df.copy())
+
+                    # 缓存结果
+                    if use_cache:
+                        self.cache_manager.set(
+                            symbol, indicator_name, params, coverage_start,
+                            self._covered_end(end_date, result_df), result_df,
+                            state=self._segment_state(indicator, result_df)
+                        )
 
                 results[indicator_name] = result_df
                 logger.info(f"完成指标计算: {indicator_name}")
@@ -525,6 +486,74 @@ class IndicatorManager:
 
         return results
 
+    @staticmethod
+    def _covered_end(end_date: str, result_df: pd.DataFrame) -> str:
+        """
+        缓存段的结束日期：请求的结束日期与实际最后一根 bar 中较早的一个
+
+        请求结束于今天或未来时，尚未入库的日期不能算作已覆盖，否则后续请求会从缓存
+        切片返回而缺少新 bar；段末尾停在最后一根 bar，新数据由 _extend_cached_segment 追加。
+        """
+        end = normalize_date(end_date, OPEN_END)
+        dates = trade_dates(result_df)
+        if dates is None or dates.empty or pd.isna(dates.max()):
+            return end
+        return min(end, dates.max().strftime('%Y-%m-%d'))
+
+    @staticmethod
+    def _segment_state(indicator: BaseIndicator, result_df: pd.DataFrame) -> Optional[Dict]:
+        """缓存段末尾的增量状态，不支持增量或无法建立时返回 None"""
+        if not indicator.supports_incremental or 'trade_date' not in result_df.columns:
+            return None
+        try:
+            return indicator.init_state(result_df)
+        except Exception as e:
+            logger.debug(f"建立 {indicator.name} 增量状态失败: {e}")
+            return None
+
+    def _extend_cached_segment(self, symbol: str, indicator: BaseIndicator, params: Dict,
+                               df: pd.DataFrame, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        在已缓存的日期段末尾追加新 bar
+
+        段末尾保存了指标的增量状态（递推值或预热所需的最后 lookback 行输入），
+        新 bar 由 BaseIndicator.update 推进，无需重算整个区间。
+        段内已有行的预热从段的开始日期算起，因此请求范围内前几行可能比从 start_date
+        重新计算的结果预热更充分。
+
+        Returns:
+            请求范围内的结果；缓存段不可用（不存在、不早于请求开始、没有状态或与新数据不衔接）时返回 None
+        """
+        if 'trade_date' not in df.columns:
+            return None
+
+        segment = self.cache_manager.get_segment(symbol, indicator.name, params)
+        start = normalize_date(start_date, OPEN_START)
+        if segment is None or segment['state'] is None or segment['start_date'] > start:
+            return None
+
+        segment_end = pd.Timestamp(segment['end_date'])
+        dates = pd.to_datetime(df['trade_date'])
+        # 查询被截断且没有覆盖段末尾时，中间可能缺少数据
+        if len(df) >= self.DAILY_QUERY_LIMIT and dates.min() > segment_end:
+            return None
+
+        new_df = df[(dates > segment_end).to_numpy()].reset_index(drop=True)
+        data, state = segment['data'], segment['state']
+        if not new_df.empty:
+            new_rows, state = indicator.update(state, new_df)
+            prepared = indicator.prepare_data(new_df)
+            extension = pd.concat(
+                [prepared, new_rows[[c for c in new_rows.columns if c not in prepared.columns]]], axis=1
+            )
+            data = pd.concat([data, extension.reindex(columns=data.columns)], ignore_index=True)
+            logger.info(f"缓存段 {symbol} {indicator.name} 追加 {len(new_df)} 根新 bar")
+
+        end = normalize_date(end_date, OPEN_END)
+        self.cache_manager.set(symbol, indicator.name, params, segment['start_date'],
+                               self._covered_end(end, data), data, state=state)
+        return slice_by_date(data, start, end)
+
     def calculate_single(self, symbol: str,
                          indicator_name: str,
                          start_date: str,
@@ -554,6 +583,136 @@ class IndicatorManager:
 
         return results.get(indicator_name)
 
+    def calculate_for_panel(self, symbols: List[str],
+                            indicator_names: List[str],
+                            start_date: str,
+                            end_date: str,
+                            indicator_params: Optional[Dict[str, Dict]] = None,
+                            panel=None) -> Dict[str, Any]:
+        """
+        面板模式：一次性为多只股票计算多个指标
+
+        数据通过 PanelLoader 批量加载为 日期×股票 矩阵，
+        指标在 (T, N) 数组上整体计算，结果与逐股票调用 calculate_for_symbol 一致。
+
+        Args:
+            symbols: 股票代码列表
+            indicator_names: 指标名称列表
+            start_date: 开始日期
+            end_date: 结束日期
+            indicator_params: 各指标参数，格式同 calculate_for_symbol
+            panel: 已加载的 PricePanel（可选，传入时不再查询数据库）
+
+        Returns:
+            {指标名: PricePanel}，PricePanel.fields 为 {输出列名: (T, N) 矩阵}，
+            可用 symbol_frame(symbol) 取回单只股票的结果
+        """
+        from src.indicators.panel_engine import PanelIndicatorEngine, PANEL_INPUT_FIELDS
+        from src.query.panel_loader import PanelLoader
+
+        if indicator_params is None or not isinstance(indicator_params, dict):
+            indicator_params = {}
+
+        names = [name for name in indicator_names if name in self.available_indicators]
+        for name in set(indicator_names) - set(names):
+            logger.warning(f"指标 {name} 不可用")
+
+        if panel is None:
+            # 单股票模式的行即为该股票自身的交易日，面板以数据日期为行即可
+            loader = PanelLoader(self.query_engine)
+            panel = loader.load(symbols, start_date, end_date,
+                                fields=PANEL_INPUT_FIELDS, use_trade_calendar=False)
+
+        if panel.shape[0] == 0 or panel.shape[1] == 0:
+            logger.warning(f"面板在 {start_date} - {end_date} 期间无数据")
+            return {}
+
+        logger.info(f"面板模式计算指标: {len(panel.symbols)}只股票, 指标: {names}")
+        return PanelIndicatorEngine(panel).calculate_many(names, indicator_params)
+
+    def update_since_last_bar(self, symbol: str,
+                              indicator_names: List[str],
+                              end_date: Optional[str] = None,
+                              indicator_params: Optional[Dict[str, Dict]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        增量模式：只计算上次状态之后的新 bar
+
+        首次调用（或指标不支持增量）时加载全部历史完整计算并保存状态；
+        之后只查询最后状态日期之后的数据，由 BaseIndicator.update 推进。
+        状态按 股票 + 指标 + 参数 持久化在 self.state_store 中。
+
+        Args:
+            symbol: 股票代码
+            indicator_names: 指标名称列表
+            end_date: 截止日期，None 表示最新
+            indicator_params: 各指标参数，格式同 calculate_for_symbol
+
+        Returns:
+            {指标名: 新 bar 的指标结果 DataFrame（以 trade_date 为索引）}，
+            首次计算时为全部历史的结果
+        """
+        if indicator_params is None or not isinstance(indicator_params, dict):
+            indicator_params = {}
+        self.change_bus.poll()
+
+        indicators, saved = {}, {}
+        for name in indicator_names:
+            if name not in self.available_indicators:
+                logger.warning(f"指标 {name} 不可用")
+                continue
+            indicator = self.create_indicator(name, **indicator_params.get(name, {}))
+            indicators[name] = indicator
+            if indicator.supports_incremental:
+                saved[name] = self.state_store.get(symbol, indicator.get_state_key())
+
+        # 所有指标都有状态时只需查询最早状态日期之后的数据
+        if indicators and len(saved) == len(indicators) and all(saved.values()):
+            start_date = min(entry['last_date'] for entry in saved.values())
+        else:
+            start_date = None
+
+        df = self.query_engine.query_daily_data_many(
+            [symbol], start_date, end_date,
+            columns=['open', 'high', 'low', 'close', 'volume']
+        )
+        if df.empty:
+            logger.info(f"股票 {symbol} 没有新数据")
+            return {}
+
+        df = df.rename(columns={'open': 'open_price', 'high': 'high_price',
+                                'low': 'low_price', 'close': 'close_price'})
+        df['trade_date'] = pd.to_datetime(df['trade_date'])
+        df = df.set_index('trade_date').drop(columns=['symbol'], errors='ignore').astype(float)
+        last_date = df.index[-1].strftime('%Y-%m-%d')
+
+        results = {}
+        for name, indicator in indicators.items():
+            try:
+                entry = saved.get(name)
+                if entry:
+                    new_df = df[df.index > pd.Timestamp(entry['last_date'])]
+                    if new_df.empty:
+                        results[name] = new_df
+                        continue
+                    result_df, state = indicator.update(entry['state'], new_df)
+                    logger.info(f"增量更新 {symbol} {name}: {len(new_df)} 根新 bar")
+                else:
+                    result_df = indicator.calculate(df)
+                    state = indicator.init_state(df)
+
+                if state is not None:
+                    self.state_store.set(symbol, indicator.get_state_key(), last_date, state)
+                results[name] = result_df
+
+            except Exception as e:
+                logger.error(f"增量计算指标 {name} 失败: {e}")
+
+        return results
+
+    def reset_incremental_state(self, symbol: Optional[str] = None):
+        """清除增量计算状态（复权因子变化或数据修正后需要重建）"""
+        self.state_store.clear(symbol)
+
     def get_available_indicators(self) -> Dict[str, Dict]:
         """
         获取所有可用指标信息
@@ -652,10 +811,7 @@ class IndicatorManager:
 
     def get_cache_stats(self) -> Dict:
         """获取缓存统计信息"""
-        return {
-            'memory_cache_items': len(self.cache_manager.memory_cache),
-            'memory_ttl': self.cache_manager.memory_ttl
-        }
+        return self.cache_manager.get_cache_stats()
 
     def clear_cache(self, cache_type: str = 'all'):
         """
@@ -0,0 +1,359 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/indicators\kernels.py
+# File Name: kernels
+# @ Author: mango-gh22
+# @ Date：2026/10/17 15:05
+"""
+desc 指标数组内核 - 沿时间轴（axis=0）的 NumPy 滚动/递推运算
+"""
+
+# src/indicators/kernels.py
+"""
+指标数组内核
+
+所有函数接受 1-D (T,) 或 2-D (T, N) 的 float64 数组，沿 axis=0（时间）计算，
+语义与对应的 pandas 操作保持一致：
+    rolling_mean(x, w)           <-> Series.rolling(w).mean()
+    rolling_mean(x, w, 1)        <-> Series.rolling(w, min_periods=1).mean()
+    rolling_std(x, w)            <-> Series.rolling(w).std()
+    rolling_min / rolling_max    <-> Series.rolling(w).min() / max()
+    rolling_rank_pct(x, w)       <-> Series.rolling(w).rank(pct=True)
+    ema(x, span)                 <-> Series.ewm(span=span, adjust=False).mean()
+    shift / diff / ffill / bfill <-> Series.shift(1) / diff() / ffill() / bfill()
+
+路径相关的指标（Parabolic SAR）无法数组化，逐 bar 递推内核在安装 numba 时
+编译执行，否则以同一份 Python 代码在原生 float 列表上运行。
+"""
+
+import warnings
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+
+    HAS_NUMBA = True
+except ImportError:
+    njit = None
+    HAS_NUMBA = False
+
+
+def _windows(x: np.ndarray, window: int) -> np.ndarray:
+    """(T-w+1, ..., w) 的滑动窗口视图（不复制数据）"""
+    return sliding_window_view(x, window, axis=0)
+
+
+def _rolling_reduce(x: np.ndarray, window: int, func, **kwargs) -> np.ndarray:
+    """完整窗口上的归约，前 window-1 行为 NaN（min_periods=window）"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= window:
+        out[window - 1:] = func(_windows(x, window), axis=-1, **kwargs)
+    return out
+
+
+def rolling_mean(x: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+    """滚动均值；min_periods 小于窗口时按窗口内非 NaN 值计算"""
+    if min_periods is None or min_periods >= window:
+        return _rolling_reduce(x, window, np.mean)
+
+    x = np.asarray(x, dtype=np.float64)
+    pad = np.full((window - 1,) + x.shape[1:], np.nan)
+    windows = _windows(np.concatenate([pad, x]), window)
+    counts = (~np.isnan(windows)).sum(axis=-1)
+    sums = np.nansum(windows, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts >= min_periods, sums / counts, np.nan)
+
+
+def rolling_std(x: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """滚动标准差（默认样本标准差，同 pandas）"""
+    return _rolling_reduce(x, window, np.std, ddof=ddof)
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    """滚动最小值"""
+    return _rolling_reduce(x, window, np.min)
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """滚动最大值"""
+    return _rolling_reduce(x, window, np.max)
+
+
+def rolling_mean_deviation(x: np.ndarray, window: int, block_elements: int = 1 << 22) -> np.ndarray:
+    """
+    滚动平均绝对偏差 mean(|x - mean(x)|)
+
+    |x - mean| 需要物化 (窗口数, w) 的临时数组，按行分块计算，
+    单块元素数不超过 block_elements，分钟线等长序列的内存占用保持恒定。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] < window:
+        return out
+
+    windows = _windows(x, window)
+    n_windows = windows.shape[0]
+    per_row = window * int(np.prod(x.shape[1:], dtype=np.int64))
+    block = max(1, block_elements // max(per_row, 1))
+    for start in range(0, n_windows, block):
+        chunk = windows[start:start + block]
+        center = chunk.mean(axis=-1, keepdims=True)
+        out[window - 1 + start:window - 1 + start + len(chunk)] = np.abs(chunk - center).mean(axis=-1)
+    return out
+
+
+def rolling_rank_pct(x: np.ndarray, window: int) -> np.ndarray:
+    """窗口内最后一个值的百分位排名（平均排名法），窗口含 NaN 时为 NaN"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] >= window:
+        windows = _windows(x, window)
+        last = windows[..., -1:]
+        less = (windows < last).sum(axis=-1)
+        equal = (windows == last).sum(axis=-1)
+        rank = less + (equal + 1) / 2.0
+        has_nan = np.isnan(windows).any(axis=-1)
+        out[window - 1:] = np.where(has_nan, np.nan, rank / window)
+    return out
+
+
+def rolling_nanmin_before(x: np.ndarray, lookback: int) -> np.ndarray:
+    """第 i 行为 x[i-lookback:i] 的最小值（忽略 NaN），前 lookback 行为 NaN"""
+    return _shifted_window_reduce(x, lookback, np.nanmin)
+
+
+def rolling_nanmax_before(x: np.ndarray, lookback: int) -> np.ndarray:
+    """第 i 行为 x[i-lookback:i] 的最大值（忽略 NaN），前 lookback 行为 NaN"""
+    return _shifted_window_reduce(x, lookback, np.nanmax)
+
+
+def _shifted_window_reduce(x: np.ndarray, lookback: int, func) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[0] > lookback:
+        with warnings.catch_warnings():
+            # 全 NaN 窗口返回 NaN，与 pandas 的 min()/max() 一致
+            warnings.simplefilter('ignore', RuntimeWarning)
+            out[lookback:] = func(_windows(x[:-1], lookback), axis=-1)
+    return out
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """指数移动平均（adjust=False），时间上递推、股票间向量化"""
+    x = np.asarray(x, dtype=np.float64)
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(x)
+    if x.shape[0] == 0:
+        return out
+
+    out[0] = x[0]
+    prev = x[0].copy() if x.ndim > 1 else x[0]
+    for t in range(1, x.shape[0]):
+        cur = x[t]
+        value = (1.0 - alpha) * prev + alpha * cur
+        # NaN 输入沿用上一个值（与 pandas 对尾部缺失值的处理一致）
+        value = np.where(np.isnan(cur), prev, value)
+        prev = np.where(np.isnan(prev), cur, value)
+        out[t] = prev
+    return out
+
+
+def shift(x: np.ndarray, periods: int = 1, fill_value=np.nan) -> np.ndarray:
+    """沿时间轴平移"""
+    x = np.asarray(x)
+    if x.dtype == bool and fill_value is np.nan:
+        fill_value = False
+    out = np.empty_like(x, dtype=np.result_type(x, np.asarray(fill_value)))
+    if periods >= x.shape[0]:
+        out[:] = fill_value
+        return out
+    out[:periods] = fill_value
+    out[periods:] = x[:-periods] if periods else x
+    return out
+
+
+def diff(x: np.ndarray) -> np.ndarray:
+    """一阶差分，首行为 NaN"""
+    x = np.asarray(x, dtype=np.float64)
+    return x - shift(x)
+
+
+def ffill(x: np.ndarray) -> np.ndarray:
+    """前向填充 NaN"""
+    x = np.asarray(x, dtype=np.float64)
+    flat = x.reshape(x.shape[0], -1)
+    rows = np.arange(flat.shape[0])[:, None]
+    idx = np.where(np.isnan(flat), 0, rows)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = flat[idx, np.arange(flat.shape[1])]
+    return filled.reshape(x.shape)
+
+
+def bfill(x: np.ndarray) -> np.ndarray:
+    """后向填充 NaN"""
+    return ffill(np.asarray(x, dtype=np.float64)[::-1])[::-1]
+
+
+def run_length(condition: np.ndarray) -> np.ndarray:
+    """条件连续成立的天数（不成立时归零）"""
+    condition = np.asarray(condition, dtype=bool)
+    counts = np.cumsum(condition, axis=0, dtype=np.int64)
+    reset = np.where(condition, 0, counts)
+    np.maximum.accumulate(reset, axis=0, out=reset)
+    return counts - reset
+
+
+def crossed_above(a: np.ndarray, b) -> np.ndarray:
+    """a 上穿 b：a > b 且前一日 a <= b"""
+    prev_b = shift(b) if np.ndim(b) else b
+    return (a > b) & (shift(a) <= prev_b)
+
+
+def crossed_below(a: np.ndarray, b) -> np.ndarray:
+    """a 下穿 b：a < b 且前一日 a >= b"""
+    prev_b = shift(b) if np.ndim(b) else b
+    return (a < b) & (shift(a) >= prev_b)
+
+
+def divergence(price: np.ndarray, values: np.ndarray, lookback: int,
+               start: int = 20):
+    """
+    价格/指标背离（逐行扫描版本的数组实现）
+
+    第 i 行（i >= start）：
+        底背离：price[i] < min(price[i-lookback:i]) 且 values[i] > min(values[i-lookback:i])
+        顶背离：price[i] > max(price[i-lookback:i]) 且 values[i] < max(values[i-lookback:i])
+
+    Returns:
+        (bullish, bearish) 布尔数组
+    """
+    bullish = (price < rolling_nanmin_before(price, lookback)) & \
+              (values > rolling_nanmin_before(values, lookback))
+    bearish = (price > rolling_nanmax_before(price, lookback)) & \
+              (values < rolling_nanmax_before(values, lookback))
+    bullish[:start] = False
+    bearish[:start] = False
+    return bullish, bearish
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """
+    能量潮：首日为当日成交量，之后上涨日加、下跌日减成交量，平盘不变
+
+    sign(diff(close)) * volume 的累加，等价于原逐行递推。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    if close.shape[0] == 0:
+        return np.empty_like(close)
+
+    flow = np.sign(np.nan_to_num(diff(close))) * volume
+    flow[0] = volume[0]
+    return np.cumsum(flow, axis=0)
+
+
+def _sar_loop(high, low, close, acceleration_factor, acceleration_max, sar, state):
+    """
+    Parabolic SAR 逐 bar 递推（numba 可编译；输入为 1-D 序列，结果写入 sar）
+
+    state = [trend, acceleration, extreme_point]，推进后原地更新。
+    trend 为 0 表示从头开始：由前两根收盘价确定初始趋势并填写 sar[0]；
+    否则为续算：第 0 行是上一根 bar，sar[0] 需预先填入上一根的 SAR。
+    """
+    n = len(close)
+    if n == 0:
+        return sar
+
+    trend = state[0]
+    if trend == 0:
+        trend = 1 if n > 1 and close[1] > close[0] else -1
+        sar[0] = low[0] if trend == 1 else high[0]
+        acceleration = acceleration_factor
+        extreme_point = high[0] if trend == 1 else low[0]
+    else:
+        acceleration = state[1]
+        extreme_point = state[2]
+
+    for i in range(1, n):
+        value = sar[i - 1] + acceleration * (extreme_point - sar[i - 1])
+
+        if trend == 1:
+            if low[i] < value:
+                # 上升趋势反转
+                trend = -1
+                value = max(high[i - 1], high[i])
+                acceleration = acceleration_factor
+                extreme_point = low[i]
+            elif high[i] > extreme_point:
+                extreme_point = high[i]
+                acceleration = min(acceleration + acceleration_factor, acceleration_max)
+        else:
+            if high[i] > value:
+                # 下降趋势反转
+                trend = 1
+                value = min(low[i - 1], low[i])
+                acceleration = acceleration_factor
+                extreme_point = high[i]
+            elif low[i] < extreme_point:
+                extreme_point = low[i]
+                acceleration = min(acceleration + acceleration_factor, acceleration_max)
+
+        sar[i] = value
+
+    state[0] = trend
+    state[1] = acceleration
+    state[2] = extreme_point
+    return sar
+
+
+_sar_loop_compiled = njit(cache=True)(_sar_loop) if HAS_NUMBA else None
+
+
+def parabolic_sar(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                  acceleration_factor: float = 0.02, acceleration_max: float = 0.2,
+                  use_numba: bool = None, state: list = None, prev_sar: float = None) -> np.ndarray:
+    """
+    Parabolic SAR
+
+    Args:
+        high, low, close: 1-D 价格序列
+        acceleration_factor: 加速因子
+        acceleration_max: 最大加速因子
+        use_numba: None 表示有 numba 时使用
+        state: [trend, acceleration, extreme_point]，原地更新为最后一根 bar 的状态；
+               传入非零 trend 时为续算，此时第 0 行为上一根 bar，prev_sar 为其 SAR
+        prev_sar: 续算时上一根 bar 的 SAR
+
+    Returns:
+        SAR 序列 (float64)
+    """
+    if use_numba is None:
+        use_numba = HAS_NUMBA
+    if use_numba and not HAS_NUMBA:
+        raise ImportError("未安装 numba")
+
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    sar = np.zeros(len(close))
+    loop_state = np.zeros(3) if state is None else np.asarray(state, dtype=np.float64).copy()
+    if loop_state[0] != 0 and len(sar):
+        sar[0] = prev_sar
+
+    if use_numba:
+        sar = _sar_loop_compiled(high, low, close, float(acceleration_factor),
+                                 float(acceleration_max), sar, loop_state)
+    else:
+        # 纯 Python 路径：在原生 float 列表上递推，避免逐元素访问 ndarray/Series 的开销
+        py_state = loop_state.tolist()
+        sar = np.asarray(_sar_loop(high.tolist(), low.tolist(), close.tolist(),
+                                   acceleration_factor, acceleration_max, sar.tolist(), py_state),
+                         dtype=np.float64)
+        loop_state = np.asarray(py_state)
+
+    if state is not None:
+        state[:] = loop_state.tolist()
+    return sar
@@ -0,0 +1,196 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/indicators\memory_tier.py
+# File Name: memory_tier
+# @ Author: mango-gh22
+# @ Date：2026/10/17 20:10
+"""
+desc 指标缓存内存层 - 按字节限额的分段锁 LRU
+"""
+# src/indicators/memory_tier.py
+"""
+按字节限额的内存缓存层
+
+- 键按哈希分到多个分段（stripe），每段一把锁、一个 OrderedDict，
+  AsyncIndicatorCalculator / ParallelCalculator 的工作线程并发访问时互不阻塞
+- 每段的字节数和条目数各有上限（总上限平均分配），超出时按 LRU 淘汰
+- 数据大小用 DataFrame.memory_usage(deep=True) 计算
+- 命中/未命中/淘汰/过期次数可通过 stats() 获取
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import pandas as pd
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class _Stripe:
+    """一个分段：独立的锁、LRU 顺序和计数"""
+
+    __slots__ = ('lock', 'items', 'bytes', 'hits', 'misses', 'evictions', 'expirations', 'rejected')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (value, size, created_at, meta)，末尾为最近使用
+        self.items: OrderedDict = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.rejected = 0
+
+
+class LRUMemoryTier:
+    """按字节限额、分段加锁的 LRU 内存缓存"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_items: int = 1000,
+                 ttl: float = 3600, stripes: int = 16):
+        """
+        初始化内存层
+
+        Args:
+            max_bytes: 总字节上限
+            max_items: 总条目上限
+            ttl: 条目生存时间（秒）
+            stripes: 分段数
+        """
+        if stripes <= 0:
+            raise ValueError("分段数必须是正整数")
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.ttl = ttl
+        self._stripes = [_Stripe() for _ in range(stripes)]
+
+    @property
+    def _stripe_bytes(self) -> int:
+        return self.max_bytes // len(self._stripes)
+
+    @property
+    def _stripe_items(self) -> int:
+        return max(1, -(-self.max_items // len(self._stripes)))
+
+    def _stripe(self, key: str) -> _Stripe:
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _remove(self, stripe: _Stripe, key: str):
+        _, size, _, _ = stripe.items.pop(key)
+        stripe.bytes -= size
+
+    def get(self, key: str) -> Optional[Tuple[Any, Dict]]:
+        """
+        获取缓存项
+
+        Returns:
+            (值, 元数据) 或 None
+        """
+        stripe = self._stripe(key)
+        with stripe.lock:
+            item = stripe.items.get(key)
+            if item is None:
+                stripe.misses += 1
+                return None
+
+            value, _, created_at, meta = item
+            if time.monotonic() - created_at > self.ttl:
+                self._remove(stripe, key)
+                stripe.expirations += 1
+                stripe.misses += 1
+                return None
+
+            stripe.items.move_to_end(key)
+            stripe.hits += 1
+            return value, meta
+
+    def put(self, key: str, value: Any, meta: Optional[Dict] = None) -> bool:
+        """
+        设置缓存项，必要时按 LRU 淘汰
+
+        Returns:
+            是否已缓存（单项超过分段字节上限时不缓存）
+        """
+        size = estimate_size(value)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            if key in stripe.items:
+                self._remove(stripe, key)
+
+            if size > self._stripe_bytes:
+                stripe.rejected += 1
+                logger.debug(f"缓存项过大未放入内存: {key}, {size} 字节")
+                return False
+
+            while stripe.items and (stripe.bytes + size > self._stripe_bytes
+                                    or len(stripe.items) >= self._stripe_items):
+                oldest = next(iter(stripe.items))
+                self._remove(stripe, oldest)
+                stripe.evictions += 1
+
+            stripe.items[key] = (value, size, time.monotonic(), meta or {})
+            stripe.bytes += size
+            return True
+
+    def pop(self, key: str):
+        """删除缓存项"""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            if key in stripe.items:
+                self._remove(stripe, key)
+
+    def pop_where(self, predicate: Callable[[str, Dict], bool]) -> int:
+        """删除 predicate(键, 元数据) 为真的缓存项，返回删除数"""
+        removed = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                keys = [key for key, (_, _, _, meta) in stripe.items.items() if predicate(key, meta)]
+                for key in keys:
+                    self._remove(stripe, key)
+                removed += len(keys)
+        return removed
+
+    def clear(self):
+        """清空所有分段（计数保留）"""
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.items.clear()
+                stripe.bytes = 0
+
+    def __len__(self) -> int:
+        return sum(len(stripe.items) for stripe in self._stripes)
+
+    def __contains__(self, key: str) -> bool:
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return key in stripe.items
+
+    def stats(self) -> Dict:
+        """命中/未命中/淘汰统计"""
+        totals = {'items': 0, 'bytes': 0, 'hits': 0, 'misses': 0,
+                  'evictions': 0, 'expirations': 0, 'rejected': 0}
+        for stripe in self._stripes:
+            with stripe.lock:
+                totals['items'] += len(stripe.items)
+                totals['bytes'] += stripe.bytes
+                totals['hits'] += stripe.hits
+                totals['misses'] += stripe.misses
+                totals['evictions'] += stripe.evictions
+                totals['expirations'] += stripe.expirations
+                totals['rejected'] += stripe.rejected
+
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_rate'] = totals['hits'] / lookups if lookups else 0.0
+        totals['max_bytes'] = self.max_bytes
+        totals['max_items'] = self.max_items
+        return totals
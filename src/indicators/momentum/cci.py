@@ -10,6 +10,7 @@ import pandas as pd
 import numpy as np
 from typing import List
 from ..base_indicator import BaseIndicator, IndicatorType
+from .. import kernels
 import logging
 
 logger = logging.getLogger(__name__)
@@ -84,9 +85,10 @@ class CCI(BaseIndicator):
         # 计算简单移动平均
         sma = typical_price.rolling(window=self.period).mean()
 
-        # 计算平均偏差
-        mean_deviation = typical_price.rolling(window=self.period).apply(
-            lambda x: np.mean(np.abs(x - np.mean(x)))
+        # 计算平均偏差（滑动窗口视图上整体计算，避免逐窗口回调 Python）
+        mean_deviation = pd.Series(
+            kernels.rolling_mean_deviation(typical_price.to_numpy(dtype=np.float64), self.period),
+            index=typical_price.index
         )
 
         # 计算CCI值
@@ -123,47 +125,24 @@ class CCI(BaseIndicator):
         df['CCI_Momentum_Up'] = cci_diff > 0
         df['CCI_Momentum_Down'] = cci_diff < 0
 
-        # 4. 背离检测
+        # 4. 背离检测（价格与CCI在前10日窗口内的新高/新低比较）
         if 'close_price' in df.columns and len(df) > 30:
-            df['CCI_Bullish_Divergence'] = False
-            df['CCI_Bearish_Divergence'] = False
-
-            # 寻找局部极值点
-            for i in range(20, len(df)):
-                # 价格创新低但CCI未创新低（底背离）
-                if (df['close_price'].iloc[i] < df['close_price'].iloc[i - 10:i].min() and
-                        cci.iloc[i] > cci.iloc[i - 10:i].min()):
-                    df.loc[df.index[i], 'CCI_Bullish_Divergence'] = True
-
-                # 价格创新高但CCI未创新高（顶背离）
-                if (df['close_price'].iloc[i] > df['close_price'].iloc[i - 10:i].max() and
-                        cci.iloc[i] < cci.iloc[i - 10:i].max()):
-                    df.loc[df.index[i], 'CCI_Bearish_Divergence'] = True
+            bullish, bearish = kernels.divergence(
+                df['close_price'].to_numpy(dtype=np.float64), cci.to_numpy(dtype=np.float64), lookback=10
+            )
+            # 价格创新低但CCI未创新低（底背离）
+            df['CCI_Bullish_Divergence'] = bullish
+            # 价格创新高但CCI未创新高（顶背离）
+            df['CCI_Bearish_Divergence'] = bearish
 
         # 5. 趋势强度
         cci_abs = abs(cci)
         df['CCI_Trend_Strength'] = cci_abs.rolling(window=5).mean()
 
-        # 6. 超买超卖区间的持续时间
-        df['CCI_Overbought_Duration'] = 0
-        df['CCI_Oversold_Duration'] = 0
-
-        overbought_count = 0
-        oversold_count = 0
-
-        for i in range(len(df)):
-            if df['CCI_Overbought'].iloc[i]:
-                overbought_count += 1
-                oversold_count = 0
-            elif df['CCI_Oversold'].iloc[i]:
-                oversold_count += 1
-                overbought_count = 0
-            else:
-                overbought_count = 0
-                oversold_count = 0
-
-            df.loc[df.index[i], 'CCI_Overbought_Duration'] = overbought_count
-            df.loc[df.index[i], 'CCI_Oversold_Duration'] = oversold_count
+        # 6. 超买超卖区间的持续时间（连续天数）
+        overbought = df['CCI_Overbought'].to_numpy()
+        df['CCI_Overbought_Duration'] = kernels.run_length(overbought)
+        df['CCI_Oversold_Duration'] = kernels.run_length(df['CCI_Oversold'].to_numpy() & ~overbought)
 
     def validate_parameters(self) -> bool:
         """验证参数有效性"""
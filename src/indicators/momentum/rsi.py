@@ -12,7 +12,7 @@ Desc: RSI指标 - 修复参数验证问题
 
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from ..base_indicator import BaseIndicator, IndicatorType
 import logging
 
@@ -164,6 +164,66 @@ class RSI(BaseIndicator):
         df['RSI_Buy_Signal'] = (rsi > self.oversold) & (rsi.shift(1) <= self.oversold)
         df['RSI_Sell_Signal'] = (rsi < self.overbought) & (rsi.shift(1) >= self.overbought)
 
+    def get_incremental_lookback(self) -> Optional[int]:
+        """新 bar 的平均涨跌幅需要前 period 个价格变化，即 period + 1 个价格"""
+        return self.period + 1
+
+    def init_state(self, df: pd.DataFrame) -> Optional[Dict]:
+        # 数据不足时 calculate 输出全 NaN，不建立状态
+        if len(df) < self.period + 5:
+            return None
+        return super().init_state(df)
+
+    def _init_recursive_state(self, prepared: pd.DataFrame) -> Dict:
+        prices = pd.to_numeric(prepared[self.price_column], errors='coerce')
+        delta = prices.diff()
+        loss = -delta.where(delta < 0, 0)
+        avg_loss = loss.rolling(window=self.period, min_periods=1).mean().replace(0, np.nan)
+        last_avg_loss = avg_loss.dropna()
+        return {
+            'last_avg_loss': float(last_avg_loss.iloc[-1]) if len(last_avg_loss) else None,
+            'last_rsi': float(self.calculate(prepared)['RSI'].iloc[-1]),
+        }
+
+    def update(self, state: Dict, new_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+        """
+        在 尾部 period+1 个价格 + 新数据 上计算平均涨跌幅
+
+        平均跌幅为 0 时沿用上一个非零值（与 calculate 的前向填充一致）；
+        若历史中从未出现过非零跌幅，calculate 会用之后的值回填，
+        增量计算无法获知未来数据，此时使用 1e-10。
+        """
+        if new_df.empty:
+            return new_df.copy(), state
+
+        combined = self._combine_with_tail(state, new_df)
+        n_tail = len(combined) - len(new_df)
+        prices = pd.to_numeric(combined[self.price_column], errors='coerce')
+
+        delta = prices.diff()
+        avg_gain = delta.where(delta > 0, 0).rolling(window=self.period).mean().iloc[n_tail:]
+        avg_loss = (-delta.where(delta < 0, 0)).rolling(window=self.period).mean().iloc[n_tail:]
+
+        last_avg_loss = np.nan if state['last_avg_loss'] is None else state['last_avg_loss']
+        avg_loss = pd.concat([pd.Series([last_avg_loss]), avg_loss.replace(0, np.nan)], ignore_index=True).ffill()
+        new_last_avg_loss = avg_loss.iloc[-1]
+        avg_loss_filled = avg_loss.iloc[1:].fillna(1e-10).to_numpy()
+
+        rsi = 100 - (100 / (1 + avg_gain.to_numpy() / avg_loss_filled))
+        rsi = pd.Series(np.concatenate([[state['last_rsi']], rsi])).ffill()
+
+        # 信号需要前一日的 RSI
+        result = combined.iloc[n_tail - 1:].copy()
+        result['RSI'] = rsi.to_numpy()
+        self._add_rsi_signals(result)
+
+        result = result.iloc[1:]
+        result.index = new_df.index
+        return result, self._advance_state(
+            state, combined,
+            last_avg_loss=None if pd.isna(new_last_avg_loss) else float(new_last_avg_loss),
+            last_rsi=float(rsi.iloc[-1]))
+
     def validate_parameters(self) -> bool:
         """验证参数有效性"""
         try:
@@ -8,8 +8,9 @@ desc stochastic.py（随机指标）- 动量指标
 """
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import List, Optional
 from ..base_indicator import BaseIndicator, IndicatorType
+from .. import kernels
 import logging
 
 logger = logging.getLogger(__name__)
@@ -127,21 +128,13 @@ class Stochastic(BaseIndicator):
         df['Stochastic_Golden_Cross'] = (k_line > d_line) & (k_line.shift(1) <= d_line.shift(1))
         df['Stochastic_Death_Cross'] = (k_line < d_line) & (k_line.shift(1) >= d_line.shift(1))
 
-        # 3. 背离检测
+        # 3. 背离检测（价格与%K在前5日窗口内的新高/新低比较）
         if 'close_price' in df.columns and len(df) > 30:
-            df['Stochastic_Bullish_Divergence'] = False
-            df['Stochastic_Bearish_Divergence'] = False
-
-            # 简单背离检测逻辑
-            for i in range(20, len(df)):
-                # 寻找局部极值点
-                if (df['close_price'].iloc[i] < df['close_price'].iloc[i - 5:i].min() and
-                        k_line.iloc[i] > k_line.iloc[i - 5:i].min()):
-                    df.loc[df.index[i], 'Stochastic_Bullish_Divergence'] = True
-
-                if (df['close_price'].iloc[i] > df['close_price'].iloc[i - 5:i].max() and
-                        k_line.iloc[i] < k_line.iloc[i - 5:i].max()):
-                    df.loc[df.index[i], 'Stochastic_Bearish_Divergence'] = True
+            bullish, bearish = kernels.divergence(
+                df['close_price'].to_numpy(dtype=np.float64), k_line.to_numpy(dtype=np.float64), lookback=5
+            )
+            df['Stochastic_Bullish_Divergence'] = bullish
+            df['Stochastic_Bearish_Divergence'] = bearish
 
         # 4. 动量信号
         k_momentum = k_line.diff()
@@ -152,6 +145,10 @@ class Stochastic(BaseIndicator):
         df['Stochastic_Golden_in_Oversold'] = df['Stochastic_Golden_Cross'] & df['Stochastic_Oversold'].shift(1)
         df['Stochastic_Death_in_Overbought'] = df['Stochastic_Death_Cross'] & df['Stochastic_Overbought'].shift(1)
 
+    def get_incremental_lookback(self) -> Optional[int]:
+        """K/D 线的多层滑动窗口，且背离检测需要超过30行的窗口"""
+        return max(30, self.k_period + self.smoothing + 2 * self.d_period)
+
     def validate_parameters(self) -> bool:
         """验证参数有效性"""
         # 通过 self.parameters 访问参数
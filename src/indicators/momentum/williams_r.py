@@ -12,6 +12,7 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict
 from ..base_indicator import BaseIndicator, IndicatorType
+from .. import kernels
 import logging
 
 logger = logging.getLogger(__name__)
@@ -132,42 +133,20 @@ class WilliamsR(BaseIndicator):
         df['Williams_Break_Oversold'] = (williams_r > self.oversold_level) & \
                                         (williams_r.shift(1) <= self.oversold_level)
 
-        # 6. 背离检测
+        # 6. 背离检测（价格与指标在前10日窗口内的新高/新低比较）
         if 'close_price' in df.columns and len(df) > 30:
-            df['Williams_Bullish_Divergence'] = False
-            df['Williams_Bearish_Divergence'] = False
-
-            for i in range(20, len(df)):
-                # 底背离：价格创新低，指标未创新低
-                if (df['close_price'].iloc[i] < df['close_price'].iloc[i - 10:i].min() and
-                        williams_r.iloc[i] > williams_r.iloc[i - 10:i].min()):
-                    df.loc[df.index[i], 'Williams_Bullish_Divergence'] = True
-
-                # 顶背离：价格创新高，指标未创新高
-                if (df['close_price'].iloc[i] > df['close_price'].iloc[i - 10:i].max() and
-                        williams_r.iloc[i] < williams_r.iloc[i - 10:i].max()):
-                    df.loc[df.index[i], 'Williams_Bearish_Divergence'] = True
-
-        # 7. 超买超卖持续时间
-        df['Williams_Overbought_Duration'] = 0
-        df['Williams_Oversold_Duration'] = 0
-
-        ob_count = 0
-        os_count = 0
-
-        for i in range(len(df)):
-            if df['Williams_Overbought'].iloc[i]:
-                ob_count += 1
-                os_count = 0
-            elif df['Williams_Oversold'].iloc[i]:
-                os_count += 1
-                ob_count = 0
-            else:
-                ob_count = 0
-                os_count = 0
-
-            df.loc[df.index[i], 'Williams_Overbought_Duration'] = ob_count
-            df.loc[df.index[i], 'Williams_Oversold_Duration'] = os_count
+            bullish, bearish = kernels.divergence(
+                df['close_price'].to_numpy(dtype=np.float64), williams_r.to_numpy(dtype=np.float64), lookback=10
+            )
+            # 底背离：价格创新低，指标未创新低
+            df['Williams_Bullish_Divergence'] = bullish
+            # 顶背离：价格创新高，指标未创新高
+            df['Williams_Bearish_Divergence'] = bearish
+
+        # 7. 超买超卖持续时间（连续天数）
+        overbought = df['Williams_Overbought'].to_numpy()
+        df['Williams_Overbought_Duration'] = kernels.run_length(overbought)
+        df['Williams_Oversold_Duration'] = kernels.run_length(df['Williams_Oversold'].to_numpy() & ~overbought)
 
         # 8. 趋势强度
         df['Williams_Trend_Strength'] = abs(williams_r).rolling(window=5).mean()
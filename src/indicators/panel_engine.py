@@ -0,0 +1,464 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/indicators\panel_engine.py
+# File Name: panel_engine
+# @ Author: mango-gh22
+# @ Date：2026/10/17 15:30
+"""
+desc 面板指标引擎 - 在 日期×股票 矩阵上一次性计算全部股票的指标
+"""
+
+# src/indicators/panel_engine.py
+"""
+面板指标引擎
+
+IndicatorManager.calculate_for_symbol 按股票、再按指标逐个跑 pandas 流程。
+PanelIndicatorEngine 直接在 PricePanel 的 (T, N) float64 矩阵上计算，
+每个指标只需若干次数组运算即可覆盖全部股票。
+
+与逐股票计算结果一致的关键：
+    面板按交易日历对齐，停牌日为 NaN；而单股票 DataFrame 只包含有行情的日期。
+    引擎先把每列的有效行稳定地"压实"到顶部（尾部补 NaN），
+    在压实后的矩阵上做因果（只看过去）的滚动/递推运算，最后按原位置还原。
+    这样每只股票的窗口只包含它自己的交易日，与单股票计算完全相同。
+
+支持: moving_average, macd, rsi, bollinger_bands, stochastic, williams_r, cci, obv
+其余指标（parabolic_sar, ichimoku_cloud）回退到逐股票计算。
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.indicators import kernels as K
+from src.query.panel_loader import PricePanel
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 指标类使用的列名 -> 面板字段名（QueryEngine.DAILY_COLUMN_EXPRESSIONS 的输出名）
+PANEL_FIELD_ALIASES = {
+    'open_price': 'open',
+    'high_price': 'high',
+    'low_price': 'low',
+    'close_price': 'close',
+}
+
+# 面板模式需要加载的字段
+PANEL_INPUT_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _indicator_classes() -> Dict[str, type]:
+    """指标名 -> 指标类（延迟导入，与 IndicatorFactory 保持一致）"""
+    from .trend.moving_average import MovingAverage
+    from .trend.macd import MACD
+    from .trend.parabolic_sar import ParabolicSAR
+    from .trend.ichimoku_cloud import IchimokuCloud
+    from .momentum.rsi import RSI
+    from .momentum.stochastic import Stochastic
+    from .momentum.cci import CCI
+    from .momentum.williams_r import WilliamsR
+    from .volatility.bollinger_bands import BollingerBands
+    from .volume.obv import OBV
+
+    return {
+        'moving_average': MovingAverage,
+        'macd': MACD,
+        'parabolic_sar': ParabolicSAR,
+        'ichimoku_cloud': IchimokuCloud,
+        'rsi': RSI,
+        'stochastic': Stochastic,
+        'cci': CCI,
+        'williams_r': WilliamsR,
+        'bollinger_bands': BollingerBands,
+        'obv': OBV,
+    }
+
+
+class PanelIndicatorEngine:
+    """面板指标引擎"""
+
+    VECTORIZED_INDICATORS = (
+        'moving_average', 'macd', 'rsi', 'bollinger_bands',
+        'stochastic', 'williams_r', 'cci', 'obv',
+    )
+
+    def __init__(self, panel: PricePanel):
+        """
+        Args:
+            panel: 输入面板（需包含指标所需字段，如 close/high/low/volume）
+        """
+        self.panel = panel
+        mask = panel.mask if panel.mask is not None else np.ones(panel.shape, dtype=bool)
+        self.mask = mask
+
+        # 有效行稳定排序到顶部：order[k, j] 为第 j 只股票第 k 个交易日在面板中的行号
+        self._order = np.argsort(~mask, axis=0, kind='stable')
+        self.counts = mask.sum(axis=0)
+        self._valid = np.arange(mask.shape[0])[:, None] < self.counts[None, :]
+        self._prepared: Dict[str, np.ndarray] = {}
+
+    # ------------------------------------------------------------------
+    # 数据准备
+    # ------------------------------------------------------------------
+
+    def field(self, column: str) -> np.ndarray:
+        """
+        取压实并预处理后的字段矩阵
+
+        与 BaseIndicator.prepare_data 一致：有效区内先前向、再后向填充，仍缺失则填 0。
+        压实后尾部（无行情）保持 NaN。
+        """
+        name = PANEL_FIELD_ALIASES.get(column, column)
+        if name in self._prepared:
+            return self._prepared[name]
+        if name not in self.panel:
+            raise ValueError(f"面板中缺少字段: {name}")
+
+        values = np.take_along_axis(self.panel[name], self._order, axis=0)
+        values = np.where(self._valid, values, np.nan)
+        if np.isnan(values[self._valid]).any():
+            values = K.bfill(K.ffill(values))
+            values = np.where(self._valid & np.isnan(values), 0.0, values)
+            values = np.where(self._valid, values, np.nan)
+
+        self._prepared[name] = values
+        return values
+
+    def _restore(self, values: np.ndarray) -> np.ndarray:
+        """压实后的结果还原到面板位置，无行情的格子为 NaN/False/0"""
+        values = np.asarray(values)
+        if values.dtype == bool:
+            fill = False
+        elif np.issubdtype(values.dtype, np.integer):
+            fill = 0
+        else:
+            fill = np.nan
+
+        out = np.full(values.shape, fill, dtype=values.dtype)
+        np.put_along_axis(out, self._order, values, axis=0)
+        out[~self.mask] = fill
+        return out
+
+    def _columns_with(self, min_length: int) -> np.ndarray:
+        """有效行数 >= min_length 的股票（按列广播的布尔行向量）"""
+        return (self.counts >= min_length)[None, :]
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def calculate(self, indicator_name: str, **parameters) -> PricePanel:
+        """
+        计算单个指标
+
+        Args:
+            indicator_name: 指标名称
+            **parameters: 指标参数（同对应指标类）
+
+        Returns:
+            PricePanel，fields 为 {输出列名: (T, N) 矩阵}，行列与输入面板一致
+        """
+        classes = _indicator_classes()
+        if indicator_name not in classes:
+            raise ValueError(f"未知的指标: {indicator_name}")
+
+        # 通过指标类完成参数合并与校验
+        indicator = classes[indicator_name](**parameters)
+
+        if indicator_name in self.VECTORIZED_INDICATORS:
+            compact = getattr(self, f'_calc_{indicator_name}')(indicator)
+            outputs = {name: self._restore(values) for name, values in compact.items()}
+        else:
+            outputs = self._calculate_per_symbol(indicator)
+
+        return PricePanel(dates=self.panel.dates, symbols=self.panel.symbols,
+                          fields=outputs, mask=self.mask)
+
+    def calculate_many(self, indicator_names: List[str],
+                       indicator_params: Optional[Dict[str, Dict]] = None) -> Dict[str, PricePanel]:
+        """
+        计算多个指标
+
+        Returns:
+            {指标名: PricePanel}，计算失败的指标不包含在结果中
+        """
+        indicator_params = indicator_params or {}
+        results = {}
+        for name in indicator_names:
+            start = time.time()
+            try:
+                results[name] = self.calculate(name, **indicator_params.get(name, {}))
+                logger.info(f"面板指标完成: {name}, {self.panel.shape[0]}x{self.panel.shape[1]}, "
+                            f"耗时 {time.time() - start:.3f}s")
+            except Exception as e:
+                logger.error(f"面板指标计算失败 {name}: {e}")
+        return results
+
+    # ------------------------------------------------------------------
+    # 向量化指标（输入输出均为压实后的矩阵）
+    # ------------------------------------------------------------------
+
+    def _calc_moving_average(self, ind) -> Dict[str, np.ndarray]:
+        price = self.field(ind.price_column)
+        prefix = 'EMA' if ind.ma_type.lower() == 'ema' else 'MA'
+
+        out = {}
+        for period in ind.periods:
+            column = f'{prefix}_{period}'
+            out[column] = K.ema(price, period) if prefix == 'EMA' else K.rolling_mean(price, period)
+            if period <= 60:
+                out[f'{column}_Signal'] = price > out[column]
+
+        periods = sorted(ind.periods)
+        if len(periods) >= 2:
+            for i, short_period in enumerate(periods):
+                for long_period in periods[i + 1:]:
+                    short_col, long_col = f'{prefix}_{short_period}', f'{prefix}_{long_period}'
+                    short_ma, long_ma = out[short_col], out[long_col]
+                    out[f'{short_col}_CROSS_{long_col}_GOLDEN'] = K.crossed_above(short_ma, long_ma)
+                    out[f'{short_col}_CROSS_{long_col}_DEATH'] = K.crossed_below(short_ma, long_ma)
+        return out
+
+    def _calc_macd(self, ind) -> Dict[str, np.ndarray]:
+        price = self.field(ind.price_column)
+        dif = K.ema(price, ind.fast_period) - K.ema(price, ind.slow_period)
+        dea = K.ema(dif, ind.signal_period)
+        hist = (dif - dea) * 2
+        hist_diff = K.diff(hist)
+
+        return {
+            'MACD_DIF': dif,
+            'MACD_DEA': dea,
+            'MACD_HIST': hist,
+            'MACD_GOLDEN_CROSS': K.crossed_above(dif, dea),
+            'MACD_DEATH_CROSS': K.crossed_below(dif, dea),
+            'MACD_HIST_TURNING_UP': K.crossed_above(hist_diff, 0),
+            'MACD_HIST_TURNING_DOWN': K.crossed_below(hist_diff, 0),
+            'MACD_DIF_ABOVE_ZERO': dif > 0,
+            'MACD_DIF_BELOW_ZERO': dif < 0,
+            'MACD_DIF_CROSS_ZERO_UP': K.crossed_above(dif, 0),
+            'MACD_DIF_CROSS_ZERO_DOWN': K.crossed_below(dif, 0),
+        }
+
+    def _calc_rsi(self, ind) -> Dict[str, np.ndarray]:
+        price = self.field(ind.price_column)
+        delta = K.diff(price)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = -np.where(delta < 0, delta, 0.0)
+
+        avg_gain = K.rolling_mean(gain, ind.period, min_periods=1)
+        avg_loss = K.rolling_mean(loss, ind.period, min_periods=1)
+        avg_loss = K.bfill(K.ffill(np.where(avg_loss == 0, np.nan, avg_loss)))
+        avg_loss = np.where(np.isnan(avg_loss), 1e-10, avg_loss)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+        rsi = K.bfill(K.ffill(np.where(self._valid, rsi, np.nan)))
+        rsi = np.where(np.isnan(rsi), 50.0, rsi)
+
+        # 数据不足 period+5 的股票与单股票版本一样输出 NaN、不产生信号
+        rsi = np.where(self._columns_with(ind.period + 5), rsi, np.nan)
+
+        return {
+            'RSI': rsi,
+            'RSI_Overbought': rsi >= ind.overbought,
+            'RSI_Oversold': rsi <= ind.oversold,
+            'RSI_Buy_Signal': K.crossed_above(rsi, ind.oversold),
+            'RSI_Sell_Signal': K.crossed_below(rsi, ind.overbought),
+        }
+
+    def _calc_bollinger_bands(self, ind) -> Dict[str, np.ndarray]:
+        price = self.field(ind.price_column)
+        middle = K.rolling_mean(price, ind.period)
+        std = K.rolling_std(price, ind.period)
+        upper = middle + std * ind.std_dev
+        lower = middle - std * ind.std_dev
+
+        above = price > upper
+        below = price < lower
+        band_width = upper - lower
+        with np.errstate(divide='ignore', invalid='ignore'):
+            width_change = (band_width / K.shift(band_width) - 1) * 100
+
+        window = ind.period * 2
+        width_rank = K.rolling_rank_pct(band_width, window)
+        extreme_squeeze = (width_rank < 0.2) & (self.counts > window)[None, :]
+
+        return {
+            'BB_Middle': middle,
+            'BB_Upper': upper,
+            'BB_Lower': lower,
+            'Price_Above_Upper': above,
+            'Price_Below_Lower': below,
+            'Price_In_Band': ~(above | below),
+            'BB_Squeeze': width_change < 0,
+            'BB_Expansion': width_change > 0,
+            'BB_Extreme_Squeeze': extreme_squeeze,
+            'BB_Breakout_Upper': K.crossed_above(price, upper),
+            'BB_Breakout_Lower': K.crossed_below(price, lower),
+            'BB_Return_From_Upper': (price <= upper) & (K.shift(price) > K.shift(upper)),
+            'BB_Return_From_Lower': (price >= lower) & (K.shift(price) < K.shift(lower)),
+        }
+
+    def _high_low_close(self):
+        return self.field('high_price'), self.field('low_price'), self.field('close_price')
+
+    @staticmethod
+    def _safe_range(highest: np.ndarray, lowest: np.ndarray) -> np.ndarray:
+        price_range = highest - lowest
+        return np.where(price_range == 0, 1e-10, price_range)
+
+    def _calc_stochastic(self, ind) -> Dict[str, np.ndarray]:
+        high, low, close = self._high_low_close()
+        lowest = K.rolling_min(low, ind.k_period)
+        price_range = self._safe_range(K.rolling_max(high, ind.k_period), lowest)
+
+        k_fast = K.rolling_mean(100 * ((close - lowest) / price_range), ind.smoothing)
+        d_slow = K.rolling_mean(k_fast, ind.d_period)
+        k_slow = K.rolling_mean(d_slow, ind.d_period)
+
+        overbought = k_fast >= ind.overbought_level
+        oversold = k_fast <= ind.oversold_level
+        golden = K.crossed_above(k_fast, d_slow)
+        death = K.crossed_below(k_fast, d_slow)
+        momentum = K.diff(k_fast)
+
+        bullish, bearish = K.divergence(close, k_fast, lookback=5)
+        long_enough = self._columns_with(31)
+
+        return {
+            'Stochastic_K_Fast': k_fast,
+            'Stochastic_D_Slow': d_slow,
+            'Stochastic_K_Slow': k_slow,
+            'Stochastic_Overbought': overbought,
+            'Stochastic_Oversold': oversold,
+            'Stochastic_Golden_Cross': golden,
+            'Stochastic_Death_Cross': death,
+            'Stochastic_Bullish_Divergence': bullish & long_enough,
+            'Stochastic_Bearish_Divergence': bearish & long_enough,
+            'Stochastic_Momentum_Up': momentum > 0,
+            'Stochastic_Momentum_Down': momentum < 0,
+            'Stochastic_Golden_in_Oversold': golden & K.shift(oversold),
+            'Stochastic_Death_in_Overbought': death & K.shift(overbought),
+        }
+
+    def _calc_williams_r(self, ind) -> Dict[str, np.ndarray]:
+        high, low, close = self._high_low_close()
+        highest = K.rolling_max(high, ind.period)
+        price_range = self._safe_range(highest, K.rolling_min(low, ind.period))
+        wr = ((highest - close) / price_range) * -100
+
+        overbought = wr >= ind.overbought_level
+        oversold = wr <= ind.oversold_level
+        momentum = K.diff(wr)
+        bullish, bearish = K.divergence(close, wr, lookback=10)
+        long_enough = self._columns_with(31)
+
+        return {
+            'Williams_R': wr,
+            'Williams_Overbought': overbought,
+            'Williams_Oversold': oversold,
+            'Williams_Extreme_Overbought': wr >= -10,
+            'Williams_Extreme_Oversold': wr <= -90,
+            'Williams_Above_Mid': wr > -50,
+            'Williams_Below_Mid': wr < -50,
+            'Williams_Cross_Mid_Up': K.crossed_above(wr, -50),
+            'Williams_Cross_Mid_Down': K.crossed_below(wr, -50),
+            'Williams_Momentum_Up': momentum > 0,
+            'Williams_Momentum_Down': momentum < 0,
+            'Williams_Break_Overbought': K.crossed_below(wr, ind.overbought_level),
+            'Williams_Break_Oversold': K.crossed_above(wr, ind.oversold_level),
+            'Williams_Bullish_Divergence': bullish & long_enough,
+            'Williams_Bearish_Divergence': bearish & long_enough,
+            'Williams_Overbought_Duration': K.run_length(overbought),
+            'Williams_Oversold_Duration': K.run_length(oversold & ~overbought),
+            'Williams_Trend_Strength': K.rolling_mean(np.abs(wr), 5),
+        }
+
+    def _calc_cci(self, ind) -> Dict[str, np.ndarray]:
+        high, low, close = self._high_low_close()
+        typical = (high + low + close) / 3
+        sma = K.rolling_mean(typical, ind.period)
+        mean_dev = K.rolling_mean_deviation(typical, ind.period)
+        mean_dev = np.where(mean_dev == 0, 1e-10, mean_dev)
+        cci = (typical - sma) / (ind.constant * mean_dev)
+
+        overbought = cci >= ind.overbought_level
+        oversold = cci <= ind.oversold_level
+        momentum = K.diff(cci)
+        bullish, bearish = K.divergence(close, cci, lookback=10)
+        long_enough = self._columns_with(31)
+
+        return {
+            'CCI': cci,
+            'CCI_Overbought': overbought,
+            'CCI_Oversold': oversold,
+            'CCI_Above_Zero': cci > 0,
+            'CCI_Below_Zero': cci < 0,
+            'CCI_Cross_Zero_Up': K.crossed_above(cci, 0),
+            'CCI_Cross_Zero_Down': K.crossed_below(cci, 0),
+            'CCI_Momentum_Up': momentum > 0,
+            'CCI_Momentum_Down': momentum < 0,
+            'CCI_Bullish_Divergence': bullish & long_enough,
+            'CCI_Bearish_Divergence': bearish & long_enough,
+            'CCI_Trend_Strength': K.rolling_mean(np.abs(cci), 5),
+            'CCI_Overbought_Duration': K.run_length(overbought),
+            'CCI_Oversold_Duration': K.run_length(oversold & ~overbought),
+        }
+
+    def _calc_obv(self, ind) -> Dict[str, np.ndarray]:
+        price = self.field(ind.price_column)
+        volume = self.field(ind.volume_column)
+
+        obv = K.obv(price, volume)
+
+        obv_change = K.diff(obv)
+        obv_ma20 = np.where(self._columns_with(20), K.rolling_mean(obv, 20), np.nan)
+        bullish, bearish = K.divergence(price, obv, lookback=10)
+        long_enough = self._columns_with(31)
+
+        return {
+            'OBV': obv,
+            'OBV_Increasing': obv_change > 0,
+            'OBV_Decreasing': obv_change < 0,
+            'OBV_MA20': obv_ma20,
+            'OBV_Above_MA20': obv > obv_ma20,
+            'OBV_Below_MA20': obv < obv_ma20,
+            'OBV_Bullish_Divergence': bullish & long_enough,
+            'OBV_Bearish_Divergence': bearish & long_enough,
+            'OBV_Break_Above_MA20': K.crossed_above(obv, obv_ma20),
+            'OBV_Break_Below_MA20': K.crossed_below(obv, obv_ma20),
+        }
+
+    # ------------------------------------------------------------------
+    # 回退：逐股票计算
+    # ------------------------------------------------------------------
+
+    def _calculate_per_symbol(self, indicator) -> Dict[str, np.ndarray]:
+        """未向量化的指标逐股票调用指标类，再拼回面板"""
+        inputs = {column: self.field(column) for column in indicator.get_required_columns()}
+        T, N = self.panel.shape
+        outputs: Dict[str, np.ndarray] = {}
+
+        for j in range(N):
+            count = int(self.counts[j])
+            if count == 0:
+                continue
+            df = pd.DataFrame({column: values[:count, j] for column, values in inputs.items()})
+            result = indicator.calculate(df)
+
+            for column in result.columns:
+                if column in inputs:
+                    continue
+                series = result[column]
+                if series.dtype == bool:
+                    values, fill = series.to_numpy(), False
+                else:
+                    values, fill = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64), np.nan
+                if column not in outputs:
+                    outputs[column] = np.full((T, N), fill, dtype=values.dtype)
+                outputs[column][:count, j] = values
+
+        return {column: self._restore(values) for column, values in outputs.items()}
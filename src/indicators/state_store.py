@@ -0,0 +1,120 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/indicators\state_store.py
+# File Name: state_store
+# @ Author: mango-gh22
+# @ Date：2026/10/17 18:30
+"""
+desc 增量指标状态持久化 - 每只股票一个 JSON 文件
+"""
+# src/indicators/state_store.py
+"""
+增量指标状态存储
+
+文件按统一写法的股票代码命名（见 symbol_key），600519.SH 与 sh600519 共用一个文件。
+文件内容: {状态键: {'last_date': 最后一根 bar 的日期, 'state': 指标状态, 'updated_at': 更新时间}}
+状态键由 BaseIndicator.get_state_key() 生成（指标名 + 参数摘要）。
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+from src.data.change_events import symbol_key
+
+logger = logging.getLogger(__name__)
+
+
+class IndicatorStateStore:
+    """增量指标状态存储（线程安全，原子写入）"""
+
+    def __init__(self, state_dir: str = "data/cache/indicator_state"):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _get_path(self, symbol: str) -> Path:
+        return self.state_dir / f"{symbol_key(symbol)}.json"
+
+    def _load(self, symbol: str) -> Dict:
+        path = self._get_path(symbol)
+        if not path.exists():
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            # 状态损坏时丢弃，调用方会全量重算
+            logger.warning(f"读取指标状态失败 {path}: {e}")
+            return {}
+
+    def get(self, symbol: str, state_key: str) -> Optional[Dict]:
+        """
+        获取指标状态
+
+        Returns:
+            {'last_date', 'state', 'updated_at'} 或 None
+        """
+        with self._lock:
+            return self._load(symbol).get(state_key)
+
+    def set(self, symbol: str, state_key: str, last_date: str, state: Dict):
+        """保存指标状态（先写临时文件再替换，避免中断时留下半个文件）"""
+        with self._lock:
+            data = self._load(symbol)
+            data[state_key] = {
+                'last_date': last_date,
+                'state': state,
+                'updated_at': datetime.now().isoformat()
+            }
+
+            path = self._get_path(symbol)
+            tmp_path = path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def invalidate(self, symbol: str, since_date: Optional[str] = None,
+                   changed_at: Optional[str] = None) -> int:
+        """
+        数据变更后删除受影响的状态
+
+        状态的 last_date >= since_date 时，状态已包含变更前的数据，需要重建；
+        since_date 为 None 表示全部状态。changed_at 不为 None 时只删除早于该时间更新的状态。
+
+        Returns:
+            删除的状态数
+        """
+        with self._lock:
+            data = self._load(symbol)
+            stale = [key for key, entry in data.items()
+                     if (since_date is None or entry.get('last_date', '') >= since_date)
+                     and (changed_at is None or entry.get('updated_at', '') < changed_at)]
+            if not stale:
+                return 0
+
+            for key in stale:
+                del data[key]
+            path = self._get_path(symbol)
+            if data:
+                tmp_path = path.with_suffix('.json.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            else:
+                path.unlink(missing_ok=True)
+
+        logger.info(f"数据变更清除指标状态: {symbol}, {len(stale)} 项")
+        return len(stale)
+
+    def clear(self, symbol: Optional[str] = None):
+        """清除指定股票（或全部）的状态"""
+        with self._lock:
+            paths = [self._get_path(symbol)] if symbol else list(self.state_dir.glob('*.json'))
+            for path in paths:
+                if path.exists():
+                    path.unlink()
+        logger.info(f"清除指标状态: {symbol or '全部'}")
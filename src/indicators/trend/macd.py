@@ -9,7 +9,7 @@ Desc: MACD指标 - 修复参数验证问题
 """
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from ..base_indicator import BaseIndicator, IndicatorType
 import logging
 
@@ -32,6 +32,10 @@ class MACD(BaseIndicator):
         'price_column': 'close_price'
     }
 
+    # MACD 信号最多回看两日（柱状图拐点需要前两日的 HIST）
+    SIGNAL_LOOKBACK = 2
+    STATE_OUTPUTS = ('MACD_DIF', 'MACD_DEA', 'MACD_HIST')
+
     def __init__(self, **parameters):
         """
         初始化MACD指标
@@ -120,6 +124,61 @@ class MACD(BaseIndicator):
         df['MACD_DIF_CROSS_ZERO_UP'] = (df['MACD_DIF'] > 0) & (df['MACD_DIF'].shift(1) <= 0)
         df['MACD_DIF_CROSS_ZERO_DOWN'] = (df['MACD_DIF'] < 0) & (df['MACD_DIF'].shift(1) >= 0)
 
+    def get_incremental_lookback(self) -> Optional[int]:
+        return self.SIGNAL_LOOKBACK
+
+    def _init_recursive_state(self, prepared: pd.DataFrame) -> Dict:
+        price_series = prepared[self.price_column]
+        ema_fast = price_series.ewm(span=self.fast_period, adjust=False).mean()
+        ema_slow = price_series.ewm(span=self.slow_period, adjust=False).mean()
+        dif = ema_fast - ema_slow
+        dea = dif.ewm(span=self.signal_period, adjust=False).mean()
+        tail = pd.DataFrame({'MACD_DIF': dif, 'MACD_DEA': dea, 'MACD_HIST': (dif - dea) * 2})
+        return {
+            'ema_fast': float(ema_fast.iloc[-1]),
+            'ema_slow': float(ema_slow.iloc[-1]),
+            'outputs': self._output_tail(tail),
+        }
+
+    def _output_tail(self, df: pd.DataFrame) -> Dict[str, List]:
+        tail = df[list(self.STATE_OUTPUTS)].tail(self.SIGNAL_LOOKBACK)
+        return {col: tail[col].astype(float).tolist() for col in self.STATE_OUTPUTS}
+
+    def update(self, state: Dict, new_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+        """三条 EMA 按递推公式推进，信号在 前两日 + 新数据 上计算"""
+        if new_df.empty:
+            return new_df.copy(), state
+
+        combined = self._combine_with_tail(state, new_df)
+        n_tail = len(combined) - len(new_df)
+        prices = combined[self.price_column].to_numpy(dtype=np.float64)[n_tail:]
+
+        alpha_fast = 2.0 / (self.fast_period + 1.0)
+        alpha_slow = 2.0 / (self.slow_period + 1.0)
+        alpha_signal = 2.0 / (self.signal_period + 1.0)
+        ema_fast, ema_slow = state['ema_fast'], state['ema_slow']
+        dea = state['outputs']['MACD_DEA'][-1]
+
+        dif_values, dea_values = [], []
+        for price in prices:
+            ema_fast = (1.0 - alpha_fast) * ema_fast + alpha_fast * price
+            ema_slow = (1.0 - alpha_slow) * ema_slow + alpha_slow * price
+            dif = ema_fast - ema_slow
+            dea = (1.0 - alpha_signal) * dea + alpha_signal * dif
+            dif_values.append(dif)
+            dea_values.append(dea)
+
+        tail_outputs = {col: values[-n_tail:] if n_tail else [] for col, values in state['outputs'].items()}
+        combined['MACD_DIF'] = tail_outputs['MACD_DIF'] + dif_values
+        combined['MACD_DEA'] = tail_outputs['MACD_DEA'] + dea_values
+        combined['MACD_HIST'] = (combined['MACD_DIF'] - combined['MACD_DEA']) * 2
+        self._add_macd_signals(combined)
+
+        result = combined.iloc[n_tail:]
+        result.index = new_df.index
+        return result, self._advance_state(state, combined, ema_fast=float(ema_fast),
+                                           ema_slow=float(ema_slow), outputs=self._output_tail(combined))
+
     def validate_parameters(self) -> bool:
         """验证参数有效性"""
         # 通过 self.parameters 访问参数
@@ -9,7 +9,7 @@ Desc: 移动平均线指标 - 适配新设计
 """
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from ..base_indicator import BaseIndicator, IndicatorType
 import logging
 
@@ -127,6 +127,47 @@ class MovingAverage(BaseIndicator):
                         (df[short_col].shift(1) >= df[long_col].shift(1))
                     )
 
+    def get_incremental_lookback(self) -> Optional[int]:
+        """SMA 回放最长周期窗口（含交叉信号需要的前一日）；EMA 只需前一日"""
+        return 1 if self.ma_type.lower() == 'ema' else max(self.periods)
+
+    def _init_recursive_state(self, prepared: pd.DataFrame) -> Dict:
+        if self.ma_type.lower() != 'ema':
+            return {}
+        price_series = prepared[self.price_column]
+        return {'ema': {str(period): float(price_series.ewm(span=period, adjust=False).mean().iloc[-1])
+                        for period in self.periods}}
+
+    def update(self, state: Dict, new_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+        """EMA 按递推公式推进，SMA 使用默认的窗口回放"""
+        if self.ma_type.lower() != 'ema' or new_df.empty:
+            return super().update(state, new_df)
+
+        # 第 0 行为上一根 bar，其 EMA 即状态值
+        combined = self._combine_with_tail(state, new_df)
+        prices = combined[self.price_column].to_numpy(dtype=np.float64)
+
+        ema_state = {}
+        for period in self.periods:
+            alpha = 2.0 / (period + 1.0)
+            values = np.empty(len(prices))
+            values[0] = state['ema'][str(period)]
+            for i in range(1, len(prices)):
+                values[i] = (1.0 - alpha) * values[i - 1] + alpha * prices[i]
+
+            column_name = f'EMA_{period}'
+            combined[column_name] = values
+            if period <= 60:
+                combined[f'{column_name}_Signal'] = combined[self.price_column] > combined[column_name]
+            ema_state[str(period)] = float(values[-1])
+
+        if len(self.periods) >= 2:
+            self._add_cross_signals(combined)
+
+        result = combined.iloc[1:]
+        result.index = new_df.index
+        return result, self._advance_state(state, combined, ema=ema_state)
+
     def validate_parameters(self) -> bool:
         """验证参数有效性"""
         periods = self.parameters['periods']
@@ -9,8 +9,9 @@ desc 抛物线指标（Parabolic SAR）- 用于判断趋势反转点
 
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from ..base_indicator import BaseIndicator, IndicatorType
+from .. import kernels
 import logging
 
 logger = logging.getLogger(__name__)
@@ -86,76 +87,52 @@ class ParabolicSAR(BaseIndicator):
 
         return result_df
 
-    def _calculate_sar(self, df: pd.DataFrame) -> pd.Series:
-        """计算SAR值"""
+    def _calculate_sar(self, df: pd.DataFrame, state: list = None, prev_sar: float = None) -> pd.Series:
+        """计算SAR值（逐 bar 递推内核，安装 numba 时编译执行；state 见 kernels.parabolic_sar）"""
         high = df['high_price'] if self.use_high_low else df['close_price']
         low = df['low_price'] if self.use_high_low else df['close_price']
         close = df['close_price']
 
-        # 初始化数组
-        sar = np.zeros(len(df))
-        trend = np.zeros(len(df))  # 1表示上升趋势，-1表示下降趋势
-        acceleration = np.zeros(len(df))
-        extreme_point = np.zeros(len(df))
-
-        # 初始化第一个值
-        sar[0] = low[0] if close[1] > close[0] else high[0]
-        trend[0] = 1 if close[1] > close[0] else -1
-        acceleration[0] = self.acceleration_factor
-        extreme_point[0] = high[0] if trend[0] == 1 else low[0]
-
-        # 计算SAR
-        for i in range(1, len(df)):
-            prev_trend = trend[i - 1]
-
-            if prev_trend == 1:  # 上升趋势
-                # 计算当前SAR
-                sar[i] = sar[i - 1] + acceleration[i - 1] * (extreme_point[i - 1] - sar[i - 1])
-
-                # 检查是否需要反转
-                if low[i] < sar[i]:
-                    # 趋势反转
-                    trend[i] = -1
-                    sar[i] = max(high[i - 1], high[i])
-                    acceleration[i] = self.acceleration_factor
-                    extreme_point[i] = low[i]
-                else:
-                    # 继续上升趋势
-                    trend[i] = 1
-                    acceleration[i] = acceleration[i - 1]
-                    extreme_point[i] = extreme_point[i - 1]
-
-                    # 更新极值点
-                    if high[i] > extreme_point[i - 1]:
-                        extreme_point[i] = high[i]
-                        acceleration[i] = min(acceleration[i - 1] + self.acceleration_factor,
-                                              self.acceleration_max)
-
-            else:  # 下降趋势
-                # 计算当前SAR
-                sar[i] = sar[i - 1] + acceleration[i - 1] * (extreme_point[i - 1] - sar[i - 1])
-
-                # 检查是否需要反转
-                if high[i] > sar[i]:
-                    # 趋势反转
-                    trend[i] = 1
-                    sar[i] = min(low[i - 1], low[i])
-                    acceleration[i] = self.acceleration_factor
-                    extreme_point[i] = high[i]
-                else:
-                    # 继续下降趋势
-                    trend[i] = -1
-                    acceleration[i] = acceleration[i - 1]
-                    extreme_point[i] = extreme_point[i - 1]
-
-                    # 更新极值点
-                    if low[i] < extreme_point[i - 1]:
-                        extreme_point[i] = low[i]
-                        acceleration[i] = min(acceleration[i - 1] + self.acceleration_factor,
-                                              self.acceleration_max)
-
+        sar = kernels.parabolic_sar(
+            high.to_numpy(dtype=np.float64),
+            low.to_numpy(dtype=np.float64),
+            close.to_numpy(dtype=np.float64),
+            self.acceleration_factor,
+            self.acceleration_max,
+            state=state,
+            prev_sar=prev_sar
+        )
         return pd.Series(sar, index=df.index)
 
+    def get_incremental_lookback(self) -> Optional[int]:
+        """转折信号需要前两日的 SAR"""
+        return 2
+
+    def _init_recursive_state(self, prepared: pd.DataFrame) -> Dict:
+        trend_state = [0.0, 0.0, 0.0]
+        sar = self._calculate_sar(prepared, state=trend_state)
+        return {'trend': trend_state, 'sar': sar.tail(self.get_incremental_lookback()).tolist()}
+
+    def update(self, state: Dict, new_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+        """从上一根 bar 的趋势/加速因子/极值点继续递推"""
+        if new_df.empty:
+            return new_df.copy(), state
+
+        combined = self._combine_with_tail(state, new_df)
+        n_tail = len(combined) - len(new_df)
+
+        # 第 0 行为上一根 bar，其 SAR 已知
+        trend_state = list(state['trend'])
+        sar = self._calculate_sar(combined.iloc[n_tail - 1:], state=trend_state, prev_sar=state['sar'][-1])
+        combined['Parabolic_SAR'] = np.concatenate([state['sar'][-n_tail:-1], sar.to_numpy()])
+        self._add_sar_signals(combined)
+
+        result = combined.iloc[n_tail:]
+        result.index = new_df.index
+        return result, self._advance_state(
+            state, combined, trend=trend_state,
+            sar=combined['Parabolic_SAR'].tail(self.get_incremental_lookback()).tolist())
+
     def _add_sar_signals(self, df: pd.DataFrame):
         """添加SAR信号"""
         if 'Parabolic_SAR' not in df.columns:
@@ -9,7 +9,7 @@ Desc: 布林带指标 - 修复参数验证问题
 """
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import List, Optional
 from ..base_indicator import BaseIndicator, IndicatorType
 import logging
 
@@ -122,6 +122,10 @@ class BollingerBands(BaseIndicator):
         df['BB_Return_From_Lower'] = (price_series >= df['BB_Lower']) & \
                                      (price_series.shift(1) < df['BB_Lower'].shift(1))
 
+    def get_incremental_lookback(self) -> Optional[int]:
+        """带宽排名回看 2 倍周期的带宽，每个带宽又需要 1 个周期的价格"""
+        return self.period * 3
+
     def validate_parameters(self) -> bool:
         """验证参数有效性"""
         # 通过 self.parameters 访问参数
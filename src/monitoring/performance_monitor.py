@@ -46,6 +46,7 @@ class PerformanceMetrics:
     cache_hit_rate: float = 0.0
     query_latency_ms: float = 0.0
     parallel_efficiency: float = 0.0
+    system_cpu_percent: float = 0.0  # 全部核心的平均使用率（含子进程和其他进程）
 
 
 class PerformanceMonitor:
@@ -76,6 +77,7 @@ class PerformanceMonitor:
             self.last_cpu_times = self._get_cpu_times()
             self.last_disk_io = psutil.disk_io_counters()
             self.last_net_io = psutil.net_io_counters()
+            psutil.cpu_percent(interval=None)  # 系统 CPU 基准，下次调用返回区间平均值
             self.last_update = time.time()
             time.sleep(0.1)  # 确保第二次采样有效
             logger.debug("初始采样完成")
@@ -186,6 +188,12 @@ class PerformanceMonitor:
         self.last_cpu_times = current_cpu_times
         self.last_update = time.time()
 
+        # 系统 CPU 使用率（距上次调用的平均值）
+        try:
+            system_cpu_percent = psutil.cpu_percent(interval=None)
+        except Exception:
+            system_cpu_percent = 0.0
+
         # 收集其他指标（独立异常捕获）
         try:
             memory = psutil.virtual_memory()
@@ -240,7 +248,8 @@ class PerformanceMonitor:
             network_io_sent_mb=net_sent_mb,
             network_io_recv_mb=net_recv_mb,
             active_threads=threading.active_count(),
-            open_files=open_files
+            open_files=open_files,
+            system_cpu_percent=system_cpu_percent
         )
 
     def _check_thresholds(self, metrics: PerformanceMetrics):
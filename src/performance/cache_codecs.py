@@ -0,0 +1,244 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/performance\cache_codecs.py
+# File Name: cache_codecs
+# @ Author: mango-gh22
+# @ Date：2026/10/17 21:10
+"""
+desc 缓存编解码 - 可插拔压缩算法 + DataFrame/ndarray 免 pickle 序列化
+"""
+# src/performance/cache_codecs.py
+"""
+缓存编解码
+
+数据块格式: MAGIC(4) + 序列化方式(1) + 压缩算法(1) + 载荷
+- 序列化方式: pickle / arrow (DataFrame 写为 Arrow IPC 流) / numpy (ndarray 原始缓冲区)
+- 压缩算法: none / zlib / lz4 / zstd（lz4、zstd 需要安装对应的包）
+数据块自描述，更换编解码配置后旧数据仍可读取；没有 MAGIC 的数据按旧格式
+（pickle + zlib）解码。
+"""
+
+import json
+import pickle
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+import logging
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    HAS_PYARROW = False
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'\x93SC1'
+HEADER_SIZE = len(MAGIC) + 2
+
+SERIALIZERS = {'pickle': 0, 'arrow': 1, 'numpy': 2}
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'lz4': 2, 'zstd': 3}
+_SERIALIZER_NAMES = {v: k for k, v in SERIALIZERS.items()}
+_COMPRESSION_NAMES = {v: k for k, v in COMPRESSIONS.items()}
+
+
+def available_compressions() -> Dict[str, bool]:
+    """各压缩算法是否可用"""
+    return {'none': True, 'zlib': True, 'lz4': lz4_frame is not None, 'zstd': zstandard is not None}
+
+
+def _compress(data: bytes, compression: str, level: Optional[int]) -> bytes:
+    if compression == 'none':
+        return data
+    if compression == 'zlib':
+        return zlib.compress(data, -1 if level is None else level)
+    if compression == 'lz4':
+        return lz4_frame.compress(data, compression_level=level or 0)
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+
+def _decompress(data: Union[bytes, memoryview], compression: str) -> Union[bytes, memoryview]:
+    if compression == 'none':
+        return data
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    if compression == 'lz4':
+        if lz4_frame is None:
+            raise ValueError("缓存数据使用 lz4 压缩，但未安装 lz4")
+        return lz4_frame.decompress(data)
+    if zstandard is None:
+        raise ValueError("缓存数据使用 zstd 压缩，但未安装 zstandard")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _serialize(value: Any, serializer: str) -> Tuple[bytes, str]:
+    """序列化，返回 (字节, 实际使用的序列化方式)"""
+    if serializer in ('auto', 'arrow') and isinstance(value, pd.DataFrame) and HAS_PYARROW:
+        try:
+            table = pa.Table.from_pandas(value, preserve_index=True)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes(), 'arrow'
+        except (ValueError, TypeError, pa.ArrowNotImplementedError) as e:
+            # ArrowInvalid/ArrowTypeError 分别是 ValueError/TypeError 的子类；重复列名时 from_pandas 抛普通 ValueError
+            logger.debug(f"无法转换为 Arrow，回退为 pickle: {e}")
+
+    # dtype.str 无法表达结构化/子数组 dtype，这类数组走 pickle
+    if (serializer in ('auto', 'numpy') and isinstance(value, np.ndarray)
+            and value.dtype != object and value.dtype.fields is None and value.dtype.subdtype is None):
+        array = np.ascontiguousarray(value)
+        header = json.dumps({'dtype': array.dtype.str, 'shape': array.shape}).encode()
+        return struct.pack('<I', len(header)) + header + array.tobytes(), 'numpy'
+
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 'pickle'
+
+
+def _deserialize(payload: Union[bytes, memoryview], serializer: str) -> Any:
+    if serializer == 'arrow':
+        if not HAS_PYARROW:
+            raise ValueError("缓存数据为 Arrow 格式，但未安装 pyarrow")
+        return pa.ipc.open_stream(pa.py_buffer(payload)).read_all().to_pandas()
+
+    if serializer == 'numpy':
+        (header_size,) = struct.unpack_from('<I', payload)
+        header = json.loads(bytes(payload[4:4 + header_size]))
+        array = np.frombuffer(payload, dtype=np.dtype(header['dtype']),
+                              offset=4 + header_size).reshape(header['shape'])
+        # 载荷不可写（如解压得到的 bytes）时复制一份，调用方可以原地修改
+        return array if array.flags.writeable else array.copy()
+
+    return pickle.loads(payload)
+
+
+class CacheCodec:
+    """缓存编解码器：序列化方式 + 压缩算法"""
+
+    def __init__(self, compression: str = 'zlib', level: Optional[int] = None,
+                 serializer: str = 'auto'):
+        """
+        初始化编解码器
+
+        Args:
+            compression: none / zlib / lz4 / zstd，未安装时回退为 zlib
+            level: 压缩级别（None 表示算法默认值）
+            serializer: auto（DataFrame 用 Arrow、ndarray 用原始缓冲区，其余 pickle）/ arrow / numpy / pickle
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩算法: {compression}")
+        if serializer != 'auto' and serializer not in SERIALIZERS:
+            raise ValueError(f"不支持的序列化方式: {serializer}")
+
+        if not available_compressions()[compression]:
+            logger.warning(f"未安装 {compression}，缓存压缩回退为 zlib")
+            compression, level = 'zlib', None
+
+        self.compression = compression
+        self.level = level
+        self.serializer = serializer
+
+    @classmethod
+    def from_config(cls, config: Union[None, str, Dict]) -> 'CacheCodec':
+        """
+        从配置创建
+
+        config 可以是压缩算法名（如 'lz4'），或
+        {'compression': 'zstd', 'level': 3, 'serializer': 'auto'}
+        """
+        if config is None:
+            return cls()
+        if isinstance(config, str):
+            return cls(compression=config)
+        return cls(compression=config.get('compression', 'zlib'),
+                   level=config.get('level'),
+                   serializer=config.get('serializer', 'auto'))
+
+    @property
+    def name(self) -> str:
+        return f"{self.serializer}/{self.compression}"
+
+    def encode(self, value: Any) -> Tuple[bytes, str, int]:
+        """
+        编码
+
+        Returns:
+            (数据块, 统计标签 '序列化方式/压缩算法', 序列化后未压缩的字节数)
+        """
+        payload, serializer = _serialize(value, self.serializer)
+        header = MAGIC + bytes((SERIALIZERS[serializer], COMPRESSIONS[self.compression]))
+        blob = header + _compress(payload, self.compression, self.level)
+        return blob, f"{serializer}/{self.compression}", len(payload)
+
+    @staticmethod
+    def decode(blob: Union[bytes, bytearray]) -> Tuple[Any, str, int]:
+        """
+        解码（按数据块头部选择序列化方式和压缩算法）
+
+        Returns:
+            (值, 统计标签, 序列化后未压缩的字节数)
+        """
+        if not blob.startswith(MAGIC):
+            # 旧格式: pickle + zlib
+            payload = zlib.decompress(blob)
+            return pickle.loads(payload), 'pickle/zlib', len(payload)
+
+        serializer = _SERIALIZER_NAMES[blob[len(MAGIC)]]
+        compression = _COMPRESSION_NAMES[blob[len(MAGIC) + 1]]
+        payload = _decompress(memoryview(blob)[HEADER_SIZE:], compression)
+        return _deserialize(payload, serializer), f"{serializer}/{compression}", len(payload)
+
+
+class CodecStats:
+    """按编解码标签统计耗时和压缩率（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, label: str, operation: str, seconds: float, raw_bytes: int, stored_bytes: int):
+        """
+        记录一次编码或解码
+
+        Args:
+            label: 编解码标签
+            operation: 'encode' 或 'decode'
+        """
+        with self._lock:
+            item = self._stats.setdefault(label, {
+                'encodes': 0, 'encode_seconds': 0.0, 'decodes': 0, 'decode_seconds': 0.0,
+                'raw_bytes': 0, 'stored_bytes': 0
+            })
+            item[f'{operation}s'] += 1
+            item[f'{operation}_seconds'] += seconds
+            if operation == 'encode':
+                item['raw_bytes'] += raw_bytes
+                item['stored_bytes'] += stored_bytes
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各标签的次数、平均耗时（毫秒）和压缩率（未压缩/压缩后）"""
+        with self._lock:
+            result = {}
+            for label, item in self._stats.items():
+                result[label] = {
+                    'encodes': item['encodes'],
+                    'decodes': item['decodes'],
+                    'avg_encode_ms': item['encode_seconds'] / item['encodes'] * 1000 if item['encodes'] else 0,
+                    'avg_decode_ms': item['decode_seconds'] / item['decodes'] * 1000 if item['decodes'] else 0,
+                    'raw_bytes': item['raw_bytes'],
+                    'stored_bytes': item['stored_bytes'],
+                    'ratio': item['raw_bytes'] / item['stored_bytes'] if item['stored_bytes'] else 0,
+                }
+            return result
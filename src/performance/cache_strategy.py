@@ -11,10 +11,11 @@ desc
 File: src/performance/cache_strategy.py
 Desc: 缓存策略 - 智能缓存管理和优化
 """
+import os
 import json
 import pickle
 import hashlib
-import zlib
+import sqlite3
 from typing import Dict, List, Optional, Any, Tuple, Set
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -27,6 +28,8 @@ import numpy as np
 from collections import OrderedDict, defaultdict
 import time
 
+from .cache_codecs import CacheCodec, CodecStats
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,6 +37,7 @@ class CacheLevel(Enum):
     """缓存级别"""
     MEMORY = "memory"  # 内存缓存（最快）
     DISK = "disk"  # 磁盘缓存（中等）
+    SHARED = "shared"  # 同主机多进程共享缓存（SQLite）
     DISTRIBUTED = "distributed"  # 分布式缓存（最慢）
 
 
@@ -541,6 +545,12 @@ class MultiLevelCache:
             CacheLevel.DISK, l2_config
         )
 
+        # 共享缓存（可选）：同主机多个进程之间共享结果
+        if 'shared' in self.config:
+            self.caches[CacheLevel.SHARED] = self._create_cache(
+                CacheLevel.SHARED, self.config['shared']
+            )
+
         # L3: 分布式缓存（可选）
         if 'l3' in self.config:
             l3_config = self.config['l3']
@@ -568,7 +578,12 @@ class MultiLevelCache:
         if level == CacheLevel.MEMORY:
             return strategy_class(max_size)
         elif level == CacheLevel.DISK:
-            return DiskCache(strategy_class, max_size, config.get('cache_dir'))
+            return DiskCache(strategy_class, max_size, config.get('cache_dir'),
+                             codec=CacheCodec.from_config(config.get('codec')))
+        elif level == CacheLevel.SHARED:
+            return SharedCache(max_size, config.get('path'),
+                               codec=CacheCodec.from_config(config.get('codec')),
+                               busy_timeout=config.get('busy_timeout', 30.0))
         else:
             # 分布式缓存（简化实现）
             return strategy_class(max_size)
@@ -589,6 +604,15 @@ class MultiLevelCache:
             self.stats['l1_hits'] += 1
             return value
 
+        # 尝试从共享缓存获取（可能是其他进程写入的）
+        if CacheLevel.SHARED in self.caches:
+            value = self.caches[CacheLevel.SHARED].get(key)
+            if value is not None:
+                self.stats['shared_hits'] += 1
+                # 写回到L1
+                self.caches[CacheLevel.MEMORY].set(key, value)
+                return value
+
         # 尝试从L2获取
         value = self.caches[CacheLevel.DISK].get(key)
         if value is not None:
@@ -611,7 +635,7 @@ class MultiLevelCache:
         return None
 
     def set(self, key: str, value: Any, level: CacheLevel = None,
-            ttl: Optional[timedelta] = None):
+            ttl: Optional[timedelta] = None, codec: Optional[CacheCodec] = None):
         """
         设置缓存项（多级）
 
@@ -620,18 +644,28 @@ class MultiLevelCache:
             value: 缓存值
             level: 缓存级别（None表示所有级别）
             ttl: 生存时间
+            codec: 序列化缓存使用的编解码器（None表示该级别的默认编解码器）
         """
         if level is None:
             # 写入所有级别
             for cache_level, cache in self.caches.items():
-                cache.set(key, value, ttl)
+                self._set_level(cache, key, value, ttl, codec)
             self.stats['sets'] += 1
         else:
             # 只写入指定级别
             if level in self.caches:
-                self.caches[level].set(key, value, ttl)
+                self._set_level(self.caches[level], key, value, ttl, codec)
                 self.stats['sets'] += 1
 
+    @staticmethod
+    def _set_level(cache: BaseCacheStrategy, key: str, value: Any,
+                   ttl: Optional[timedelta], codec: Optional[CacheCodec]):
+        """写入一个级别（内存级别不序列化，忽略编解码器）"""
+        if codec is not None and hasattr(cache, 'codec'):
+            cache.set(key, value, ttl, codec=codec)
+        else:
+            cache.set(key, value, ttl)
+
     def delete(self, key: str, level: CacheLevel = None) -> int:
         """
         删除缓存项
@@ -680,8 +714,15 @@ class MultiLevelCache:
             level_stats = cache.get_stats()
             stats[f'{level.value}_stats'] = level_stats
 
+        # 编解码统计（各序列化级别合并）
+        stats['codecs'] = {}
+        for cache in self.caches.values():
+            if hasattr(cache, 'codec_stats'):
+                stats['codecs'].update(cache.codec_stats.snapshot())
+
         # 计算命中率
         total_hits = (stats.get('l1_hits', 0) +
+                      stats.get('shared_hits', 0) +
                       stats.get('l2_hits', 0) +
                       stats.get('l3_hits', 0))
         total_access = total_hits + stats.get('misses', 0)
@@ -698,6 +739,12 @@ class MultiLevelCache:
 
         return stats
 
+    def close(self):
+        """关闭各级缓存（磁盘缓存写回访问统计）"""
+        for cache in self.caches.values():
+            if hasattr(cache, 'close'):
+                cache.close()
+
     def prefetch(self, keys: List[str]):
         """预取缓存项"""
         # 这里可以实现智能预取逻辑
@@ -723,9 +770,34 @@ class MultiLevelCache:
 
 
 class DiskCache(BaseCacheStrategy):
-    """磁盘缓存实现"""
+    """
+    磁盘缓存实现
+
+    数据文件为 <cache_dir>/<md5(key)>.cache（编码格式见 cache_codecs），索引存放在
+    <cache_dir>/index.sqlite（WAL 模式），每次写入/删除只改一行。
+    命中时的访问统计（last_accessed/access_count）先记在内存里，
+    达到 ACCESS_FLUSH_SIZE 条或距上次写回超过 ACCESS_FLUSH_INTERVAL 秒时批量写回，
+    清理空间、获取统计和关闭时也会写回。进程异常退出最多丢失一批访问统计。
+    """
+
+    INDEX_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS disk_index (
+            cache_key TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            last_accessed REAL NOT NULL,
+            size INTEGER NOT NULL,
+            ttl REAL,
+            metadata TEXT,
+            access_count INTEGER DEFAULT 0
+        )
+    """
+
+    # 访问统计批量写回阈值
+    ACCESS_FLUSH_SIZE = 512
+    ACCESS_FLUSH_INTERVAL = 5.0  # 秒
 
-    def __init__(self, strategy_class, max_size: int, cache_dir: str):
+    def __init__(self, strategy_class, max_size: int, cache_dir: str,
+                 codec: Optional[CacheCodec] = None):
         """
         初始化磁盘缓存
 
@@ -733,40 +805,66 @@ class DiskCache(BaseCacheStrategy):
             strategy_class: 缓存策略类
             max_size: 最大大小（MB）
             cache_dir: 缓存目录
+            codec: 默认编解码器（None 表示 zlib 压缩 + 自动选择序列化方式）
         """
         super().__init__(max_size)
+        self.codec = codec or CacheCodec()
+        self.codec_stats = CodecStats()
         self.strategy = strategy_class(max_size)
-        self.cache_dir = Path(cache_dir)
+        self.cache_dir = Path(cache_dir or 'data/cache/disk')
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
-        # 索引文件
-        self.index_file = self.cache_dir / 'index.json'
-        self.index = self._load_index()
+        # 索引数据库
+        self.index_file = self.cache_dir / 'index.sqlite'
+        self._conn = sqlite3.connect(str(self.index_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self.INDEX_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_disk_last_accessed ON disk_index (last_accessed)")
+        self._conn.commit()
+        self._migrate_json_index()
+
+        # 待写回的访问统计: key -> [最后访问时间, 新增访问次数]
+        self._pending_access: Dict[str, List] = {}
+        self._last_flush = time.monotonic()
+
+        count, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM disk_index").fetchone()
+        self.stats['total_items'] = count
+        self.stats['size'] = size
 
         # 启动清理线程
+        self._closed = threading.Event()
         self.cleanup_thread = threading.Thread(
             target=self._cleanup_loop,
             daemon=True
         )
         self.cleanup_thread.start()
 
-    def _load_index(self) -> Dict[str, Dict]:
-        """加载索引"""
-        if self.index_file.exists():
-            try:
-                with open(self.index_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def _save_index(self):
-        """保存索引"""
+    def _migrate_json_index(self):
+        """导入旧版 index.json 索引（导入后删除）"""
+        json_index = self.cache_dir / 'index.json'
+        if not json_index.exists():
+            return
+
         try:
-            with open(self.index_file, 'w') as f:
-                json.dump(self.index, f)
+            with open(json_index, 'r') as f:
+                index = json.load(f)
+            rows = []
+            for key, info in index.items():
+                created_at = datetime.fromisoformat(info['created_at']).timestamp()
+                last_accessed = datetime.fromisoformat(
+                    info.get('last_accessed') or info['created_at']).timestamp()
+                rows.append((key, created_at, last_accessed, info.get('size', 0), info.get('ttl'),
+                             json.dumps(info.get('metadata') or {}, default=str),
+                             info.get('access_count', 0)))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO disk_index VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            json_index.unlink()
+            logger.info(f"磁盘缓存索引已迁移到 SQLite: {len(rows)} 项")
         except Exception as e:
-            logger.error(f"保存索引失败: {e}")
+            logger.error(f"迁移旧索引失败: {e}")
 
     def _get_cache_path(self, key: str) -> Path:
         """获取缓存文件路径"""
@@ -774,86 +872,116 @@ class DiskCache(BaseCacheStrategy):
         key_hash = hashlib.md5(key.encode()).hexdigest()
         return self.cache_dir / f"{key_hash}.cache"
 
-    def get(self, key: str) -> Optional[Any]:
-        """获取缓存项"""
-        # 先检查内存索引
-        if key not in self.index:
-            self.stats['misses'] += 1
-            return None
+    def _record_access(self, key: str):
+        """记录一次命中，按数量或时间阈值批量写回"""
+        pending = self._pending_access.get(key)
+        if pending is None:
+            self._pending_access[key] = [time.time(), 1]
+        else:
+            pending[0] = time.time()
+            pending[1] += 1
 
-        # 检查是否过期
-        item_info = self.index[key]
-        created_at = datetime.fromisoformat(item_info['created_at'])
-        ttl = timedelta(seconds=item_info.get('ttl', 0))
+        if (len(self._pending_access) >= self.ACCESS_FLUSH_SIZE or
+                time.monotonic() - self._last_flush >= self.ACCESS_FLUSH_INTERVAL):
+            self.flush()
 
-        if ttl and datetime.now() - created_at > ttl:
-            # 已过期，删除
-            self.delete(key)
-            self.stats['misses'] += 1
-            return None
+    def flush(self):
+        """把缓冲的访问统计写回索引"""
+        with self.lock:
+            self._last_flush = time.monotonic()
+            if not self._pending_access:
+                return
+            rows = [(last, count, key) for key, (last, count) in self._pending_access.items()]
+            self._pending_access.clear()
+            try:
+                self._conn.executemany(
+                    "UPDATE disk_index SET last_accessed = ?, access_count = access_count + ? "
+                    "WHERE cache_key = ?", rows)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"写回访问统计失败: {e}")
 
-        # 从磁盘加载
-        cache_path = self._get_cache_path(key)
-        if not cache_path.exists():
-            self.delete(key)
-            self.stats['misses'] += 1
-            return None
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存项"""
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT created_at, ttl FROM disk_index WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
 
-        try:
-            with open(cache_path, 'rb') as f:
-                # 解压缩
-                compressed_data = f.read()
-                data = zlib.decompress(compressed_data)
-                value = pickle.loads(data)
+            # 检查是否过期
+            created_at, ttl = row
+            if ttl and time.time() - created_at > ttl:
+                # 已过期，删除
+                self.delete(key)
+                self.stats['misses'] += 1
+                return None
+
+            # 从磁盘加载
+            cache_path = self._get_cache_path(key)
+            try:
+                with open(cache_path, 'rb') as f:
+                    # 读入可写缓冲区，未压缩的 ndarray 可直接引用
+                    blob = bytearray(os.fstat(f.fileno()).st_size)
+                    f.readinto(blob)
+                start = time.perf_counter()
+                value, label, raw_size = CacheCodec.decode(blob)
+                self.codec_stats.record(label, 'decode', time.perf_counter() - start, raw_size, len(blob))
+            except FileNotFoundError:
+                self.delete(key)
+                self.stats['misses'] += 1
+                return None
+            except Exception as e:
+                logger.error(f"加载缓存失败 {key}: {e}")
+                self.delete(key)
+                self.stats['misses'] += 1
+                return None
 
-            # 更新访问信息
-            item_info['last_accessed'] = datetime.now().isoformat()
-            item_info['access_count'] = item_info.get('access_count', 0) + 1
-            self._save_index()
+            # 更新访问信息（批量写回）
+            self._record_access(key)
 
             self.stats['hits'] += 1
             return value
 
-        except Exception as e:
-            logger.error(f"加载缓存失败 {key}: {e}")
-            self.delete(key)
-            self.stats['misses'] += 1
-            return None
-
     def set(self, key: str, value: Any, ttl: Optional[timedelta] = None,
-            metadata: Optional[Dict] = None):
-        """设置缓存项"""
+            metadata: Optional[Dict] = None, codec: Optional[CacheCodec] = None):
+        """设置缓存项（codec 为 None 时使用默认编解码器）"""
         try:
             # 序列化和压缩数据
-            data = pickle.dumps(value)
-            compressed_data = zlib.compress(data)
+            start = time.perf_counter()
+            compressed_data, label, raw_size = (codec or self.codec).encode(value)
+            self.codec_stats.record(label, 'encode', time.perf_counter() - start,
+                                    raw_size, len(compressed_data))
 
             # 计算大小
             size = len(compressed_data)
 
-            # 检查空间
-            if self._needs_cleanup(size):
-                self._cleanup(size)
+            with self.lock:
+                # 覆盖已有项时先删除旧项
+                self.delete(key)
 
-            # 保存到磁盘
-            cache_path = self._get_cache_path(key)
-            with open(cache_path, 'wb') as f:
-                f.write(compressed_data)
-
-            # 更新索引
-            self.index[key] = {
-                'created_at': datetime.now().isoformat(),
-                'last_accessed': datetime.now().isoformat(),
-                'size': size,
-                'ttl': ttl.total_seconds() if ttl else None,
-                'metadata': metadata or {},
-                'access_count': 0
-            }
-            self._save_index()
-
-            # 更新统计
-            self.stats['size'] += size
-            self.stats['total_items'] += 1
+                # 检查空间
+                if self._needs_cleanup(size):
+                    self._cleanup(size)
+
+                # 保存到磁盘
+                cache_path = self._get_cache_path(key)
+                with open(cache_path, 'wb') as f:
+                    f.write(compressed_data)
+
+                # 更新索引
+                now = time.time()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO disk_index VALUES (?, ?, ?, ?, ?, ?, 0)",
+                    (key, now, now, size, ttl.total_seconds() if ttl else None,
+                     json.dumps(metadata or {}, default=str))
+                )
+                self._conn.commit()
+
+                # 更新统计
+                self.stats['size'] += size
+                self.stats['total_items'] += 1
 
         except Exception as e:
             logger.error(f"保存缓存失败 {key}: {e}")
@@ -861,21 +989,24 @@ class DiskCache(BaseCacheStrategy):
     def delete(self, key: str) -> bool:
         """删除缓存项"""
         try:
-            # 删除文件
-            cache_path = self._get_cache_path(key)
-            if cache_path.exists():
-                cache_path.unlink()
-
-            # 删除索引
-            if key in self.index:
-                item_info = self.index.pop(key)
-                self.stats['size'] -= item_info.get('size', 0)
+            with self.lock:
+                # 删除文件
+                cache_path = self._get_cache_path(key)
+                cache_path.unlink(missing_ok=True)
+
+                # 删除索引
+                self._pending_access.pop(key, None)
+                row = self._conn.execute(
+                    "SELECT size FROM disk_index WHERE cache_key = ?", (key,)).fetchone()
+                if row is None:
+                    return False
+
+                self._conn.execute("DELETE FROM disk_index WHERE cache_key = ?", (key,))
+                self._conn.commit()
+                self.stats['size'] -= row[0]
                 self.stats['total_items'] -= 1
-                self._save_index()
                 return True
 
-            return False
-
         except Exception as e:
             logger.error(f"删除缓存失败 {key}: {e}")
             return False
@@ -883,18 +1014,19 @@ class DiskCache(BaseCacheStrategy):
     def clear(self):
         """清理所有缓存"""
         try:
-            # 删除所有缓存文件
-            for cache_file in self.cache_dir.glob("*.cache"):
-                cache_file.unlink()
+            with self.lock:
+                # 删除所有缓存文件
+                for cache_file in self.cache_dir.glob("*.cache"):
+                    cache_file.unlink()
 
-            # 删除索引文件
-            if self.index_file.exists():
-                self.index_file.unlink()
+                # 清空索引
+                self._conn.execute("DELETE FROM disk_index")
+                self._conn.commit()
 
-            # 重置索引和统计
-            self.index = {}
-            self.stats['size'] = 0
-            self.stats['total_items'] = 0
+                # 重置统计
+                self._pending_access.clear()
+                self.stats['size'] = 0
+                self.stats['total_items'] = 0
 
             logger.info("清理磁盘缓存")
 
@@ -904,25 +1036,25 @@ class DiskCache(BaseCacheStrategy):
     def _cleanup(self, required_space: int):
         """清理磁盘空间"""
         try:
-            # 按访问时间排序
-            sorted_items = sorted(
-                self.index.items(),
-                key=lambda x: x[1].get('last_accessed', '')
-            )
+            with self.lock:
+                # 按访问时间排序（先写回缓冲的访问统计）
+                self.flush()
+                cursor = self._conn.execute(
+                    "SELECT cache_key, size FROM disk_index ORDER BY last_accessed")
 
-            removed_size = 0
-            keys_to_remove = []
+                removed_size = 0
+                keys_to_remove = []
 
-            for key, item_info in sorted_items:
-                if removed_size >= required_space:
-                    break
+                for key, size in cursor:
+                    if removed_size >= required_space:
+                        break
 
-                keys_to_remove.append(key)
-                removed_size += item_info.get('size', 0)
+                    keys_to_remove.append(key)
+                    removed_size += size
 
-            # 删除选中的项
-            for key in keys_to_remove:
-                self.delete(key)
+                # 删除选中的项
+                for key in keys_to_remove:
+                    self.delete(key)
 
             if keys_to_remove:
                 self.stats['evictions'] += len(keys_to_remove)
@@ -931,32 +1063,328 @@ class DiskCache(BaseCacheStrategy):
         except Exception as e:
             logger.error(f"磁盘缓存清理失败: {e}")
 
+    def cleanup_expired(self) -> int:
+        """删除过期项，返回删除数量"""
+        with self.lock:
+            expired_keys = [row[0] for row in self._conn.execute(
+                "SELECT cache_key FROM disk_index WHERE ttl > 0 AND created_at + ttl < ?",
+                (time.time(),)
+            )]
+
+            # 批量删除过期项
+            for key in expired_keys:
+                self.delete(key)
+
+        if expired_keys:
+            logger.debug(f"清理了 {len(expired_keys)} 个过期缓存项")
+        return len(expired_keys)
+
     def _cleanup_loop(self):
         """定期清理循环"""
-        while True:
-            time.sleep(3600)  # 每小时清理一次
+        # 每小时清理一次，close() 后退出
+        while not self._closed.wait(3600):
+            try:
+                self.cleanup_expired()
+                self.flush()
+            except Exception as e:
+                logger.error(f"定期清理失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        self.flush()
+        with self.lock:
+            stats = super().get_stats()
+            stats['current_items'] = stats['total_items']
+            stats['avg_size'] = (
+                stats['size'] / stats['current_items']
+                if stats['current_items'] > 0 else 0
+            )
+            stats['index'] = 'sqlite-wal'
+            stats['codecs'] = self.codec_stats.snapshot()
+            return stats
+
+    def get_keys(self) -> List[str]:
+        """获取所有缓存键"""
+        with self.lock:
+            return [row[0] for row in self._conn.execute("SELECT cache_key FROM disk_index")]
+
+    def close(self):
+        """写回访问统计并关闭索引"""
+        if self._closed.is_set():
+            return
+        self.flush()
+        self._closed.set()
+        with self.lock:
+            self._conn.close()
+
+
+class SharedCache(BaseCacheStrategy):
+    """
+    同主机多进程共享缓存
+
+    数据和索引都存放在一个 SQLite 文件中（WAL 模式），多个 uvicorn 工作进程、
+    批量计算任务和脚本打开同一个文件即可共享结果，并发安全由 SQLite 文件锁保证：
+    读可以并发，写在 BEGIN IMMEDIATE 事务中串行执行，总大小在同一事务里维护，
+    超出上限时按最近访问时间淘汰。命中时的访问统计与 DiskCache 一样批量写回。
+    fork 出的子进程首次使用时会重新打开连接。
+    """
 
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS shared_cache (
+            cache_key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL,
+            last_accessed REAL NOT NULL,
+            access_count INTEGER DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_shared_last_accessed ON shared_cache (last_accessed)",
+        "CREATE TABLE IF NOT EXISTS shared_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO shared_meta VALUES ('total_size', 0)",
+    )
+
+    # 访问统计批量写回阈值
+    ACCESS_FLUSH_SIZE = 512
+    ACCESS_FLUSH_INTERVAL = 5.0  # 秒
+
+    def __init__(self, max_size: int = 500, db_path: Optional[str] = None,
+                 codec: Optional[CacheCodec] = None, busy_timeout: float = 30.0):
+        """
+        初始化共享缓存
+
+        Args:
+            max_size: 最大大小（MB，所有进程合计）
+            db_path: SQLite 文件路径
+            codec: 编解码器（None 表示 zlib 压缩 + 自动选择序列化方式）
+            busy_timeout: 等待其他进程释放写锁的最长时间（秒）
+        """
+        super().__init__(max_size)
+        self.db_path = Path(db_path or 'data/cache/shared/shared_cache.sqlite')
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout = busy_timeout
+        self.codec = codec or CacheCodec()
+        self.codec_stats = CodecStats()
+
+        self._pending_access: Dict[str, List] = {}
+        self._last_flush = time.monotonic()
+        self._conn = None
+        self._pid = None
+        self._connect()
+
+    def _connect(self):
+        """打开连接（autocommit 模式，事务显式控制）"""
+        self._conn = sqlite3.connect(str(self.db_path), timeout=self.busy_timeout,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._pid = os.getpid()
+        self._execute_write(lambda conn: [conn.execute(sql) for sql in self.SCHEMA])
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """当前进程的连接（fork 后重新打开，不复用父进程的连接）"""
+        if self._pid != os.getpid():
+            self._pending_access = {}
+            self._connect()
+        return self._conn
+
+    def _execute_write(self, operation):
+        """在写事务中执行 operation(conn)，返回其结果"""
+        with self.lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
             try:
-                # 清理过期项
-                current_time = datetime.now()
-                expired_keys = []
+                result = operation(conn)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _adjust_size(conn: sqlite3.Connection, delta: int):
+        conn.execute("UPDATE shared_meta SET value = value + ? WHERE name = 'total_size'", (delta,))
+
+    @staticmethod
+    def _delete_rows(conn: sqlite3.Connection, keys: List[str]) -> int:
+        """删除若干行并扣减总大小，返回删除数量"""
+        deleted = 0
+        for key in keys:
+            row = conn.execute("SELECT size FROM shared_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM shared_cache WHERE cache_key = ?", (key,))
+                SharedCache._adjust_size(conn, -row[0])
+                deleted += 1
+        return deleted
 
-                for key, item_info in self.index.items():
-                    created_at = datetime.fromisoformat(item_info['created_at'])
-                    ttl = timedelta(seconds=item_info.get('ttl', 0))
+    def _record_access(self, key: str):
+        """记录一次命中，按数量或时间阈值批量写回"""
+        pending = self._pending_access.get(key)
+        if pending is None:
+            self._pending_access[key] = [time.time(), 1]
+        else:
+            pending[0] = time.time()
+            pending[1] += 1
 
-                    if ttl and current_time - created_at > ttl:
-                        expired_keys.append(key)
+        if (len(self._pending_access) >= self.ACCESS_FLUSH_SIZE or
+                time.monotonic() - self._last_flush >= self.ACCESS_FLUSH_INTERVAL):
+            self.flush()
 
-                # 批量删除过期项
-                for key in expired_keys:
-                    self.delete(key)
+    def flush(self):
+        """把缓冲的访问统计写回"""
+        with self.lock:
+            self._last_flush = time.monotonic()
+            if not self._pending_access:
+                return
+            rows = [(last, count, key) for key, (last, count) in self._pending_access.items()]
+            self._pending_access.clear()
+            try:
+                self._execute_write(lambda conn: conn.executemany(
+                    "UPDATE shared_cache SET last_accessed = MAX(last_accessed, ?), "
+                    "access_count = access_count + ? WHERE cache_key = ?", rows))
+            except sqlite3.Error as e:
+                logger.error(f"写回共享缓存访问统计失败: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存项"""
+        with self.lock:
+            try:
+                row = self.conn.execute(
+                    "SELECT value, expires_at FROM shared_cache WHERE cache_key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"读取共享缓存失败 {key}: {e}")
+                row = None
+
+            if row is None:
+                self.stats['misses'] += 1
+                return None
 
-                if expired_keys:
-                    logger.debug(f"清理了 {len(expired_keys)} 个过期缓存项")
+            blob, expires_at = row
+            if expires_at is not None and time.time() > expires_at:
+                self.delete(key)
+                self.stats['misses'] += 1
+                return None
 
+            try:
+                start = time.perf_counter()
+                value, label, raw_size = CacheCodec.decode(blob)
+                self.codec_stats.record(label, 'decode', time.perf_counter() - start, raw_size, len(blob))
             except Exception as e:
-                logger.error(f"定期清理失败: {e}")
+                logger.error(f"解码共享缓存失败 {key}: {e}")
+                self.delete(key)
+                self.stats['misses'] += 1
+                return None
+
+            self._record_access(key)
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[timedelta] = None,
+            metadata: Optional[Dict] = None, codec: Optional[CacheCodec] = None):
+        """设置缓存项（codec 为 None 时使用默认编解码器）"""
+        try:
+            start = time.perf_counter()
+            blob, label, raw_size = (codec or self.codec).encode(value)
+            self.codec_stats.record(label, 'encode', time.perf_counter() - start, raw_size, len(blob))
+
+            size = len(blob)
+            limit = self.max_size * 1024 * 1024
+            if size > limit:
+                logger.debug(f"缓存项过大未放入共享缓存: {key}, {size} 字节")
+                return
+
+            now = time.time()
+            expires_at = now + ttl.total_seconds() if ttl else None
+
+            def write(conn):
+                self._delete_rows(conn, [key])
+                total = conn.execute("SELECT value FROM shared_meta WHERE name = 'total_size'").fetchone()[0]
+                evicted = []
+                if total + size > limit:
+                    # 按最近访问时间淘汰，直到放得下
+                    for old_key, old_size in conn.execute(
+                            "SELECT cache_key, size FROM shared_cache ORDER BY last_accessed"):
+                        if total + size <= limit:
+                            break
+                        evicted.append(old_key)
+                        total -= old_size
+                    self._delete_rows(conn, evicted)
+                conn.execute(
+                    "INSERT INTO shared_cache VALUES (?, ?, ?, ?, ?, ?, 0)",
+                    (key, sqlite3.Binary(blob), size, now, expires_at, now))
+                self._adjust_size(conn, size)
+                return len(evicted)
+
+            evicted = self._execute_write(write)
+            self._pending_access.pop(key, None)
+            if evicted:
+                self.stats['evictions'] += evicted
+                logger.debug(f"共享缓存淘汰 {evicted} 个项")
+
+        except Exception as e:
+            logger.error(f"保存共享缓存失败 {key}: {e}")
+
+    def delete(self, key: str) -> bool:
+        """删除缓存项"""
+        try:
+            self._pending_access.pop(key, None)
+            return self._execute_write(lambda conn: self._delete_rows(conn, [key])) > 0
+        except sqlite3.Error as e:
+            logger.error(f"删除共享缓存失败 {key}: {e}")
+            return False
+
+    def clear(self):
+        """清理所有缓存（影响所有进程）"""
+        def clear_all(conn):
+            conn.execute("DELETE FROM shared_cache")
+            conn.execute("UPDATE shared_meta SET value = 0 WHERE name = 'total_size'")
+
+        with self.lock:
+            self._pending_access.clear()
+            self._execute_write(clear_all)
+        logger.info("清理共享缓存")
+
+    def cleanup_expired(self) -> int:
+        """删除过期项，返回删除数量"""
+        def delete_expired(conn):
+            keys = [row[0] for row in conn.execute(
+                "SELECT cache_key FROM shared_cache WHERE expires_at < ?", (time.time(),))]
+            return self._delete_rows(conn, keys)
+
+        return self._execute_write(delete_expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息（命中/未命中为本进程，条目数和大小为所有进程合计）"""
+        self.flush()
+        with self.lock:
+            count, = self.conn.execute("SELECT COUNT(*) FROM shared_cache").fetchone()
+            size, = self.conn.execute("SELECT value FROM shared_meta WHERE name = 'total_size'").fetchone()
+            self.stats['total_items'] = count
+            self.stats['size'] = size
+            stats = super().get_stats()
+            stats['current_items'] = count
+            stats['avg_size'] = size / count if count else 0
+            stats['path'] = str(self.db_path)
+            stats['codecs'] = self.codec_stats.snapshot()
+            return stats
+
+    def get_keys(self) -> List[str]:
+        """获取所有缓存键"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT cache_key FROM shared_cache")]
+
+    def close(self):
+        """写回访问统计并关闭连接"""
+        if self._conn is None:
+            return
+        if self._pid == os.getpid():
+            self.flush()
+        with self.lock:
+            self._conn.close()
+            self._conn = None
 
 
 class CacheManager:
@@ -975,6 +1403,12 @@ class CacheManager:
         # 缓存组（用于批量操作）
         self.cache_groups: Dict[str, Set[str]] = defaultdict(set)
 
+        # 按缓存组配置的编解码器: groups.<组名>.codec
+        self.group_codecs: Dict[str, CacheCodec] = {}
+        for group, group_config in self.config.get('groups', {}).items():
+            if isinstance(group_config, dict) and group_config.get('codec'):
+                self.set_group_codec(group, group_config['codec'])
+
         logger.info("初始化缓存管理器")
 
     def get(self, key: str, group: str = None) -> Optional[Any]:
@@ -1009,15 +1443,29 @@ class CacheManager:
             value: 缓存值
             level: 缓存级别
             ttl: 生存时间
-            group: 缓存组名
+            group: 缓存组名（组配置了编解码器时按该编解码器写入磁盘）
             metadata: 元数据
         """
-        self.multi_level_cache.set(key, value, level, ttl)
+        codec = self.group_codecs.get(group) if group else None
+        self.multi_level_cache.set(key, value, level, ttl, codec=codec)
 
         # 更新组信息
         if group:
             self.cache_groups[group].add(key)
 
+    def set_group_codec(self, group: str, codec: Any):
+        """
+        设置缓存组的编解码器
+
+        Args:
+            group: 缓存组名
+            codec: CacheCodec，或 CacheCodec.from_config 接受的配置（如 'lz4'）
+        """
+        if not isinstance(codec, CacheCodec):
+            codec = CacheCodec.from_config(codec)
+        self.group_codecs[group] = codec
+        logger.info(f"缓存组 '{group}' 使用编解码器 {codec.name}")
+
     def delete(self, key: str, level: CacheLevel = None) -> bool:
         """删除缓存项"""
         deleted = self.multi_level_cache.delete(key, level) > 0
@@ -40,6 +40,17 @@ class MemoryThreshold(Enum):
     CRITICAL = "critical"  # 内存使用率 > 90%
 
 
+def classify_memory_percent(memory_percent: float) -> MemoryThreshold:
+    """按系统内存使用率确定阈值级别"""
+    if memory_percent < 60:
+        return MemoryThreshold.LOW
+    if memory_percent < 80:
+        return MemoryThreshold.MEDIUM
+    if memory_percent < 90:
+        return MemoryThreshold.HIGH
+    return MemoryThreshold.CRITICAL
+
+
 @dataclass
 class MemorySnapshot:
     """内存快照"""
@@ -240,14 +251,7 @@ class MemoryProfiler:
 
         # 确定阈值
         memory_percent = vm.percent
-        if memory_percent < 60:
-            threshold = MemoryThreshold.LOW
-        elif memory_percent < 80:
-            threshold = MemoryThreshold.MEDIUM
-        elif memory_percent < 90:
-            threshold = MemoryThreshold.HIGH
-        else:
-            threshold = MemoryThreshold.CRITICAL
+        threshold = classify_memory_percent(memory_percent)
 
         # 创建快照
         snapshot = MemorySnapshot(
@@ -24,13 +24,66 @@ from enum import Enum
 import multiprocessing
 from multiprocessing import Pool, cpu_count
 import threading
-from queue import Queue, Empty
 import hashlib
 import json
 
+from .shared_frames import SharedFrame, SharedFrameSpec, read_shared_frame
+from .task_scheduler import WorkStealingScheduler, estimate_cost
+from .worker_scaling import AdaptiveWorkerController
+
 logger = logging.getLogger(__name__)
 
 
+def calculate_indicator(indicator: str, parameters: Dict, data: pd.DataFrame) -> pd.DataFrame:
+    """用 IndicatorFactory 创建指标并计算"""
+    from src.indicators.indicator_manager import IndicatorFactory
+
+    return IndicatorFactory.create_indicator(indicator, **parameters).calculate(data)
+
+
+def _calculate_shared_batch(jobs: List[Tuple[SharedFrameSpec, str, Dict]]) -> List[Tuple]:
+    """
+    进程池任务：一批任务从共享内存重建数据后依次计算（模块级函数，可被子进程导入）
+
+    Returns:
+        [(结果, 错误信息, 计算耗时), ...]，与 jobs 一一对应
+    """
+    outcomes = []
+    for spec, indicator, parameters in jobs:
+        start = time.perf_counter()
+        try:
+            result, error = calculate_indicator(indicator, parameters, read_shared_frame(spec)), None
+        except Exception as e:
+            result, error = None, str(e)
+        outcomes.append((result, error, time.perf_counter() - start))
+    return outcomes
+
+
+def _load_parallel_config(section: str) -> Dict:
+    """config/performance.yaml 中的 indicators.parallel.<section>（scheduler、adaptive）"""
+    try:
+        from src.config.config_loader import load_performance_config
+        return load_performance_config().get('indicators', {}).get('parallel', {}).get(section, {}) or {}
+    except Exception as e:
+        logger.warning(f"读取 {section} 配置失败，使用默认值: {e}")
+        return {}
+
+
+def _process_pool_context():
+    """
+    进程池的 multiprocessing 上下文
+
+    工作线程运行期间才会启动子进程（调整工作数时还会换新进程池），fork 多线程进程时子进程可能
+    继承被其他线程持有的锁而卡死，支持时改用 forkserver（与 Windows 的 spawn 一样要求入口脚本
+    有 if __name__ == '__main__' 保护），并预先导入指标模块减少子进程启动开销。
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['src.performance.parallel_calculator', 'src.indicators.indicator_manager'])
+    return context
+
+
 class ParallelMode(Enum):
     """并行模式"""
     THREAD = "thread"  # 线程并行（I/O密集型）
@@ -51,7 +104,9 @@ class ParallelTask:
     created_at: datetime = None
     result: Optional[pd.DataFrame] = None
     error: Optional[str] = None
-    execution_time: Optional[float] = None
+    execution_time: Optional[float] = None  # 计算耗时（秒）
+    cost: float = 0.0                       # 估算成本：序列长度 × 指标复杂度
+    queue_wait: Optional[float] = None      # 排队等待（入队到被工作线程取出，秒）
 
     def __post_init__(self):
         if self.created_at is None:
@@ -65,7 +120,10 @@ class ParallelCalculator:
                  max_workers: Optional[int] = None,
                  mode: ParallelMode = ParallelMode.THREAD,
                  cache_enabled: bool = True,
-                 timeout: int = 300):
+                 timeout: int = 300,
+                 priority_enabled: Optional[bool] = None,
+                 batch_cost: Optional[float] = None,
+                 adaptive: Optional[bool] = None):
         """
         初始化并行计算器
 
@@ -74,6 +132,11 @@ class ParallelCalculator:
             mode: 并行模式
             cache_enabled: 是否启用缓存
             timeout: 任务超时时间（秒）
+            priority_enabled: 是否按优先级调度，None 表示读取 config/performance.yaml
+                的 indicators.parallel.scheduler.priority_enabled
+            batch_cost: 每批任务的累计成本上限（序列长度 × 复杂度权重），None 表示读取配置
+            adaptive: 是否按 CPU 负载和内存阈值自动调整工作数（见 worker_scaling.py），
+                None 表示未指定 max_workers 时按 indicators.parallel.adaptive.enabled 决定
         """
         self.mode = mode
         self.cache_enabled = cache_enabled
@@ -88,15 +151,42 @@ class ParallelCalculator:
         else:
             self.max_workers = max_workers
 
+        # 自适应工作数：显式指定 max_workers 时默认固定工作数
+        adaptive_config = _load_parallel_config('adaptive') if adaptive is not False else {}
+        if adaptive is None:
+            adaptive = max_workers is None and adaptive_config.get('enabled', False)
+        self.controller: Optional[AdaptiveWorkerController] = None
+        if adaptive:
+            self.controller = AdaptiveWorkerController.from_config(self, adaptive_config)
+            self.max_workers = max(self.controller.min_workers,
+                                   min(self.controller.max_workers, self.max_workers))
+        self._resize_lock = threading.Lock()
+
         # 执行器
         self.executor = None
+        self._pool_size = 0
         self._init_executor()
 
-        # 任务队列
-        self.task_queue = Queue()
+        # 任务调度：每个工作线程一个队列，按成本打包，空闲时窃取（已提交未完成的任务都在 running_tasks 中）
+        scheduler_config = _load_parallel_config('scheduler') if priority_enabled is None or batch_cost is None else {}
+        self.scheduler = WorkStealingScheduler(
+            self.max_workers,
+            priority_enabled=(scheduler_config.get('priority_enabled', True)
+                              if priority_enabled is None else priority_enabled),
+            batch_cost=scheduler_config.get('batch_cost', 50000) if batch_cost is None else batch_cost
+        )
         self.completed_tasks: Dict[str, ParallelTask] = {}
         self.running_tasks: Dict[str, ParallelTask] = {}
 
+        # 工作线程：从队列取任务，线程模式直接计算，进程模式提交到进程池并等待
+        self.workers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+
+        # 进程模式：同一个 DataFrame 只写一次共享内存，id(data) -> [SharedFrame, 引用任务数]
+        self._shared_frames: Dict[int, list] = {}
+        self._shared_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
         # 缓存
         self.cache: Dict[str, Tuple[datetime, pd.DataFrame]] = {}
         self.cache_ttl = timedelta(minutes=30)
@@ -110,7 +200,9 @@ class ParallelCalculator:
             'cache_hits': 0,
             'cache_misses': 0,
             'total_execution_time': 0.0,
-            'avg_execution_time': 0.0
+            'avg_execution_time': 0.0,
+            'total_queue_wait': 0.0,
+            'shared_memory_bytes': 0
         }
 
         # 性能监控
@@ -131,12 +223,40 @@ class ParallelCalculator:
         """初始化执行器"""
         if self.mode == ParallelMode.PROCESS:
             self.executor = concurrent.futures.ProcessPoolExecutor(
-                max_workers=self.max_workers
+                max_workers=self.max_workers,
+                mp_context=_process_pool_context()
             )
         else:
             self.executor = concurrent.futures.ThreadPoolExecutor(
                 max_workers=self.max_workers
             )
+        self._pool_size = self.max_workers
+
+    def resize_workers(self, workers: int) -> int:
+        """
+        调整工作数（自适应控制器调用，也可手动调用）
+
+        减少时编号超出的工作线程处理完当前批次后退出，其队列中的任务重新分配；
+        进程模式增加到超过进程池大小时换用更大的进程池（旧池处理完已提交的批次后关闭）。
+
+        Returns:
+            调整后的工作数
+        """
+        workers = max(1, int(workers))
+        with self._resize_lock:
+            if workers == self.max_workers:
+                return workers
+            previous = self.max_workers
+            self.max_workers = workers
+            self.scheduler.resize(workers)
+            if self.mode == ParallelMode.PROCESS and workers > self._pool_size:
+                old_executor = self.executor
+                self._init_executor()
+                old_executor.shutdown(wait=False)
+            if self.workers and not self._stop_event.is_set():
+                self._ensure_workers_running()
+        logger.info(f"工作数调整: {previous} -> {workers}")
+        return workers
 
     def _generate_task_id(self, symbol: str, indicator: str,
                           parameters: Dict, data_hash: str) -> str:
@@ -146,8 +266,9 @@ class ParallelCalculator:
 
     def _get_data_hash(self, df: pd.DataFrame) -> str:
         """生成数据哈希"""
-        # 使用列名和形状作为哈希基础
-        data_info = f"{list(df.columns)}_{df.shape}_{df.index[-10:].sum() if len(df) > 10 else 0}"
+        # 使用列名、形状和最后10行（含索引）作为哈希基础，末尾 bar 更新后任务ID随之变化
+        tail_hash = int(pd.util.hash_pandas_object(df.tail(10)).sum()) if len(df) else 0
+        data_info = f"{list(df.columns)}_{df.shape}_{tail_hash}"
         return hashlib.md5(data_info.encode()).hexdigest()[:8]
 
     def _get_cached_result(self, task_id: str) -> Optional[pd.DataFrame]:
@@ -210,7 +331,7 @@ class ParallelCalculator:
     def _update_performance_stats(self):
         """更新性能统计"""
         # 队列大小
-        self.performance_stats['queue_size'] = self.task_queue.qsize()
+        self.performance_stats['queue_size'] = self.scheduler.qsize()
 
         # 吞吐量（最近1分钟）
         recent_tasks = [
@@ -300,11 +421,13 @@ class ParallelCalculator:
             parameters=parameters,
             data=data,
             mode=self.mode,
-            priority=priority
+            priority=priority,
+            cost=estimate_cost(len(data), indicator)
         )
 
-        # 添加到队列
-        self.task_queue.put((priority, task))
+        # 添加到成本最小的工作队列
+        self.running_tasks[task_id] = task
+        self.scheduler.submit(task, task.cost, priority)
         self.stats['total_tasks'] += 1
 
         # 启动工作线程（如果需要）
@@ -315,93 +438,141 @@ class ParallelCalculator:
         return task_id
 
     def _ensure_workers_running(self):
-        """确保工作线程在运行"""
-        # 这里简化处理，实际应该维护工作线程池
-        pass
-
-    def _worker_loop(self):
-        """工作线程循环"""
-        while True:
+        """确保工作线程在运行（按需启动，最多 max_workers 个，编号对应调度器队列）"""
+        alive = {worker.name: worker for worker in self.workers if worker.is_alive()}
+        for worker_id in range(self.max_workers):
+            name = f"parallel-worker-{worker_id}"
+            if name not in alive:
+                alive[name] = threading.Thread(target=self._worker_loop, args=(worker_id,),
+                                               daemon=True, name=name)
+                alive[name].start()
+        self.workers = list(alive.values())
+        if self.controller is not None:
+            self.controller.start()
+
+    def _worker_loop(self, worker_id: int = 0):
+        """工作线程循环：每次取一批任务（自己的队列为空时从其他队列窃取），工作数缩减到编号以下时退出"""
+        while not self._stop_event.is_set() and worker_id < self.max_workers:
             try:
-                # 获取任务（带超时）
-                priority, task = self.task_queue.get(timeout=1)
-
-                # 标记为运行中
-                self.running_tasks[task.task_id] = task
-
-                try:
-                    # 执行计算
-                    start_time = time.time()
-
-                    if self.mode == ParallelMode.PROCESS:
-                        result = self._calculate_in_process(task)
-                    else:
-                        result = self._calculate_in_thread(task)
-
-                    execution_time = time.time() - start_time
-
-                    # 更新任务结果
-                    task.result = result
-                    task.execution_time = execution_time
+                batch = self.scheduler.next_batch(worker_id, timeout=1)
+                if not batch:
+                    continue
 
-                    # 缓存结果
-                    self._set_cached_result(task.task_id, result)
+                dequeued_at = time.monotonic()
+                tasks = []
+                for task, queued_at in batch:
+                    task.queue_wait = dequeued_at - queued_at
+                    # 排队期间被取消的任务不再计算
+                    if task.task_id in self.running_tasks:
+                        tasks.append(task)
 
-                    # 移动到已完成
-                    self.completed_tasks[task.task_id] = task
-                    self.running_tasks.pop(task.task_id, None)
+                if self.mode == ParallelMode.PROCESS:
+                    outcomes = self._calculate_batch_in_process(tasks)
+                else:
+                    outcomes = [self._run_in_thread(task) for task in tasks]
 
-                    # 更新统计
-                    self.stats['completed_tasks'] += 1
-                    self.stats['total_execution_time'] += execution_time
+                for task, (result, error, execution_time) in zip(tasks, outcomes):
+                    self._finish_task(task, result, error, execution_time)
 
-                    logger.debug(f"任务完成: {task.task_id}, 耗时: {execution_time:.2f}秒")
+            except Exception as e:
+                logger.error(f"工作线程错误: {e}")
 
-                except Exception as e:
-                    logger.error(f"任务执行失败 {task.task_id}: {e}")
-                    task.error = str(e)
-                    self.stats['failed_tasks'] += 1
+    def _run_in_thread(self, task: ParallelTask) -> Tuple:
+        """线程模式执行单个任务，返回 (结果, 错误信息, 计算耗时)"""
+        start = time.perf_counter()
+        try:
+            return self._calculate_in_thread(task), None, time.perf_counter() - start
+        except Exception as e:
+            return None, str(e), time.perf_counter() - start
+
+    def _finish_task(self, task: ParallelTask, result: Optional[pd.DataFrame],
+                     error: Optional[str], execution_time: float):
+        """记录任务结果和耗时，移动到已完成"""
+        if task.task_id not in self.running_tasks:
+            # 计算期间已被取消
+            return
+        task.execution_time = execution_time
+        if error is None:
+            task.result = result
+            # 缓存结果
+            self._set_cached_result(task.task_id, result)
+            logger.debug(f"任务完成: {task.task_id}, 排队: {task.queue_wait:.3f}秒, "
+                         f"计算: {execution_time:.3f}秒")
+        else:
+            logger.error(f"任务执行失败 {task.task_id}: {error}")
+            task.error = error
 
-                finally:
-                    self.task_queue.task_done()
+        with self._stats_lock:
+            if error is None:
+                self.stats['completed_tasks'] += 1
+                self.stats['total_execution_time'] += execution_time
+            else:
+                self.stats['failed_tasks'] += 1
+            self.stats['total_queue_wait'] += task.queue_wait or 0.0
 
-            except Empty:
-                # 队列为空，继续等待
-                continue
-            except Exception as e:
-                logger.error(f"工作线程错误: {e}")
+        # 移动到已完成
+        self.completed_tasks[task.task_id] = task
+        self.running_tasks.pop(task.task_id, None)
 
     def _calculate_in_thread(self, task: ParallelTask) -> pd.DataFrame:
         """在线程中计算"""
-        # 这里应该调用实际的指标计算
-        # 简化实现，返回模拟数据
         logger.debug(f"在线程中计算: {task.task_id}")
-
-        # 模拟计算延迟
-        time.sleep(0.1)
-
-        # 返回模拟结果
-        result = pd.DataFrame({
-            f'{task.indicator}_result': np.random.randn(len(task.data))
-        }, index=task.data.index)
-
-        return result
+        return calculate_indicator(task.indicator, task.parameters, task.data)
 
     def _calculate_in_process(self, task: ParallelTask) -> pd.DataFrame:
-        """在进程中计算"""
-        # 进程间传递数据可能需要序列化
-        # 这里简化处理
-        logger.debug(f"在进程中计算: {task.task_id}")
+        """在进程中计算单个任务"""
+        result, error, _ = self._calculate_batch_in_process([task])[0]
+        if error is not None:
+            raise RuntimeError(error)
+        return result
 
-        # 模拟计算延迟
-        time.sleep(0.2)
+    def _calculate_batch_in_process(self, tasks: List[ParallelTask]) -> List[Tuple]:
+        """
+        在进程中计算一批任务（一次进程池调用）
 
-        # 返回模拟结果
-        result = pd.DataFrame({
-            f'{task.indicator}_result': np.random.randn(len(task.data))
-        }, index=task.data.index)
+        数据通过共享内存传递（见 shared_frames.py），子进程只收到描述信息；
+        结果 DataFrame 仍按进程池默认方式 pickle 返回。
 
-        return result
+        Returns:
+            [(结果, 错误信息, 计算耗时), ...]
+        """
+        if not tasks:
+            return []
+        logger.debug(f"在进程中计算 {len(tasks)} 个任务: {[task.task_id for task in tasks]}")
+        shared = [self._acquire_shared_frame(task.data) for task in tasks]
+        try:
+            jobs = [(frame.spec, task.indicator, task.parameters) for frame, task in zip(shared, tasks)]
+            # 与 resize_workers 换池互斥：读到的进程池在提交前不会被关闭（已提交的批次照常完成）
+            with self._resize_lock:
+                future = self.executor.submit(_calculate_shared_batch, jobs)
+            return future.result(timeout=self.timeout)
+        except Exception as e:
+            return [(None, str(e), 0.0)] * len(tasks)
+        finally:
+            for task in tasks:
+                self._release_shared_frame(task.data)
+
+    def _acquire_shared_frame(self, data: pd.DataFrame) -> SharedFrame:
+        """获取数据的共享内存（同一个 DataFrame 的并发任务共用一块）"""
+        with self._shared_lock:
+            entry = self._shared_frames.get(id(data))
+            if entry is None:
+                shared = SharedFrame(data)
+                self.stats['shared_memory_bytes'] += shared.nbytes
+                entry = self._shared_frames[id(data)] = [shared, 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _release_shared_frame(self, data: pd.DataFrame):
+        """任务结束后减少引用，最后一个任务释放共享内存"""
+        with self._shared_lock:
+            entry = self._shared_frames.get(id(data))
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._shared_frames[id(data)]
+                entry[0].release()
 
     def get_task_result(self, task_id: str, wait: bool = False,
                         timeout: int = 30) -> Optional[pd.DataFrame]:
@@ -527,8 +698,8 @@ class ParallelCalculator:
         Returns:
             是否成功取消
         """
-        # 检查是否在队列中
-        # 这里简化处理，实际需要更复杂的队列操作
+        # 排队中的任务从调度队列移除；已取出的任务由工作线程跳过或丢弃结果
+        self.scheduler.remove(lambda task: task.task_id == task_id)
         if task_id in self.running_tasks:
             # 标记为取消
             task = self.running_tasks[task_id]
@@ -547,8 +718,15 @@ class ParallelCalculator:
             avg_time = self.stats['total_execution_time'] / self.stats['completed_tasks']
             self.stats['avg_execution_time'] = avg_time
 
+        finished = self.stats['completed_tasks'] + self.stats['failed_tasks']
         return {
             'tasks': self.stats.copy(),
+            'timing': {
+                'avg_queue_wait': self.stats['total_queue_wait'] / finished if finished else 0.0,
+                'avg_compute_time': self.stats['avg_execution_time'],
+            },
+            'scheduler': self.scheduler.get_stats(),
+            'adaptive': self.controller.get_stats() if self.controller is not None else None,
             'performance': self.performance_stats.copy(),
             'cache': {
                 'size': len(self.cache),
@@ -563,12 +741,21 @@ class ParallelCalculator:
             'system': {
                 'max_workers': self.max_workers,
                 'mode': self.mode.value,
-                'queue_size': self.task_queue.qsize(),
+                'queue_size': self.scheduler.qsize(),
                 'running_tasks': len(self.running_tasks),
                 'completed_tasks': len(self.completed_tasks)
             }
         }
 
+    def get_task_timings(self) -> List[Dict[str, Any]]:
+        """已完成任务的排队等待与计算耗时（秒）"""
+        return [
+            {'task_id': task.task_id, 'symbol': task.symbol, 'indicator': task.indicator,
+             'priority': task.priority, 'cost': task.cost,
+             'queue_wait': task.queue_wait, 'compute_time': task.execution_time}
+            for task in list(self.completed_tasks.values()) if task.queue_wait is not None
+        ]
+
     def clear_cache(self):
         """清理缓存"""
         self.cache.clear()
@@ -584,7 +771,9 @@ class ParallelCalculator:
             'cache_hits': 0,
             'cache_misses': 0,
             'total_execution_time': 0.0,
-            'avg_execution_time': 0.0
+            'avg_execution_time': 0.0,
+            'total_queue_wait': 0.0,
+            'shared_memory_bytes': 0
         }
         logger.info("重置统计信息")
 
@@ -592,8 +781,14 @@ class ParallelCalculator:
         """关闭计算器"""
         logger.info("关闭并行计算器...")
 
-        # 停止监控
+        # 停止监控、自适应控制和工作线程
         self.stop_monitoring()
+        if self.controller is not None:
+            self.controller.stop()
+        self._stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout=5)
+        self.workers = []
 
         # 关闭执行器
         if self.executor:
@@ -656,17 +851,9 @@ class AsyncParallelCalculator(ParallelCalculator):
 
     async def _calculate_async(self, symbol: str, indicator: str,
                                data: pd.DataFrame, parameters: Dict) -> pd.DataFrame:
-        """异步计算"""
-        # 这里应该调用实际的指标计算
-        # 简化实现，返回模拟数据
-        await asyncio.sleep(0.1)  # 模拟异步延迟
-
-        # 返回模拟结果
-        result = pd.DataFrame({
-            f'{indicator}_async_result': np.random.randn(len(data))
-        }, index=data.index)
-
-        return result
+        """异步计算（在线程池中执行，不阻塞事件循环）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, calculate_indicator, indicator, parameters, data)
 
     def _handle_async_completion(self, task_id: str, future: asyncio.Future):
         """处理异步任务完成"""
@@ -0,0 +1,118 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/performance\shared_frames.py
+# File Name: shared_frames
+# @ Author: mango-gh22
+# @ Date：2026/10/17 23:40
+"""
+desc 共享内存 DataFrame - 进程池任务通过 multiprocessing.shared_memory 传递行情数组
+"""
+# src/performance/shared_frames.py
+"""
+共享内存 DataFrame
+
+父进程把 DataFrame 的数值列和索引按列连续写入一块共享内存，只把描述信息
+（SharedFrameSpec：共享内存名、行数、各列 dtype 和偏移）传给子进程；子进程按描述
+附加共享内存并重建 DataFrame，不再逐任务 pickle 整个 DataFrame。
+
+- 数值、布尔、datetime64 列放入共享内存；其余列（如 symbol 字符串）随描述信息传递
+- 同一个 DataFrame 上的多个任务共用一块共享内存，由创建方在任务全部结束后释放
+"""
+
+import sys
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+_ALIGN = 8
+
+
+def _shareable(dtype: np.dtype) -> bool:
+    return dtype.kind in 'fiub' or (dtype.kind == 'M' and getattr(dtype, 'tz', None) is None)
+
+
+@dataclass(frozen=True)
+class SharedFrameSpec:
+    """子进程重建 DataFrame 所需的描述信息（可 pickle，体积与行数无关）"""
+    name: str
+    rows: int
+    # (列名, dtype 字符串, 字节偏移)，按原列顺序；偏移为 None 的列在 objects 中
+    columns: Tuple[Tuple[Any, str, Optional[int]], ...]
+    # 索引：(dtype 字符串, 字节偏移)；偏移为 None 时索引在 objects['__index__'] 中
+    index: Tuple[str, Optional[int]]
+    index_name: Any = None
+    objects: Dict[Any, Any] = field(default_factory=dict)
+
+
+class SharedFrame:
+    """放在共享内存中的 DataFrame（创建方持有，负责释放）"""
+
+    def __init__(self, df: pd.DataFrame):
+        arrays, columns, objects = [], [], {}
+        offset = 0
+
+        def place(values: np.ndarray) -> int:
+            nonlocal offset
+            start = offset
+            arrays.append((start, values))
+            offset += -(-values.nbytes // _ALIGN) * _ALIGN
+            return start
+
+        for name in df.columns:
+            values = df[name].to_numpy()
+            if _shareable(values.dtype):
+                values = np.ascontiguousarray(values)
+                columns.append((name, values.dtype.str, place(values)))
+            else:
+                objects[name] = values
+                columns.append((name, values.dtype.str, None))
+
+        index_values = df.index.to_numpy()
+        if isinstance(df.index, pd.RangeIndex) or not _shareable(index_values.dtype):
+            objects['__index__'] = df.index
+            index = (index_values.dtype.str, None)
+        else:
+            index = (index_values.dtype.str, place(np.ascontiguousarray(index_values)))
+
+        # 共享内存大小不能为 0
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, _ALIGN))
+        for start, values in arrays:
+            np.ndarray(values.shape, dtype=values.dtype, buffer=self.shm.buf, offset=start)[:] = values
+
+        self.spec = SharedFrameSpec(name=self.shm.name, rows=len(df), columns=tuple(columns),
+                                    index=index, index_name=df.index.name, objects=objects)
+        self.nbytes = offset
+
+    def release(self):
+        """关闭并删除共享内存"""
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def read_shared_frame(spec: SharedFrameSpec) -> pd.DataFrame:
+    """按描述信息附加共享内存并重建 DataFrame（数据复制到本进程后立即断开）"""
+    # Python 3.13+ 关闭附加方的 resource_tracker 跟踪，共享内存只由创建方删除
+    shm = (shared_memory.SharedMemory(name=spec.name, track=False) if sys.version_info >= (3, 13)
+           else shared_memory.SharedMemory(name=spec.name))
+    try:
+        def view(dtype: str, start: int) -> np.ndarray:
+            return np.ndarray((spec.rows,), dtype=np.dtype(dtype), buffer=shm.buf, offset=start)
+
+        data = {name: spec.objects[name] if start is None else view(dtype, start)
+                for name, dtype, start in spec.columns}
+        index_dtype, index_start = spec.index
+        if index_start is None:
+            index = spec.objects['__index__']
+        else:
+            index = pd.Index(view(index_dtype, index_start).copy(), name=spec.index_name)
+        return pd.DataFrame(data, index=index, columns=[name for name, _, _ in spec.columns], copy=True)
+    finally:
+        shm.close()
+
@@ -0,0 +1,214 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/performance\task_scheduler.py
+# File Name: task_scheduler
+# @ Author: mango-gh22
+# @ Date：2026/10/18 00:20
+"""
+desc 工作窃取调度器 - 按成本分配和打包任务，空闲工作线程从最忙的队列窃取
+"""
+# src/performance/task_scheduler.py
+"""
+工作窃取调度器
+
+- 任务成本 = 序列长度 × 指标复杂度权重（见 INDICATOR_COMPLEXITY / COMPLEXITY_WEIGHTS）
+- 提交时放入待处理成本最小的工作队列
+- 工作线程每次取一批：按顺序取任务直到累计成本达到 batch_cost（便宜的任务打包，
+  昂贵的任务单独成批）；自己的队列为空时从待处理成本最大的队列窃取一批
+- priority_enabled 时每个队列按优先级（高优先）出队，否则按提交顺序
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 指标复杂度（与 ParallelStrategy.select_mode 的 indicator_complexity 取值一致）
+INDICATOR_COMPLEXITY = {
+    'moving_average': 'simple',
+    'rsi': 'simple',
+    'obv': 'simple',
+    'bollinger_bands': 'simple',
+    'macd': 'medium',
+    'williams_r': 'medium',
+    'stochastic': 'medium',
+    'cci': 'medium',
+    'ichimoku_cloud': 'complex',
+    'parabolic_sar': 'complex',
+}
+
+COMPLEXITY_WEIGHTS = {'simple': 1.0, 'medium': 2.0, 'complex': 4.0}
+
+
+def estimate_cost(rows: int, indicator: str) -> float:
+    """估算任务成本：序列长度 × 指标复杂度权重（未知指标按 medium）"""
+    return max(rows, 1) * COMPLEXITY_WEIGHTS[INDICATOR_COMPLEXITY.get(indicator, 'medium')]
+
+
+class _WorkerQueue:
+    """单个工作线程的任务队列（堆：优先级高、提交早的先出）"""
+
+    __slots__ = ('lock', 'heap', 'pending_cost')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heap: List = []
+        self.pending_cost = 0.0
+
+    def take_batch(self, batch_cost: float) -> List:
+        """取出一批任务（至少一个）"""
+        batch, total = [], 0.0
+        with self.lock:
+            while self.heap and (not batch or total + self.heap[0][2] <= batch_cost):
+                _, _, cost, queued_at, item = heapq.heappop(self.heap)
+                self.pending_cost -= cost
+                total += cost
+                batch.append((item, queued_at))
+        return batch
+
+
+class WorkStealingScheduler:
+    """按成本打包、支持优先级和工作窃取的任务调度器（线程安全）"""
+
+    def __init__(self, workers: int, priority_enabled: bool = True, batch_cost: float = 50000):
+        """
+        初始化调度器
+
+        Args:
+            workers: 工作线程数（每个一个队列）
+            priority_enabled: 是否按优先级出队
+            batch_cost: 每批任务的累计成本上限
+        """
+        if workers <= 0:
+            raise ValueError("工作线程数必须是正整数")
+        self.priority_enabled = priority_enabled
+        self.batch_cost = batch_cost
+        self._queues = [_WorkerQueue() for _ in range(workers)]
+        self._seq = itertools.count()
+        self._layout_lock = threading.Lock()  # 提交与调整队列数互斥
+        self._cond = threading.Condition()
+        self._pending = 0
+        self.stats = {'submitted': 0, 'batches': 0, 'batched_tasks': 0, 'steals': 0, 'stolen_tasks': 0}
+
+    @property
+    def workers(self) -> int:
+        return len(self._queues)
+
+    def submit(self, item: Any, cost: float, priority: int = 1) -> int:
+        """
+        提交任务到待处理成本最小的队列
+
+        Returns:
+            分配到的工作线程编号
+        """
+        key = -priority if self.priority_enabled else 0
+        with self._layout_lock:
+            worker_id = min(range(len(self._queues)), key=lambda i: self._queues[i].pending_cost)
+            queue = self._queues[worker_id]
+            with queue.lock:
+                heapq.heappush(queue.heap, (key, next(self._seq), cost, time.monotonic(), item))
+                queue.pending_cost += cost
+        with self._cond:
+            self._pending += 1
+            self.stats['submitted'] += 1
+            self._cond.notify()
+        return worker_id
+
+    def next_batch(self, worker_id: int, timeout: Optional[float] = None) -> List:
+        """
+        获取一批任务：先取自己的队列，为空时从待处理成本最大的队列窃取
+
+        Args:
+            worker_id: 工作线程编号（超出队列数时只窃取）
+            timeout: 没有任务时的等待时间（秒），None 表示不等待
+
+        Returns:
+            [(任务, 入队时间 time.monotonic()), ...]，没有任务时为空列表
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            own = self._queues[worker_id] if worker_id < len(self._queues) else None
+            batch = own.take_batch(self.batch_cost) if own is not None else []
+            stolen = False
+            if not batch:
+                victims = sorted((q for q in self._queues if q is not own and q.heap),
+                                 key=lambda q: q.pending_cost, reverse=True)
+                for victim in victims:
+                    batch = victim.take_batch(self.batch_cost)
+                    if batch:
+                        stolen = True
+                        break
+
+            if batch:
+                with self._cond:
+                    self._pending -= len(batch)
+                    self.stats['batches'] += 1
+                    self.stats['batched_tasks'] += len(batch)
+                    if stolen:
+                        self.stats['steals'] += 1
+                        self.stats['stolen_tasks'] += len(batch)
+                return batch
+
+            with self._cond:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is None or remaining <= 0:
+                    return []
+                if self._pending == 0:
+                    self._cond.wait(remaining)
+
+    def resize(self, workers: int):
+        """
+        调整队列数（工作线程数变化时调用）
+
+        新增的队列为空，由新工作线程窃取填充；缩减时被移除队列中的任务重新分配到剩余队列。
+        """
+        if workers <= 0:
+            raise ValueError("工作线程数必须是正整数")
+        with self._layout_lock:
+            if workers >= len(self._queues):
+                self._queues = self._queues + [_WorkerQueue() for _ in range(workers - len(self._queues))]
+                return
+            removed, self._queues = self._queues[workers:], self._queues[:workers]
+            for queue in removed:
+                with queue.lock:
+                    entries, queue.heap, queue.pending_cost = queue.heap, [], 0.0
+                for entry in entries:
+                    target = min(self._queues, key=lambda q: q.pending_cost)
+                    with target.lock:
+                        heapq.heappush(target.heap, entry)
+                        target.pending_cost += entry[2]
+
+    def remove(self, predicate) -> int:
+        """删除 predicate(任务) 为真的排队任务，返回删除数"""
+        removed = 0
+        for queue in self._queues:
+            with queue.lock:
+                kept = [entry for entry in queue.heap if not predicate(entry[4])]
+                dropped = len(queue.heap) - len(kept)
+                if dropped:
+                    queue.heap = kept
+                    heapq.heapify(queue.heap)
+                    queue.pending_cost = sum(entry[2] for entry in kept)
+                    removed += dropped
+        if removed:
+            with self._cond:
+                self._pending -= removed
+        return removed
+
+    def qsize(self) -> int:
+        """排队任务数"""
+        return sum(len(queue.heap) for queue in self._queues)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """调度统计：批次数、平均批大小、窃取次数、各队列长度和待处理成本"""
+        with self._cond:
+            stats = dict(self.stats)
+        stats['avg_batch_size'] = stats['batched_tasks'] / stats['batches'] if stats['batches'] else 0.0
+        stats['queue_sizes'] = [len(queue.heap) for queue in self._queues]
+        stats['pending_cost'] = [queue.pending_cost for queue in self._queues]
+        stats['priority_enabled'] = self.priority_enabled
+        stats['batch_cost'] = self.batch_cost
+        return stats
@@ -0,0 +1,174 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/performance\worker_scaling.py
+# File Name: worker_scaling
+# @ Author: mango-gh22
+# @ Date：2026/10/18 01:10
+"""
+desc 自适应工作数控制器 - 按实测 CPU 负载和内存阈值调整并行计算器的工作线程/进程数
+"""
+# src/performance/worker_scaling.py
+"""
+自适应工作数控制器
+
+定期通过 PerformanceMonitor.collect_metrics 采样系统 CPU 和内存，按
+config/performance.yaml 的 indicators.parallel.adaptive（min_workers、max_workers、
+target_load）调整 ParallelCalculator 的工作数：
+
+- 内存 CRITICAL：直接降到 min_workers
+- 内存 HIGH：每次减 1，不再增加
+- CPU 负载 > target_load + tolerance：减 1
+- CPU 负载 < target_load - tolerance 且有排队任务：加 1
+- 其余情况保持不变（容差带内不调整，避免来回抖动）
+
+CPU 负载用系统整体使用率（system_cpu_percent / 100），进程模式下子进程的计算也计入。
+内存阈值优先取 MemoryManager 最近一次快照，没有时按采样到的系统内存使用率判断。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+import logging
+
+from .memory_manager import MemoryThreshold, classify_memory_percent
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveWorkerController:
+    """按 CPU 负载和内存阈值调整并行计算器工作数的控制器"""
+
+    def __init__(self, calculator,
+                 min_workers: int = 1,
+                 max_workers: int = 8,
+                 target_load: float = 0.7,
+                 interval: float = 5.0,
+                 tolerance: float = 0.1,
+                 monitor=None,
+                 memory_manager=None):
+        """
+        初始化控制器
+
+        Args:
+            calculator: ParallelCalculator（需要 max_workers、scheduler 和 resize_workers）
+            min_workers: 最小工作数
+            max_workers: 最大工作数
+            target_load: 目标 CPU 负载率（0-1）
+            interval: 采样间隔（秒）
+            tolerance: 负载容差，|负载 - 目标| 不超过容差时不调整
+            monitor: PerformanceMonitor，None 时首次采样前创建
+            memory_manager: MemoryManager，None 时按采样的系统内存使用率判断阈值
+        """
+        if min_workers <= 0 or max_workers < min_workers:
+            raise ValueError(f"工作数范围无效: [{min_workers}, {max_workers}]")
+        self.calculator = calculator
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.target_load = target_load
+        self.interval = interval
+        self.tolerance = tolerance
+        self.monitor = monitor
+        self.memory_manager = memory_manager
+
+        self.decisions = deque(maxlen=100)
+        self.stats = {'samples': 0, 'scale_ups': 0, 'scale_downs': 0, 'memory_backoffs': 0}
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, calculator, config: Dict, **kwargs) -> 'AdaptiveWorkerController':
+        """按 indicators.parallel.adaptive 配置创建"""
+        return cls(calculator,
+                   min_workers=config.get('min_workers', 1),
+                   max_workers=config.get('max_workers', 8),
+                   target_load=config.get('target_load', 0.7),
+                   interval=config.get('interval', 5.0),
+                   tolerance=config.get('tolerance', 0.1),
+                   **kwargs)
+
+    def _memory_threshold(self, metrics) -> MemoryThreshold:
+        """内存阈值：MemoryManager 最近快照优先"""
+        history = getattr(self.memory_manager, 'memory_history', None)
+        if history:
+            return history[-1].threshold
+        return classify_memory_percent(metrics.memory_percent)
+
+    def decide(self, current: int, load: float, threshold: MemoryThreshold, backlog: int) -> int:
+        """根据负载、内存阈值和排队任务数计算目标工作数"""
+        if threshold == MemoryThreshold.CRITICAL:
+            target = self.min_workers
+        elif threshold == MemoryThreshold.HIGH:
+            target = current - 1
+        elif load > self.target_load + self.tolerance:
+            target = current - 1
+        elif load < self.target_load - self.tolerance and backlog > 0:
+            target = current + 1
+        else:
+            target = current
+        return max(self.min_workers, min(self.max_workers, target))
+
+    def step(self) -> int:
+        """采样一次并调整工作数，返回调整后的工作数"""
+        if self.monitor is None:
+            from src.monitoring.performance_monitor import PerformanceMonitor
+            self.monitor = PerformanceMonitor({})
+
+        metrics = self.monitor.collect_metrics()
+        load = metrics.system_cpu_percent / 100
+        threshold = self._memory_threshold(metrics)
+        backlog = self.calculator.scheduler.qsize()
+        current = self.calculator.max_workers
+        target = self.decide(current, load, threshold, backlog)
+
+        self.stats['samples'] += 1
+        if target != current:
+            self.calculator.resize_workers(target)
+            if target > current:
+                self.stats['scale_ups'] += 1
+            else:
+                self.stats['scale_downs'] += 1
+                if threshold in (MemoryThreshold.HIGH, MemoryThreshold.CRITICAL):
+                    self.stats['memory_backoffs'] += 1
+            logger.info(f"调整工作数: {current} -> {target} (CPU 负载 {load:.0%}, "
+                        f"内存 {threshold.value}, 排队 {backlog})")
+
+        self.decisions.append({
+            'time': time.time(), 'load': load, 'memory_threshold': threshold.value,
+            'backlog': backlog, 'workers_before': current, 'workers_after': target
+        })
+        return target
+
+    def start(self):
+        """启动后台采样线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='adaptive-workers')
+        self._thread.start()
+        logger.info(f"启动自适应工作数控制，范围: [{self.min_workers}, {self.max_workers}], "
+                    f"目标负载: {self.target_load:.0%}")
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"自适应工作数调整失败: {e}")
+
+    def stop(self):
+        """停止后台采样线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """控制统计：调整次数、当前范围、最近一次决策"""
+        return {
+            **self.stats,
+            'min_workers': self.min_workers,
+            'max_workers': self.max_workers,
+            'target_load': self.target_load,
+            'last_decision': self.decisions[-1] if self.decisions else None
+        }
@@ -143,18 +143,21 @@ class QualityMonitor:
             sample_size = min(50, total_symbols)
             sample_symbols = np.random.choice(symbols, sample_size, replace=False) if symbols else []
 
-            for symbol in sample_symbols:
-                # 检查最近30天数据
-                end_date = datetime.now().strftime('%Y-%m-%d')
-                start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-
-                df = self.query_engine.query_daily_data(
-                    symbol=symbol,
-                    start_date=start_date,
-                    end_date=end_date
-                )
+            # 检查最近30天数据（抽样股票一次批量查询）
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+
+            data_by_symbol = self.query_engine.query_daily_data_many(
+                list(sample_symbols),
+                start_date=start_date,
+                end_date=end_date,
+                columns=['close'],
+                as_dict=True
+            )
 
-                if df.empty or len(df) < 15:  # 假设至少应该有15个交易日的数据
+            for symbol in sample_symbols:
+                df = data_by_symbol.get(symbol)
+                if df is None or df.empty or len(df) < 15:  # 假设至少应该有15个交易日的数据
                     missing_data_symbols.append(symbol)
 
             completeness_rate = 1 - (len(missing_data_symbols) / sample_size) if sample_size > 0 else 0
@@ -189,6 +189,31 @@ class StockAnalytics:
 
         return correlation_matrix
 
+    @staticmethod
+    def calculate_correlation_from_panel(panel, field: str = 'close',
+                                         min_periods: int = 20) -> pd.DataFrame:
+        """
+        基于面板数据计算股票间收益率相关性
+
+        Args:
+            panel: PricePanel（src.query.panel_loader）
+            field: 价格字段
+            min_periods: 两只股票共同有效的最少样本数
+
+        Returns:
+            DataFrame: 相关性矩阵
+        """
+        prices = panel[field]
+        if prices.shape[1] < 2:
+            raise ValueError("至少需要两只股票数据来计算相关性")
+
+        # 停牌日价格为 NaN，收益率相应为 NaN，由 corr 成对剔除
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = prices[1:] / prices[:-1] - 1.0
+
+        returns_df = pd.DataFrame(returns, index=panel.dates[1:], columns=panel.symbols)
+        return returns_df.corr(min_periods=min_periods)
+
     @staticmethod
     def analyze_stock_performance(data: pd.DataFrame,
                                   risk_free_rate: float = 0.03) -> Dict:
@@ -19,6 +19,8 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 
+from src.data.change_events import DataChangeEvent, get_data_change_bus, symbol_key
+
 logger = logging.getLogger(__name__)
 
 
@@ -474,6 +476,10 @@ class DataPipeline:
         self.preprocessor = DataPreprocessor(preprocessor_config)
         self.cache: Dict[str, pd.DataFrame] = {}
 
+        # 数据入库后失效受影响股票的缓存
+        self.change_bus = get_data_change_bus()
+        self.change_bus.subscribe(self._on_data_changed)
+
     def process(self, df: pd.DataFrame, symbol: str,
                 start_date: str, end_date: str,
                 use_cache: bool = True) -> Tuple[pd.DataFrame, DataQualityReport]:
@@ -492,6 +498,7 @@ class DataPipeline:
         """
         # 生成缓存键
         cache_key = f"{symbol}_{start_date}_{end_date}"
+        self.change_bus.poll()
 
         # 检查缓存
         if use_cache and cache_key in self.cache:
@@ -602,6 +609,30 @@ class DataPipeline:
 
         return results
 
+    def _on_data_changed(self, event: DataChangeEvent):
+        self.invalidate(event.symbol, event.since_date)
+
+    def invalidate(self, symbol: str, since_date: Optional[str] = None) -> int:
+        """
+        删除股票中结束日期 >= since_date 的缓存（since_date 为 None 时删除该股票全部缓存）
+
+        Returns:
+            删除的缓存项数
+        """
+        symbol = symbol_key(symbol)
+        event = DataChangeEvent(data_type='invalidate', symbol=symbol, since_date=since_date)
+        stale = []
+        for cache_key in list(self.cache):
+            key_symbol, _, end_date = cache_key.rsplit('_', 2)
+            if symbol_key(key_symbol) == symbol and event.affects(None if end_date in ('', 'None') else end_date):
+                stale.append(cache_key)
+
+        for cache_key in stale:
+            self.cache.pop(cache_key, None)
+        if stale:
+            logger.debug(f"数据变更失效管道缓存: {symbol}, {len(stale)} 项")
+        return len(stale)
+
     def clear_cache(self):
         """清理缓存"""
         self.cache.clear()
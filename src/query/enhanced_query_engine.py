@@ -13,6 +13,8 @@ import pandas as pd
 from datetime import datetime
 import json
 
+from src.utils.single_flight import SingleFlight
+
 # 设置日志
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,7 @@ class EnhancedQueryEngine:
         """
         # 延迟导入以避免循环依赖
         if query_engine is None:
-            from src.database.query_engine import QueryEngine
+            from src.query.query_engine import QueryEngine
             self.query_engine = QueryEngine()
         else:
             self.query_engine = query_engine
@@ -46,11 +48,15 @@ class EnhancedQueryEngine:
         self.cache = {}
         self.cache_enabled = True
 
+        # 相同参数的并发查询只执行一次
+        self._inflight = SingleFlight()
+
     def query_with_indicators(self, symbol: str,
                               indicators: List[str],
                               start_date: str,
                               end_date: str,
-                              use_cache: bool = True) -> pd.DataFrame:
+                              use_cache: bool = True,
+                              data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         查询数据并计算技术指标
 
@@ -60,10 +66,49 @@ class EnhancedQueryEngine:
             start_date: 开始日期
             end_date: 结束日期
             use_cache: 是否使用缓存
+            data: 已查询的日线数据（如 query_daily_data_many 的结果），None 时从数据库查询
 
         Returns:
             包含技术指标的DataFrame
         """
+        # 相同请求并发到达时只查询和计算一次，其余调用者等待并复制结果
+        key = json.dumps([symbol, indicators, str(start_date), str(end_date), use_cache])
+        df, shared = self._inflight.do(key, self._query_with_indicators,
+                                       symbol, indicators, start_date, end_date, use_cache, data)
+        return df.copy() if shared else df
+
+    def query_daily_data_many(self, symbols: List[str],
+                              start_date: str,
+                              end_date: str,
+                              limit: int = 100) -> Dict[str, pd.DataFrame]:
+        """
+        一次查询多只股票的日线数据（分块 IN 查询），按股票拆分
+
+        每只股票的数据与 query_daily_data 的结果形式一致：按日期倒序、最多 limit 条
+        （条数限制在 SQL 中按股票截取）。底层查询引擎不支持批量查询时逐只查询。
+
+        Returns:
+            {输入代码: DataFrame}
+        """
+        if not hasattr(self.query_engine, 'query_daily_data_many'):
+            return {symbol: self.query_engine.query_daily_data(symbol, start_date, end_date)
+                    for symbol in dict.fromkeys(symbols)}
+
+        frames = self.query_engine.query_daily_data_many(symbols, start_date, end_date, as_dict=True,
+                                                         limit_per_symbol=limit)
+        return {
+            symbol: df.sort_values('trade_date', ascending=False).reset_index(drop=True)
+            if not df.empty else pd.DataFrame()
+            for symbol, df in frames.items()
+        }
+
+    def _query_with_indicators(self, symbol: str,
+                               indicators: List[str],
+                               start_date: str,
+                               end_date: str,
+                               use_cache: bool,
+                               data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """query_with_indicators 的实际查询和计算"""
         logger.info(f"查询带指标的数据: {symbol}, 指标: {indicators}, 日期: {start_date} - {end_date}")
 
         # 验证指标
@@ -74,12 +119,12 @@ class EnhancedQueryEngine:
             logger.warning(f"以下指标无效或未注册: {invalid_indicators}")
             indicators = [ind for ind in indicators if ind in available_indicators]
 
+        # 获取基础数据
+        df = self.query_engine.query_daily_data(symbol, start_date, end_date) if data is None else data.copy()
+
         if not indicators:
             logger.warning("没有有效的指标，返回原始数据")
-            return self.query_engine.query_daily_data(symbol, start_date, end_date)
-
-        # 获取基础数据
-        df = self.query_engine.query_daily_data(symbol, start_date, end_date)
+            return df
 
         if df.empty:
             logger.warning(f"股票 {symbol} 在指定日期范围内无数据")
@@ -97,7 +142,8 @@ class EnhancedQueryEngine:
                 start_date=start_date,
                 end_date=end_date,
                 indicator_params={},
-                use_cache=use_cache
+                use_cache=use_cache,
+                data=df
             )
             logger.debug(f"指标计算结果: {len(indicator_results)} 个")
         except Exception as e:
@@ -116,7 +162,14 @@ class EnhancedQueryEngine:
             indicator_cols = [col for col in indicator_df.columns
                               if col not in df.columns or col in ['trade_date', 'symbol']]
 
-            if indicator_cols:
+            if indicator_cols and 'trade_date' in df.columns and 'trade_date' in indicator_df.columns:
+                # 指标结果按日期升序，原始数据按日期倒序，按交易日期对齐
+                indicator_cols = [col for col in indicator_cols if col not in ('trade_date', 'symbol')]
+                aligned = indicator_df.drop_duplicates('trade_date', keep='last') \
+                    .set_index('trade_date')[indicator_cols].reindex(pd.to_datetime(df['trade_date']))
+                aligned.index = df.index
+                df = pd.concat([df, aligned], axis=1)
+            elif indicator_cols:
                 df = pd.concat([df, indicator_df[indicator_cols]], axis=1)
 
         logger.info(f"成功合并 {len(indicator_results)} 个指标，最终列数: {len(df.columns)}")
@@ -0,0 +1,165 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/query\panel_loader.py
+# File Name: panel_loader
+# @ Author: mango-gh22
+# @ Date：2026/10/17 14:10
+"""
+desc 面板数据加载器 - 日期×股票 对齐的 NumPy 矩阵
+"""
+
+# src/query/panel_loader.py
+"""
+面板数据加载器
+
+组合分析经常需要手工把多只股票的 DataFrame 透视成宽表。
+PanelLoader 通过 QueryEngine.query_daily_data_many 一次性取数，
+以交易日历为行、股票为列，输出 float64 连续矩阵：
+    panel['close']  -> ndarray (T, N)
+    panel.mask      -> ndarray (T, N)，True 表示该交易日有行情
+缺失位置为 NaN。
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+@dataclass
+class PricePanel:
+    """日期×股票 面板数据"""
+    dates: pd.DatetimeIndex
+    symbols: List[str]
+    fields: Dict[str, np.ndarray] = field(default_factory=dict)
+    mask: Optional[np.ndarray] = None
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.fields[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.fields
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+
+    def to_frame(self, name: str) -> pd.DataFrame:
+        """单个字段转为宽表 DataFrame（行: 日期, 列: 股票）"""
+        return pd.DataFrame(self.fields[name], index=self.dates, columns=self.symbols)
+
+    def symbol_frame(self, symbol: str, dropna: bool = True) -> pd.DataFrame:
+        """取出单只股票的长表（兼容按股票处理的旧接口）"""
+        col = self.symbols.index(symbol)
+        df = pd.DataFrame({name: values[:, col] for name, values in self.fields.items()}, index=self.dates)
+        df.index.name = 'trade_date'
+        if dropna and self.mask is not None:
+            df = df[self.mask[:, col]]
+        return df
+
+    @classmethod
+    def from_long_frame(cls, df: pd.DataFrame, symbols: Sequence[str],
+                        dates: Optional[Sequence] = None,
+                        fields: Sequence[str] = DEFAULT_PANEL_FIELDS) -> 'PricePanel':
+        """
+        长表（trade_date, symbol, 字段...）转换为面板
+
+        Args:
+            df: 长表数据
+            symbols: 列顺序
+            dates: 行日期（交易日历），None 时使用数据中出现的日期
+            fields: 需要输出的字段
+        """
+        symbols = list(symbols)
+        if dates is None:
+            dates = pd.DatetimeIndex(sorted(pd.to_datetime(df['trade_date']).unique())) \
+                if not df.empty else pd.DatetimeIndex([])
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+
+        shape = (len(dates), len(symbols))
+        mask = np.zeros(shape, dtype=bool)
+        arrays = {name: np.full(shape, np.nan, dtype=np.float64) for name in fields}
+
+        if not df.empty and shape[0] and shape[1]:
+            row_idx = dates.get_indexer(pd.to_datetime(df['trade_date']).dt.normalize())
+            col_idx = pd.Index(symbols).get_indexer(df['symbol'])
+            valid = (row_idx >= 0) & (col_idx >= 0)
+            row_idx, col_idx = row_idx[valid], col_idx[valid]
+
+            mask[row_idx, col_idx] = True
+            for name in fields:
+                if name in df.columns:
+                    values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+                    arrays[name][row_idx, col_idx] = values[valid]
+
+        return cls(dates=dates, symbols=symbols, fields=arrays, mask=mask)
+
+
+class PanelLoader:
+    """面板数据加载器"""
+
+    def __init__(self, query_engine=None, trade_date_manager=None):
+        """
+        Args:
+            query_engine: 提供 query_daily_data_many 的查询引擎，默认 QueryEngine
+            trade_date_manager: 交易日历，默认 EnhancedTradeDateManager
+        """
+        if query_engine is None:
+            from src.query.query_engine import QueryEngine
+            query_engine = QueryEngine()
+
+        self.query_engine = query_engine
+        self.trade_date_manager = trade_date_manager
+
+    def get_calendar(self, start_date: str, end_date: str) -> pd.DatetimeIndex:
+        """获取交易日历（YYYY-MM-DD）"""
+        if self.trade_date_manager is None:
+            # 仅在需要交易日历时才创建
+            from src.utils.enhanced_trade_date_manager import EnhancedTradeDateManager
+            self.trade_date_manager = EnhancedTradeDateManager()
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        return pd.DatetimeIndex(self.trade_date_manager.get_trade_dates_between(start, end))
+
+    def load(self, symbols: Sequence[str], start_date: str, end_date: str,
+             fields: Sequence[str] = DEFAULT_PANEL_FIELDS,
+             use_trade_calendar: bool = True) -> PricePanel:
+        """
+        加载面板数据
+
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD
+            fields: 字段列表（QueryEngine.DAILY_COLUMN_EXPRESSIONS 中的输出名）
+            use_trade_calendar: True 以交易日历为行，False 以数据中出现的日期为行
+
+        Returns:
+            PricePanel
+        """
+        # 查询结果中的 symbol 为数据库格式，列顺序沿用标准化后的代码；
+        # 先标准化再去重，同一股票的不同写法（如 600000.SH 与 sh600000）只占一列
+        normalize = getattr(self.query_engine, '_normalize_symbol', lambda s: s)
+        db_symbols = list(dict.fromkeys(normalize(s) for s in symbols))
+        df = self.query_engine.query_daily_data_many(
+            db_symbols, start_date=start_date, end_date=end_date, columns=list(fields)
+        )
+
+        dates = None
+        if use_trade_calendar:
+            try:
+                dates = self.get_calendar(start_date, end_date)
+            except Exception as e:
+                logger.warning(f"获取交易日历失败，改用数据日期: {e}")
+
+        panel = PricePanel.from_long_frame(df, db_symbols, dates, fields)
+        coverage = panel.mask.mean() if panel.mask.size else 0.0
+        logger.info(f"面板加载完成: {panel.shape[0]}个交易日 x {panel.shape[1]}只股票, 覆盖率{coverage:.1%}")
+        return panel
@@ -255,6 +255,127 @@ class QueryEngine:
             logger.error(f"查询日线数据失败: {e}", exc_info=True)
             return pd.DataFrame()
 
+    # 多股票查询可选字段：输出列名 → SQL 表达式
+    DAILY_COLUMN_EXPRESSIONS = {
+        'open': 'open_price',
+        'high': 'high_price',
+        'low': 'low_price',
+        'close': 'close_price',
+        'volume': 'volume',
+        'amount': 'amount',
+        'price_change': '(close_price - pre_close_price)',
+        'pct_change': 'change_percent',
+        'pre_close': 'pre_close_price',
+        'turnover_rate': 'turnover_rate',
+        'amplitude': 'amplitude',
+        'ma5': 'ma5',
+        'ma10': 'ma10',
+        'ma20': 'ma20',
+    }
+
+    def query_daily_data_many(self, symbols, start_date: str = None, end_date: str = None,
+                              columns=None, as_dict: bool = False, chunk_size: int = 100,
+                              limit_per_symbol: int = None):
+        """
+        批量查询多只股票日线数据（分块 IN (...) 查询）
+
+        Args:
+            symbols: 股票代码列表（支持多种格式）
+            start_date: 开始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD
+            columns: 输出字段（见 DAILY_COLUMN_EXPRESSIONS），None 表示全部
+            as_dict: True 返回 {输入代码: DataFrame}（同一股票的不同写法各有一项），否则返回长表
+            chunk_size: 每条查询包含的股票数
+            limit_per_symbol: 每只股票最多返回最近的多少条（在 SQL 中用 ROW_NUMBER 截取，
+                需要 MySQL 8.0+），None 表示不限制
+
+        Returns:
+            按 symbol, trade_date 升序排列的长表 DataFrame，或按股票拆分的字典
+        """
+        symbols = list(dict.fromkeys(symbols or []))
+        # 标准代码 -> 输入的各种写法（如 600519.SH 与 sh600519 查询同一只股票）
+        normalized_map = {}
+        for s in symbols:
+            normalized_map.setdefault(self._normalize_symbol(s), []).append(s)
+        normalized = list(normalized_map.keys())
+
+        if columns is None:
+            columns = list(self.DAILY_COLUMN_EXPRESSIONS.keys())
+        unknown = [col for col in columns if col not in self.DAILY_COLUMN_EXPRESSIONS]
+        if unknown:
+            raise ValueError(f"不支持的字段: {unknown}")
+
+        select_list = ', '.join(
+            f"{self.DAILY_COLUMN_EXPRESSIONS[col]} as {col}" for col in columns
+        )
+
+        frames = []
+        try:
+            for start in range(0, len(normalized), chunk_size):
+                chunk = normalized[start:start + chunk_size]
+                where_conditions = [f"symbol IN ({', '.join(['%s'] * len(chunk))})"]
+                params = list(chunk)
+
+                if start_date:
+                    where_conditions.append("trade_date >= %s")
+                    params.append(start_date)
+                if end_date:
+                    where_conditions.append("trade_date <= %s")
+                    params.append(end_date)
+
+                if limit_per_symbol is None:
+                    query = f"""
+                        SELECT trade_date, symbol, {select_list}
+                        FROM stock_daily_data
+                        WHERE {' AND '.join(where_conditions)}
+                        ORDER BY symbol, trade_date
+                    """
+                else:
+                    # 每只股票只取最近 limit_per_symbol 条，不把整个日期区间的数据传回客户端
+                    query = f"""
+                        SELECT trade_date, symbol, {', '.join(columns)}
+                        FROM (
+                            SELECT trade_date, symbol, {select_list},
+                                   ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY trade_date DESC) AS row_num
+                            FROM stock_daily_data
+                            WHERE {' AND '.join(where_conditions)}
+                        ) ranked
+                        WHERE row_num <= %s
+                        ORDER BY symbol, trade_date
+                    """
+                    params.append(limit_per_symbol)
+                result = self.db_connector.execute_query(query, tuple(params))
+                if result:
+                    frames.append(pd.DataFrame(result))
+
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+                columns=['trade_date', 'symbol'] + list(columns))
+
+            if not df.empty:
+                df['trade_date'] = pd.to_datetime(df['trade_date'])
+                for col in columns:
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+                # 各块内已按 symbol, trade_date 排序，块之间按输入顺序拼接
+                df = df.sort_values(['symbol', 'trade_date'], ignore_index=True)
+
+            chunks = (len(normalized) + chunk_size - 1) // chunk_size
+            logger.info(f"批量查询日线数据成功: {len(normalized)}只股票, {chunks}次查询, {len(df)}条记录")
+
+        except Exception as e:
+            logger.error(f"批量查询日线数据失败: {e}", exc_info=True)
+            df = pd.DataFrame(columns=['trade_date', 'symbol'] + list(columns))
+
+        if not as_dict:
+            return df
+
+        grouped = {sym: group.reset_index(drop=True) for sym, group in df.groupby('symbol', sort=False)}
+        empty = df.iloc[0:0]
+        return {
+            original: grouped.get(norm, empty).copy()
+            for norm, originals in normalized_map.items()
+            for original in originals
+        }
+
     def query_stock_basic(self, symbol: str = None, industry: str = None) -> pd.DataFrame:
         try:
             where_conditions = []
@@ -0,0 +1,91 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/src/utils\single_flight.py
+# File Name: single_flight
+# @ Author: mango-gh22
+# @ Date：2026/10/17 22:10
+"""
+desc 请求合并（single-flight）- 相同键的并发调用只执行一次
+"""
+# src/utils/single_flight.py
+"""
+请求合并
+
+同一时刻多个线程以相同的键调用 do()：第一个调用者执行函数，其余调用者等待并共享
+它的结果（或异常）。执行结束后键即释放，之后的调用会重新执行（结果缓存由调用方负责）。
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并并发调用（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key: str, func: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        执行或加入相同键的进行中调用
+
+        Args:
+            key: 合并键
+            func: 要执行的函数
+
+        Returns:
+            (结果, 是否与其他调用者共享)。共享的结果是同一个对象，调用方如需修改应先复制。
+        """
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"合并到进行中的调用: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, call.waiters > 0
+
+    def in_flight(self) -> int:
+        """进行中的调用数"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,162 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/api\test_async_query.py
+# File Name: test_async_query
+# @ Author: mango-gh22
+# @ Date：2026/10/18 02:20
+"""
+desc 异步查询层测试 - 阻塞查询不占用事件循环、排队上限背压、API 503、批量接口并发计算
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import asyncio
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.api.async_query import AsyncQueryEngine, QueryOverloadedError
+
+
+class SlowEngine:
+    """模拟阻塞数据库查询的查询引擎"""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.prefetched = []
+        self.active = self.max_active = 0
+        self._lock = threading.Lock()
+
+    def query_daily_data_many(self, symbols, start_date, end_date):
+        self.prefetched.append(list(symbols))
+        return {symbol: pd.DataFrame() if symbol == 'sh000000' else pd.DataFrame({'close_price': [1.0, 2.0, 3.0]})
+                for symbol in symbols}
+
+    def query_with_indicators(self, symbol, indicators, start_date, end_date, use_cache=True, data=None):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        # 延迟随代码递减，后提交的股票先完成
+        time.sleep(self.latency * (1 + int(symbol[-1]) % 3) / 3 if symbol[-1].isdigit() else self.latency)
+        with self._lock:
+            self.active -= 1
+        if data is not None and data.empty:
+            return data
+        return pd.DataFrame({'trade_date': pd.date_range(start_date, periods=3).astype(str),
+                             'symbol': symbol, 'close_price': [1.0, 2.0, float('nan')]})
+
+
+def query(engine: AsyncQueryEngine, symbol: str):
+    return engine.query_with_indicators(symbol, ['rsi'], '2024-01-01', '2024-01-31')
+
+
+class TestAsyncQueryEngine:
+    """异步查询层测试类"""
+
+    def test_blocking_queries_run_concurrently(self):
+        engine = AsyncQueryEngine(SlowEngine(0.2), max_workers=4, max_pending=8)
+
+        async def scenario():
+            ticks = 0
+
+            async def heartbeat():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            beat = asyncio.create_task(heartbeat())
+            start = time.perf_counter()
+            frames = await asyncio.gather(*(query(engine, f"sh60000{i}") for i in range(4)))
+            elapsed = time.perf_counter() - start
+            beat.cancel()
+            return frames, elapsed, ticks
+
+        try:
+            frames, elapsed, ticks = asyncio.run(scenario())
+        finally:
+            engine.shutdown()
+        assert [df['symbol'].iloc[0] for df in frames] == [f"sh60000{i}" for i in range(4)]
+        assert elapsed < 0.6          # 4 个 0.2 秒的查询并行执行
+        assert ticks >= 5             # 查询期间事件循环未被阻塞
+        assert engine.get_statistics()['max_in_flight'] == 4
+
+    def test_rejects_when_pending_limit_reached(self):
+        engine = AsyncQueryEngine(SlowEngine(0.3), max_workers=1, max_pending=1, acquire_timeout=0.05)
+
+        async def scenario():
+            return await asyncio.gather(query(engine, 'sh600000'), query(engine, 'sh600001'),
+                                        return_exceptions=True)
+
+        try:
+            first, second = asyncio.run(scenario())
+        finally:
+            engine.shutdown()
+        assert isinstance(first, pd.DataFrame)
+        assert isinstance(second, QueryOverloadedError)
+        assert engine.get_statistics()['rejected'] == 1
+
+
+class TestIndicatorsAPI:
+    """API 使用异步查询层测试类"""
+
+    def test_calculate_and_overload(self):
+        pytest.importorskip('uvicorn')
+        from fastapi.testclient import TestClient
+        from src.api.indicators_api import app, get_query_engine
+
+        engine = AsyncQueryEngine(SlowEngine(0.01), max_workers=1, max_pending=1, acquire_timeout=0.05)
+        app.dependency_overrides[get_query_engine] = lambda: engine
+        try:
+            client = TestClient(app)
+            body = {'symbol': 'sh600000', 'indicators': ['rsi'],
+                    'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+            response = client.post('/indicators/calculate', json=body)
+            assert response.status_code == 200
+            assert response.json()['data_count'] == 3
+
+            async def fail(*args, **kwargs):
+                raise QueryOverloadedError('查询排队已满')
+
+            engine.query_with_indicators = fail
+            response = client.post('/indicators/calculate', json=body)
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '1'
+        finally:
+            app.dependency_overrides.clear()
+            engine.shutdown()
+
+    def test_batch_fans_out_with_limit(self):
+        pytest.importorskip('uvicorn')
+        from fastapi.testclient import TestClient
+        from src.api.indicators_api import app, get_batch_concurrency, get_query_engine
+
+        slow = SlowEngine(0.15)
+        engine = AsyncQueryEngine(slow, max_workers=4, max_pending=8)
+        app.dependency_overrides[get_query_engine] = lambda: engine
+        app.dependency_overrides[get_batch_concurrency] = lambda: 2
+        symbols = ['sh600002', 'sh600001', 'sh600000', 'sh000000']
+        params = {'symbols': symbols, 'indicators': ['rsi'], 'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+        try:
+            client = TestClient(app)
+            body = client.get('/indicators/calculate/batch', params=params).json()
+            assert list(body['results']) == symbols
+            assert (body['successful'], body['failed']) == (3, 1)
+            assert body['results']['sh000000'] == {'error': '无数据'}
+            assert body['results']['sh600000']['data'][2]['close_price'] is None
+            assert slow.prefetched == [symbols]       # 一次预取全部股票
+            assert slow.max_active == 2               # 不超过并发上限
+
+            response = client.get('/indicators/calculate/batch', params=params,
+                                  headers={'Accept': 'application/x-ndjson'})
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert response.headers['content-type'].startswith('application/x-ndjson')
+            assert sorted(line['symbol'] for line in lines[:-1]) == sorted(symbols)
+            assert lines[-1]['summary'] == {'total_symbols': 4, 'successful': 3, 'failed': 1}
+        finally:
+            app.dependency_overrides.clear()
+            engine.shutdown()
@@ -0,0 +1,105 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/api\test_streaming.py
+# File Name: test_streaming
+# @ Author: mango-gh22
+# @ Date：2026/10/18 03:55
+"""
+desc 流式响应测试 - NDJSON / 列式 JSON / Arrow 分块编码、格式协商、计算接口流式输出
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api import streaming
+from src.api.async_query import AsyncQueryEngine
+
+
+def make_result(rows: int = 500) -> pd.DataFrame:
+    return pd.DataFrame({
+        'trade_date': pd.bdate_range('2020-01-01', periods=rows),
+        'symbol': 'sh600000',
+        'close_price': np.linspace(10, 20, rows),
+        'rsi': [np.nan] * 14 + list(np.linspace(30, 70, rows - 14)),
+    })
+
+
+class TestStreamingEncoders:
+    """分块编码测试类"""
+
+    def test_ndjson_and_columns_round_trip(self):
+        df = make_result()
+        meta = {'symbol': 'sh600000', 'data_count': len(df)}
+
+        chunks = list(streaming.iter_ndjson(df, meta, chunk_bytes=4096, statistics={'rsi': {'count': 486.0}}))
+        assert max(len(chunk.encode('utf-8')) for chunk in chunks) <= 4096 * 1.5
+        assert len(chunks) > 10                      # 按字节预算分块
+        lines = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        assert lines[0] == {'meta': meta}
+        assert lines[-1] == {'statistics': {'rsi': {'count': 486.0}}}
+        records = lines[1:-1]
+        assert len(records) == len(df)
+        assert records[0]['rsi'] is None and records[0]['trade_date'] == '2020-01-01T00:00:00'
+
+        body = json.loads(''.join(streaming.iter_columns(df, meta)))
+        assert body['meta'] == meta
+        assert list(body['data']) == df.columns.tolist()
+        assert body['data']['close_price'] == df['close_price'].tolist()
+
+    def test_arrow_stream(self):
+        pa = pytest.importorskip('pyarrow')
+        df = make_result()
+        data = b''.join(streaming.iter_arrow(df, {'symbol': 'sh600000'}, chunk_bytes=4096))
+        reader = pa.ipc.open_stream(data)
+        batches = list(reader)
+        assert len(batches) > 1
+        assert json.loads(reader.schema.metadata[b'meta']) == {'symbol': 'sh600000'}
+        pd.testing.assert_frame_equal(pa.Table.from_batches(batches).to_pandas(), df, check_dtype=False)
+
+    def test_negotiate_format(self):
+        assert streaming.negotiate_format(None, None) == 'json'
+        assert streaming.negotiate_format(None, 'application/x-ndjson') == 'ndjson'
+        assert streaming.negotiate_format('Columns', 'application/x-ndjson') == 'columns'
+        with pytest.raises(ValueError):
+            streaming.negotiate_format('csv', None)
+
+
+class TestCalculateStreaming:
+    """计算接口流式输出测试类"""
+
+    def test_calculate_formats(self):
+        pytest.importorskip('uvicorn')
+        from fastapi.testclient import TestClient
+        from src.api.indicators_api import app, get_query_engine
+
+        class ResultEngine:
+            def query_with_indicators(self, symbol, indicators, start_date, end_date, use_cache=True, data=None):
+                return make_result()
+
+        engine = AsyncQueryEngine(ResultEngine(), max_workers=1, max_pending=2)
+        app.dependency_overrides[get_query_engine] = lambda: engine
+        body = {'symbol': 'sh600000', 'indicators': ['rsi'], 'start_date': '2020-01-01', 'end_date': '2021-12-31'}
+        try:
+            client = TestClient(app)
+            expected = client.post('/indicators/calculate', json=body).json()
+
+            response = client.post('/indicators/calculate', json=body, headers={'Accept': 'application/x-ndjson'})
+            assert response.headers['content-type'].startswith('application/x-ndjson')
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert lines[0]['meta']['columns'] == expected['columns']
+            assert lines[1:-1] == expected['data']
+            assert lines[-1]['statistics'] == expected['statistics']
+
+            columns = client.post('/indicators/calculate', json=body, params={'format': 'columns'}).json()
+            assert columns['data']['rsi'] == [row['rsi'] for row in expected['data']]
+
+            assert client.post('/indicators/calculate', json=body, params={'format': 'csv'}).status_code == 400
+        finally:
+            app.dependency_overrides.clear()
+            engine.shutdown()
@@ -0,0 +1,180 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/data\test_adaptive_storage.py
+# File Name: test_adaptive_storage
+# @ Author: mango-gh22
+# @ Date：2026/10/18 04:30
+"""
+desc 自适应存储测试 - 入库后发布数据变更事件、批次核对记录数（用内存替身代替 MySQL）
+"""
+import sys
+import os
+from contextlib import contextmanager
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import pandas as pd
+import pytest
+
+from src.data import adaptive_storage, change_events
+from src.data.adaptive_storage import AdaptiveDataStorage
+from src.data.change_events import DataChangeBus
+
+COLUMNS = ['id', 'symbol', 'trade_date', 'open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+class FakeCursor:
+    """按 (symbol, trade_date) 去重的 INSERT IGNORE 和按股票计数"""
+
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def executemany(self, sql, records):
+        columns = sql[sql.index('(') + 1:sql.index(')')].split(', ')
+        i, j = columns.index('symbol'), columns.index('trade_date')
+        new = {(r[i], r[j]) for r in records} - self.db.rows
+        self.db.rows |= new
+        self.rowcount = len(new)
+
+    def execute(self, sql, params=()):
+        self.db.queries.append(sql)
+        counts = {}
+        for symbol, _ in self.db.rows:
+            counts[symbol] = counts.get(symbol, 0) + 1
+        if 'GROUP BY symbol' in sql:
+            self._result = [(s, counts[s]) for s in params if s in counts]
+        else:
+            self._result = [(counts.get(params[0], 0),)]
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+class FakeConnector:
+    """DatabaseConnector 替身"""
+
+    config = {'host': 'fake', 'port': 3306, 'database': 'fake'}
+
+    def __init__(self):
+        self.rows = set()
+        self.queries = []
+        self.commits = 0
+
+    @contextmanager
+    def get_connection(self):
+        connector = self
+
+        class Connection:
+            def cursor(self, dictionary=False):
+                return FakeCursor(connector)
+
+            def commit(self):
+                connector.commits += 1
+
+        yield Connection()
+
+
+class FakeRegistry:
+    def get_columns(self, table_name):
+        return COLUMNS
+
+    def get_insertable_columns(self, table_name):
+        return COLUMNS[1:]
+
+
+@pytest.fixture
+def storage_factory(monkeypatch, tmp_path):
+    """创建使用替身连接器的存储器；事件发布到临时日志的总线"""
+    bus = DataChangeBus(str(tmp_path / 'changes.sqlite'))
+    monkeypatch.setattr(change_events, '_bus', bus)
+    monkeypatch.setattr(adaptive_storage, 'get_schema_registry', lambda connector: FakeRegistry())
+
+    def create(**kwargs):
+        connector = FakeConnector()
+        monkeypatch.setattr(adaptive_storage, 'DatabaseConnector', lambda config_path: connector)
+        return AdaptiveDataStorage(**kwargs), connector, bus
+
+    return create
+
+
+def make_daily(symbol: str, dates) -> pd.DataFrame:
+    n = len(dates)
+    return pd.DataFrame({
+        'symbol': symbol, 'trade_date': dates,
+        'open': [10.0] * n, 'high': [11.0] * n, 'low': [9.0] * n, 'close': [10.5] * n,
+        'volume': [1000.0] * n, 'amount': [10500.0] * n,
+    })
+
+
+class TestAdaptiveStorageEvents:
+    """入库事件测试类"""
+
+    def test_insert_publishes_change_event(self, storage_factory):
+        storage, connector, bus = storage_factory()
+        events = []
+        bus.subscribe(events.append)
+
+        affected, report = storage.store_daily_data(make_daily('sh600000', ['20240103', '20240102']))
+        assert (affected, report['status']) == (2, 'success')
+        assert [(e.data_type, e.symbol, e.since_date, e.until_date) for e in events] == [
+            ('daily', 'sh600000', '2024-01-02', '2024-01-03')]
+        assert events[0].table == 'stock_daily_data'
+
+        # 没有新增行（INSERT IGNORE 全部跳过）时不发布
+        assert storage.store_daily_data(make_daily('sh600000', ['20240103']))[0] == 0
+        assert len(events) == 1
+
+
+class TestVerifiedCounts:
+    """批次核对记录数测试类"""
+
+    def test_single_store_does_not_defer(self, storage_factory):
+        storage, connector, _ = storage_factory()
+        assert storage.verifier.mode == 'sampled'
+
+        storage.store_daily_data(make_daily('sh600000', ['20240102']))
+        storage.store_daily_data(make_daily('sz000001', ['20240102']))
+        # 单次写入按抽样立即校验（第 1 次），不积累待核对股票
+        assert len(connector.queries) == 1 and 'GROUP BY' not in connector.queries[0]
+        assert storage.verifier.pending_symbols() == []
+
+    def test_batch_store_reports_verified_counts(self, storage_factory):
+        storage, connector, _ = storage_factory()
+        results = storage.batch_store_daily_data({
+            'sh600000': make_daily('sh600000', ['20240102', '20240103']),
+            'sz000001': make_daily('sz000001', ['20240102']),
+        })
+
+        assert results['success_count'] == 2
+        assert results['verified_counts'] == {'sh600000': 2, 'sz000001': 1}
+        # 批次内写入时不逐股票 COUNT，批次结束一条 GROUP BY
+        assert len(connector.queries) == 1 and 'GROUP BY symbol' in connector.queries[0]
+        assert storage.verifier.effective_mode == 'sampled'
+
+    def test_pipeline_reports_verified_counts(self, storage_factory, monkeypatch, tmp_path):
+        from src.data.data_pipeline import DataPipeline
+
+        storage, _, _ = storage_factory()
+        monkeypatch.chdir(tmp_path)  # 管道在当前目录写缓存和报告
+        pipeline = DataPipeline(collector=None, storage=storage)
+
+        def fetch_and_store(symbol, start_date, end_date):
+            affected, _ = storage.store_daily_data(make_daily(symbol, ['20240102', '20240103']))
+            return {'symbol': symbol, 'status': 'success', 'records_stored': affected}
+
+        monkeypatch.setattr(pipeline, 'fetch_and_store_daily_data', fetch_and_store)
+        result = pipeline.batch_process_stocks(['sh600000', 'sz000001'], '20240101', '20240131',
+                                               max_concurrent=2)
+
+        assert result['verified_counts'] == {'sh600000': 2, 'sz000001': 2}
+        assert storage.verifier.pending_symbols() == []
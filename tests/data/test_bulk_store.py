@@ -0,0 +1,188 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/data\test_bulk_store.py
+# File Name: test_bulk_store
+# @ Author: mango-gh22
+# @ Date：2026/10/18 05:00
+"""
+desc 批量导入测试 - LOAD DATA 路径、local_infile 回退、警告拒绝、报告字段（用内存替身代替 MySQL）
+"""
+import sys
+import os
+from contextlib import contextmanager
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import mysql.connector
+import pandas as pd
+import pytest
+
+from src.data import data_storage
+from src.data.data_storage import DataStorage
+
+COLUMNS = ['symbol', 'trade_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+
+class FakeDatabase:
+    """记录 (symbol, trade_date) 的表，以及 LOAD DATA 的行为配置"""
+
+    def __init__(self, local_infile='ON', load_errno=None, warnings=()):
+        self.local_infile = local_infile
+        self.load_errno = load_errno
+        self.warnings = list(warnings)
+        self.rows = set()
+        self.stage = []
+        self.statements = []
+        self.commits = self.rollbacks = 0
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        db = self.db
+        db.statements.append(sql)
+        if sql.startswith('SHOW GLOBAL VARIABLES'):
+            self._result = [('local_infile', db.local_infile)]
+        elif sql.startswith('LOAD DATA'):
+            if db.load_errno is not None:
+                raise mysql.connector.Error(msg='Loading local data is disabled', errno=db.load_errno)
+            with open(params[0], encoding='utf-8') as f:
+                db.stage = [tuple(line.rstrip('\n').split('\t')[:2]) for line in f]
+            self.rowcount = len(db.stage)
+        elif sql.startswith('SHOW WARNINGS'):
+            self._result = db.warnings
+        elif sql.startswith('INSERT INTO'):
+            self.rowcount = len(set(db.stage) - db.rows)
+            db.rows |= set(db.stage)
+        elif 'GROUP BY symbol' in sql:
+            counts = {}
+            for symbol, _ in db.rows:
+                counts[symbol] = counts.get(symbol, 0) + 1
+            self._result = [(s, counts[s]) for s in params if s in counts]
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.commits += 1
+
+    def rollback(self):
+        self.db.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class FakeConnector:
+    config = {'host': 'fake', 'port': 3306, 'database': 'fake_bulk'}
+
+    def __init__(self, db):
+        self.db = db
+
+    @contextmanager
+    def get_connection(self):
+        yield FakeConnection(self.db)
+
+    def get_bulk_connection(self):
+        return FakeConnection(self.db)
+
+
+class FakeRegistry:
+    def get_columns(self, table_name):
+        return COLUMNS
+
+
+@pytest.fixture
+def make_storage(monkeypatch):
+    monkeypatch.setattr(data_storage, 'get_schema_registry', lambda connector: FakeRegistry())
+    monkeypatch.setattr(DataStorage, '_publish_changes', staticmethod(lambda *args, **kwargs: None))
+
+    def create(db):
+        monkeypatch.setattr(data_storage, 'DatabaseConnector', lambda config_path: FakeConnector(db))
+        storage = DataStorage()
+        storage.fallback_calls = []
+
+        def store_daily_data(df, table_name=None):
+            storage.fallback_calls.append(df['symbol'].iloc[0])
+            return len(df), {'status': 'success', 'records_processed': len(df)}
+
+        storage.store_daily_data = store_daily_data
+        return storage
+
+    return create
+
+
+def make_frames():
+    def frame(code, days):
+        dates = pd.bdate_range('2024-01-02', periods=days)
+        return pd.DataFrame({'symbol': code, 'trade_date': dates, 'open': 10.0, 'high': 11.0,
+                             'low': 9.0, 'close': 10.5, 'volume': 1000.0})
+    return {'600000.SH': frame('600000.SH', 3), '000001.SZ': frame('000001.SZ', 2)}
+
+
+class TestBulkStore:
+    """批量导入测试类"""
+
+    def test_load_data_report(self, make_storage):
+        db = FakeDatabase()
+        affected, report = make_storage(db).bulk_store_daily_data(make_frames())
+
+        assert (report['mode'], report['status'], report['loads']) == ('load_data', 'success', 1)
+        assert (report['symbols'], report['records_processed'], affected) == (2, 5, 5)
+        assert report['verified_counts'] == {'sh600000': 3, 'sz000001': 2}
+        assert report['rows_per_sec'] > 0 and report['elapsed_seconds'] >= 0
+
+    def test_local_infile_off_falls_back(self, make_storage):
+        db = FakeDatabase(local_infile='OFF')
+        storage = make_storage(db)
+        affected, report = storage.bulk_store_daily_data(make_frames())
+
+        assert report['mode'] == 'fallback'
+        assert storage.fallback_calls == ['600000.SH', '000001.SZ']
+        assert (report['symbols'], report['records_processed'], affected) == (2, 5, 5)
+        assert not any(sql.startswith('LOAD DATA') for sql in db.statements)
+
+    @pytest.mark.parametrize('errno', [1148, 3948])
+    def test_rejected_load_falls_back_without_double_count(self, make_storage, errno):
+        db = FakeDatabase(load_errno=errno)
+        storage = make_storage(db)
+        affected, report = storage.bulk_store_daily_data(make_frames())
+
+        assert report['mode'] == 'fallback'
+        assert db.rollbacks == 1
+        assert sorted(storage.fallback_calls) == ['sh600000', 'sz000001']
+        assert (report['symbols'], report['records_processed'], affected) == (2, 5, 5)
+
+    def test_load_warnings_reject_batch(self, make_storage):
+        db = FakeDatabase(warnings=[('Warning', 1265, "Data truncated for column 'volume' at row 2"),
+                                    ('Note', 1051, 'Unknown table')])
+        affected, report = make_storage(db).bulk_store_daily_data(make_frames())
+
+        assert affected == 0 and db.rows == set()
+        assert not any(sql.startswith('INSERT INTO') for sql in db.statements)
+        assert report['status'] == 'error'
+        assert report['errors'] == [{'reason': 'load_data_warnings', 'rows': 5,
+                                     'warnings': ["Warning 1265: Data truncated for column 'volume' at row 2"]}]
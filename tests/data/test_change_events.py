@@ -0,0 +1,143 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/data\test_change_events.py
+# File Name: test_change_events
+# @ Author: mango-gh22
+# @ Date：2026/10/17 23:10
+"""
+desc 数据变更事件测试 - 跨进程日志、历史回放、按股票和日期失效缓存
+"""
+import sys
+import os
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+
+from src.data.change_events import DataChangeBus, DataChangeEvent, events_from_frame
+from src.indicators.cache_manager import IndicatorCacheManager
+from src.indicators.state_store import IndicatorStateStore
+
+
+def make_result(start: str, periods: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'trade_date': pd.date_range(start, periods=periods, freq='B'),
+        'value': np.arange(periods, dtype=float),
+    })
+
+
+class TestDataChangeBus:
+    """事件总线测试类"""
+
+    def test_events_from_frame(self):
+        df = pd.DataFrame({
+            'symbol': ['sh600000', 'sh600000', 'sz000001'],
+            'trade_date': ['2024-01-03', '2024-01-02', '2024-01-05'],
+        })
+        events = {e.symbol: e for e in events_from_frame(df, 'daily', 'stock_daily_data')}
+        assert events['sh600000'].since_date == '2024-01-02'
+        assert events['sh600000'].until_date == '2024-01-03'
+        assert events['sh600000'].rows == 2
+        assert events['sz000001'].since_date == '2024-01-05'
+
+        whole = events_from_frame(df, 'adjustment_factor', whole_history=True)
+        assert all(e.since_date is None for e in whole)
+
+    def test_affects(self):
+        event = DataChangeEvent(data_type='daily', symbol='sh600000', since_date='2024-01-10')
+        assert event.affects('2024-01-10')
+        assert event.affects(None)
+        assert not event.affects('2024-01-09')
+
+    def test_publish_reaches_other_bus_through_log(self, tmp_path):
+        log_path = str(tmp_path / 'changes.sqlite')
+        publisher, consumer = DataChangeBus(log_path), DataChangeBus(log_path)
+        local, remote = [], []
+        publisher.subscribe(local.append)
+        consumer.subscribe(remote.append)
+
+        publisher.publish([DataChangeEvent(data_type='daily', symbol='sh600000', since_date='2024-01-10')])
+        assert [e.symbol for e in local] == ['sh600000']
+        assert remote == []
+
+        assert consumer.poll(force=True) == 1
+        assert remote[0].since_date == '2024-01-10'
+        # 已读取的事件和本总线发布的事件不会重复分发
+        assert consumer.poll(force=True) == 0
+        assert publisher.poll(force=True) == 0
+        assert len(local) == 1
+
+    def test_replay_merges_history_per_symbol(self, tmp_path):
+        log_path = str(tmp_path / 'changes.sqlite')
+        publisher = DataChangeBus(log_path)
+        publisher.publish([
+            DataChangeEvent(data_type='daily', symbol='sh600000', since_date='2024-01-10'),
+            DataChangeEvent(data_type='daily', symbol='sh600000', since_date='2024-01-05'),
+            DataChangeEvent(data_type='adjustment_factor', symbol='sz000001', since_date=None),
+        ])
+
+        replayed = []
+        DataChangeBus(log_path).subscribe(replayed.append, replay=True)
+        by_symbol = {e.symbol: e for e in replayed}
+        assert by_symbol['sh600000'].since_date == '2024-01-05'
+        assert by_symbol['sz000001'].since_date is None
+
+
+class TestCacheInvalidation:
+    """缓存失效测试类"""
+
+    def test_invalidate_only_affected_symbol_and_suffix(self, tmp_path):
+        cache = IndicatorCacheManager(cache_dir=str(tmp_path / 'indicators'))
+        cache.set('sh600000', 'rsi', {'period': 14}, '2024-01-01', '2024-01-31', make_result('2024-01-01', 20))
+        cache.set('sh600000', 'rsi', {'period': 6}, '2023-12-01', '2023-12-29', make_result('2023-12-01', 20))
+        cache.set('sz000001', 'rsi', {'period': 14}, '2024-01-01', '2024-01-31', make_result('2024-01-01', 20))
+
+        cache.invalidate('sh600000', since_date='2024-01-15')
+
+        assert cache.get('sh600000', 'rsi', {'period': 14}, '2024-01-01', '2024-01-10') is None
+        cache.memory_cache.clear()
+        assert cache.get('sh600000', 'rsi', {'period': 14}, '2024-01-01', '2024-01-10') is None
+        assert cache.get('sh600000', 'rsi', {'period': 6}, '2023-12-01', '2023-12-29') is not None
+        assert cache.get('sz000001', 'rsi', {'period': 14}, '2024-01-01', '2024-01-31') is not None
+        cache.store.close()
+
+    def test_invalidate_keeps_entries_created_after_change(self, tmp_path):
+        cache = IndicatorCacheManager(cache_dir=str(tmp_path / 'indicators'))
+        changed_at = datetime.now().isoformat()
+        time.sleep(0.01)
+        cache.set('sh600000', 'rsi', {'period': 14}, '2024-01-01', '2024-01-31', make_result('2024-01-01', 20))
+
+        assert cache.invalidate('sh600000', since_date=None, changed_at=changed_at) == 0
+        assert cache.get('sh600000', 'rsi', {'period': 14}, '2024-01-01', '2024-01-31') is not None
+        assert cache.invalidate('sh600000') == 2  # 内存层 + 磁盘层
+        cache.store.close()
+
+    def test_state_store_invalidate(self, tmp_path):
+        store = IndicatorStateStore(str(tmp_path / 'state'))
+        store.set('sh600000', 'rsi_a', '2024-01-31', {'x': 1})
+        store.set('sh600000', 'rsi_b', '2024-01-05', {'x': 2})
+
+        assert store.invalidate('sh600000', since_date='2024-01-10') == 1
+        assert store.get('sh600000', 'rsi_a') is None
+        assert store.get('sh600000', 'rsi_b') is not None
+        assert store.invalidate('sh600000') == 1
+        assert not (tmp_path / 'state' / 'sh600000.json').exists()
+
+    def test_invalidate_matches_non_canonical_symbol(self, tmp_path):
+        # 调用方按 600519.SH 缓存，事件携带入库时的统一写法 sh600519
+        event = events_from_frame(pd.DataFrame({'symbol': ['600519.SH'], 'trade_date': ['2024-01-03']}), 'daily')[0]
+        assert event.symbol == 'sh600519'
+
+        cache = IndicatorCacheManager(cache_dir=str(tmp_path / 'indicators'))
+        cache.set('600519.SH', 'rsi', {'period': 14}, '2024-01-01', '2024-01-31', make_result('2024-01-01', 20))
+        assert cache.get('sh600519', 'rsi', {'period': 14}, '2024-01-01', '2024-01-10') is not None
+        assert cache.invalidate(event.symbol, event.since_date) == 2
+        assert cache.get('600519.SH', 'rsi', {'period': 14}, '2024-01-01', '2024-01-10') is None
+        cache.store.close()
+
+        store = IndicatorStateStore(str(tmp_path / 'state'))
+        store.set('600519.SH', 'rsi_a', '2024-01-31', {'x': 1})
+        assert store.invalidate(event.symbol, event.since_date) == 1
+        assert store.get('600519.SH', 'rsi_a') is None
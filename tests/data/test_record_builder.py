@@ -0,0 +1,103 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/data\test_record_builder.py
+# File Name: test_record_builder
+# @ Author: mango-gh22
+# @ Date：2026/10/17 9:40
+"""
+desc 列式记录构建器测试
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data.record_builder import build_records, column_to_list
+
+
+def legacy_prepare_records(df: pd.DataFrame, columns, decimals=None):
+    """原 iterrows 实现（作为对照）"""
+    decimals = decimals or {}
+    records = []
+    for _, row in df.iterrows():
+        record = []
+        for col in columns:
+            val = row[col] if col in row.index else None
+            if pd.isna(val):
+                record.append(None)
+            elif isinstance(val, (np.integer,)):
+                record.append(int(val))
+            elif isinstance(val, (np.floating, float)):
+                if col in decimals:
+                    record.append(round(float(val), decimals[col]))
+                else:
+                    record.append(float(val))
+            elif isinstance(val, (datetime, pd.Timestamp)):
+                record.append(val.strftime('%Y-%m-%d %H:%M:%S'))
+            else:
+                record.append(val)
+        records.append(tuple(record))
+    return records
+
+
+def create_test_frame(rows: int = 50) -> pd.DataFrame:
+    np.random.seed(7)
+    close = 100 + np.cumsum(np.random.randn(rows))
+    close[::7] = np.nan
+    return pd.DataFrame({
+        'symbol': ['sh600519'] * rows,
+        'trade_date': pd.date_range('2024-01-01', periods=rows).strftime('%Y-%m-%d'),
+        'close_price': close,
+        'volume': np.random.randint(1000, 100000, rows),
+        'processed_time': pd.date_range('2024-01-01 15:00:00', periods=rows),
+        'quality_grade': ['A', None] * (rows // 2),
+    })
+
+
+class TestRecordBuilder:
+    """列式记录构建测试类"""
+
+    def setup_method(self):
+        self.df = create_test_frame()
+        self.columns = list(self.df.columns)
+
+    def test_matches_legacy_output(self):
+        """与 iterrows 实现结果一致"""
+        assert build_records(self.df, self.columns) == legacy_prepare_records(self.df, self.columns)
+
+    def test_native_types(self):
+        """numpy 标量转换为 Python 原生类型，NaN 转为 None"""
+        records = build_records(self.df, self.columns)
+        second = records[1]
+        assert type(second[2]) is float
+        assert type(second[3]) is int
+        assert records[0][2] is None  # close[0] 被置为 NaN
+        assert records[1][5] is None
+
+    def test_missing_column_filled_with_none(self):
+        """缺失字段填充 None"""
+        records = build_records(self.df, ['symbol', 'not_exists'])
+        assert all(r[1] is None for r in records)
+
+    def test_decimals(self):
+        """小数位数限制"""
+        decimals = {'close_price': 3}
+        assert build_records(self.df, self.columns, decimals) == \
+            legacy_prepare_records(self.df, self.columns, decimals)
+
+    def test_nat_and_nullable_dtypes(self):
+        """NaT 与可空整数列"""
+        series = pd.Series([pd.Timestamp('2024-01-02'), pd.NaT])
+        assert column_to_list(series) == ['2024-01-02 00:00:00', None]
+
+        nullable = pd.Series([1, None, 3], dtype='Int64')
+        assert column_to_list(nullable) == [1, None, 3]
+        assert all(v is None or type(v) is int for v in column_to_list(nullable))
+
+    def test_empty_frame(self):
+        """空数据返回空列表"""
+        assert build_records(self.df.iloc[0:0], self.columns) == []
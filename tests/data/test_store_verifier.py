@@ -0,0 +1,113 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/data\test_store_verifier.py
+# File Name: test_store_verifier
+# @ Author: mango-gh22
+# @ Date：2026/10/18 05:40
+"""
+desc 存储校验策略测试 - sampled 节奏、deferred 记录与分块核对、always/off、批次范围
+"""
+import sys
+import os
+from contextlib import contextmanager
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import pytest
+
+from src.data.store_verifier import StoreVerifier
+
+
+class CountingConnector:
+    """按 IN (...) 返回记录数的连接器替身（表中没有的股票不返回行）"""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.queries = []
+
+    @contextmanager
+    def get_connection(self):
+        connector = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params):
+                connector.queries.append((sql, params))
+                self.rows = [(s, connector.counts[s]) for s in params if s in connector.counts]
+
+            def fetchall(self):
+                return self.rows
+
+        class Connection:
+            def cursor(self):
+                return Cursor()
+
+        yield Connection()
+
+
+class TestStoreVerifier:
+    """存储校验器测试类"""
+
+    def test_sampled_cadence(self):
+        verifier = StoreVerifier('sampled', sample_every=3)
+        # 第 1、4、7 次写入校验
+        assert [verifier.should_verify_now() for _ in range(7)] == [True, False, False, True, False, False, True]
+
+    @pytest.mark.parametrize('mode, verify_now', [('always', True), ('off', False)])
+    def test_always_and_off_record_nothing(self, mode, verify_now):
+        verifier = StoreVerifier(mode)
+        assert all(verifier.should_verify_now() is verify_now for _ in range(3))
+        verifier.record('stock_daily_data', ['sh600000'])
+        connector = CountingConnector({'sh600000': 10})
+        assert verifier.pending_symbols() == []
+        assert verifier.reconcile(connector) == {}
+        assert connector.queries == []
+
+    def test_deferred_reconcile_in_chunks(self):
+        verifier = StoreVerifier('deferred', chunk_size=2)
+        assert not verifier.should_verify_now()
+        verifier.record('daily', ['sh600002', 'sh600000'])
+        verifier.record('daily', 'sh600001')
+        verifier.record('daily', ['sh600000', ''])
+        verifier.record('factor', ['sh600000'])
+        assert verifier.pending_symbols('daily') == ['sh600000', 'sh600001', 'sh600002']
+
+        connector = CountingConnector({'sh600000': 5, 'sh600002': 3})
+        result = verifier.reconcile(connector, 'daily')
+
+        # 未写入任何记录的股票计数为 0
+        assert result == {'daily': {'sh600000': 5, 'sh600001': 0, 'sh600002': 3}}
+        assert [params for _, params in connector.queries] == [('sh600000', 'sh600001'), ('sh600002',)]
+        # 只核对指定表，其他表仍待核对；核对过的不再重复
+        assert verifier.pending_symbols() == ['sh600000']
+        assert verifier.reconcile(connector) == {'factor': {'sh600000': 5}}
+        assert verifier.reconcile(connector) == {}
+
+    def test_batch_defers_sampled_writes(self):
+        verifier = StoreVerifier()
+        verifier.record('daily', ['sh600000'])
+        assert verifier.pending_symbols() == []  # 批次外不记录
+
+        with verifier.batch():
+            with verifier.batch():
+                assert verifier.effective_mode == 'deferred'
+            assert not verifier.should_verify_now()
+            verifier.record('daily', ['sh600000'])
+        assert verifier.effective_mode == 'sampled'
+        assert verifier.reconcile(CountingConnector({'sh600000': 2})) == {'daily': {'sh600000': 2}}
+
+    @pytest.mark.parametrize('mode', ['always', 'off'])
+    def test_batch_keeps_explicit_modes(self, mode):
+        verifier = StoreVerifier(mode)
+        with verifier.batch():
+            assert verifier.effective_mode == mode
+            verifier.record('daily', ['sh600000'])
+        assert verifier.pending_symbols() == []
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            StoreVerifier('never')
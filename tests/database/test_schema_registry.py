@@ -0,0 +1,117 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/database\test_schema_registry.py
+# File Name: test_schema_registry
+# @ Author: mango-gh22
+# @ Date：2026/10/18 05:20
+"""
+desc 表结构注册表测试 - 单次查询预加载、TTL 过期、DDL 后失效（用内存替身代替 MySQL）
+"""
+import sys
+import os
+from contextlib import contextmanager
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import pytest
+
+from src.database import schema_registry
+from src.database.db_connector import DatabaseConnector
+from src.database.schema_registry import SchemaRegistry, get_schema_registry
+
+
+def column(table, field, key='', extra=''):
+    return {'table_name': table, 'field': field, 'type': b'int', 'key': key, 'extra': extra, 'nullable': 'NO'}
+
+
+class FakeConnector:
+    """INFORMATION_SCHEMA.COLUMNS 替身；ALTER TABLE ... ADD COLUMN 修改表结构"""
+
+    config = {'host': 'fake', 'port': 3306, 'database': 'fake_schema'}
+
+    def __init__(self):
+        self.columns = [column('daily', 'id', 'PRI', 'auto_increment'), column('daily', 'symbol'),
+                        column('basic', 'symbol', 'PRI')]
+        self.queries = []
+
+    @contextmanager
+    def get_connection(self):
+        yield self._connection()
+
+    def _connection(self):
+        connector = self
+
+        class Cursor:
+            description = None
+            rowcount = 0
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=()):
+                connector.queries.append(sql)
+                if sql.startswith('ALTER TABLE'):
+                    table, _, _, field = sql.split()[2:6]
+                    connector.columns.append(column(table, field))
+                    return
+                self.rows = [c for c in connector.columns if not params or c['table_name'] == params[0]]
+
+            def fetchall(self):
+                return self.rows
+
+            def close(self):
+                pass
+
+        class Connection:
+            def cursor(self, dictionary=False):
+                return Cursor()
+
+            def commit(self):
+                pass
+
+            def close(self):
+                pass
+
+        return Connection()
+
+
+class TestSchemaRegistry:
+    """表结构注册表测试类"""
+
+    def test_single_query_preload(self):
+        connector = FakeConnector()
+        registry = SchemaRegistry(connector)
+
+        assert registry.get_columns('daily') == ['id', 'symbol']
+        assert registry.get_insertable_columns('daily') == ['symbol']
+        assert registry.get_columns('basic') == ['symbol']
+        assert len(connector.queries) == 1            # 一条 INFORMATION_SCHEMA 查询加载全部表
+        assert registry.get_stats()['hits'] == 3
+        with pytest.raises(ValueError):
+            registry.get_columns('missing')
+
+    def test_ttl_expiry_reloads_single_table(self):
+        connector = FakeConnector()
+        registry = SchemaRegistry(connector, ttl=0)
+
+        registry.get_columns('daily')
+        connector.columns.append(column('daily', 'close_price'))
+        assert registry.get_columns('daily') == ['id', 'symbol', 'close_price']
+        assert connector.queries[-1].rstrip().endswith('ORDER BY ORDINAL_POSITION')
+        assert 'TABLE_NAME = %s' in connector.queries[-1]
+
+    def test_ddl_invalidates_registry(self, monkeypatch):
+        monkeypatch.setattr(schema_registry, '_registries', {})
+        connector = FakeConnector()
+        registry = get_schema_registry(connector)
+        assert registry.get_columns('daily') == ['id', 'symbol']
+
+        # DatabaseConnector.execute_query 执行 DDL 后失效全部注册表
+        db = DatabaseConnector.__new__(DatabaseConnector)
+        db.get_connection = connector._connection
+        db.execute_query('ALTER TABLE daily ADD COLUMN volume BIGINT', fetch=False)
+
+        assert registry.get_columns('daily') == ['id', 'symbol', 'volume']
+        assert registry.get_stats()['invalidations'] == 1
@@ -0,0 +1,165 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/indicators\test_cache_store.py
+# File Name: test_cache_store
+# @ Author: mango-gh22
+# @ Date：2026/10/17 19:20
+"""
+desc 指标列式缓存测试 - 分区文件、按列读取、SQLite 索引
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators.cache_manager import IndicatorCacheManager
+from src.indicators.cache_store import ColumnarResultStore, HAS_PYARROW
+from src.indicators.trend.macd import MACD
+
+
+def create_result_frame(days: int = 120) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({'close_price': 20 + np.cumsum(rng.normal(0, 0.3, days))},
+                      index=pd.bdate_range('2024-01-01', periods=days, name='trade_date'))
+    return MACD().calculate(df)
+
+
+class TestColumnarResultStore:
+    """列式存储测试类"""
+
+    @pytest.mark.parametrize('file_format', ['feather', 'parquet'])
+    def test_round_trip_and_projection(self, tmp_path, file_format):
+        store = ColumnarResultStore(str(tmp_path), file_format)
+        data = create_result_frame()
+        entry = store.write('k1', 'sh600000', 'macd', {'fast_period': 12}, '2024-01-01', '2024-06-14', data)
+
+        assert entry['format'] == (file_format if HAS_PYARROW else 'pickle')
+        assert entry['path'].startswith(os.path.join('sh600000', 'macd'))
+        pd.testing.assert_frame_equal(store.read('k1'), data, check_freq=False)
+
+        projected = store.read('k1', columns=['MACD_DIF', 'MACD_GOLDEN_CROSS', 'missing'])
+        assert list(projected.columns) == ['MACD_DIF', 'MACD_GOLDEN_CROSS']
+        assert projected.index.equals(data.index)
+
+    @pytest.mark.skipif(not HAS_PYARROW, reason="未安装 pyarrow")
+    def test_non_arrow_data_falls_back_to_pickle(self, tmp_path):
+        store = ColumnarResultStore(str(tmp_path))
+        data = pd.DataFrame({'value': [1, 'a', 2.5]})
+        assert store.write('k2', 'sh600000', 'x', {}, None, None, data)['format'] == 'pickle'
+        pd.testing.assert_frame_equal(store.read('k2'), data)
+
+    def test_index_survives_reopen(self, tmp_path):
+        store = ColumnarResultStore(str(tmp_path))
+        store.write('k3', 'sz000001', 'macd', {}, '2024-01-01', '2024-06-14', create_result_frame())
+        store.read('k3')
+        store.close()
+
+        stats = ColumnarResultStore(str(tmp_path)).stats()
+        assert stats['entries'] == 1
+        assert stats['total_hits'] == 1
+        assert stats['disk_bytes'] > 0
+
+
+class TestIndicatorCacheManagerDisk:
+    """指标缓存管理器磁盘层测试类"""
+
+    def test_disk_hit_after_memory_clear(self, tmp_path):
+        cache = IndicatorCacheManager(str(tmp_path))
+        data = create_result_frame()
+        cache.set('sh600000', 'macd', {}, '2024-01-01', '2024-06-14', data)
+        cache.clear('memory')
+
+        cached = cache.get('sh600000', 'macd', {}, '2024-01-01', '2024-06-14')
+        pd.testing.assert_frame_equal(cached, data, check_freq=False)
+        assert cache.get_cache_stats()['disk_cache_items'] == 1
+
+        cache.clear('all')
+        assert cache.get('sh600000', 'macd', {}, '2024-01-01', '2024-06-14') is None
+
+    def test_cleanup_expired(self, tmp_path):
+        cache = IndicatorCacheManager(str(tmp_path))
+        cache.set('sh600000', 'macd', {}, '2024-01-01', '2024-06-14', create_result_frame())
+        cache.disk_ttl = -1
+        cache.cleanup_expired()
+        assert cache.get_cache_stats()['disk_cache_items'] == 0
+
+
+class FakeQueryEngine:
+    """模拟 QueryEngine.query_daily_data：按日期倒序、最多返回100条"""
+
+    def __init__(self, days: int = 150):
+        rng = np.random.default_rng(5)
+        close = np.round(20 + np.cumsum(rng.normal(0, 0.3, days)), 2)
+        self.data = pd.DataFrame({
+            'trade_date': pd.bdate_range('2024-01-01', periods=days),
+            'symbol': 'sh600000',
+            'open': close,
+            'high': close + 0.5,
+            'low': close - 0.5,
+            'close': close,
+            'volume': rng.integers(1000, 100000, days).astype(float),
+        })
+        self.calls = 0
+
+    def query_daily_data(self, symbol, start_date, end_date):
+        self.calls += 1
+        mask = (self.data['trade_date'] >= start_date) & (self.data['trade_date'] <= end_date)
+        return self.data[mask].iloc[::-1].head(100).reset_index(drop=True)
+
+
+class TestRangeAwareCache:
+    """按日期范围缓存测试类"""
+
+    def setup_method(self):
+        from src.indicators.indicator_manager import IndicatorManager
+        self.manager = IndicatorManager()
+        self.manager.query_engine = FakeQueryEngine()
+
+    def calculate(self, name, start, end, use_cache=True):
+        return self.manager.calculate_for_symbol('sh600000', [name], start, end, use_cache=use_cache)[name]
+
+    @pytest.mark.parametrize('indicator_name', ['macd', 'rsi', 'bollinger_bands', 'moving_average', 'obv'])
+    def test_sub_range_and_extension(self, tmp_path, indicator_name):
+        self.manager.cache_manager = IndicatorCacheManager(str(tmp_path))
+        self.calculate(indicator_name, '2024-01-01', '2024-03-29')
+        assert self.manager.query_engine.calls == 1
+
+        # 子区间直接从缓存段切片
+        sub = self.calculate(indicator_name, '2024-02-01', '2024-03-15')
+        assert self.manager.query_engine.calls == 1
+        assert sub['trade_date'].min() == pd.Timestamp('2024-02-01')
+        assert sub['trade_date'].max() == pd.Timestamp('2024-03-15')
+
+        # 结束日期延长：与整体重新计算一致
+        extended = self.calculate(indicator_name, '2024-01-01', '2024-04-30')
+        expected = self.calculate(indicator_name, '2024-01-01', '2024-04-30', use_cache=False)
+        assert self.manager.query_engine.calls == 3
+        assert extended['trade_date'].is_monotonic_increasing
+        pd.testing.assert_frame_equal(extended, expected, check_dtype=False, rtol=1e-9)
+
+    def test_earlier_start_recomputes(self, tmp_path):
+        self.manager.cache_manager = IndicatorCacheManager(str(tmp_path))
+        self.calculate('macd', '2024-02-01', '2024-03-29')
+        result = self.calculate('macd', '2024-01-01', '2024-03-29')
+        assert self.manager.query_engine.calls == 2
+        assert result['trade_date'].min() == pd.Timestamp('2024-01-01')
+
+    def test_future_end_date_covers_only_returned_bars(self, tmp_path):
+        self.manager.cache_manager = IndicatorCacheManager(str(tmp_path))
+        engine = self.manager.query_engine
+        full, engine.data = engine.data, engine.data.head(60)
+
+        # 结束日期在最后一根 bar 之后：缓存段只覆盖到已入库的最后一天
+        first = self.calculate('rsi', '2024-01-01', '2024-12-31')
+        segment = self.manager.cache_manager.get_segment('sh600000', 'rsi', {})
+        assert segment['end_date'] == first['trade_date'].max().strftime('%Y-%m-%d')
+
+        # 新 bar 入库后，同样的请求追加新 bar 而不是返回旧切片
+        engine.data = full.head(80)
+        result = self.calculate('rsi', '2024-01-01', '2024-12-31')
+        expected = self.calculate('rsi', '2024-01-01', '2024-12-31', use_cache=False)
+        assert result['trade_date'].max() == full['trade_date'].iloc[79]
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-9)
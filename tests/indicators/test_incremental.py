@@ -0,0 +1,102 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/indicators\test_incremental.py
+# File Name: test_incremental
+# @ Author: mango-gh22
+# @ Date：2026/10/17 18:40
+"""
+desc 增量指标计算测试 - 历史状态 + 新 bar 推进与全量计算一致
+"""
+import sys
+import os
+import json
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators.indicator_manager import IndicatorFactory
+from src.indicators.state_store import IndicatorStateStore
+
+
+def create_test_data(days: int = 300, seed: int = 21) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = np.round(20 + np.cumsum(rng.normal(0, 0.4, days)), 2)
+    return pd.DataFrame({
+        'close_price': close,
+        'high_price': close + np.round(rng.random(days), 2),
+        'low_price': close - np.round(rng.random(days), 2),
+        'volume': rng.integers(1000, 100000, days).astype(float),
+    }, index=pd.bdate_range('2023-01-02', periods=days))
+
+
+class TestIncrementalIndicators:
+    """增量指标计算测试类"""
+
+    def setup_method(self):
+        self.df = create_test_data()
+
+    @pytest.mark.parametrize('indicator_name, params', [
+        ('moving_average', {}),
+        ('moving_average', {'periods': [5, 12, 26], 'ma_type': 'ema'}),
+        ('macd', {}),
+        ('rsi', {}),
+        ('bollinger_bands', {}),
+        ('obv', {}),
+        ('stochastic', {}),
+        ('parabolic_sar', {}),
+        ('parabolic_sar', {'use_high_low': False}),
+    ])
+    def test_parity_with_full_calculation(self, indicator_name, params):
+        """前 200 根建状态，之后分批（1 根、9 根、其余）推进，结果与全量计算一致"""
+        indicator = IndicatorFactory.create_indicator(indicator_name, **params)
+        expected = indicator.calculate(self.df)
+
+        state = indicator.init_state(self.df.iloc[:200])
+        assert state is not None
+        parts = []
+        for start, end in [(200, 201), (201, 210), (210, len(self.df))]:
+            # 状态经过 JSON 往返，验证可持久化
+            state = json.loads(json.dumps(state))
+            result, state = indicator.update(state, self.df.iloc[start:end])
+            parts.append(result)
+        actual = pd.concat(parts)
+
+        assert state['bars'] == len(self.df)
+        assert actual.index.equals(self.df.index[200:])
+        for column in indicator.get_output_columns():
+            if column not in expected.columns:
+                continue
+            np.testing.assert_allclose(actual[column].to_numpy(dtype=float),
+                                       expected[column].iloc[200:].to_numpy(dtype=float),
+                                       rtol=1e-9, equal_nan=True, err_msg=f"{indicator_name}.{column}")
+
+    def test_unsupported_indicator(self):
+        indicator = IndicatorFactory.create_indicator('cci')
+        assert not indicator.supports_incremental
+        assert indicator.init_state(self.df) is None
+
+    def test_short_history_has_no_state(self):
+        assert IndicatorFactory.create_indicator('rsi').init_state(self.df.iloc[:15]) is None
+
+    def test_state_key_depends_on_parameters(self):
+        a = IndicatorFactory.create_indicator('macd')
+        b = IndicatorFactory.create_indicator('macd', fast_period=5)
+        assert a.get_state_key() != b.get_state_key()
+
+
+class TestIndicatorStateStore:
+    """状态存储测试类"""
+
+    def test_round_trip(self, tmp_path):
+        store = IndicatorStateStore(str(tmp_path))
+        store.set('sh600000', 'macd:abc', '2024-01-05', {'bars': 10, 'ema_fast': 1.5})
+
+        entry = IndicatorStateStore(str(tmp_path)).get('sh600000', 'macd:abc')
+        assert entry['last_date'] == '2024-01-05'
+        assert entry['state'] == {'bars': 10, 'ema_fast': 1.5}
+        assert store.get('sh600000', 'rsi:abc') is None
+
+        store.clear('sh600000')
+        assert store.get('sh600000', 'macd:abc') is None
@@ -0,0 +1,152 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/indicators\test_indicator_kernels.py
+# File Name: test_indicator_kernels
+# @ Author: mango-gh22
+# @ Date：2026/10/17 16:40
+"""
+desc OBV / Parabolic SAR / CCI 内核与原逐行实现的一致性测试
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators import kernels
+from src.indicators.momentum.cci import CCI
+from src.indicators.trend.parabolic_sar import ParabolicSAR
+from src.indicators.volume.obv import OBV
+
+
+def legacy_obv(price: pd.Series, volume: pd.Series) -> np.ndarray:
+    """原 OBV.calculate 的逐行实现"""
+    price_change = price.diff()
+    obv = np.zeros(len(price))
+    obv[0] = volume.iloc[0]
+    for i in range(1, len(price)):
+        if price_change.iloc[i] > 0:
+            obv[i] = obv[i - 1] + volume.iloc[i]
+        elif price_change.iloc[i] < 0:
+            obv[i] = obv[i - 1] - volume.iloc[i]
+        else:
+            obv[i] = obv[i - 1]
+    return obv
+
+
+def legacy_sar(high, low, close, af=0.02, af_max=0.2) -> np.ndarray:
+    """原 ParabolicSAR._calculate_sar 的逐行实现"""
+    n = len(close)
+    sar, trend = np.zeros(n), np.zeros(n)
+    acceleration, extreme_point = np.zeros(n), np.zeros(n)
+    sar[0] = low[0] if close[1] > close[0] else high[0]
+    trend[0] = 1 if close[1] > close[0] else -1
+    acceleration[0] = af
+    extreme_point[0] = high[0] if trend[0] == 1 else low[0]
+
+    for i in range(1, n):
+        sar[i] = sar[i - 1] + acceleration[i - 1] * (extreme_point[i - 1] - sar[i - 1])
+        if trend[i - 1] == 1:
+            if low[i] < sar[i]:
+                trend[i], sar[i] = -1, max(high[i - 1], high[i])
+                acceleration[i], extreme_point[i] = af, low[i]
+            else:
+                trend[i], acceleration[i], extreme_point[i] = 1, acceleration[i - 1], extreme_point[i - 1]
+                if high[i] > extreme_point[i - 1]:
+                    extreme_point[i] = high[i]
+                    acceleration[i] = min(acceleration[i - 1] + af, af_max)
+        else:
+            if high[i] > sar[i]:
+                trend[i], sar[i] = 1, min(low[i - 1], low[i])
+                acceleration[i], extreme_point[i] = af, high[i]
+            else:
+                trend[i], acceleration[i], extreme_point[i] = -1, acceleration[i - 1], extreme_point[i - 1]
+                if low[i] < extreme_point[i - 1]:
+                    extreme_point[i] = low[i]
+                    acceleration[i] = min(acceleration[i - 1] + af, af_max)
+    return sar
+
+
+def create_test_data(days: int, seed: int = 0) -> pd.DataFrame:
+    """价格保留两位小数以产生平盘日"""
+    rng = np.random.default_rng(seed)
+    close = np.round(50 + np.cumsum(rng.normal(0, 0.3, days)), 2)
+    return pd.DataFrame({
+        'close_price': close,
+        'high_price': close + np.round(rng.random(days), 2),
+        'low_price': close - np.round(rng.random(days), 2),
+        'volume': rng.integers(1000, 100000, days),
+    })
+
+
+def legacy_mean_deviation(series: pd.Series, period: int) -> np.ndarray:
+    """原 CCI.calculate 的 rolling().apply 实现"""
+    return series.rolling(window=period).apply(lambda x: np.mean(np.abs(x - np.mean(x)))).to_numpy()
+
+
+class TestIndicatorKernels:
+    """OBV / SAR / CCI 内核测试类"""
+
+    @pytest.mark.parametrize('days, seed', [(2, 1), (50, 2), (1000, 3), (5000, 4)])
+    def test_obv_parity(self, days, seed):
+        df = create_test_data(days, seed)
+        expected = legacy_obv(df['close_price'], df['volume'])
+        np.testing.assert_array_equal(OBV().calculate(df)['OBV'].to_numpy(), expected)
+
+    def test_obv_panel_columns(self):
+        """2-D 输入逐列计算"""
+        a, b = create_test_data(300, 5), create_test_data(300, 6)
+        close = np.column_stack([a['close_price'], b['close_price']])
+        volume = np.column_stack([a['volume'], b['volume']])
+        result = kernels.obv(close, volume)
+        np.testing.assert_array_equal(result[:, 1], legacy_obv(b['close_price'], b['volume']))
+
+    @pytest.mark.parametrize('days, seed', [(2, 1), (50, 2), (1000, 3), (5000, 4)])
+    @pytest.mark.parametrize('params', [{}, {'acceleration_factor': 0.01, 'acceleration_max': 0.1}])
+    def test_sar_parity(self, days, seed, params):
+        df = create_test_data(days, seed)
+        expected = legacy_sar(df['high_price'].to_numpy(), df['low_price'].to_numpy(),
+                              df['close_price'].to_numpy(),
+                              params.get('acceleration_factor', 0.02), params.get('acceleration_max', 0.2))
+        result = ParabolicSAR(**params).calculate(df)
+        np.testing.assert_allclose(result['Parabolic_SAR'].to_numpy(), expected, rtol=1e-12)
+
+    def test_sar_close_only(self):
+        df = create_test_data(500, 7)
+        close = df['close_price'].to_numpy()
+        result = ParabolicSAR(use_high_low=False).calculate(df)
+        np.testing.assert_allclose(result['Parabolic_SAR'].to_numpy(), legacy_sar(close, close, close))
+
+    def test_sar_datetime_index(self):
+        """非整数索引的数据也能计算"""
+        df = create_test_data(100, 8)
+        df.index = pd.bdate_range('2024-01-01', periods=len(df))
+        result = ParabolicSAR().calculate(df)
+        assert result['Parabolic_SAR'].notna().all()
+
+    @pytest.mark.skipif(not kernels.HAS_NUMBA, reason="未安装 numba")
+    def test_sar_numba_matches_python(self):
+        df = create_test_data(2000, 9)
+        args = (df['high_price'].to_numpy(), df['low_price'].to_numpy(), df['close_price'].to_numpy())
+        np.testing.assert_array_equal(kernels.parabolic_sar(*args, use_numba=True),
+                                      kernels.parabolic_sar(*args, use_numba=False))
+
+    @pytest.mark.parametrize('period', [5, 20])
+    def test_mean_deviation_parity(self, period):
+        typical = create_test_data(3000, 10)['close_price']
+        expected = legacy_mean_deviation(typical, period)
+        np.testing.assert_allclose(kernels.rolling_mean_deviation(typical.to_numpy(), period),
+                                   expected, rtol=1e-10, equal_nan=True)
+        # 分块边界不影响结果
+        np.testing.assert_allclose(kernels.rolling_mean_deviation(typical.to_numpy(), period, block_elements=64),
+                                   expected, rtol=1e-10, equal_nan=True)
+
+    def test_cci_parity(self):
+        df = create_test_data(1000, 12)
+        typical = (df['high_price'] + df['low_price'] + df['close_price']) / 3
+        mean_dev = pd.Series(legacy_mean_deviation(typical, 20)).replace(0, 1e-10)
+        expected = (typical - typical.rolling(20).mean()) / (0.015 * mean_dev)
+        np.testing.assert_allclose(CCI().calculate(df)['CCI'].to_numpy(), expected.to_numpy(),
+                                   rtol=1e-9, equal_nan=True)
@@ -0,0 +1,96 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/indicators\test_indicator_signals.py
+# File Name: test_indicator_signals
+# @ Author: mango-gh22
+# @ Date：2026/10/17 17:20
+"""
+desc 背离/持续时间信号与原逐行扫描实现的一致性测试
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators.momentum.cci import CCI
+from src.indicators.momentum.stochastic import Stochastic
+from src.indicators.momentum.williams_r import WilliamsR
+from src.indicators.volume.obv import OBV
+
+
+def legacy_divergence(price: pd.Series, values: pd.Series, lookback: int):
+    """原 _add_*_signals 中的逐行背离扫描"""
+    bullish = np.zeros(len(price), dtype=bool)
+    bearish = np.zeros(len(price), dtype=bool)
+    for i in range(20, len(price)):
+        if price.iloc[i] < price.iloc[i - lookback:i].min() and values.iloc[i] > values.iloc[i - lookback:i].min():
+            bullish[i] = True
+        if price.iloc[i] > price.iloc[i - lookback:i].max() and values.iloc[i] < values.iloc[i - lookback:i].max():
+            bearish[i] = True
+    return bullish, bearish
+
+
+def legacy_durations(overbought: pd.Series, oversold: pd.Series):
+    """原超买超卖持续时间的逐行计数"""
+    ob_out, os_out = np.zeros(len(overbought), dtype=int), np.zeros(len(overbought), dtype=int)
+    ob_count = os_count = 0
+    for i in range(len(overbought)):
+        if overbought.iloc[i]:
+            ob_count, os_count = ob_count + 1, 0
+        elif oversold.iloc[i]:
+            os_count, ob_count = os_count + 1, 0
+        else:
+            ob_count = os_count = 0
+        ob_out[i], os_out[i] = ob_count, os_count
+    return ob_out, os_out
+
+
+def create_test_data(days: int = 400, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = np.round(30 + np.cumsum(rng.normal(0, 0.5, days)), 2)
+    return pd.DataFrame({
+        'close_price': close,
+        'high_price': close + np.round(rng.random(days), 2),
+        'low_price': close - np.round(rng.random(days), 2),
+        'volume': rng.integers(1000, 100000, days).astype(float),
+    }, index=pd.bdate_range('2023-01-02', periods=days))
+
+
+class TestIndicatorSignals:
+    """信号向量化测试类"""
+
+    def setup_method(self):
+        self.df = create_test_data()
+
+    @pytest.mark.parametrize('indicator, value_col, prefix, lookback', [
+        (CCI(), 'CCI', 'CCI', 10),
+        (WilliamsR(), 'Williams_R', 'Williams', 10),
+        (Stochastic(), 'Stochastic_K_Fast', 'Stochastic', 5),
+        (OBV(), 'OBV', 'OBV', 10),
+    ])
+    def test_divergence_parity(self, indicator, value_col, prefix, lookback):
+        result = indicator.calculate(self.df)
+        bullish, bearish = legacy_divergence(result['close_price'], result[value_col], lookback)
+
+        assert result[f'{prefix}_Bullish_Divergence'].dtype == bool
+        np.testing.assert_array_equal(result[f'{prefix}_Bullish_Divergence'].to_numpy(), bullish)
+        np.testing.assert_array_equal(result[f'{prefix}_Bearish_Divergence'].to_numpy(), bearish)
+        assert bullish.any() or bearish.any()
+
+    @pytest.mark.parametrize('indicator, prefix', [(CCI(), 'CCI'), (WilliamsR(), 'Williams')])
+    def test_duration_parity(self, indicator, prefix):
+        result = indicator.calculate(self.df)
+        ob, os_ = legacy_durations(result[f'{prefix}_Overbought'], result[f'{prefix}_Oversold'])
+
+        np.testing.assert_array_equal(result[f'{prefix}_Overbought_Duration'].to_numpy(), ob)
+        np.testing.assert_array_equal(result[f'{prefix}_Oversold_Duration'].to_numpy(), os_)
+        assert ob.max() > 1
+
+    def test_short_history_has_no_divergence_columns(self):
+        """不超过30行时不输出背离列（与原实现一致）"""
+        result = CCI().calculate(self.df.iloc[:30])
+        assert 'CCI_Bullish_Divergence' not in result.columns
+        assert 'CCI_Overbought_Duration' in result.columns
@@ -0,0 +1,95 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/indicators\test_memory_tier.py
+# File Name: test_memory_tier
+# @ Author: mango-gh22
+# @ Date：2026/10/17 20:30
+"""
+desc 指标缓存内存层测试 - 字节上限、LRU 淘汰、并发访问
+"""
+import sys
+import os
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+
+from src.indicators.cache_manager import IndicatorCacheManager
+from src.indicators.memory_tier import LRUMemoryTier, estimate_size
+
+
+def frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({'value': np.arange(rows, dtype=np.float64)})
+
+
+class TestLRUMemoryTier:
+    """内存层测试类"""
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        size = estimate_size(frame(1000))
+        tier = LRUMemoryTier(max_bytes=size * 3 + 100, max_items=100, stripes=1)
+        for key in 'abc':
+            tier.put(key, frame(1000))
+        tier.get('a')  # a 变为最近使用
+        tier.put('d', frame(1000))
+
+        assert 'b' not in tier
+        assert all(key in tier for key in 'acd')
+        stats = tier.stats()
+        assert stats['evictions'] == 1
+        assert stats['bytes'] <= stats['max_bytes']
+
+    def test_item_limit_and_oversized_values(self):
+        tier = LRUMemoryTier(max_bytes=10 ** 6, max_items=2, stripes=1)
+        for key in 'abc':
+            tier.put(key, frame(10))
+        assert len(tier) == 2
+
+        assert not tier.put('big', frame(10 ** 6))
+        assert tier.stats()['rejected'] == 1
+
+    def test_ttl_expiration(self):
+        tier = LRUMemoryTier(ttl=-1)
+        tier.put('a', frame(10), {'start_date': '2024-01-01'})
+        assert tier.get('a') is None
+        assert tier.stats()['expirations'] == 1
+
+    def test_concurrent_access_stays_bounded(self):
+        size = estimate_size(frame(100))
+        tier = LRUMemoryTier(max_bytes=size * 40, max_items=1000, stripes=4)
+
+        def worker(offset):
+            for i in range(300):
+                key = f"k{(offset * 7 + i) % 120}"
+                if tier.get(key) is None:
+                    tier.put(key, frame(100))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = tier.stats()
+        assert stats['hits'] + stats['misses'] == 8 * 300
+        assert stats['bytes'] <= stats['max_bytes']
+        assert stats['bytes'] == sum(estimate_size(frame(100)) for _ in range(len(tier)))
+
+
+class TestIndicatorCacheManagerMemory:
+    """缓存管理器内存层统计测试类"""
+
+    def test_stats_exposed(self, tmp_path):
+        cache = IndicatorCacheManager(str(tmp_path), memory_max_bytes=10 ** 6)
+        data = frame(50)
+        cache.set('sh600000', 'macd', {}, '2024-01-01', '2024-01-31', data)
+        assert cache.get('sh600000', 'macd', {}, '2024-01-01', '2024-01-31') is not None
+        assert cache.get('sh600000', 'rsi', {}, '2024-01-01', '2024-01-31') is None
+
+        stats = cache.get_cache_stats()
+        assert stats['memory_cache_items'] == 1
+        assert stats['memory_hits'] == 1
+        assert stats['memory_misses'] >= 1
+        assert stats['memory_bytes'] == estimate_size(data)
+        assert stats['memory_ttl'] == 3600
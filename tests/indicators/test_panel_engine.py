@@ -0,0 +1,101 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/indicators\test_panel_engine.py
+# File Name: test_panel_engine
+# @ Author: mango-gh22
+# @ Date：2026/10/17 16:05
+"""
+desc 面板指标引擎测试 - 与逐股票指标类结果一致
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators.panel_engine import PanelIndicatorEngine
+from src.indicators.indicator_manager import IndicatorFactory
+from src.query.panel_loader import PricePanel
+
+
+def create_long_frame() -> pd.DataFrame:
+    """4只股票：一只有停牌日，一只只有25个交易日"""
+    np.random.seed(7)
+    dates = pd.bdate_range('2024-01-01', periods=150)
+    frames = []
+    for k, symbol in enumerate(['sh600000', 'sh600519', 'sz000001', 'sz300750']):
+        close = 10 * (k + 1) + np.cumsum(np.random.randn(len(dates)) * 0.5)
+        df = pd.DataFrame({
+            'trade_date': dates,
+            'symbol': symbol,
+            'close': close,
+            'high': close + np.random.rand(len(dates)),
+            'low': close - np.random.rand(len(dates)),
+            'volume': np.random.randint(1000, 100000, len(dates)).astype(float),
+        })
+        if symbol == 'sh600519':
+            df = df.drop(index=list(range(30, 42)) + [70, 71, 100])  # 停牌
+        if symbol == 'sz300750':
+            df = df.iloc[-25:]  # 新股
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def symbol_input(long_df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    df = long_df[long_df['symbol'] == symbol].reset_index(drop=True)
+    return df.rename(columns={'close': 'close_price', 'high': 'high_price', 'low': 'low_price'})
+
+
+class TestPanelIndicatorEngine:
+    """面板指标引擎测试类"""
+
+    def setup_method(self):
+        self.long_df = create_long_frame()
+        self.symbols = ['sh600000', 'sh600519', 'sz000001', 'sz300750']
+        self.panel = PricePanel.from_long_frame(self.long_df, self.symbols,
+                                                fields=('high', 'low', 'close', 'volume'))
+        self.engine = PanelIndicatorEngine(self.panel)
+
+    @pytest.mark.parametrize('indicator_name, params', [
+        ('moving_average', {}),
+        ('moving_average', {'periods': [5, 12], 'ma_type': 'ema'}),
+        ('macd', {}),
+        ('rsi', {}),
+        ('bollinger_bands', {}),
+        ('stochastic', {}),
+        ('williams_r', {}),
+        ('cci', {}),
+        ('obv', {}),
+    ])
+    def test_parity_with_per_symbol(self, indicator_name, params):
+        """面板结果与逐股票指标类结果一致"""
+        result = self.engine.calculate(indicator_name, **params)
+
+        for symbol in self.symbols:
+            expected = IndicatorFactory.create_indicator(indicator_name, **params).calculate(
+                symbol_input(self.long_df, symbol))
+            actual = result.symbol_frame(symbol)
+            assert len(actual) == len(expected)
+
+            output_columns = [c for c in expected.columns if c in result.fields]
+            assert output_columns, f"{indicator_name} 没有可比较的输出列"
+            for column in output_columns:
+                exp = expected[column].to_numpy(dtype=float)
+                act = actual[column].to_numpy(dtype=float)
+                np.testing.assert_allclose(act, exp, rtol=1e-9, atol=1e-9, equal_nan=True,
+                                           err_msg=f"{indicator_name}.{column} @ {symbol}")
+
+    def test_missing_cells_stay_empty(self):
+        """停牌日不产生指标值"""
+        result = self.engine.calculate('macd')
+        col = self.symbols.index('sh600519')
+        assert np.isnan(result['MACD_DIF'][~self.panel.mask[:, col], col]).all()
+        assert not result['MACD_GOLDEN_CROSS'][~self.panel.mask[:, col], col].any()
+
+    def test_fallback_indicator(self):
+        """未向量化的指标回退到逐股票计算"""
+        result = self.engine.calculate('parabolic_sar')
+        assert result.shape == self.panel.shape
+        assert len(result.fields) > 0
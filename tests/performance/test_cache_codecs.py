@@ -0,0 +1,102 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/performance\test_cache_codecs.py
+# File Name: test_cache_codecs
+# @ Author: mango-gh22
+# @ Date：2026/10/17 21:30
+"""
+desc 缓存编解码测试 - 压缩算法、Arrow/NumPy 序列化、旧格式兼容、按组配置
+"""
+import sys
+import os
+import pickle
+import zlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.performance.cache_codecs import CacheCodec, HAS_PYARROW, available_compressions
+from src.performance.cache_strategy import CacheLevel, CacheManager
+
+
+def create_frame(rows: int = 500) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({'close': rng.random(rows), 'volume': rng.integers(0, 10000, rows)},
+                        index=pd.bdate_range('2024-01-01', periods=rows, name='trade_date'))
+
+
+class TestCacheCodec:
+    """编解码器测试类"""
+
+    @pytest.mark.parametrize('compression', [c for c, ok in available_compressions().items() if ok])
+    def test_round_trip(self, compression):
+        codec = CacheCodec(compression)
+        frame = create_frame()
+        for value in (frame, np.arange(12.0).reshape(3, 4), {'a': [1, 2]}):
+            blob, _, _ = codec.encode(value)
+            decoded, label, _ = CacheCodec.decode(bytearray(blob))
+            assert label.endswith(f'/{compression}')
+            if isinstance(value, pd.DataFrame):
+                pd.testing.assert_frame_equal(decoded, value, check_freq=False)
+            elif isinstance(value, np.ndarray):
+                np.testing.assert_array_equal(decoded, value)
+                decoded[0, 0] = -1  # 结果可写
+            else:
+                assert decoded == value
+
+    def test_serializer_selection(self):
+        codec = CacheCodec('none')
+        assert codec.encode(create_frame())[1] == ('arrow/none' if HAS_PYARROW else 'pickle/none')
+        assert codec.encode(np.zeros(3))[1] == 'numpy/none'
+        assert codec.encode(np.array(['a', None], dtype=object))[1] == 'pickle/none'
+        assert CacheCodec('none', serializer='pickle').encode(create_frame())[1] == 'pickle/none'
+
+    def test_pickle_fallback_keeps_values(self):
+        codec = CacheCodec('none')
+        # 结构化数组：dtype.str 会丢失字段
+        records = np.array([(1, 2.5), (2, 3.5)], dtype=[('id', '<i4'), ('close', '<f8')])
+        blob, label, _ = codec.encode(records)
+        decoded = CacheCodec.decode(blob)[0]
+        assert label == 'pickle/none'
+        assert decoded.dtype == records.dtype and decoded['close'].tolist() == [2.5, 3.5]
+        # 重复列名：Arrow 转换抛 ValueError
+        frame = pd.DataFrame([[1, 2], [3, 4]], columns=['a', 'a'])
+        blob, label, _ = codec.encode(frame)
+        assert label == 'pickle/none'
+        pd.testing.assert_frame_equal(CacheCodec.decode(blob)[0], frame)
+
+    def test_legacy_blob(self):
+        blob = zlib.compress(pickle.dumps({'x': 1}))
+        assert CacheCodec.decode(blob)[:2] == ({'x': 1}, 'pickle/zlib')
+
+    def test_invalid_config(self):
+        with pytest.raises(ValueError):
+            CacheCodec('snappy')
+        with pytest.raises(ValueError):
+            CacheCodec(serializer='msgpack')
+
+
+class TestCacheManagerCodecs:
+    """缓存管理器按组编解码测试类"""
+
+    def test_group_codec_and_stats(self, tmp_path):
+        manager = CacheManager({
+            'l2': {'strategy': 'lfu', 'max_size': 100, 'cache_dir': str(tmp_path), 'codec': 'zlib'},
+            'groups': {'raw': {'codec': 'none'}},
+        })
+        frame = create_frame()
+        manager.set('raw_frame', frame, group='raw')
+        manager.set('default_frame', frame)
+
+        disk = manager.multi_level_cache.caches[CacheLevel.DISK]
+        pd.testing.assert_frame_equal(disk.get('raw_frame'), frame, check_freq=False)
+        disk.get('default_frame')
+
+        codecs = manager.get_stats()['codecs']
+        serializer = 'arrow' if HAS_PYARROW else 'pickle'
+        assert codecs[f'{serializer}/none']['encodes'] == 1
+        assert codecs[f'{serializer}/zlib']['decodes'] == 1
+        assert codecs[f'{serializer}/zlib']['ratio'] > 1
+        manager.multi_level_cache.close()
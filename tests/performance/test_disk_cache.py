@@ -0,0 +1,85 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/performance\test_disk_cache.py
+# File Name: test_disk_cache
+# @ Author: mango-gh22
+# @ Date：2026/10/17 20:40
+"""
+desc 磁盘缓存测试 - SQLite 索引、访问统计批量写回、旧索引迁移
+"""
+import sys
+import os
+import json
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import pandas as pd
+
+from src.performance.cache_strategy import DiskCache, LRUCacheStrategy
+
+
+class TestDiskCache:
+    """磁盘缓存测试类"""
+
+    def test_round_trip_and_reopen(self, tmp_path):
+        cache = DiskCache(LRUCacheStrategy, 10, str(tmp_path))
+        data = pd.DataFrame({'close': [1.0, 2.0, 3.0]})
+        cache.set('sh600000', data)
+        cache.set('sh600000', data)  # 覆盖不重复计数
+        pd.testing.assert_frame_equal(cache.get('sh600000'), data)
+        assert cache.get('missing') is None
+        cache.close()
+
+        reopened = DiskCache(LRUCacheStrategy, 10, str(tmp_path))
+        stats = reopened.get_stats()
+        assert stats['total_items'] == 1
+        assert stats['size'] > 0
+        assert reopened.get_keys() == ['sh600000']
+        row = reopened._conn.execute(
+            "SELECT access_count FROM disk_index WHERE cache_key = 'sh600000'").fetchone()
+        assert row[0] == 1
+        reopened.close()
+
+    def test_access_stats_are_batched(self, tmp_path):
+        cache = DiskCache(LRUCacheStrategy, 10, str(tmp_path))
+        cache.ACCESS_FLUSH_INTERVAL = 3600
+        cache.set('a', 1)
+        for _ in range(5):
+            assert cache.get('a') == 1
+
+        query = "SELECT access_count FROM disk_index WHERE cache_key = 'a'"
+        assert cache._conn.execute(query).fetchone()[0] == 0
+        cache.flush()
+        assert cache._conn.execute(query).fetchone()[0] == 5
+        cache.close()
+
+    def test_expired_and_eviction(self, tmp_path):
+        cache = DiskCache(LRUCacheStrategy, 10, str(tmp_path))
+        cache.set('old', 1, ttl=timedelta(seconds=-1))
+        assert cache.get('old') is None
+        assert cache.get_stats()['total_items'] == 0
+
+        cache.set('a', b'x' * 100)
+        cache.set('b', b'y' * 100)
+        cache.get('a')
+        cache.max_size = (cache.stats['size'] + 1) / (1024 * 1024)
+        cache.set('c', b'z' * 100)
+        # 最久未访问的 b 被淘汰
+        assert set(cache.get_keys()) == {'a', 'c'}
+        cache.close()
+
+    def test_migrates_json_index(self, tmp_path):
+        now = datetime.now().isoformat()
+        legacy = DiskCache(LRUCacheStrategy, 10, str(tmp_path))
+        legacy.set('k', {'v': 1})
+        legacy._conn.execute("DELETE FROM disk_index")
+        legacy._conn.commit()
+        legacy.close()
+        with open(tmp_path / 'index.json', 'w') as f:
+            json.dump({'k': {'created_at': now, 'last_accessed': now, 'size': 10,
+                             'ttl': None, 'metadata': {}, 'access_count': 3}}, f)
+
+        cache = DiskCache(LRUCacheStrategy, 10, str(tmp_path))
+        assert not (tmp_path / 'index.json').exists()
+        assert cache.get('k') == {'v': 1}
+        cache.close()
@@ -0,0 +1,88 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/performance\test_parallel_calculator.py
+# File Name: test_parallel_calculator
+# @ Author: mango-gh22
+# @ Date：2026/10/17 23:55
+"""
+desc 并行计算器测试 - 真实指标计算、共享内存数据传递
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators.indicator_manager import IndicatorFactory
+from src.performance.parallel_calculator import ParallelCalculator, ParallelMode
+from src.performance.shared_frames import SharedFrame, read_shared_frame
+
+
+def make_prices(rows: int = 300, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50 + np.cumsum(rng.normal(0, 0.5, rows))
+    return pd.DataFrame({
+        'symbol': 'sh600000',
+        'open_price': close + rng.normal(0, 0.1, rows),
+        'high_price': close + rng.random(rows),
+        'low_price': close - rng.random(rows),
+        'close_price': close,
+        'volume': rng.integers(1000, 10000, rows),
+    }, index=pd.date_range('2023-01-02', periods=rows, freq='B', name='trade_date'))
+
+
+class TestSharedFrame:
+    """共享内存 DataFrame 测试类"""
+
+    def test_round_trip(self):
+        df = make_prices(50)
+        shared = SharedFrame(df)
+        try:
+            restored = read_shared_frame(shared.spec)
+        finally:
+            shared.release()
+        pd.testing.assert_frame_equal(restored, df, check_freq=False)
+
+
+class TestParallelCalculator:
+    """并行计算器测试类"""
+
+    @pytest.mark.parametrize('mode', [ParallelMode.THREAD, ParallelMode.PROCESS])
+    def test_results_match_direct_calculation(self, mode):
+        data = make_prices()
+        calculator = ParallelCalculator(max_workers=2, mode=mode)
+        try:
+            task_ids = calculator.batch_submit([
+                ('sh600000', 'cci', data, {'period': 20}),
+                ('sh600000', 'parabolic_sar', data, {}),
+            ])
+            summary = calculator.wait_for_completion(task_ids, timeout=120)
+        finally:
+            calculator.shutdown()
+
+        assert summary['successful'] == 2
+        cci, sar = (summary['results'][task_id] for task_id in task_ids)
+        # 共享内存只传递索引的值，不保留 freq
+        pd.testing.assert_frame_equal(cci, IndicatorFactory.create_indicator('cci', period=20).calculate(data),
+                                      check_freq=False)
+        pd.testing.assert_frame_equal(sar, IndicatorFactory.create_indicator('parabolic_sar').calculate(data),
+                                      check_freq=False)
+        assert calculator._shared_frames == {}
+
+        timings = calculator.get_task_timings()
+        assert len(timings) == 2
+        assert all(t['queue_wait'] >= 0 and t['compute_time'] > 0 for t in timings)
+        stats = calculator.get_statistics()
+        assert stats['scheduler']['batched_tasks'] == 2
+        assert stats['timing']['avg_compute_time'] > 0
+
+    def test_failed_task_is_reported(self):
+        calculator = ParallelCalculator(max_workers=1, mode=ParallelMode.THREAD)
+        try:
+            task_id = calculator.submit_task('sh600000', 'unknown_indicator', make_prices(30))
+            summary = calculator.wait_for_completion([task_id], timeout=30)
+        finally:
+            calculator.shutdown()
+        assert summary['failed'] == 1
@@ -0,0 +1,83 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/performance\test_shared_cache.py
+# File Name: test_shared_cache
+# @ Author: mango-gh22
+# @ Date：2026/10/17 21:50
+"""
+desc 多进程共享缓存测试 - 跨进程读写、大小上限淘汰、MultiLevelCache 共享级别
+"""
+import sys
+import os
+import multiprocessing
+from datetime import timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+
+from src.performance.cache_strategy import CacheLevel, MultiLevelCache, SharedCache
+
+
+def write_from_worker(db_path: str, worker: int, count: int):
+    """子进程：写入一批缓存项"""
+    cache = SharedCache(db_path=db_path)
+    for i in range(count):
+        cache.set(f"w{worker}:{i}", {'worker': worker, 'value': i})
+    cache.close()
+
+
+class TestSharedCache:
+    """共享缓存测试类"""
+
+    def test_visible_across_processes(self, tmp_path):
+        db_path = str(tmp_path / 'shared.sqlite')
+        ctx = multiprocessing.get_context('spawn')
+        workers = [ctx.Process(target=write_from_worker, args=(db_path, w, 50)) for w in range(3)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join(60)
+            assert p.exitcode == 0
+
+        cache = SharedCache(db_path=db_path)
+        assert cache.get('w2:49') == {'worker': 2, 'value': 49}
+        stats = cache.get_stats()
+        assert stats['current_items'] == 150
+        assert stats['size'] > 0
+        cache.close()
+
+    def test_size_limit_and_ttl(self, tmp_path):
+        cache = SharedCache(max_size=1, db_path=str(tmp_path / 'shared.sqlite'))
+        block = np.random.default_rng(0).random(40000)  # 约 320KB
+        for i in range(5):
+            cache.set(f"k{i}", block)
+            cache.get('k0')  # k0 保持最近访问
+            cache.flush()
+
+        keys = set(cache.get_keys())
+        assert 'k0' in keys and 'k4' in keys
+        assert cache.get_stats()['size'] <= 1024 * 1024
+        assert cache.stats['evictions'] > 0
+
+        cache.set('short', 1, ttl=timedelta(seconds=-1))
+        assert cache.get('short') is None
+        cache.close()
+
+    def test_multi_level_shared_tier(self, tmp_path):
+        config = {
+            'l2': {'strategy': 'lfu', 'max_size': 100, 'cache_dir': str(tmp_path / 'disk_a')},
+            'shared': {'max_size': 100, 'path': str(tmp_path / 'shared.sqlite')},
+        }
+        writer = MultiLevelCache(config)
+        frame = pd.DataFrame({'close': [1.0, 2.0]})
+        writer.set('macd:sh600000', frame)
+
+        # 另一个实例（模拟另一个进程）有自己的内存和磁盘缓存，从共享级别命中
+        reader = MultiLevelCache(dict(config, l2=dict(config['l2'], cache_dir=str(tmp_path / 'disk_b'))))
+        pd.testing.assert_frame_equal(reader.get('macd:sh600000'), frame)
+        stats = reader.get_stats()
+        assert stats['shared_hits'] == 1
+        assert CacheLevel.SHARED in reader.caches
+        writer.close()
+        reader.close()
@@ -0,0 +1,66 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/performance\test_task_scheduler.py
+# File Name: test_task_scheduler
+# @ Author: mango-gh22
+# @ Date：2026/10/18 00:40
+"""
+desc 工作窃取调度器测试 - 成本估算、按成本打包、优先级、窃取
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from src.performance.task_scheduler import WorkStealingScheduler, estimate_cost
+
+
+class TestWorkStealingScheduler:
+    """调度器测试类"""
+
+    def test_estimate_cost_uses_complexity(self):
+        assert estimate_cost(1000, 'parabolic_sar') > estimate_cost(1000, 'cci') > estimate_cost(1000, 'rsi')
+        assert estimate_cost(2000, 'rsi') == 2 * estimate_cost(1000, 'rsi')
+
+    def test_cheap_tasks_are_batched_expensive_alone(self):
+        scheduler = WorkStealingScheduler(1, priority_enabled=False, batch_cost=100)
+        for i in range(5):
+            scheduler.submit(f"cheap{i}", cost=30)
+        scheduler.submit('expensive', cost=500)
+
+        sizes = []
+        while scheduler.qsize():
+            sizes.append([item for item, _ in scheduler.next_batch(0)])
+        assert sizes == [['cheap0', 'cheap1', 'cheap2'], ['cheap3', 'cheap4'], ['expensive']]
+
+    def test_priority_order(self):
+        scheduler = WorkStealingScheduler(1, priority_enabled=True, batch_cost=1)
+        for item, priority in [('low', 1), ('high', 9), ('mid', 5)]:
+            scheduler.submit(item, cost=1, priority=priority)
+        order = [scheduler.next_batch(0)[0][0] for _ in range(3)]
+        assert order == ['high', 'mid', 'low']
+
+        fifo = WorkStealingScheduler(1, priority_enabled=False, batch_cost=1)
+        for item, priority in [('low', 1), ('high', 9)]:
+            fifo.submit(item, cost=1, priority=priority)
+        assert [fifo.next_batch(0)[0][0] for _ in range(2)] == ['low', 'high']
+
+    def test_idle_worker_steals_from_busiest_queue(self):
+        scheduler = WorkStealingScheduler(3, priority_enabled=False, batch_cost=10)
+        scheduler.submit('big', cost=100)   # 队列 0
+        scheduler.submit('a', cost=5)       # 队列 1
+        scheduler.submit('b', cost=5)       # 队列 2
+
+        # 队列 2 取完自己的任务后，从待处理成本最大的队列 0 窃取
+        assert [item for item, _ in scheduler.next_batch(2)] == ['b']
+        assert [item for item, _ in scheduler.next_batch(2)] == ['big']
+        assert scheduler.get_stats()['steals'] == 1
+        assert [item for item, _ in scheduler.next_batch(0)] == ['a']
+        assert scheduler.next_batch(1) == []
+        assert scheduler.get_stats()['steals'] == 2
+
+    def test_remove_queued(self):
+        scheduler = WorkStealingScheduler(2)
+        for item in ['x', 'y', 'z']:
+            scheduler.submit(item, cost=1)
+        assert scheduler.remove(lambda item: item == 'y') == 1
+        assert scheduler.qsize() == 2
@@ -0,0 +1,149 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/performance\test_worker_scaling.py
+# File Name: test_worker_scaling
+# @ Author: mango-gh22
+# @ Date：2026/10/18 01:30
+"""
+desc 自适应工作数控制器测试 - 按负载增减、内存阈值回退、调度队列随工作数调整、换进程池时的提交
+"""
+import sys
+import os
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from types import SimpleNamespace
+
+from src.performance.memory_manager import MemoryThreshold
+from src.performance.parallel_calculator import ParallelCalculator, ParallelMode
+from src.performance.task_scheduler import WorkStealingScheduler
+from src.performance.worker_scaling import AdaptiveWorkerController
+
+
+class FakeMonitor:
+    """返回固定系统 CPU / 内存使用率的监控器"""
+
+    def __init__(self, cpu: float, memory: float = 40.0):
+        self.cpu, self.memory = cpu, memory
+
+    def collect_metrics(self):
+        return SimpleNamespace(system_cpu_percent=self.cpu, memory_percent=self.memory)
+
+
+class RacingExecutor:
+    """提交前在另一线程调整工作数（触发换池），模拟工作线程读到旧进程池后才提交"""
+
+    def __init__(self, calculator, executor, workers):
+        self.calculator, self.executor, self.workers = calculator, executor, workers
+        self.resizer = None
+
+    def submit(self, fn, *args):
+        if self.resizer is None:
+            self.resizer = threading.Thread(target=self.calculator.resize_workers, args=(self.workers,))
+            self.resizer.start()
+            self.resizer.join(timeout=0.5)
+        return self.executor.submit(fn, *args)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+def make_calculator(workers: int) -> ParallelCalculator:
+    return ParallelCalculator(max_workers=workers, mode=ParallelMode.THREAD, adaptive=False)
+
+
+class TestAdaptiveWorkerController:
+    """控制器测试类"""
+
+    def test_scales_up_under_target_with_backlog(self):
+        calculator = make_calculator(2)
+        try:
+            controller = AdaptiveWorkerController(calculator, min_workers=1, max_workers=3,
+                                                  target_load=0.7, monitor=FakeMonitor(cpu=20))
+            assert controller.step() == 2  # 没有排队任务时不扩容
+
+            calculator.scheduler.submit('queued', cost=1)
+            assert controller.step() == 3
+            assert controller.step() == 3  # 不超过 max_workers
+            assert calculator.scheduler.workers == 3
+            assert controller.get_stats()['scale_ups'] == 1
+        finally:
+            calculator.shutdown()
+
+    def test_scales_down_over_target(self):
+        calculator = make_calculator(3)
+        try:
+            monitor = FakeMonitor(cpu=95)
+            controller = AdaptiveWorkerController(calculator, min_workers=2, max_workers=4, monitor=monitor)
+            assert [controller.step(), controller.step()] == [2, 2]
+
+            monitor.cpu = 72  # 容差带内保持不变
+            assert controller.step() == 2
+        finally:
+            calculator.shutdown()
+
+    def test_memory_threshold_backs_off(self):
+        calculator = make_calculator(4)
+        try:
+            memory_manager = SimpleNamespace(memory_history=[SimpleNamespace(threshold=MemoryThreshold.HIGH)])
+            controller = AdaptiveWorkerController(calculator, min_workers=1, max_workers=8,
+                                                  monitor=FakeMonitor(cpu=10),
+                                                  memory_manager=memory_manager)
+            calculator.scheduler.submit('queued', cost=1)
+            assert controller.step() == 3  # 负载低也不扩容，反而减少
+
+            memory_manager.memory_history.append(SimpleNamespace(threshold=MemoryThreshold.CRITICAL))
+            assert controller.step() == 1
+            assert controller.get_stats()['memory_backoffs'] == 2
+
+            # 没有 MemoryManager 时按采样的系统内存使用率判断
+            controller.memory_manager = None
+            controller.monitor = FakeMonitor(cpu=10, memory=85)
+            calculator.resize_workers(4)
+            assert controller.step() == 3
+        finally:
+            calculator.shutdown()
+
+    def test_scheduler_resize_keeps_queued_tasks(self):
+        scheduler = WorkStealingScheduler(3, priority_enabled=False, batch_cost=1)
+        for item in ['a', 'b', 'c', 'd']:
+            scheduler.submit(item, cost=1)
+        scheduler.resize(1)
+        assert scheduler.workers == 1
+        assert sorted(scheduler.next_batch(0)[0][0] for _ in range(4)) == ['a', 'b', 'c', 'd']
+
+        scheduler.resize(2)
+        scheduler.submit('e', cost=1)
+        assert scheduler.workers == 2 and scheduler.qsize() == 1
+
+    def test_calculator_completes_tasks_after_resize(self):
+        from tests.performance.test_parallel_calculator import make_prices
+
+        calculator = make_calculator(1)
+        try:
+            data = make_prices(100)
+            first = calculator.submit_task('sh600000', 'rsi', data)
+            calculator.resize_workers(3)
+            assert len([w for w in calculator.workers if w.is_alive()]) == 3
+            second = calculator.submit_task('sh600000', 'cci', data)
+            calculator.resize_workers(1)
+            summary = calculator.wait_for_completion([first, second], timeout=60)
+            assert summary['successful'] == 2
+            assert calculator.get_statistics()['system']['max_workers'] == 1
+        finally:
+            calculator.shutdown()
+
+    def test_process_pool_swap_does_not_fail_batch(self):
+        from tests.performance.test_parallel_calculator import make_prices
+
+        calculator = ParallelCalculator(max_workers=1, mode=ParallelMode.PROCESS, adaptive=False)
+        try:
+            racing = calculator.executor = RacingExecutor(calculator, calculator.executor, workers=3)
+            task_id = calculator.submit_task('sh600000', 'rsi', make_prices(100))
+            summary = calculator.wait_for_completion([task_id], timeout=60)
+            racing.resizer.join(timeout=10)
+
+            assert summary['successful'] == 1
+            assert calculator.executor is not racing and calculator.max_workers == 3
+        finally:
+            calculator.shutdown()
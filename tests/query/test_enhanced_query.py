@@ -531,6 +531,45 @@ class TestEnhancedQueryEngine(unittest.TestCase):
                 self.mock_engine.query_daily_data.assert_called_once()
                 mock_available.assert_called_once()
 
+    def test_concurrent_identical_queries_coalesced(self):
+        """测试相同的并发请求只查询和计算一次"""
+        import threading
+        import time
+
+        def slow_query(*args, **kwargs):
+            time.sleep(0.3)
+            return self.test_data
+
+        self.mock_engine.query_daily_data.side_effect = slow_query
+
+        with patch.object(self.engine.indicator_manager, 'calculate_for_symbol') as mock_calculate:
+            mock_calculate.return_value = {
+                'rsi': pd.DataFrame({'RSI': np.random.uniform(0, 100, 50)}, index=self.test_data.index)
+            }
+
+            barrier = threading.Barrier(8)
+            results = []
+
+            def request():
+                barrier.wait()
+                results.append(self.engine.query_with_indicators(
+                    'sh600519', ['rsi'], '2024-01-01', '2024-02-01'))
+
+            threads = [threading.Thread(target=request) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            self.assertEqual(len(results), 8)
+            self.mock_engine.query_daily_data.assert_called_once()
+            mock_calculate.assert_called_once()
+            # 计算复用已查询的数据
+            self.assertIs(mock_calculate.call_args.kwargs['data'], self.test_data)
+            # 每个调用者拿到独立的副本
+            self.assertEqual(len({id(r) for r in results}), 8)
+            pd.testing.assert_frame_equal(results[0], results[-1])
+
     def test_get_available_indicators(self):
         """测试获取可用指标"""
         # 模拟指标管理器
@@ -0,0 +1,97 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/query\test_panel_loader.py
+# File Name: test_panel_loader
+# @ Author: mango-gh22
+# @ Date：2026/10/17 14:40
+"""
+desc 面板数据加载器测试
+"""
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import numpy as np
+import pandas as pd
+
+from src.query.panel_loader import PricePanel, PanelLoader
+from src.query.analytics import StockAnalytics
+
+
+def create_long_frame() -> pd.DataFrame:
+    """两只股票，sz000001 缺少 2024-01-03"""
+    return pd.DataFrame({
+        'trade_date': pd.to_datetime(['2024-01-02', '2024-01-04', '2024-01-02', '2024-01-03', '2024-01-04']),
+        'symbol': ['sz000001', 'sz000001', 'sh600519', 'sh600519', 'sh600519'],
+        'close': [10.0, 10.5, 1700.0, 1710.0, 1690.0],
+        'volume': [1e6, 1.2e6, 2e5, 2.1e5, 1.9e5],
+    })
+
+
+class FakeQueryEngine:
+    def __init__(self, df):
+        self.df = df
+
+    def _normalize_symbol(self, symbol):
+        return {'000001.SZ': 'sz000001'}.get(symbol, symbol)
+
+    def query_daily_data_many(self, symbols, start_date=None, end_date=None, columns=None):
+        return self.df
+
+
+class FakeCalendar:
+    def get_trade_dates_between(self, start, end):
+        return list(pd.date_range(start, end, freq='B').to_pydatetime())
+
+
+class TestPanelLoader:
+    """面板加载测试类"""
+
+    def test_alignment_and_mask(self):
+        """按日期×股票对齐，缺失位置为 NaN 且 mask 为 False"""
+        dates = pd.date_range('2024-01-02', '2024-01-04')
+        panel = PricePanel.from_long_frame(create_long_frame(), ['sz000001', 'sh600519'], dates,
+                                           fields=('close', 'volume'))
+
+        assert panel.shape == (3, 2)
+        assert panel['close'].dtype == np.float64
+        assert panel['close'].flags['C_CONTIGUOUS']
+        assert np.isnan(panel['close'][1, 0])
+        assert panel['close'][2, 1] == 1690.0
+        assert panel.mask.tolist() == [[True, True], [False, True], [True, True]]
+
+    def test_symbol_frame(self):
+        """单股票长表只保留有效行"""
+        panel = PricePanel.from_long_frame(create_long_frame(), ['sz000001', 'sh600519'],
+                                           fields=('close',))
+        df = panel.symbol_frame('sz000001')
+        assert list(df['close']) == [10.0, 10.5]
+
+    def test_loader_uses_trade_calendar(self):
+        """加载器以交易日历为行，并使用标准化后的股票代码为列"""
+        loader = PanelLoader(FakeQueryEngine(create_long_frame()), FakeCalendar())
+        panel = loader.load(['000001.SZ', 'sh600519'], '2024-01-01', '2024-01-05', fields=('close',))
+
+        assert panel.symbols == ['sz000001', 'sh600519']
+        assert len(panel.dates) == 5  # 2024-01-01 ~ 05 的工作日
+        assert not panel.mask[0].any()  # 01-01 无数据
+
+    def test_loader_merges_symbol_aliases(self):
+        """同一股票的不同写法只占一列，且只查询一次"""
+        engine = FakeQueryEngine(create_long_frame())
+        queried = []
+        engine.query_daily_data_many = lambda symbols, **kwargs: queried.append(symbols) or engine.df
+        panel = PanelLoader(engine, FakeCalendar()).load(['000001.SZ', 'sz000001', 'sh600519'],
+                                                         '2024-01-01', '2024-01-05', fields=('close',))
+
+        assert queried == [['sz000001', 'sh600519']]
+        assert panel.symbols == ['sz000001', 'sh600519']
+        assert list(panel.symbol_frame('sz000001')['close']) == [10.0, 10.5]
+
+    def test_panel_correlation(self):
+        """面板相关性矩阵"""
+        panel = PricePanel.from_long_frame(create_long_frame(), ['sz000001', 'sh600519'],
+                                           fields=('close',))
+        corr = StockAnalytics.calculate_correlation_from_panel(panel, min_periods=1)
+        assert corr.shape == (2, 2)
+        assert corr.loc['sh600519', 'sh600519'] == 1.0
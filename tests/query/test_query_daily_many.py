@@ -0,0 +1,113 @@
+# _*_ coding: utf-8 _*_
+# File Path: E:/MyFile/stock_database_v1/tests/query\test_query_daily_many.py
+# File Name: test_query_daily_many
+# @ Author: mango-gh22
+# @ Date：2026/10/18 05:30
+"""
+desc 批量日线查询测试 - IN (...) 分块、字段投影、长表/字典输出、代码别名、按股票限制条数（用替身连接器代替 MySQL）
+"""
+import sys
+import os
+import re
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+import pandas as pd
+import pytest
+
+from src.query.enhanced_query_engine import EnhancedQueryEngine
+from src.query.query_engine import QueryEngine
+
+ROWS = {
+    'sh600519': [('2024-01-02', 1700.0), ('2024-01-03', 1710.0)],
+    'sz000001': [('2024-01-02', 10.0)],
+    'sh600000': [('2024-01-02', 7.0), ('2024-01-03', 7.1)],
+}
+
+
+class FakeConnector:
+    """按 IN (...) 中的股票返回 ROWS 中的记录（row_num <= %s 时每只股票取最近几条），并记录每次查询"""
+
+    def __init__(self):
+        self.calls = []
+
+    def execute_query(self, query, params=()):
+        self.calls.append((query, params))
+        columns = re.findall(r' as (\w+)', query)
+        limit = params[-1] if 'row_num <= %s' in query else None
+        return [{'trade_date': date, 'symbol': symbol, **{col: close for col in columns}, 'volume': '100'}
+                for symbol in params if symbol in ROWS
+                for date, close in (ROWS[symbol][-limit:] if limit else ROWS[symbol])]
+
+
+@pytest.fixture
+def engine():
+    engine = QueryEngine.__new__(QueryEngine)
+    engine.db_connector = FakeConnector()
+    return engine
+
+
+class TestQueryDailyDataMany:
+    """批量日线查询测试类"""
+
+    def test_chunked_in_queries(self, engine):
+        df = engine.query_daily_data_many(['sh600519', '000001.SZ', '600000'], '2024-01-01', '2024-01-31',
+                                          columns=['close', 'volume'], chunk_size=2)
+
+        params = [call[1] for call in engine.db_connector.calls]
+        assert params == [('sh600519', 'sz000001', '2024-01-01', '2024-01-31'),
+                          ('sh600000', '2024-01-01', '2024-01-31')]
+        assert 'symbol IN (%s, %s)' in engine.db_connector.calls[0][0]
+        assert 'symbol IN (%s)' in engine.db_connector.calls[1][0]
+
+        # 长表跨块按 symbol, trade_date 排序，字段转为数值
+        assert df.columns.tolist() == ['trade_date', 'symbol', 'close', 'volume']
+        assert list(zip(df['symbol'], df['trade_date'].dt.strftime('%Y-%m-%d'))) == [
+            ('sh600000', '2024-01-02'), ('sh600000', '2024-01-03'),
+            ('sh600519', '2024-01-02'), ('sh600519', '2024-01-03'), ('sz000001', '2024-01-02')]
+        assert df['volume'].dtype.kind in 'if'
+
+    def test_column_projection(self, engine):
+        engine.query_daily_data_many(['sh600519'], columns=['close', 'pct_change'])
+        query = engine.db_connector.calls[0][0]
+        assert 'close_price as close' in query and 'pct_change' in query
+        assert 'open_price' not in query
+
+        with pytest.raises(ValueError):
+            engine.query_daily_data_many(['sh600519'], columns=['close', 'no_such_column'])
+
+    def test_dict_output_keeps_aliases(self, engine):
+        frames = engine.query_daily_data_many(['600519.SH', 'sh600519', 'sz000001', 'sh688001'],
+                                              columns=['close'], as_dict=True)
+
+        # 同一股票的两种写法只查询一次，但各自有一项
+        assert engine.db_connector.calls[0][1] == ('sh600519', 'sz000001', 'sh688001')
+        assert list(frames) == ['600519.SH', 'sh600519', 'sz000001', 'sh688001']
+        pd.testing.assert_frame_equal(frames['600519.SH'], frames['sh600519'])
+        assert frames['600519.SH'] is not frames['sh600519']
+        assert frames['sh600519']['close'].tolist() == [1700.0, 1710.0]
+        assert len(frames['sz000001']) == 1
+        assert frames['sh688001'].empty and 'close' in frames['sh688001'].columns
+
+    def test_limit_per_symbol_in_sql(self, engine):
+        df = engine.query_daily_data_many(['sh600519', 'sh600000'], '2024-01-01', '2024-01-31',
+                                          columns=['close'], limit_per_symbol=1)
+
+        query, params = engine.db_connector.calls[0]
+        assert 'ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY trade_date DESC)' in query
+        assert params == ('sh600519', 'sh600000', '2024-01-01', '2024-01-31', 1)
+        assert list(zip(df['symbol'], df['trade_date'].dt.strftime('%Y-%m-%d'))) == [
+            ('sh600000', '2024-01-03'), ('sh600519', '2024-01-03')]
+
+        # 不限制时不使用窗口函数
+        engine.query_daily_data_many(['sh600519'])
+        assert 'ROW_NUMBER' not in engine.db_connector.calls[1][0]
+
+    def test_enhanced_engine_limits_in_sql(self, engine):
+        frames = EnhancedQueryEngine(query_engine=engine).query_daily_data_many(
+            ['sh600519', 'sz000001', 'sh688001'], '2024-01-01', '2024-01-31', limit=1)
+
+        assert engine.db_connector.calls[0][1][-1] == 1
+        assert frames['sh600519']['trade_date'].dt.strftime('%Y-%m-%d').tolist() == ['2024-01-03']
+        assert len(frames['sz000001']) == 1
+        assert frames['sh688001'].empty